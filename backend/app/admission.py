@@ -0,0 +1,145 @@
+"""
+Admission control for /chat.
+
+Each question is routed first (a few regexes) and then admitted to the lane
+of its cost class before any handler thread is used:
+  * cheap     - static answers and precomputed lookups (survey, calendar, forecasts)
+  * standard  - in-memory analysis over the loaded tables
+  * expensive - anything that waits on the network (geocoding, OSRM, the LLM)
+A lane runs at most `concurrency` requests and lets at most `queue` more
+wait, each for at most `timeout` seconds. A full queue or a timed-out wait
+is answered at once with 503 and a Retry-After estimated from the lane's
+recent service time, so a burst of LLM fallbacks fills the expensive lane
+and nothing else. Each client also has a token bucket; an empty bucket is a
+429 with the seconds until the next token.
+"""
+
+import asyncio
+import math
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from fastapi.responses import JSONResponse
+
+from instrumentation import record_admission
+
+CHEAP, STANDARD, EXPENSIVE = "cheap", "standard", "expensive"
+LANE_ORDER = (CHEAP, STANDARD, EXPENSIVE)
+# concurrency, queue, queue timeout (seconds); the concurrencies add up to less than
+# the server's 40 worker threads, so the cheap lane always has threads left
+LANE_DEFAULTS = {
+    CHEAP: (16, 64, 2.0),
+    STANDARD: (8, 32, 10.0),
+    EXPENSIVE: (4, 8, 15.0),
+}
+CLIENT_RATE = float(os.environ.get("POTHOLE_CLIENT_RATE", "5"))  # requests per second, refilled continuously
+CLIENT_BURST = float(os.environ.get("POTHOLE_CLIENT_BURST", "20"))
+CLIENT_IDLE_SECONDS = 600  # buckets idle this long are dropped
+SERVICE_TIME_DECAY = 0.2  # weight of the newest request in a lane's mean service time
+
+
+def _lane_setting(lane, name, default, cast):
+    return cast(os.environ.get(f"POTHOLE_{lane.upper()}_{name}", default))
+
+
+class Rejected(Exception):
+    """A request turned away before it ran; `response()` is the HTTP answer."""
+
+    def __init__(self, status, detail, retry_after):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+        self.retry_after = max(1, math.ceil(retry_after))
+
+    def response(self):
+        return JSONResponse({"detail": self.detail}, status_code=self.status, headers={"Retry-After": str(self.retry_after)})
+
+
+class _Lane:
+    def __init__(self, name, concurrency, queue, timeout):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue = queue
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.running = 0
+        self.waiting = 0
+        self.service_time = 0.1  # seconds, until requests have been measured
+
+    def retry_after(self):
+        """Seconds until the requests already queued here should have drained."""
+        return self.service_time * (self.waiting + 1) / self.concurrency
+
+
+class AdmissionController:
+    def __init__(self, lanes=None, client_rate=CLIENT_RATE, client_burst=CLIENT_BURST):
+        lanes = lanes or {
+            name: (
+                _lane_setting(name, "CONCURRENCY", concurrency, int),
+                _lane_setting(name, "QUEUE", queue, int),
+                _lane_setting(name, "QUEUE_TIMEOUT", timeout, float),
+            )
+            for name, (concurrency, queue, timeout) in LANE_DEFAULTS.items()
+        }
+        self.lanes = {name: _Lane(name, *settings) for name, settings in lanes.items()}
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self._buckets = {}  # client -> [tokens, last refill]
+        self._lock = threading.Lock()
+
+    def check_rate(self, client):
+        """Take one token from the client's bucket or raise a 429."""
+        if self.client_rate <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if len(self._buckets) > 10_000:
+                self._buckets = {c: b for c, b in self._buckets.items() if now - b[1] < CLIENT_IDLE_SECONDS}
+            bucket = self._buckets.setdefault(client, [self.client_burst, now])
+            bucket[0] = min(self.client_burst, bucket[0] + (now - bucket[1]) * self.client_rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                record_admission("client", "rate_limited", 0.0)
+                raise Rejected(429, "Too many requests from this client.", (1 - bucket[0]) / self.client_rate)
+            bucket[0] -= 1
+
+    @asynccontextmanager
+    async def admit(self, lane_name):
+        """Hold a slot in the lane for the enclosed block, queueing within the lane's limits."""
+        lane = self.lanes[lane_name]
+        # Counted here rather than from the semaphore, whose count lags a burst of pending acquires
+        if lane.running + lane.waiting >= lane.concurrency + lane.queue:
+            record_admission(lane.name, "queue_full", 0.0)
+            raise Rejected(503, f"The server is busy with {lane.name} questions.", lane.retry_after())
+        queued = time.perf_counter()
+        lane.waiting += 1
+        try:
+            await asyncio.wait_for(lane.semaphore.acquire(), lane.timeout)
+        except asyncio.TimeoutError:
+            record_admission(lane.name, "timeout", time.perf_counter() - queued)
+            raise Rejected(503, f"The server is busy with {lane.name} questions.", lane.retry_after())
+        finally:
+            lane.waiting -= 1
+        started = time.perf_counter()
+        record_admission(lane.name, "admitted", started - queued)
+        lane.running += 1
+        try:
+            yield
+        finally:
+            lane.running -= 1
+            lane.semaphore.release()
+            elapsed = time.perf_counter() - started
+            lane.service_time += SERVICE_TIME_DECAY * (elapsed - lane.service_time)
+
+    def status(self):
+        return {
+            name: {"running": lane.running, "waiting": lane.waiting, "concurrency": lane.concurrency, "queue": lane.queue}
+            for name, lane in self.lanes.items()
+        }
+
+
+def client_id(request):
+    """The client a request counts against (behind a proxy, run uvicorn with --proxy-headers)."""
+    return request.client.host if request.client else "unknown"
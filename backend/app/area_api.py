@@ -0,0 +1,213 @@
+"""
+Per-ZIP indicators, profiles and boundary GeoJSON for the dashboard.
+
+Everything is computed once from the loaded pothole, pavement, survey and
+population data and kept as ready-to-send JSON bytes, each with a strong
+ETag and pre-compressed variants, so repeated requests cost a dict lookup.
+Boundaries come from the levels prebuilt by boundaries.py when they exist, and
+are otherwise simplified here as a coverage (shared borders stay shared) with
+one tolerance per zoom level.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+import integrated
+from boundaries import level_for_zoom, load_level, topology_features, topology_to_geojson
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+ZIP_CODES_PATH = os.path.join(integrated.data_folder_path, "GIS", "GeoBoundaries", "ZIP_Codes.gdb")
+POPULATION_PATH = os.path.join(integrated.data_folder_path, "Population 2022-2018.xlsx")
+GEO_MIN_ZOOM = 6
+GEO_MAX_ZOOM = 14
+GEO_DEFAULT_ZOOM = 11
+CACHE_CONTROL = "public, max-age=300, must-revalidate"
+
+# Indicator name -> profile label; the first one is the default map indicator
+INDICATORS = {
+    "pothole_complaints": "Pothole complaints",
+    "open_complaints": "Open pothole complaints",
+    "complaints_per_1k_residents": "Pothole complaints per 1,000 residents",
+    "average_pci": "Average PCI",
+    "road_segments": "Road segments",
+    "population": "Population",
+    "survey_responses": "Survey responses",
+}
+
+
+class CachedPayload:
+    """A JSON document serialized once, with its strong ETag and compressed variants."""
+
+    def __init__(self, document):
+        self.body = json.dumps(document, separators=(",", ":")).encode("utf-8")
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        # Each encoding is its own representation, so each gets its own strong ETag
+        self.variants = {"gzip": (gzip.compress(self.body, compresslevel=9), f'"{digest}-gz"')}
+        if brotli is not None:
+            self.variants["br"] = (brotli.compress(self.body), f'"{digest}-br"')
+
+    def etags(self):
+        return {self.etag} | {etag for _, etag in self.variants.values()}
+
+    def select(self, accept_encoding):
+        """Return (body, etag, content_encoding) for the client's Accept-Encoding header."""
+        accepted = {part.split(";")[0].strip() for part in (accept_encoding or "").split(",")}
+        for encoding in ("br", "gzip"):
+            if encoding in accepted and encoding in self.variants:
+                body, etag = self.variants[encoding]
+                return body, etag, encoding
+        return self.body, self.etag, None
+
+
+def _load_population():
+    """Total population per ZIP from the 2022 ACS sheet; empty when the workbook can't be read."""
+    try:
+        sheet = pd.read_excel(POPULATION_PATH, sheet_name="2022")
+    except Exception as e:  # reading .xlsx needs openpyxl
+        print(f"Population data not loaded: {e}")
+        return pd.Series(dtype=float)
+    labels = sheet.iloc[:, 0].astype(str).str.strip()
+    row = sheet[labels == "Total population"]
+    if row.empty:
+        return pd.Series(dtype=float)
+    row = row.iloc[0, 1:]
+    zips = row.index.str.extract(r"ZCTA5 (\d{5})")[0]
+    values = pd.to_numeric(row.astype(str).str.replace(",", ""), errors="coerce").to_numpy()
+    return pd.Series(values, index=zips.to_numpy()).dropna()
+
+
+def _points_per_zip(df, zips, lat_col="Latitude", lon_col="Longitude"):
+    """Spatially join points to ZIP polygons; returns the points with a `zip` column."""
+    if df.empty or lat_col not in df.columns:
+        return pd.DataFrame(columns=list(df.columns) + ["zip"])
+    points = df.dropna(subset=[lat_col, lon_col])
+    gdf = gpd.GeoDataFrame(points, geometry=gpd.points_from_xy(points[lon_col], points[lat_col]), crs="EPSG:4326")
+    joined = gpd.sjoin(gdf, zips[["zip", "geometry"]], how="inner", predicate="within")
+    return pd.DataFrame(joined.drop(columns=["geometry", "index_right"]))
+
+
+def _native(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class AreaData:
+    def __init__(self):
+        zips = gpd.read_file(ZIP_CODES_PATH, layer="ZIP_Codes").to_crs(epsg=4326)
+        zips = zips.rename(columns={"ZCTA5CE20": "zip"})[["zip", "geometry"]]
+        self.zips = zips.sort_values("zip").reset_index(drop=True)
+        self.stats = self._compute_stats()
+        rows = self.stats.to_dict("index")  # keeps int columns as ints, unlike iterrows()
+
+        self.indicators = {
+            name: CachedPayload([
+                {"areaId": zipcode, "areaName": f"ZIP Code {zipcode}", "value": _native(row[name])}
+                for zipcode, row in rows.items()
+            ])
+            for name in INDICATORS
+        }
+        self.profiles = {
+            zipcode: CachedPayload({
+                "areaId": zipcode,
+                "areaName": f"ZIP Code {zipcode}",
+                "indicators": {label: _native(row[name]) for name, label in INDICATORS.items()},
+            })
+            for zipcode, row in rows.items()
+        }
+        self._geo = {}
+        self._geo_lock = threading.Lock()
+
+    def _compute_stats(self):
+        stats = pd.DataFrame(index=pd.Index(self.zips["zip"], name="zip"))
+        complaints = _points_per_zip(integrated.complaint_df, self.zips)
+        stats["pothole_complaints"] = complaints.groupby("zip").size()
+        if "CLOSEDDATETIME" in complaints.columns:
+            stats["open_complaints"] = complaints[complaints["CLOSEDDATETIME"].isna()].groupby("zip").size()
+        else:
+            stats["open_complaints"] = np.nan
+        pavement = _points_per_zip(integrated.pavement_latlon_df, self.zips)
+        stats["road_segments"] = pavement.groupby("zip").size()
+        if "PCI" in pavement.columns:
+            stats["average_pci"] = pavement.groupby("zip")["PCI"].mean().round(1)
+        else:
+            stats["average_pci"] = np.nan
+        stats["survey_responses"] = pd.Series({z: len(rows) for z, rows in integrated.survey_by_zip.items()})
+        stats["population"] = _load_population()
+        counts = ["pothole_complaints", "open_complaints", "road_segments", "survey_responses"]
+        stats[counts] = stats[counts].fillna(0).astype(int)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            per_1k = stats["pothole_complaints"] / stats["population"] * 1000
+        stats["complaints_per_1k_residents"] = per_1k.where(stats["population"] > 0).round(2)
+        return stats
+
+    def geo(self, zoom):
+        """Boundary FeatureCollection simplified for `zoom` (one screen pixel of tolerance)."""
+        zoom = int(min(max(zoom, GEO_MIN_ZOOM), GEO_MAX_ZOOM))
+        level = level_for_zoom("zip_codes", zoom)
+        key = ("prebuilt", level) if level is not None else zoom
+        with self._geo_lock:
+            if key not in self._geo:
+                if level is not None:
+                    # Output of `python boundaries.py`: already simplified and quantized
+                    shapes = topology_features(load_level("zip_codes", level), "zip_codes")
+                    items = [(properties.get("id"), geometry) for properties, geometry in shapes]
+                else:
+                    # Degrees covered by one 256px-tile pixel at this zoom
+                    tolerance = 360.0 / (256 * 2 ** zoom)
+                    geometries = shapely.coverage_simplify(self.zips.geometry.to_numpy(), tolerance)
+                    # Six decimals is ~10 cm, far below a pixel at any supported zoom
+                    geometries = shapely.set_precision(geometries, 1e-6)
+                    items = zip(self.zips["zip"], geometries)
+                features = [
+                    {"type": "Feature", "properties": {"id": zipcode, "name": f"ZIP Code {zipcode}"}, "geometry": shapely.geometry.mapping(geometry)}
+                    for zipcode, geometry in items
+                    if geometry is not None
+                ]
+                self._geo[key] = CachedPayload({"type": "FeatureCollection", "features": features})
+            return self._geo[key]
+
+
+_boundary_payloads = {}
+_boundary_lock = threading.Lock()
+
+
+def boundary_payload(layer, zoom, fmt="topojson"):
+    """Prebuilt boundary layer for `zoom` as TopoJSON or GeoJSON; None when it has not been built."""
+    level = level_for_zoom(layer, zoom)
+    if level is None:
+        return None
+    key = (layer, level, fmt)
+    with _boundary_lock:
+        if key not in _boundary_payloads:
+            topology = load_level(layer, level)
+            document = topology if fmt == "topojson" else topology_to_geojson(topology, layer)
+            _boundary_payloads[key] = CachedPayload(document)
+        return _boundary_payloads[key]
+
+
+_area_data = None
+_area_lock = threading.Lock()
+
+
+def area_data():
+    global _area_data
+    with _area_lock:
+        if _area_data is None:
+            _area_data = AreaData()
+        return _area_data
@@ -0,0 +1,106 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import process_pool
+from deadline import collect
+from instrumentation import drop_trace, stage
+
+from integrated import (
+    PYPLOT_HANDLERS,
+    handle_transportation_mode_zipcode,
+    handle_transportation_mode_zipcodes,
+    resolve_intent,
+    run_intent,
+)
+
+BATCH_WORKERS = 4
+FAILED_ANSWER = "Sorry, something went wrong while answering this question. Please try asking it on its own."
+
+# Parameterized intents that can answer a whole group of calls at once. The grouped
+# function takes the list of parameter values and returns one answer per value.
+BATCH_HANDLERS = {
+    handle_transportation_mode_zipcode: ("zipcode", handle_transportation_mode_zipcodes),
+}
+
+# These draw with pyplot, whose global state is not thread-safe; run them serially
+# unless the worker processes are running (each has its own pyplot).
+SERIAL_HANDLERS = PYPLOT_HANDLERS
+
+
+def _call_key(handler, kwargs):
+    return handler, tuple(sorted(kwargs.items()))
+
+
+def _failed(handler, error):
+    # One failing question must not fail the others in its batch
+    print(f"Batch question for {handler.__name__} failed: {error!r}")
+    return FAILED_ANSWER, None, pd.DataFrame()
+
+
+def _answer_one(handler, kwargs):
+    try:
+        return collect(run_intent, handler, kwargs)
+    except Exception as e:
+        return _failed(handler, e)
+
+
+def _run_in_worker(handler, kwargs):
+    # RequestTrace is not thread-safe, so the parallel calls leave it to the request thread
+    drop_trace()
+    return _answer_one(handler, kwargs)
+
+
+def answer_batch(prompts, resolved=None):
+    """Answer several prompts at once.
+
+    Prompts that resolve to the same handler and parameters are answered once, grouped
+    intents are answered with a single vectorized call, and the rest run in a small
+    thread pool. Answers come back in the order of `prompts`; a question whose
+    handler raises gets an apology in its place. `resolved` is the
+    prompts' (handler, kwargs) when the caller has already routed them.
+    """
+    if resolved is None:
+        resolved = [resolve_intent(prompt) for prompt in prompts]
+
+    unique_calls = {}
+    for handler, kwargs in resolved:
+        unique_calls.setdefault(_call_key(handler, kwargs), (handler, kwargs))
+
+    answers = {}
+    grouped = {}
+    parallel = []
+    serial = []
+    for key, (handler, kwargs) in unique_calls.items():
+        if handler in BATCH_HANDLERS and len(kwargs) == 1:
+            grouped.setdefault(handler, []).append(key)
+        elif handler in SERIAL_HANDLERS and not process_pool.running():
+            serial.append(key)
+        else:
+            parallel.append(key)
+
+    for handler, keys in grouped.items():
+        if len(keys) == 1:
+            parallel.append(keys[0])
+            continue
+        param, batch_handler = BATCH_HANDLERS[handler]
+        values = [unique_calls[key][1][param] for key in keys]
+        try:
+            grouped_answers = batch_handler(values)
+        except Exception as e:
+            grouped_answers = [_failed(handler, e)] * len(keys)
+        for key, answer in zip(keys, grouped_answers):
+            answers[key] = answer
+
+    if parallel:
+        # The request thread's trace times the whole parallel phase as one data query
+        with stage("data_query"), ThreadPoolExecutor(max_workers=min(BATCH_WORKERS, len(parallel))) as pool:
+            # Each call runs in a copy of this thread's context, so it keeps the request's deadline
+            futures = [pool.submit(contextvars.copy_context().run, _run_in_worker, *unique_calls[key]) for key in parallel]
+            for key, future in zip(parallel, futures):
+                answers[key] = future.result()
+    for key in serial:
+        answers[key] = _answer_one(*unique_calls[key])
+
+    return [answers[_call_key(handler, kwargs)] for handler, kwargs in resolved]
@@ -0,0 +1,331 @@
+"""
+Offline build of simplified, quantized boundary layers.
+
+The GIS boundary layers are full-resolution survey geometry (tens of thousands
+of vertices per layer). This script turns each one into a TopoJSON file per
+zoom level:
+  * simplified to about one screen pixel at that zoom, as a coverage where
+    possible, so neighbouring polygons keep their shared borders
+  * quantized to a quarter pixel, with shared borders stored once as arcs
+and writes report.json with vertex counts, sizes and the geometric error of
+every level.
+
+Run it from backend/app after the boundary data changes:
+    python boundaries.py
+The API then serves the prebuilt level that matches the requested zoom.
+"""
+
+import argparse
+import gzip
+import json
+import math
+import os
+
+import geopandas as gpd
+import numpy as np
+import shapely
+
+GIS_DIR = os.path.join("..", "Data", "GIS")
+BUILD_DIR = os.environ.get("POTHOLE_BOUNDARY_DIR", os.path.join(GIS_DIR, "simplified"))
+LEVELS = (8, 10, 12, 14)
+# Metric CRS for the error report (UTM zone 14N covers Bexar County)
+ERROR_CRS = "EPSG:32614"
+
+# name -> (source, layer inside the source, {output property: source column})
+LAYERS = {
+    "zip_codes": ("GeoBoundaries/ZIP_Codes.gdb", "ZIP_Codes", {"id": "ZCTA5CE20"}),
+    "census_tracts": ("GeoBoundaries/Census_Tracts.gdb", "Census_Tracts", {"id": "GEOID20", "name": "NAMELSAD20"}),
+    "neighborhoods": ("GeoBoundaries/Neighborhoods.gdb", "Neighborhood_Assoc", {"id": "AssociationID", "name": "Name"}),
+    "council_districts": ("CouncilDistricts.zip!CouncilDistricts/CouncilDistricts.shp", None, {"id": "District", "name": "Name"}),
+    "watersheds": ("bexar_watersheds.zip!bexar_watershed.shp", None, {"id": "huc10", "name": "name"}),
+    "subwatersheds": ("bexar_watersheds.zip!bexar_subwatershed.shp", None, {"id": "huc12", "name": "name"}),
+}
+
+
+def pixel_degrees(zoom):
+    """Width of one 256px-tile pixel at `zoom`, in degrees of longitude."""
+    return 360.0 / (256 * 2 ** zoom)
+
+
+def read_layer(name):
+    source, layer, properties = LAYERS[name]
+    path = os.path.join(GIS_DIR, source)
+    if ".zip!" in source:
+        path = "zip://" + path
+    gdf = gpd.read_file(path, layer=layer) if layer else gpd.read_file(path)
+    gdf = gdf[gdf.geometry.notna() & ~gdf.geometry.is_empty].to_crs(epsg=4326)
+    out = gpd.GeoDataFrame({key: gdf[column].to_numpy() for key, column in properties.items()}, geometry=gdf.geometry.to_numpy(), crs=gdf.crs)
+    return out.reset_index(drop=True)
+
+
+def simplify(geometries, tolerance):
+    """Coverage-simplify; polygons the coverage pass breaks fall back to per-polygon simplification.
+
+    Returns (simplified geometries, number of fallbacks).
+    """
+    simplified = shapely.coverage_simplify(geometries, tolerance)
+    broken = ~shapely.is_valid(simplified) | shapely.is_empty(simplified)
+    if broken.any():
+        simplified[broken] = shapely.simplify(geometries[broken], tolerance, preserve_topology=True)
+    return simplified, int(broken.sum())
+
+
+# ---------- TopoJSON encoding ----------
+def _polygon_rings(geometry):
+    """[[exterior, hole, ...], ...] coordinate arrays for a Polygon or MultiPolygon."""
+    polygons = geometry.geoms if geometry.geom_type == "MultiPolygon" else [geometry]
+    return [[np.asarray(p.exterior.coords)] + [np.asarray(r.coords) for r in p.interiors] for p in polygons if not p.is_empty]
+
+
+def _quantize_ring(coords, translate, scale):
+    q = np.rint((coords[:, :2] - translate) / scale).astype(np.int64)
+    keep = np.ones(len(q), dtype=bool)
+    keep[1:] = np.any(q[1:] != q[:-1], axis=1)
+    q = q[keep]
+    if np.any(q[0] != q[-1]):
+        # The closing point snapped onto its neighbour and was dropped above
+        q = np.vstack([q, q[:1]])
+    # A ring needs three distinct corners plus the closing point
+    return q if len(q) >= 4 else None
+
+
+def _find_junctions(rings):
+    """Points where rings stop sharing a border: they are seen with more than one neighbour pair."""
+    neighbours = {}
+    junctions = set()
+    for ring in rings:
+        points = [tuple(p) for p in ring[:-1]]
+        n = len(points)
+        for i, point in enumerate(points):
+            pair = frozenset((points[i - 1], points[(i + 1) % n]))
+            seen = neighbours.setdefault(point, pair)
+            if seen != pair:
+                junctions.add(point)
+    return junctions
+
+
+class _ArcIndex:
+    def __init__(self):
+        self.arcs = []
+        self._index = {}
+
+    def add(self, arc):
+        key = tuple(arc)
+        if key in self._index:
+            return self._index[key]
+        reverse_key = key[::-1]
+        if reverse_key in self._index:
+            return ~self._index[reverse_key]
+        self._index[key] = len(self.arcs)
+        self.arcs.append(arc)
+        return self._index[key]
+
+
+def _cut_ring(ring, junctions, arc_index):
+    points = [tuple(p) for p in ring[:-1]]
+    cuts = [i for i, point in enumerate(points) if point in junctions]
+    if not cuts:
+        # Closed arc with no junctions: start at the smallest point so twins line up
+        start = points.index(min(points))
+        rotated = points[start:] + points[:start]
+        return [arc_index.add(rotated + [rotated[0]])]
+    rotated = points[cuts[0]:] + points[:cuts[0]]
+    offsets = [i - cuts[0] for i in cuts] + [len(points)]
+    rotated.append(rotated[0])
+    return [arc_index.add(rotated[a:b + 1]) for a, b in zip(offsets[:-1], offsets[1:])]
+
+
+def to_topology(gdf, object_name, zoom):
+    """Encode a GeoDataFrame of polygons as a quantized TopoJSON topology for `zoom`."""
+    minx, miny, maxx, maxy = gdf.total_bounds
+    # Quarter-pixel grid: invisible at this zoom, and small integers delta-encode compactly
+    cell = pixel_degrees(zoom) / 4
+    steps = max(2, math.ceil(max(maxx - minx, maxy - miny) / cell) + 1)
+    scale = np.array([(maxx - minx) / (steps - 1) or 1.0, (maxy - miny) / (steps - 1) or 1.0])
+    translate = np.array([minx, miny])
+
+    features = []
+    all_rings = []
+    for geometry in gdf.geometry:
+        polygons = []
+        for rings in _polygon_rings(geometry):
+            quantized = [_quantize_ring(ring, translate, scale) for ring in rings]
+            if quantized[0] is None:
+                continue
+            polygons.append([ring for ring in quantized if ring is not None])
+        features.append(polygons)
+        all_rings += [ring for polygon in polygons for ring in polygon]
+
+    junctions = _find_junctions(all_rings)
+    arc_index = _ArcIndex()
+    geometries = []
+    properties = [c for c in gdf.columns if c != "geometry"]
+    for polygons, (_, row) in zip(features, gdf[properties].iterrows()):
+        props = {}
+        for key, value in row.items():
+            if isinstance(value, np.generic):
+                value = value.item()
+            if value is not None and not (isinstance(value, float) and math.isnan(value)):
+                props[key] = value
+        arcs = [[_cut_ring(ring, junctions, arc_index) for ring in polygon] for polygon in polygons]
+        if not arcs:
+            geometries.append({"type": None, "properties": props})
+        elif len(arcs) == 1:
+            geometries.append({"type": "Polygon", "arcs": arcs[0], "properties": props})
+        else:
+            geometries.append({"type": "MultiPolygon", "arcs": arcs, "properties": props})
+
+    encoded_arcs = []
+    for arc in arc_index.arcs:
+        points = np.array(arc, dtype=np.int64)
+        deltas = np.vstack([points[:1], np.diff(points, axis=0)])
+        encoded_arcs.append(deltas.tolist())
+    return {
+        "type": "Topology",
+        "transform": {"scale": scale.tolist(), "translate": translate.tolist()},
+        "objects": {object_name: {"type": "GeometryCollection", "geometries": geometries}},
+        "arcs": encoded_arcs,
+    }
+
+
+# ---------- TopoJSON decoding ----------
+def _decode_arcs(topology):
+    scale = np.array(topology["transform"]["scale"])
+    translate = np.array(topology["transform"]["translate"])
+    return [np.cumsum(np.array(arc, dtype=np.int64), axis=0) * scale + translate for arc in topology["arcs"]]
+
+
+def _ring_coords(arc_ids, arcs):
+    parts = []
+    for i, arc_id in enumerate(arc_ids):
+        arc = arcs[arc_id] if arc_id >= 0 else arcs[~arc_id][::-1]
+        parts.append(arc if i == 0 else arc[1:])
+    return np.vstack(parts)
+
+
+def topology_features(topology, object_name):
+    """Yield (properties, shapely geometry) for every geometry of one TopoJSON object."""
+    arcs = _decode_arcs(topology)
+    for geometry in topology["objects"][object_name]["geometries"]:
+        if geometry["type"] == "Polygon":
+            polygons = [geometry["arcs"]]
+        elif geometry["type"] == "MultiPolygon":
+            polygons = geometry["arcs"]
+        else:
+            yield geometry.get("properties", {}), None
+            continue
+        shapes = [shapely.Polygon(_ring_coords(p[0], arcs), [_ring_coords(r, arcs) for r in p[1:]]) for p in polygons]
+        yield geometry.get("properties", {}), shapes[0] if len(shapes) == 1 else shapely.MultiPolygon(shapes)
+
+
+def topology_to_geojson(topology, object_name):
+    features = [
+        {"type": "Feature", "properties": properties, "geometry": shapely.geometry.mapping(geometry) if geometry is not None else None}
+        for properties, geometry in topology_features(topology, object_name)
+    ]
+    return {"type": "FeatureCollection", "features": features}
+
+
+# ---------- Prebuilt levels ----------
+def level_path(layer, zoom):
+    return os.path.join(BUILD_DIR, f"{layer}_z{zoom}.topojson")
+
+
+def built_levels(layer):
+    """Zoom levels that have a prebuilt file for `layer`, ascending."""
+    return [zoom for zoom in LEVELS if os.path.exists(level_path(layer, zoom))]
+
+
+def level_for_zoom(layer, zoom):
+    """The coarsest prebuilt level that is still within a pixel at `zoom` (or the finest one available)."""
+    levels = built_levels(layer)
+    if not levels:
+        return None
+    for level in levels:
+        if level >= zoom:
+            return level
+    return levels[-1]
+
+
+def load_level(layer, zoom):
+    with open(level_path(layer, zoom)) as f:
+        return json.load(f)
+
+
+# ---------- Build ----------
+def _error_stats(original, decoded):
+    """Compare source and decoded geometry in metres.
+
+    Returns the largest distance from a decoded vertex to the source boundary, the
+    mean absolute area change (%), and how many polygon parts vanished because they
+    were smaller than the quantization grid (slivers and specks).
+    """
+    original = gpd.GeoSeries(original, crs="EPSG:4326").to_crs(ERROR_CRS).to_numpy()
+    decoded = gpd.GeoSeries(decoded, crs="EPSG:4326").to_crs(ERROR_CRS).to_numpy()
+    present = ~shapely.is_missing(decoded)
+    max_error = 0.0
+    for source, result in zip(original[present], decoded[present]):
+        vertices = shapely.points(shapely.get_coordinates(result))
+        max_error = max(max_error, float(shapely.distance(vertices, source.boundary).max()))
+    area = shapely.area(original[present])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        area_change = np.abs(shapely.area(decoded[present]) - area) / area * 100
+    dropped_parts = int(shapely.get_num_geometries(original).sum() - shapely.get_num_geometries(decoded[present]).sum())
+    return max_error, float(np.nanmean(area_change)), dropped_parts
+
+
+def build_layer(name, levels=LEVELS):
+    gdf = read_layer(name)
+    geometries = gdf.geometry.to_numpy()
+    original_bytes = len(json.dumps(gdf.__geo_interface__, separators=(",", ":")).encode())
+    report = {
+        "features": len(gdf),
+        "coverage_valid": bool(shapely.coverage_is_valid(geometries)),
+        "source_vertices": int(shapely.get_num_coordinates(geometries).sum()),
+        "source_geojson_bytes": original_bytes,
+        "levels": {},
+    }
+    for zoom in levels:
+        simplified, fallbacks = simplify(geometries, pixel_degrees(zoom))
+        level = gdf.set_geometry(simplified)
+        topology = to_topology(level, name, zoom)
+        body = json.dumps(topology, separators=(",", ":")).encode()
+        with open(level_path(name, zoom), "wb") as f:
+            f.write(body)
+        decoded = np.array([geometry for _, geometry in topology_features(topology, name)], dtype=object)
+        max_error_m, area_change_pct, dropped_parts = _error_stats(geometries, decoded)
+        report["levels"][str(zoom)] = {
+            "tolerance_deg": pixel_degrees(zoom),
+            "coverage_fallbacks": fallbacks,
+            "vertices": int(sum(len(arc) for arc in topology["arcs"])),
+            "arcs": len(topology["arcs"]),
+            "topojson_bytes": len(body),
+            "topojson_gzip_bytes": len(gzip.compress(body)),
+            "max_error_m": round(max_error_m, 2),
+            "mean_area_change_pct": round(area_change_pct, 4),
+            "dropped_parts": dropped_parts,
+        }
+    return report
+
+
+def print_report(report):
+    print(f"{'layer':<18}{'zoom':>5}{'vertices':>10}{'KB':>9}{'gzip KB':>9}{'max err m':>11}{'area %':>9}{'dropped':>9}")
+    for name, layer in report.items():
+        print(f"{name:<18}{'src':>5}{layer['source_vertices']:>10}{layer['source_geojson_bytes'] / 1024:>9.0f}")
+        for zoom, level in layer["levels"].items():
+            print(
+                f"{'':<18}{zoom:>5}{level['vertices']:>10}{level['topojson_bytes'] / 1024:>9.0f}"
+                f"{level['topojson_gzip_bytes'] / 1024:>9.0f}{level['max_error_m']:>11.1f}{level['mean_area_change_pct']:>9.3f}{level['dropped_parts']:>9}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build simplified, quantized TopoJSON boundary layers.")
+    parser.add_argument("--layers", nargs="+", default=list(LAYERS), choices=list(LAYERS))
+    args = parser.parse_args()
+    os.makedirs(BUILD_DIR, exist_ok=True)
+    report = {name: build_layer(name) for name in args.layers}
+    with open(os.path.join(BUILD_DIR, "report.json"), "w") as f:
+        json.dump(report, f, indent=2)
+    print_report(report)
+    print(f"\nWrote {BUILD_DIR}")
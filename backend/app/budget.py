@@ -0,0 +1,268 @@
+"""
+Repair-budget estimates from the Street and Sidewalk IMP project history.
+
+The cost model is built once from Street_IMP_Cleaned.csv and
+Sidewalk_IMP_Cleaned.csv. For each treatment (Sealant_App) and PCI band it
+keeps the median estimated cost per foot and the distribution of durations. It
+also keeps the footage share of each treatment within a band, so a segment in
+band D costs the blended price of what the city has historically put on D
+streets.
+
+The projection engine steps every pavement segment of a district through the
+years as arrays. Each year it:
+  * prices each segment at its band's cost per foot times its length
+  * scores each segment's chance of a pothole complaint with the risk model,
+    from its current PCI and maintenance age
+  * treats segments in priority order until the annual budget runs out, or, with
+    no budget, repairs segments in proportion to their complaint chance
+  * restores treated segments to PCI 100, and lowers untreated ones by the
+    typical yearly PCI loss measured on the pavement inventory
+Scenarios differ only in the budget and the priority, and results are cached,
+so a repeated question is a dictionary lookup.
+"""
+
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = os.path.join("..", "Data")
+STREET_PROJECTS_PATH = os.path.join(DATA_DIR, "Street_IMP_Cleaned.csv")
+SIDEWALK_PROJECTS_PATH = os.path.join(DATA_DIR, "Sidewalk_IMP_Cleaned.csv")
+
+COST_WINDOW_YEARS = 5  # unit costs come from the latest fiscal years, as prices drift
+MIN_PROJECTS = 5  # cells with fewer recent projects fall back to the full history
+DEFAULT_PCI_LOSS_PER_YEAR = 2.0  # used only when the inventory has no install dates
+
+# PCI bands as labelled in the IMP data (PCI_Factor); index 0 is the worst band
+BAND_EDGES = [41, 61, 71, 86]
+BANDS = ["F", "D", "C", "B", "A"]
+BAND_LABELS = {"F": "F (0-40)", "D": "D (41-60)", "C": "C (61-70)", "B": "B (71-85)", "A": "A (86-100)"}
+TREATMENT_NAMES = {"Asphat Overlay": "Asphalt Overlay"}  # typo in the export
+SIDEWALK = "Sidewalk"
+
+PRIORITIES = ("risk", "worst_first")
+
+
+def pci_band(pci):
+    """Band index (0 = F .. 4 = A) for an array of PCI values."""
+    return np.digitize(np.clip(pci, 0, 100), BAND_EDGES)
+
+
+def load_projects(street_path=STREET_PROJECTS_PATH, sidewalk_path=SIDEWALK_PROJECTS_PATH):
+    """Street and sidewalk projects in one frame: treatment, band, district, fiscal_year, cost, length_ft, duration_days."""
+    frames = []
+    if os.path.exists(street_path):
+        street = pd.read_csv(street_path, usecols=[
+            "Sealant_App", "Type_", "PCI_Factor", "CouncilDistrict", "FiscalYear", "EstTotalCost", "Shape_Length", "ActDuration"])
+        frames.append(pd.DataFrame({
+            "treatment": street["Sealant_App"].replace(TREATMENT_NAMES),
+            "category": street["Type_"],
+            "band": street["PCI_Factor"].map({label: band for band, label in BAND_LABELS.items()}),
+            "district": street["CouncilDistrict"],
+            "fiscal_year": street["FiscalYear"],
+            "cost": street["EstTotalCost"],
+            "length_ft": street["Shape_Length"],
+            "duration_days": street["ActDuration"],
+        }))
+    if os.path.exists(sidewalk_path):
+        sidewalk = pd.read_csv(sidewalk_path, usecols=[
+            "CouncilDistrict", "FiscalYear", "EstTotalCost", "ProjectLength", "ActDuration"])
+        frames.append(pd.DataFrame({
+            "treatment": SIDEWALK,
+            "category": SIDEWALK,
+            "band": None,
+            "district": sidewalk["CouncilDistrict"],
+            "fiscal_year": sidewalk["FiscalYear"],
+            "cost": sidewalk["EstTotalCost"],
+            "length_ft": sidewalk["ProjectLength"],
+            "duration_days": sidewalk["ActDuration"],
+        }))
+    if not frames:
+        return pd.DataFrame(columns=["treatment", "category", "band", "district", "fiscal_year", "cost", "length_ft", "duration_days"])
+    projects = pd.concat(frames, ignore_index=True)
+    for column in ("district", "fiscal_year", "cost", "length_ft", "duration_days"):
+        projects[column] = pd.to_numeric(projects[column], errors="coerce")
+    projects = projects.dropna(subset=["treatment", "fiscal_year", "cost"])
+    projects = projects[projects["cost"] > 0]
+    projects["cost_per_foot"] = projects["cost"] / projects["length_ft"].where(projects["length_ft"] > 0)
+    return projects.reset_index(drop=True)
+
+
+def _recent(projects, years):
+    if projects.empty:
+        return projects
+    return projects[projects["fiscal_year"] > projects["fiscal_year"].max() - years]
+
+
+class CostModel:
+    def __init__(self, projects, window_years=COST_WINDOW_YEARS):
+        self.latest_fiscal_year = int(projects["fiscal_year"].max()) if not projects.empty else None
+        self.window = (self.latest_fiscal_year - window_years + 1, self.latest_fiscal_year) if self.latest_fiscal_year else None
+        priced = projects.dropna(subset=["cost_per_foot"])
+        recent = _recent(priced, window_years)
+
+        # Median cost per foot and durations per treatment and band, recent years first
+        keys = ["treatment", "band"]
+        cells = priced.assign(band=priced["band"].fillna("-")).groupby(keys)
+        recent_cells = recent.assign(band=recent["band"].fillna("-")).groupby(keys)
+        table = pd.DataFrame({
+            "projects": recent_cells.size(),
+            "feet": recent_cells["length_ft"].sum(),
+            "cost_per_foot": recent_cells["cost_per_foot"].median(),
+        }).reindex(cells.size().index)
+        thin = table["projects"].fillna(0) < MIN_PROJECTS
+        table.loc[thin, "projects"] = cells.size()[thin]
+        table.loc[thin, "feet"] = cells["length_ft"].sum()[thin]
+        table.loc[thin, "cost_per_foot"] = cells["cost_per_foot"].median()[thin]
+        table["duration_median_days"] = cells["duration_days"].median()
+        table["duration_p90_days"] = cells["duration_days"].quantile(0.9)
+        self.table = table.reset_index()
+
+        # Blended cost per foot per band, weighted by the footage each treatment got in that band
+        street = self.table[self.table["band"].isin(BANDS)]
+        self.band_cost_per_foot = np.zeros(len(BANDS))
+        self.band_treatment = {}
+        for i, band in enumerate(BANDS):
+            rows = street[street["band"] == band]
+            if rows.empty or rows["feet"].sum() == 0:
+                continue
+            share = rows["feet"] / rows["feet"].sum()
+            self.band_cost_per_foot[i] = float((share * rows["cost_per_foot"]).sum())
+            self.band_treatment[band] = rows.loc[rows["feet"].idxmax(), "treatment"]
+        filled = self.band_cost_per_foot > 0
+        if filled.any() and not filled.all():
+            self.band_cost_per_foot[~filled] = np.interp(np.flatnonzero(~filled), np.flatnonzero(filled), self.band_cost_per_foot[filled])
+
+        # Programmed spend per district and fiscal year, the baseline funding scenario
+        spend = _recent(projects, window_years).groupby(["district", "fiscal_year"])["cost"].sum()
+        self.annual_spend = spend.groupby(level="district").mean()
+        self.citywide_annual_spend = float(spend.groupby(level="fiscal_year").sum().mean()) if not spend.empty else 0.0
+
+    def unit_cost(self, treatment, band=None):
+        """The cost table row for one treatment (and band), or None."""
+        rows = self.table[(self.table["treatment"] == treatment) & (self.table["band"] == (band or "-"))]
+        return None if rows.empty else rows.iloc[0].to_dict()
+
+    def baseline_budget(self, district=None):
+        if district is None:
+            return self.citywide_annual_spend
+        return float(self.annual_spend.get(district, 0.0))
+
+
+def pci_loss_per_year(segments):
+    """Typical PCI points lost per year: median of (100 - PCI) / age over segments at least a year old."""
+    age = segments["Maintenance_Age_Years"].to_numpy(dtype=float)
+    pci = segments["PCI"].to_numpy(dtype=float)
+    valid = (age >= 1) & ~np.isnan(pci)
+    if not valid.any():
+        return DEFAULT_PCI_LOSS_PER_YEAR
+    return float(np.median((100 - pci[valid]) / age[valid]))
+
+
+class BudgetEngine:
+    def __init__(self, costs, segments, model):
+        """`segments`: risk_model.segment_frame output with a District column; `model`: the fitted RiskModel."""
+        self.costs = costs
+        self.model = model
+        self.pci_loss = pci_loss_per_year(segments)
+        length = segments["LengthFeet"].to_numpy(dtype=float)
+        pci = segments["PCI"].to_numpy(dtype=float)
+        age = segments["Maintenance_Age_Years"].to_numpy(dtype=float)
+        self.length = np.nan_to_num(length, nan=np.nanmedian(length) if np.isfinite(length).any() else 0.0)
+        self.pci = np.nan_to_num(pci, nan=np.nanmedian(pci) if np.isfinite(pci).any() else 100.0)
+        self.age = np.nan_to_num(age, nan=np.nanmedian(age) if np.isfinite(age).any() else 0.0)
+
+        # The two features that change over the projection are rescored each year; the rest is fixed
+        X = model.matrix(segments)
+        self._dynamic = [model.features.index("deterioration"), model.features.index("maintenance_age")]
+        self._static_z = X @ model.weights + model.intercept - X[:, self._dynamic] @ model.weights[self._dynamic]
+
+        self.districts = {}
+        if "District" in segments.columns:
+            codes = pd.to_numeric(segments["District"], errors="coerce").to_numpy(dtype=float)
+            for value in np.unique(codes[~np.isnan(codes)]):
+                self.districts[int(value)] = np.flatnonzero(codes == value)
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Pickled for the warm-start snapshot; the projection cache starts empty again
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state["_cache"] = {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _probability(self, rows, pci, age):
+        w = self.model.weights[self._dynamic]
+        mean, scale = self.model.mean[self._dynamic], self.model.scale[self._dynamic]
+        z = self._static_z[rows] + w[0] * ((100 - pci) - mean[0]) / scale[0] + w[1] * (age - mean[1]) / scale[1]
+        return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+    def _rows(self, district):
+        if district is None:
+            return np.arange(len(self.pci))
+        return self.districts.get(int(district), np.array([], dtype=np.int64))
+
+    def project(self, district=None, years=5, annual_budget=None, priority="risk"):
+        """Year-by-year spend, treated segments, mean PCI and expected complaint segments for one scenario."""
+        key = (district, years, annual_budget, priority)
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+        rows = self._rows(district)
+        length, pci, age = self.length[rows], self.pci[rows].copy(), self.age[rows].copy()
+        total_length = length.sum()
+        yearly = {"spend": [], "segments_treated": [], "miles_treated": [], "mean_pci": [], "expected_complaint_segments": []}
+        for _ in range(years):
+            p = self._probability(rows, pci, age)
+            cost = length * self.costs.band_cost_per_foot[pci_band(pci)]
+            if annual_budget is None:
+                # Repair as potholes appear: each segment is fixed with its complaint probability
+                treated = p
+                spend = float((p * cost).sum())
+                complaints = float(p.sum())
+            else:
+                order = np.argsort(-p if priority == "risk" else pci, kind="stable")
+                within = np.cumsum(cost[order]) <= annual_budget
+                treated = np.zeros(len(rows))
+                treated[order[within]] = 1.0
+                spend = float(cost[order[within]].sum())
+                complaints = float((p * (1 - treated)).sum())
+            pci = treated * 100 + (1 - treated) * np.maximum(pci - self.pci_loss, 0)
+            age = (1 - treated) * (age + 1)
+            yearly["spend"].append(spend)
+            yearly["segments_treated"].append(float(treated.sum()))
+            yearly["miles_treated"].append(float((treated * length).sum() / 5280))
+            yearly["mean_pci"].append(float((pci * length).sum() / total_length) if total_length else float("nan"))
+            yearly["expected_complaint_segments"].append(complaints)
+        result = {
+            "district": district,
+            "years": years,
+            "annual_budget": annual_budget,
+            "priority": priority,
+            "segments": int(len(rows)),
+            "start_mean_pci": float((self.pci[rows] * length).sum() / total_length) if total_length else float("nan"),
+            "yearly": yearly,
+            "total_spend": float(sum(yearly["spend"])),
+            "total_expected_complaint_segments": float(sum(yearly["expected_complaint_segments"])),
+        }
+        with self._lock:
+            self._cache[key] = result
+        return result
+
+    def scenarios(self, district=None, years=5, annual_budget=None):
+        """Reactive repair vs the historical budget (risk first and worst first), plus a requested budget."""
+        baseline = self.costs.baseline_budget(district)
+        scenarios = {"Resurface as potholes appear": self.project(district, years)}
+        if baseline > 0:
+            scenarios["Historical funding, highest risk first"] = self.project(district, years, round(baseline), "risk")
+            scenarios["Historical funding, worst pavement first"] = self.project(district, years, round(baseline), "worst_first")
+        if annual_budget:
+            scenarios["Requested budget, highest risk first"] = self.project(district, years, float(annual_budget), "risk")
+        return scenarios
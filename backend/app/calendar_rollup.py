@@ -0,0 +1,138 @@
+"""
+Calendar rollups of pothole reports.
+
+Counts per day, week, month and year are built once at load as NumPy arrays
+indexed by period number (day 0 = the first date, month 0 = January of the
+first year), together with fix-time statistics. The time-based chat answers
+then read single array cells instead of filtering the raw frames, and never
+touch those frames.
+"""
+
+import numpy as np
+import pandas as pd
+
+MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+def _period_stat(index, values, size, func):
+    """`func` of `values` per period index, NaN where a period has no values."""
+    out = np.full(size, np.nan)
+    if len(values):
+        stats = pd.Series(values).groupby(index).agg(func)
+        out[stats.index.to_numpy()] = stats.to_numpy()
+    return out
+
+
+class CalendarRollup:
+    def __init__(self, opened, counts=None, closed=None):
+        """`opened`: report dates; `counts`: reports per row (1 each when None); `closed`: close dates for fix times."""
+        opened = pd.to_datetime(pd.Series(opened), errors="coerce")
+        valid = opened.notna().to_numpy()
+        days = opened[valid].to_numpy(dtype="datetime64[D]")
+        weights = np.ones(len(days)) if counts is None else np.asarray(counts, dtype=float)[valid]
+        self.empty = len(days) == 0
+        if self.empty:
+            return
+
+        self.first_day, self.last_day = days.min(), days.max()
+        first = pd.Timestamp(self.first_day)
+        self.first_year = first.year
+        day_index = (days - self.first_day).astype(np.int64)
+        years = days.astype("datetime64[Y]").astype(np.int64) + 1970
+        month_index = days.astype("datetime64[M]").astype(np.int64) - (self.first_year - 1970) * 12
+        # Weeks start on Monday; week 0 is the week containing the first date
+        week_index = (day_index + first.weekday()) // 7
+        year_index = years - self.first_year
+
+        self.daily = np.bincount(day_index, weights=weights)
+        self.weekly = np.bincount(week_index, weights=weights)
+        self.monthly = np.bincount(month_index, weights=weights)
+        self.yearly = np.bincount(year_index, weights=weights)
+        self._cumulative = np.concatenate([[0.0], np.cumsum(self.daily)])
+        self.month_of_year = np.bincount(month_index % 12, weights=weights, minlength=12)
+        self.months_with_reports = np.bincount(month_index % 12, minlength=12) > 0
+
+        self.has_fix_times = closed is not None
+        if not self.has_fix_times:
+            return
+        closed = pd.to_datetime(pd.Series(closed), errors="coerce")[valid].to_numpy(dtype="datetime64[D]")
+        is_closed = ~np.isnat(closed)
+        self.unresolved_monthly = np.bincount(month_index[~is_closed], minlength=len(self.monthly))
+        self.unresolved_yearly = np.bincount(year_index[~is_closed], minlength=len(self.yearly))
+        fix_days = (closed[is_closed] - days[is_closed]).astype(np.int64)
+        keep = fix_days >= 0  # closing before opening is a data-entry error
+        fix_days, fix_months, fix_years = fix_days[keep], month_index[is_closed][keep], year_index[is_closed][keep]
+        fix_days_sorted = np.sort(fix_days)
+        self.fix_overall = None if not len(fix_days) else {
+            "count": int(len(fix_days)),
+            "mean": float(fix_days.mean()),
+            "median": float(np.median(fix_days_sorted)),
+            "p90": float(fix_days_sorted[min(int(0.9 * len(fix_days)), len(fix_days) - 1)]),
+        }
+        self.fix_mean_monthly = _period_stat(fix_months, fix_days, len(self.monthly), "mean")
+        self.fix_median_monthly = _period_stat(fix_months, fix_days, len(self.monthly), "median")
+        self.fix_mean_yearly = _period_stat(fix_years, fix_days, len(self.yearly), "mean")
+        self.fix_median_yearly = _period_stat(fix_years, fix_days, len(self.yearly), "median")
+        self.fix_count_yearly = np.bincount(fix_years, minlength=len(self.yearly))
+
+    # ---------- Lookups ----------
+    @property
+    def last_date(self):
+        return pd.Timestamp(self.last_day)
+
+    def _month_index(self, year, month):
+        return (year - self.first_year) * 12 + month - 1
+
+    def covers_month(self, year, month):
+        return not self.empty and 0 <= self._month_index(year, month) < len(self.monthly)
+
+    def month(self, year, month):
+        """Reports in one calendar month (0 outside the data)."""
+        if not self.covers_month(year, month):
+            return 0.0
+        return float(self.monthly[self._month_index(year, month)])
+
+    def year(self, year):
+        if self.empty or not 0 <= year - self.first_year < len(self.yearly):
+            return 0.0
+        return float(self.yearly[year - self.first_year])
+
+    def between(self, start, end):
+        """Reports from `start` to `end`, both inclusive, from the running daily sums."""
+        if self.empty:
+            return 0.0
+        a = int((np.datetime64(pd.Timestamp(start).date(), "D") - self.first_day).astype(np.int64))
+        b = int((np.datetime64(pd.Timestamp(end).date(), "D") - self.first_day).astype(np.int64)) + 1
+        a, b = min(max(a, 0), len(self.daily)), min(max(b, 0), len(self.daily))
+        return float(self._cumulative[b] - self._cumulative[a]) if b > a else 0.0
+
+    def latest_month(self):
+        """(year, month, count) of the last month with data."""
+        ts = self.last_date
+        return ts.year, ts.month, self.month(ts.year, ts.month)
+
+    def years(self):
+        """[(year, reports)] for every year in the data."""
+        return [(self.first_year + i, float(n)) for i, n in enumerate(self.yearly)]
+
+    def seasonal(self):
+        """[(month name, reports)] summed over all years, for months that have any reports."""
+        return [(MONTH_NAMES[m], float(self.month_of_year[m])) for m in range(12) if self.months_with_reports[m]]
+
+    def unresolved_by_year(self):
+        """[(year, total, unresolved)] for years with reports."""
+        return [
+            (self.first_year + i, int(total), int(self.unresolved_yearly[i]))
+            for i, total in enumerate(self.yearly) if total > 0
+        ]
+
+    def fix_time(self, year=None):
+        """Fix-time summary in days: count, mean, median (and p90 overall); None without data."""
+        if self.empty or not self.has_fix_times:
+            return None
+        if year is None:
+            return self.fix_overall
+        i = year - self.first_year
+        if not 0 <= i < len(self.yearly) or self.fix_count_yearly[i] == 0:
+            return None
+        return {"count": int(self.fix_count_yearly[i]), "mean": float(self.fix_mean_yearly[i]), "median": float(self.fix_median_yearly[i])}
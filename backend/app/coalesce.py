@@ -0,0 +1,79 @@
+"""
+Single-flight coalescing of identical concurrent questions.
+
+When a dashboard refreshes, many clients ask the same question at the same
+moment. `SingleFlight.do` lets the first caller for a key (the resolved
+intent and its parameters) run the handler, while callers that arrive before
+it finishes wait for that answer instead of computing their own. Nothing is
+cached: once the answer is handed out the key is forgotten, so the next
+request after it computes afresh.
+"""
+
+import threading
+import time
+
+
+class WaitTimeout(TimeoutError):
+    """A waiting caller's timeout ran out before the flight it joined finished."""
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, on_flight=None):
+        """`on_flight(key, waiters, seconds)` is called once per computed answer, e.g. to record metrics."""
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._on_flight = on_flight
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._flights)
+
+    def do(self, key, fn, timeout=None):
+        """Run `fn()` once per key among concurrent callers; returns (result, shared).
+
+        `shared` is True for callers that received another caller's answer.
+        An exception raised by `fn` is raised in every waiting caller too. A
+        caller that waits `timeout` seconds without an answer gets WaitTimeout;
+        the flight itself carries on for the others.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.waiters += 1
+        if not leader:
+            if not flight.done.wait(None if timeout is None else max(0.0, timeout)):
+                with self._lock:
+                    flight.waiters -= 1
+                raise WaitTimeout(f"no answer within {timeout:.2f}s")
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        started = time.perf_counter()
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            # Forget the key before waking the waiters, so a later request starts a new flight
+            with self._lock:
+                del self._flights[key]
+                waiters = flight.waiters
+            flight.done.set()
+            if self._on_flight is not None:
+                self._on_flight(key, waiters, time.perf_counter() - started)
+        return flight.result, False
@@ -0,0 +1,88 @@
+"""
+Per-request deadline budget.
+
+`/chat` answers within REQUEST_BUDGET seconds of starting its handler. The
+deadline lives in a context variable, so it follows the request into the
+handler thread and into every helper the handler calls. Network steps ask
+`timeout_for(step_max)` for their timeout: the step's own limit, cut down
+to what is left of the budget. When too little is left, `DeadlineExceeded`
+is raised before the call is made.
+
+A handler that falls back to a cheaper answer (a local gazetteer instead of
+Nominatim, a straight line instead of an OSRM route) calls `degrade(reason)`.
+`collect` gathers those reasons, and an answer with any reasons is returned
+as a `Degraded` tuple, which /chat reports to the frontend as a
+"degraded" list.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+REQUEST_BUDGET = float(os.environ.get("POTHOLE_REQUEST_BUDGET", "8"))  # seconds per /chat answer
+MIN_STEP_SECONDS = 0.25  # a network step with less time than this left is skipped
+
+_deadline = ContextVar("pothole_deadline", default=None)
+_reasons = ContextVar("pothole_degraded", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Too little of the request's budget is left for the next step."""
+
+
+class Degraded(tuple):
+    """A handler answer (text, fig, highlight_df) that fell back to a cheaper result; `reasons` says which."""
+
+    def __new__(cls, answer, reasons):
+        self = super().__new__(cls, answer)
+        self.reasons = list(reasons)
+        return self
+
+
+@contextmanager
+def budget(seconds=REQUEST_BUDGET):
+    """Give the enclosed block `seconds` to finish (or the outer budget, if that is shorter)."""
+    expires = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(expires if outer is None else min(outer, expires))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """Seconds left in the current budget, or None outside of one."""
+    expires = _deadline.get()
+    return None if expires is None else expires - time.monotonic()
+
+
+def timeout_for(step_max):
+    """Timeout for a network step: its own limit, capped by the budget left."""
+    left = remaining()
+    if left is None:
+        return step_max
+    if left < MIN_STEP_SECONDS:
+        raise DeadlineExceeded(f"{left:.2f}s left of the request budget")
+    return min(step_max, left)
+
+
+def degrade(reason):
+    """Note that the answer being built fell back to a cheaper result."""
+    reasons = _reasons.get()
+    if reasons is not None and reason not in reasons:
+        reasons.append(reason)
+
+
+def collect(fn, *args, **kwargs):
+    """Call `fn`; its answer comes back as `Degraded` if anything it called used `degrade`."""
+    reasons = []
+    token = _reasons.set(reasons)
+    try:
+        answer = fn(*args, **kwargs)
+    finally:
+        _reasons.reset(token)
+    if reasons and isinstance(answer, tuple):
+        return Degraded(answer, reasons)
+    return answer
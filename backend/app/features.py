@@ -0,0 +1,193 @@
+"""
+Offline build of the spatial feature tables behind the pothole risk score.
+
+Terrain, watershed and soil data only change when the GIS exports are refreshed,
+so the polygon overlays run here once instead of on every question:
+  * every 311 pothole point (Potholes_With_Nearest_Roads) gets its terrain
+    (potholes_elev_sidewalks.csv), its watershed and subwatershed, and the
+    SSURGO soil map unit underneath it with that unit's drainage attributes
+  * the points are rolled up per road segment (CartID) and per street
+    (MSAG_Name) and written as Parquet, sorted by a zoom-16 quadkey so nearby
+    rows sit together on disk
+
+Run it from backend/app after the GIS data changes:
+    python features.py
+integrated.py then reads the street table at startup.
+"""
+
+import argparse
+import os
+
+import duckdb
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+
+from spatial_agg import _mercator_xy
+
+DATA_DIR = os.path.join("..", "Data")
+GIS_DIR = os.path.join(DATA_DIR, "GIS")
+FEATURES_DIR = os.environ.get("POTHOLE_FEATURES_DIR", os.path.join(DATA_DIR, "features"))
+
+POTHOLE_POINTS_PATH = "zip://" + os.path.join(GIS_DIR, "Potholes_With_Nearest_Roads.gdb.zip")
+TERRAIN_PATH = os.path.join(GIS_DIR, "potholes_elev_sidewalks.csv")
+STREETS_PATH = os.path.join(DATA_DIR, "Potholes_on_COSA_Streets.csv")
+WATERSHEDS_PATH = "zip://" + os.path.join(GIS_DIR, "bexar_watersheds.zip")
+SOIL_UNITS_PATH = os.path.join(GIS_DIR, "Bexar_Soil", "spatial", "soilmu_a_tx029.shp")
+SOIL_ATTRIBUTES_PATH = os.path.join(GIS_DIR, "Bexar_Soil", "tabular", "muaggatt.txt")
+
+KEY_ZOOM = 16  # quadkey cells are ~600 m across at this latitude
+TERRAIN_COLUMNS = ["avg_elevation", "avg_slope", "avg_roughness", "sidewalk_ratio"]
+
+# Positions of the columns we use in the SSURGO muaggatt table (pipe-delimited, no header)
+MUAGGATT_COLUMNS = {0: "soil_symbol", 1: "soil_name", 8: "flood_frequency", 15: "drainage_class", 17: "hydrologic_group", 39: "mukey"}
+# Ordinal scores, higher = water stays longer in the road base
+DRAINAGE_SCORES = {
+    "Excessively drained": 0, "Somewhat excessively drained": 1, "Well drained": 2,
+    "Moderately well drained": 3, "Somewhat poorly drained": 4, "Poorly drained": 5, "Very poorly drained": 6,
+}
+HYDROLOGIC_SCORES = {"A": 1, "B": 2, "C": 3, "D": 4}  # D = slowest infiltration
+FLOOD_SCORES = {"None": 0, "Very rare": 1, "Rare": 2, "Occasional": 3, "Frequent": 4, "Very frequent": 5}
+
+# Categorical columns rolled up by their most common value, numeric ones by their mean
+CATEGORY_COLUMNS = ["huc10", "watershed", "huc12", "subwatershed", "soil_symbol", "drainage_class", "hydrologic_group"]
+MEAN_COLUMNS = TERRAIN_COLUMNS + ["drainage_score", "hydrologic_score", "flood_score"]
+TABLES = {"segment": "CartID", "street": "MSAG_Name"}
+
+
+def quadkey(lat, lon, zoom=KEY_ZOOM):
+    """Bing-style quadkeys for arrays of points; a prefix of length z is the zoom-z tile."""
+    x, y = _mercator_xy(np.asarray(lat, dtype=float), np.asarray(lon, dtype=float))
+    cells = 2 ** zoom
+    col = np.minimum((x * cells).astype(np.int64), cells - 1)
+    row = np.minimum((y * cells).astype(np.int64), cells - 1)
+    shifts = np.arange(zoom - 1, -1, -1)
+    digits = ((col[:, None] >> shifts) & 1) + 2 * ((row[:, None] >> shifts) & 1)
+    text = np.ascontiguousarray((digits + ord("0")).astype(np.uint8)).view(f"S{zoom}").ravel()
+    return text.astype(str)
+
+
+def read_potholes():
+    """Pothole points with their street, segment and terrain attributes."""
+    points = gpd.read_file(POTHOLE_POINTS_PATH, columns=["CASEID"]).to_crs(epsg=4326)
+    points = points[points.geometry.notna() & ~points.geometry.is_empty].drop_duplicates("CASEID")
+    points["Latitude"] = points.geometry.y
+    points["Longitude"] = points.geometry.x
+
+    streets = pd.read_csv(STREETS_PATH, usecols=["CASEID", "CartID", "MSAG_Name"], dtype={"CartID": str})
+    streets = streets.dropna(subset=["CartID"]).drop_duplicates("CASEID")
+    streets["CartID"] = streets["CartID"].str.replace(r"\.0$", "", regex=True)
+    terrain = pd.read_csv(TERRAIN_PATH, usecols=["CASEID"] + TERRAIN_COLUMNS).drop_duplicates("CASEID")
+
+    points = points.merge(streets, on="CASEID", how="left").merge(terrain, on="CASEID", how="left")
+    return points.reset_index(drop=True)
+
+
+def _overlay(points, polygons, columns):
+    """Attach polygon attributes to each point; points on a shared border keep the first match."""
+    joined = gpd.sjoin(points[["geometry"]], polygons[list(columns) + ["geometry"]].to_crs(points.crs), how="left", predicate="within")
+    joined = joined[~joined.index.duplicated(keep="first")]
+    for target, source in columns.items():
+        points[source] = joined[target].to_numpy()
+    return points
+
+
+def soil_units():
+    """SSURGO map-unit polygons with drainage attributes, or None when the polygons are not in the export."""
+    if not os.path.exists(SOIL_UNITS_PATH):
+        print(f"Soil map units not found at {SOIL_UNITS_PATH}; soil columns will be empty.")
+        return None
+    attributes = pd.read_csv(SOIL_ATTRIBUTES_PATH, sep="|", header=None, usecols=list(MUAGGATT_COLUMNS), dtype=str,
+                             keep_default_na=False, na_values=[""])  # "None" is a flooding class, not a missing value
+    attributes = attributes.rename(columns=MUAGGATT_COLUMNS)
+    units = gpd.read_file(SOIL_UNITS_PATH, columns=["MUKEY"]).rename(columns={"MUKEY": "mukey"})
+    return units.merge(attributes, on="mukey", how="left")
+
+
+def pothole_features():
+    """One row per pothole point with terrain, watershed and soil features."""
+    points = read_potholes()
+    watersheds = gpd.read_file(WATERSHEDS_PATH, layer="bexar_watershed")
+    subwatersheds = gpd.read_file(WATERSHEDS_PATH, layer="bexar_subwatershed")
+    points = _overlay(points, watersheds, {"huc10": "huc10", "name": "watershed"})
+    points = _overlay(points, subwatersheds, {"huc12": "huc12", "name": "subwatershed"})
+
+    soils = soil_units()
+    soil_columns = [c for c in MUAGGATT_COLUMNS.values() if c != "mukey"]
+    if soils is not None:
+        points = _overlay(points, soils, {c: c for c in soil_columns})
+    else:
+        for column in soil_columns:
+            points[column] = pd.Series(None, index=points.index, dtype="str")
+    points["drainage_score"] = points["drainage_class"].map(DRAINAGE_SCORES)
+    # Dual groups such as "A/D" describe the undrained condition by their last letter
+    points["hydrologic_score"] = points["hydrologic_group"].str[-1:].map(HYDROLOGIC_SCORES)
+    points["flood_score"] = points["flood_frequency"].map(FLOOD_SCORES)
+    return pd.DataFrame(points.drop(columns="geometry"))
+
+
+def _most_common(points, key, column):
+    counts = points.groupby([key, column]).size().rename("n").reset_index()
+    counts = counts.sort_values([key, "n"], ascending=[True, False], kind="stable")
+    return counts.drop_duplicates(key).set_index(key)[column]
+
+
+def aggregate(points, key):
+    """Roll pothole features up to one row per `key` (CartID or MSAG_Name)."""
+    points = points.dropna(subset=[key])
+    grouped = points.groupby(key)
+    table = grouped[["Latitude", "Longitude"] + MEAN_COLUMNS].mean()
+    table.insert(0, "pothole_count", grouped.size())
+    table["max_slope"] = grouped["avg_slope"].max()
+    for column in CATEGORY_COLUMNS:
+        table[column] = _most_common(points, key, column)
+    if key == "CartID":
+        table.insert(0, "MSAG_Name", _most_common(points, key, "MSAG_Name"))
+    table[MEAN_COLUMNS + ["max_slope"]] = table[MEAN_COLUMNS + ["max_slope"]].round(3)
+    table.insert(0, "quadkey", quadkey(table["Latitude"], table["Longitude"]))
+    return table.reset_index()
+
+
+def table_path(name):
+    return os.path.join(FEATURES_DIR, f"{name}_features.parquet")
+
+
+def write_table(df, name):
+    """Write one feature table as Parquet, ordered by quadkey so spatial range scans read few row groups."""
+    path = table_path(name)
+    con = duckdb.connect()
+    con.register("features", df)
+    con.execute(f"COPY (SELECT * FROM features ORDER BY quadkey) TO '{path}' (FORMAT PARQUET, COMPRESSION ZSTD)")
+    con.close()
+    return path
+
+
+def load_table(name, columns=None):
+    """Read a feature table; an empty DataFrame when it has not been built."""
+    path = table_path(name)
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    selected = ", ".join(f'"{c}"' for c in columns) if columns else "*"
+    con = duckdb.connect()
+    try:
+        return con.execute(f"SELECT {selected} FROM read_parquet(?)", [path]).df()
+    finally:
+        con.close()
+
+
+def build(tables=TABLES):
+    points = pothole_features()
+    print(f"{len(points)} pothole points; terrain {points['avg_slope'].notna().mean():.1%}, "
+          f"watershed {points['huc10'].notna().mean():.1%}, soil {points['drainage_class'].notna().mean():.1%}")
+    os.makedirs(FEATURES_DIR, exist_ok=True)
+    for name in tables:
+        table = aggregate(points, TABLES[name])
+        path = write_table(table, name)
+        print(f"{name:<8} {len(table):>7} rows {len(table.columns):>3} columns {os.path.getsize(path) / 1024:>8.0f} KB  {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the per-segment and per-street spatial feature tables.")
+    parser.add_argument("--tables", nargs="+", default=list(TABLES), choices=list(TABLES))
+    args = parser.parse_args()
+    build(args.tables)
@@ -0,0 +1,220 @@
+"""
+Daily pothole-case forecasts.
+
+The daily 311 case history (311_Pothole_Cases_18_24.csv) and the published
+forecast (311_ts_pred_24_25.csv) are loaded once into arrays indexed by day,
+with running sums, so the expected number of cases for any window and its
+80%/95% interval take a few array reads.
+
+Two sources answer a window:
+  * the published forecast, for windows it covers; its mean is shifted by the
+    recent bias of the forecast against counts that arrived after it was made
+  * an additive exponential-smoothing model (level plus day-of-week pattern)
+    fitted on the history, for windows past the published horizon
+New daily counts go through `observe`, which updates the running sums, the
+smoothing model and the bias in constant time, so the forecasts follow the
+data without a refit.
+"""
+
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+Z80 = 1.2816
+Z95 = 1.96
+SEASON = 7  # days in the day-of-week pattern
+ALPHA = 0.1  # level smoothing
+GAMMA = 0.1  # day-of-week smoothing
+VARIANCE_DECAY = 0.05  # weight of the newest squared one-step error
+BIAS_DECAY = 0.1  # weight of the newest published-forecast error
+
+# Lagged weather columns in the case history (weekly means of daily values, week 1 = the week before)
+PRECIPITATION_COLUMNS = ["WEEK1PRCP", "WEEK2PRCP", "WEEK3PRCP", "WEEK4PRCP"]
+TEMPERATURE_COLUMNS = ["WEEK1TAVG", "WEEK2TAVG", "WEEK3TAVG", "WEEK4TAVG"]
+TEMPERATURE_SWING_COLUMNS = ["WEEK1TDIF", "WEEK2TDIF", "WEEK3TDIF", "WEEK4TDIF"]
+
+
+def _day(value):
+    return np.datetime64(pd.Timestamp(value).date(), "D")
+
+
+class _Smoother:
+    """Additive level + day-of-week exponential smoothing with a running error variance."""
+
+    def __init__(self, first_weeks):
+        level = float(np.nanmean(first_weeks)) if np.isfinite(first_weeks).any() else 0.0
+        by_weekday = first_weeks[: len(first_weeks) // SEASON * SEASON].reshape(-1, SEASON)
+        with np.errstate(invalid="ignore"):
+            self.season = np.nan_to_num(np.nanmean(by_weekday, axis=0) - level) if by_weekday.size else np.zeros(SEASON)
+        self.level = level
+        self.variance = float(np.nanvar(first_weeks)) if np.isfinite(first_weeks).any() else 0.0
+
+    def update(self, day_index, value):
+        slot = day_index % SEASON
+        if np.isnan(value):  # missing day: keep the state
+            return
+        error = value - (self.level + self.season[slot])
+        self.variance = (1 - VARIANCE_DECAY) * self.variance + VARIANCE_DECAY * error * error
+        self.level += ALPHA * error
+        self.season[slot] += GAMMA * (1 - ALPHA) * error
+
+    def window(self, last_index, first_h, days):
+        """Mean and variance of the total over steps first_h .. first_h + days - 1 ahead of `last_index`."""
+        # Day-of-week part: whole weeks plus the leftover days
+        start_slot = (last_index + first_h) % SEASON
+        leftover = sum(self.season[(start_slot + i) % SEASON] for i in range(days % SEASON))
+        mean = days * self.level + (days // SEASON) * self.season.sum() + leftover
+        # h-step errors share the level error: Var(sum) = s^2 * sum_k (1 + alpha * k)^2, k = h - 1
+        def squares(n):  # sum_{k=0}^{n-1} (1 + alpha*k)^2 in closed form
+            return n + ALPHA * n * (n - 1) + ALPHA ** 2 * (n - 1) * n * (2 * n - 1) / 6
+        variance = self.variance * (squares(first_h - 1 + days) - squares(first_h - 1))
+        return mean, variance
+
+
+class Forecaster:
+    def __init__(self, history, published=None):
+        """`history`: OpenDate + cases per day; `published`: Date, ts_pred and the 95% upper band."""
+        history = history.dropna(subset=["OpenDate"]).sort_values("OpenDate")
+        self.origin = _day(history["OpenDate"].iloc[0])
+        index = (history["OpenDate"].to_numpy(dtype="datetime64[D]") - self.origin).astype(np.int64)
+        self._size = int(index[-1]) + 1
+        self._cases = np.full(max(self._size * 2, 64), np.nan)
+        self._cases[index] = history["cases"].to_numpy(dtype=float)
+        self._cumulative = np.zeros(len(self._cases) + 1)
+        self._cumulative[1: self._size + 1] = np.cumsum(np.nan_to_num(self._cases[: self._size]))
+        self._lock = threading.Lock()
+
+        self._smoother = _Smoother(self._cases[: 4 * SEASON].copy())
+        for i in range(self._size):
+            self._smoother.update(i, self._cases[i])
+
+        self.bias = 0.0
+        self.published_start = None
+        if published is not None and not published.empty:
+            published = published.sort_values("Date")
+            self.published_start = int((_day(published["Date"].iloc[0]) - self.origin).astype(np.int64))
+            mean = published["ts_pred"].to_numpy(dtype=float)
+            # The lower bands are clipped at zero, so the spread comes from the upper 95% band
+            sigma = np.maximum(published["upper_95"].to_numpy(dtype=float) - mean, 0) / Z95
+            self._published_mean = mean
+            self._published_mean_sum = np.concatenate([[0.0], np.cumsum(mean)])
+            self._published_variance_sum = np.concatenate([[0.0], np.cumsum(sigma ** 2)])
+
+    @property
+    def as_of(self):
+        """Date of the latest observed count."""
+        return pd.Timestamp(self.origin + np.timedelta64(self._size - 1, "D"))
+
+    @property
+    def published_end(self):
+        if self.published_start is None:
+            return None
+        return self.published_start + len(self._published_mean)
+
+    def observe(self, date, cases):
+        """Add one day's count (new days extend the series; known days are not re-fitted)."""
+        with self._lock:
+            i = int((_day(date) - self.origin).astype(np.int64))
+            if i < self._size:
+                return False
+            if i >= len(self._cases):
+                grown = np.full(max(len(self._cases) * 2, i + 1), np.nan)
+                grown[: len(self._cases)] = self._cases
+                cumulative = np.zeros(len(grown) + 1)
+                cumulative[: len(self._cumulative)] = self._cumulative
+                self._cases, self._cumulative = grown, cumulative
+            self._cases[i] = float(cases)
+            # Days skipped since the last count add nothing to the running sum
+            self._cumulative[self._size + 1: i + 2] = self._cumulative[self._size]
+            self._cumulative[i + 1] += float(cases)
+            for missing in range(self._size, i):
+                self._smoother.update(missing, np.nan)
+            self._smoother.update(i, float(cases))
+            if self.published_start is not None and self.published_start <= i < self.published_end:
+                error = float(cases) - self._published_mean[i - self.published_start]
+                self.bias = (1 - BIAS_DECAY) * self.bias + BIAS_DECAY * error
+            self._size = i + 1
+            return True
+
+    def observed(self, start, days):
+        """Total reported cases over `days` days from `start`, from the running sums."""
+        a = int((_day(start) - self.origin).astype(np.int64))
+        a, b = min(max(a, 0), self._size), min(max(a + days, 0), self._size)
+        return float(self._cumulative[b] - self._cumulative[a])
+
+    def expected(self, days, start=None):
+        """Expected total cases for `days` days from `start` (default: the day after the latest count).
+
+        Returns a dict with start, end, expected, low_80, high_80, low_95, high_95 and source.
+        """
+        with self._lock:
+            first = self._size if start is None else int((_day(start) - self.origin).astype(np.int64))
+            first = max(first, self._size)
+            last = first + days
+            if self.published_start is not None and self.published_start <= first and last <= self.published_end:
+                a, b = first - self.published_start, last - self.published_start
+                mean = self._published_mean_sum[b] - self._published_mean_sum[a] + days * self.bias
+                variance = self._published_variance_sum[b] - self._published_variance_sum[a]
+                source = "published forecast"
+            else:
+                mean, variance = self._smoother.window(self._size - 1, first - self._size + 1, days)
+                source = "exponential smoothing"
+        mean = max(float(mean), 0.0)
+        sd = float(np.sqrt(max(variance, 0.0)))
+        return {
+            "start": pd.Timestamp(self.origin + np.timedelta64(first, "D")),
+            "end": pd.Timestamp(self.origin + np.timedelta64(last - 1, "D")),
+            "expected": mean,
+            "low_80": max(mean - Z80 * sd, 0.0),
+            "high_80": mean + Z80 * sd,
+            "low_95": max(mean - Z95 * sd, 0.0),
+            "high_95": mean + Z95 * sd,
+            "source": source,
+        }
+
+
+def _quartile_effect(cases, driver):
+    """Mean daily cases in the top vs bottom quarter of `driver`, and their correlation."""
+    valid = ~(np.isnan(cases) | np.isnan(driver))
+    cases, driver = cases[valid], driver[valid]
+    if len(cases) < 8:
+        return None
+    low, high = np.quantile(driver, [0.25, 0.75])
+    return {
+        "high_mean": float(cases[driver >= high].mean()),
+        "low_mean": float(cases[driver <= low].mean()),
+        "high_threshold": float(high),
+        "low_threshold": float(low),
+        "correlation": float(np.corrcoef(cases, driver)[0, 1]),
+    }
+
+
+def weather_effects(history):
+    """How daily cases differ after wet, cold and high-swing weeks, from the lagged weather columns."""
+    if history.empty or "cases" not in history.columns:
+        return {}
+    cases = history["cases"].to_numpy(dtype=float)
+    drivers = {
+        "rain": PRECIPITATION_COLUMNS,
+        "temperature": TEMPERATURE_COLUMNS,
+        "temperature_swing": TEMPERATURE_SWING_COLUMNS,
+    }
+    effects = {}
+    for name, columns in drivers.items():
+        if all(column in history.columns for column in columns):
+            # Mean over the four lag weeks: the weather of the month before the report
+            effect = _quartile_effect(cases, history[columns].to_numpy(dtype=float).mean(axis=1))
+            if effect:
+                effects[name] = effect
+    return effects
+
+
+def load_published(path):
+    """The published daily forecast, or None when the file is missing."""
+    if not os.path.exists(path):
+        return None
+    published = pd.read_csv(path, parse_dates=["Date"])
+    # R's forecast export names the bands X80./X95. (upper) and X80..1/X95..1 (lower)
+    return published.rename(columns={"X80.": "upper_80", "X95.": "upper_95", "X80..1": "lower_80", "X95..1": "lower_95"})
@@ -0,0 +1,301 @@
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# ---------- Debug output ----------
+# Set POTHOLE_DEBUG=1 to get the verbose "[DEBUG]" traces back. When it is off,
+# debug() returns before formatting anything, so the calls cost a single check.
+DEBUG_ENABLED = os.environ.get("POTHOLE_DEBUG", "").lower() in ("1", "true", "yes")
+
+
+def debug(message, *args):
+    """Print a debug line, formatting `message % args` only when debugging is enabled."""
+    if not DEBUG_ENABLED:
+        return
+    print("[DEBUG] " + (message % args if args else message))
+
+
+# ---------- Structured request log ----------
+# One JSON line per /chat call. POTHOLE_TRACE_LOG=off silences it.
+trace_logger = logging.getLogger("potholes.trace")
+trace_logger.propagate = False
+if os.environ.get("POTHOLE_TRACE_LOG", "on").lower() not in ("0", "off", "false", "no"):
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    trace_logger.addHandler(_handler)
+    trace_logger.setLevel(logging.INFO)
+else:
+    trace_logger.setLevel(logging.CRITICAL + 1)
+
+STAGES = ("routing", "data_query", "geocode", "llm", "serialization")
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+WAITER_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64)
+
+
+class RequestTrace:
+    """Timings and counters collected while answering a single chat message."""
+
+    __slots__ = ("started", "intent", "stages", "cache", "payload_bytes", "highlight_rows", "_stack")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.intent = None
+        self.stages = dict.fromkeys(STAGES, 0.0)
+        self.cache = {}
+        self.payload_bytes = 0
+        self.highlight_rows = 0
+        # Stack of [stage_name, resumed_at]; only the innermost stage accumulates time,
+        # so nested handlers and a geocode inside a handler are never double counted.
+        self._stack = []
+
+    def enter(self, name):
+        now = time.perf_counter()
+        if self._stack:
+            parent = self._stack[-1]
+            self.stages[parent[0]] += now - parent[1]
+        self._stack.append([name, now])
+
+    def exit(self):
+        now = time.perf_counter()
+        name, resumed_at = self._stack.pop()
+        self.stages[name] = self.stages.get(name, 0.0) + now - resumed_at
+        if self._stack:
+            self._stack[-1][1] = now
+
+    def as_dict(self, total):
+        return {
+            "intent": self.intent or "unmatched",
+            "total_ms": round(total * 1000, 3),
+            "stages_ms": {name: round(value * 1000, 3) for name, value in self.stages.items() if value},
+            "cache": self.cache,
+            "payload_bytes": self.payload_bytes,
+            "highlight_rows": self.highlight_rows,
+        }
+
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+def start_trace():
+    trace = RequestTrace()
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+@contextmanager
+def stage(name):
+    """Attribute the wall time of the enclosed block to `name` on the current trace."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    trace.enter(name)
+    try:
+        yield
+    finally:
+        trace.exit()
+
+
+def record_intent(name):
+    """Mark the intent that matched; the first call wins so nested handlers keep the outer name."""
+    trace = _current_trace.get()
+    if trace is None or trace.intent is not None:
+        return
+    trace.intent = name
+    trace.stages["routing"] = time.perf_counter() - trace.started
+
+
+def record_cache(cache_name, hit):
+    trace = _current_trace.get()
+    if trace is not None:
+        outcome = "hit" if hit else "miss"
+        trace.cache[f"{cache_name}_{outcome}"] = trace.cache.get(f"{cache_name}_{outcome}", 0) + 1
+    _metrics.inc_cache(cache_name, hit)
+
+
+def record_coalesced(intent, waiters, seconds):
+    """One computed answer that `waiters` other identical requests shared (coalesce.py)."""
+    _metrics.observe_flight(intent, waiters, seconds)
+
+
+def record_admission(lane, outcome, wait_seconds):
+    """An admission decision (admission.py): admitted, queue_full, timeout or rate_limited."""
+    _metrics.observe_admission(lane, outcome, wait_seconds)
+
+
+def intent_handler(func):
+    """Decorator for chat handlers: records the intent name and times the handler as data_query."""
+    name = func.__name__
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        record_intent(name)
+        with stage("data_query"):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def finish_trace(trace):
+    """Fold a finished trace into the process metrics and write its structured log line."""
+    total = time.perf_counter() - trace.started
+    _metrics.observe(trace, total)
+    trace_logger.info(json.dumps(trace.as_dict(total)))
+    _current_trace.set(None)
+
+
+def drop_trace():
+    """Stop recording into the current trace in this context, without counting it.
+
+    For requests turned away by admission control (record_admission counts those),
+    and for worker threads that must not touch the request's trace.
+    """
+    _current_trace.set(None)
+
+
+# ---------- Prometheus-style registry ----------
+class _Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += value
+        self.count += 1
+
+    def render(self, metric, labels):
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            cumulative += bucket_count
+            lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f"{metric}_sum{{{labels}}} {self.total}")
+        lines.append(f"{metric}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class _MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}
+        self.request_latency = {}
+        self.stage_latency = {}
+        self.payload_size = {}
+        self.cache = {}
+        self.flight_waiters = {}
+        self.coalesced_saved = {}
+        self.admissions = {}
+        self.admission_wait = {}
+
+    def observe(self, trace, total):
+        intent = trace.intent or "unmatched"
+        with self._lock:
+            self.requests[intent] = self.requests.get(intent, 0) + 1
+            self.request_latency.setdefault(intent, _Histogram(LATENCY_BUCKETS)).observe(total)
+            for name, value in trace.stages.items():
+                if value:
+                    self.stage_latency.setdefault((intent, name), _Histogram(LATENCY_BUCKETS)).observe(value)
+            self.payload_size.setdefault(intent, _Histogram(SIZE_BUCKETS)).observe(trace.payload_bytes)
+
+    def observe_flight(self, intent, waiters, seconds):
+        with self._lock:
+            self.flight_waiters.setdefault(intent, _Histogram(WAITER_BUCKETS)).observe(waiters)
+            # Each waiter skipped a full run of the handler
+            self.coalesced_saved[intent] = self.coalesced_saved.get(intent, 0.0) + waiters * seconds
+
+    def observe_admission(self, lane, outcome, wait_seconds):
+        with self._lock:
+            self.admissions[(lane, outcome)] = self.admissions.get((lane, outcome), 0) + 1
+            if outcome == "admitted":
+                self.admission_wait.setdefault(lane, _Histogram(LATENCY_BUCKETS)).observe(wait_seconds)
+
+    def inc_cache(self, cache_name, hit):
+        key = (cache_name, "hit" if hit else "miss")
+        with self._lock:
+            self.cache[key] = self.cache.get(key, 0) + 1
+
+    def render(self):
+        with self._lock:
+            lines = [
+                "# HELP pothole_chat_requests_total Chat requests answered, by matched intent.",
+                "# TYPE pothole_chat_requests_total counter",
+            ]
+            for intent, count in sorted(self.requests.items()):
+                lines.append(f'pothole_chat_requests_total{{intent="{intent}"}} {count}')
+            lines += [
+                "# HELP pothole_chat_request_seconds End-to-end handling time of a chat request.",
+                "# TYPE pothole_chat_request_seconds histogram",
+            ]
+            for intent, hist in sorted(self.request_latency.items()):
+                lines += hist.render("pothole_chat_request_seconds", f'intent="{intent}"')
+            lines += [
+                "# HELP pothole_chat_stage_seconds Time spent per stage (routing, data_query, geocode, llm, serialization).",
+                "# TYPE pothole_chat_stage_seconds histogram",
+            ]
+            for (intent, name), hist in sorted(self.stage_latency.items()):
+                lines += hist.render("pothole_chat_stage_seconds", f'intent="{intent}",stage="{name}"')
+            lines += [
+                "# HELP pothole_chat_response_bytes Size of the serialized /chat response body.",
+                "# TYPE pothole_chat_response_bytes histogram",
+            ]
+            for intent, hist in sorted(self.payload_size.items()):
+                lines += hist.render("pothole_chat_response_bytes", f'intent="{intent}"')
+            lines += [
+                "# HELP pothole_cache_requests_total Cache lookups by cache and outcome.",
+                "# TYPE pothole_cache_requests_total counter",
+            ]
+            for (cache_name, outcome), count in sorted(self.cache.items()):
+                lines.append(f'pothole_cache_requests_total{{cache="{cache_name}",result="{outcome}"}} {count}')
+            lines += [
+                "# HELP pothole_coalesced_waiters Identical concurrent requests that shared one computed answer.",
+                "# TYPE pothole_coalesced_waiters histogram",
+            ]
+            for intent, hist in sorted(self.flight_waiters.items()):
+                lines += hist.render("pothole_coalesced_waiters", f'intent="{intent}"')
+            lines += [
+                "# HELP pothole_coalesced_saved_seconds_total Handler time not spent because requests shared an answer.",
+                "# TYPE pothole_coalesced_saved_seconds_total counter",
+            ]
+            for intent, saved in sorted(self.coalesced_saved.items()):
+                lines.append(f'pothole_coalesced_saved_seconds_total{{intent="{intent}"}} {saved}')
+            lines += [
+                "# HELP pothole_admission_total Admission decisions by lane and outcome.",
+                "# TYPE pothole_admission_total counter",
+            ]
+            for (lane, outcome), count in sorted(self.admissions.items()):
+                lines.append(f'pothole_admission_total{{lane="{lane}",outcome="{outcome}"}} {count}')
+            lines += [
+                "# HELP pothole_admission_wait_seconds Time admitted requests waited in their lane's queue.",
+                "# TYPE pothole_admission_wait_seconds histogram",
+            ]
+            for lane, hist in sorted(self.admission_wait.items()):
+                lines += hist.render("pothole_admission_wait_seconds", f'lane="{lane}"')
+        return "\n".join(lines) + "\n"
+
+
+_metrics = _MetricsRegistry()
+
+
+def render_metrics():
+    """Return all collected metrics in the Prometheus text exposition format."""
+    return _metrics.render()
@@ -13,6 +13,28 @@ import hashlib
 from functools import lru_cache
 import inspect
 import calendar
+import itertools
+import threading
+from contextlib import nullcontext
+from instrumentation import debug, intent_handler, record_cache, record_coalesced, record_intent, stage, DEBUG_ENABLED
+from spatial_agg import MAX_CLUSTERS, cluster_points
+from features import load_table as load_feature_table, table_path as feature_table_path
+import risk_model
+import budget
+from treatments import TreatmentIndex, links_path as treatment_links_path, load_links as load_treatment_links
+from forecast import Forecaster, load_published, weather_effects
+from calendar_rollup import CalendarRollup
+from streets import StreetIndex, StreetRows
+from pothole_reports import load_reports
+from street_history import StreetMonthMatrix, TREND_MONTHS
+from stop_neighbors import StopNeighbors, MAX_RADIUS_M
+import transit_graph
+from coalesce import SingleFlight, WaitTimeout
+from deadline import DeadlineExceeded, Degraded, collect, degrade, remaining, timeout_for
+import process_pool
+from profiling import profiling
+from snapshot import Snapshot
+from route_exposure import route_exposure, POOR_PCI
 
 global pothole_cases_df, pavement_latlon_df, complaint_df # Declare globals here
 
@@ -43,9 +65,18 @@ def _convert_dataframe_numerics_to_native_types(df):
 # highlight_feature_group = st.session_state.highlight_feature_group
 
 # ---------- Groq AI Configuration ----------
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+GROQ_API_URL = os.environ.get("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
 GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
 
+# External geo services (overridable so benchmarks can point them at local stubs)
+NOMINATIM_URL = os.environ.get("NOMINATIM_URL", "https://nominatim.openstreetmap.org/search")
+OSRM_URL = os.environ.get("OSRM_URL", "http://router.project-osrm.org")
+# Longest each network step may take; the request's deadline (deadline.py) can cut them shorter
+GEOCODE_TIMEOUT = 5
+OSRM_TIMEOUT = 5
+LLM_TIMEOUT = float(os.environ.get("POTHOLE_LLM_TIMEOUT", "20"))
+CITY_CENTER = (29.4241, -98.4936)  # downtown San Antonio, for the local gazetteer
+
 # Initialize global DataFrames
 pothole_cases_df = pd.DataFrame()
 pavement_latlon_df = pd.DataFrame()
@@ -67,6 +98,14 @@ if os.path.exists('../Data/VIA/via_routes_cleaned.csv'):
     via_routes_df = pd.read_csv('../Data/VIA/via_routes_cleaned.csv')
 else:
     via_routes_df = pd.DataFrame()
+if os.path.exists('../Data/VIA/trip_cleaned.csv'):
+    via_trips_df = pd.read_csv('../Data/VIA/trip_cleaned.csv')
+else:
+    via_trips_df = pd.DataFrame()
+if os.path.exists('../Data/VIA/transfers_data_cleaned.csv'):
+    via_transfers_df = pd.read_csv('../Data/VIA/transfers_data_cleaned.csv')
+else:
+    via_transfers_df = pd.DataFrame()
 
 # --- Load sensitive locations from extracted CSV ---
 import re
@@ -98,21 +137,53 @@ def points_within_radius(points_df, center_lat, center_lon, radius_m):
     return gdf_points_proj[gdf_points_proj.geometry.within(buffer.iloc[0])]
 
 # --- Utility: Fast Geocoding with Caching ---
-def geocode_address(address):
-    @lru_cache(maxsize=1000) # Cache results to avoid repeated API calls
-    def _geocode(addr):
-        url = f"https://nominatim.openstreetmap.org/search"
-        params = {"q": addr, "format": "json", "limit": 1}
-        try:
-            resp = requests.get(url, params=params, headers={"User-Agent": "pothole-bot"}, timeout=5)
+# The cache lives at module level so it survives between calls (it used to be rebuilt on every call).
+@lru_cache(maxsize=1000) # Cache results to avoid repeated API calls
+def _geocode(addr):
+    url = NOMINATIM_URL
+    params = {"q": addr, "format": "json", "limit": 1}
+    try:
+        with stage("geocode"):
+            resp = requests.get(url, params=params, headers={"User-Agent": "pothole-bot"}, timeout=timeout_for(GEOCODE_TIMEOUT))
             resp.raise_for_status()
             data = resp.json()
-            if data:
-                return float(data[0]["lat"]), float(data[0]["lon"])
-        except Exception:
-            return None, None
-        return None, None
-    return _geocode(address)
+    except (DeadlineExceeded, requests.exceptions.RequestException):
+        # Timeouts, refused connections and error statuses (429, 5xx) are not cached,
+        # so a later request tries Nominatim again; this one falls back to local_geocode
+        raise
+    # Only a real answer is cached, including "no match"
+    if data:
+        return float(data[0]["lat"]), float(data[0]["lon"])
+    return None, None
+
+def local_geocode(place):
+    """Middle of a street's pavement segments, or a VIA stop by name; no network needed."""
+    name = re.sub(r"^\d+\s+", "", place.split(",")[0].strip())  # drop the house number and city
+    if name.lower() == "san antonio":
+        return CITY_CENTER
+    rows = pavement_street_rows.rows(street_index.lookup(name))
+    if len(rows):
+        segments = pavement_latlon_df.iloc[rows]
+        return float(segments["Latitude"].median()), float(segments["Longitude"].median())
+    if not via_stops_df.empty:
+        stops = via_stops_df[via_stops_df["stop_name"].str.lower() == name.lower()]
+        if not stops.empty:
+            return float(stops["stop_lat"].iloc[0]), float(stops["stop_lon"].iloc[0])
+    return None, None
+
+def geocode_address(address):
+    misses_before = _geocode.cache_info().misses
+    try:
+        result = _geocode(address)
+    except (DeadlineExceeded, requests.exceptions.RequestException, KeyError, IndexError, TypeError, ValueError):
+        # No answer, or one we could not read (not cached either way)
+        result = local_geocode(address)
+        if result[0] is None:
+            degrade(f"The geocoder did not answer, and '{address}' is not a street or stop name.")
+        else:
+            degrade(f"The geocoder did not answer, so '{address}' was placed from the street list.")
+    record_cache("geocode", hit=_geocode.cache_info().misses == misses_before)
+    return result
 
 # --- Utility: Convert pavement_latlon_df to GeoDataFrame ---
 def get_pavement_gdf():
@@ -129,6 +200,7 @@ def get_pavement_gdf():
     return get_pavement_gdf.gdf
 
 # --- Improved Handler: Active pothole complaints within the area of a school zone, senior center, or hospital ---
+@intent_handler
 def handle_active_complaints_near_sensitive_areas(radius_m=300, sensitive_type='school'):
     # Map user type to possible keywords in the name
     type_keywords = {
@@ -141,11 +213,11 @@ def handle_active_complaints_near_sensitive_areas(radius_m=300, sensitive_type='
     if complaint_df.empty or 'Latitude' not in complaint_df.columns or 'Longitude' not in complaint_df.columns:
         return "Complaint data with location is required for this analysis.", None, pd.DataFrame()
     unresolved = complaint_df[complaint_df['CLOSEDDATETIME'].isna() & complaint_df['Latitude'].notna() & complaint_df['Longitude'].notna()]
-    print(f"DEBUG: Number of unresolved complaints: {len(unresolved)}")
+    debug("Number of unresolved complaints: %d", len(unresolved))
     # Use extracted sensitive locations, filter for any keyword in name
     pattern = '|'.join(keywords)
     sensitive = sensitive_locations_df[sensitive_locations_df['name'].str.contains(pattern, case=False, na=False)].copy()
-    print(f"DEBUG: Number of sensitive locations ({sensitive_type}): {len(sensitive)}")
+    debug("Number of sensitive locations (%s): %d", sensitive_type, len(sensitive))
     if sensitive.empty:
         return f"No sensitive {sensitive_type} location data available.", None, pd.DataFrame()
     summary = []
@@ -174,6 +246,7 @@ def handle_active_complaints_near_sensitive_areas(radius_m=300, sensitive_type='
     return response, None, highlight_df
 
 # --- Handler: Intersections with VIA stops, high pothole & injury rates ---
+@intent_handler
 def handle_intersections_via_pothole_injury(top_n=5):
     # Stub: join stops, complaints, and injuries at intersections
     if injuries_df.empty or via_stops_df.empty or complaint_df.empty:
@@ -182,6 +255,7 @@ def handle_intersections_via_pothole_injury(top_n=5):
     return "This analysis requires intersection and injury data. Please provide a dataset with intersection locations and injury counts.", None, pd.DataFrame()
 
 # --- Handler: Prioritize maintenance for bus damage/delays ---
+@intent_handler
 def handle_prioritize_maintenance_for_buses():
     # Overlay VIA routes, complaint density, and PCI
     if via_routes_df.empty or pavement_latlon_df.empty or complaint_df.empty:
@@ -190,26 +264,39 @@ def handle_prioritize_maintenance_for_buses():
     return "This analysis requires VIA route geometry and pavement condition data. Please provide route shapes and PCI scores.", None, pd.DataFrame()
 
 # --- Handler: History of repeated pothole complaints along a road ---
+@intent_handler
 def handle_repeated_complaints_on_road(road):
-    if complaint_df.empty or 'MSAG_Name' not in complaint_df.columns:
+    if complaint_history is None:
         return "Complaint data with road names is required.", None, pd.DataFrame()
-    road_complaints = complaint_df[complaint_df['MSAG_Name'].str.contains(road, case=False, na=False)]
-    if road_complaints.empty:
-        return f"No complaints found for road '{road}'.", None, pd.DataFrame()
-    trend = road_complaints.groupby(road_complaints['OPENEDDATETIME'].dt.to_period('M')).size()
-
-    # Build grouped-by-year markdown-friendly output
-    groups = {}
-    for period, count in trend.items():
-        year = int(str(period)[:4])
-        month = int(str(period)[5:7])
-        groups.setdefault(year, []).append((month, count))
+    # "Culebra and Bandera" / "Culebra vs Bandera": compare when every part names a street
+    parts = [p.strip() for p in re.split(r"\s+(?:and|vs\.?|versus)\s+|,", road) if p.strip()]
+    streets = {part.title(): street_index.lookup(part) for part in parts}
+    if len(streets) > 1 and all(streets.values()):
+        table = complaint_history.compare(streets)
+        lines = [f"📍 **Complaint History: {', '.join(streets)}**\n"]
+        for label, row in table.iterrows():
+            lines.append(
+                f"• **{label}**: {row['total']:,} complaints in {row['months']} months; "
+                f"last {TREND_MONTHS} months {row['recent_total']:,} ({row['trend_per_month']:+.2f}/month)"
+                + (" — repeated" if row['repeated'] else "")
+            )
+        return "\n".join(lines), None, pd.DataFrame()
 
+    ids = street_index.lookup(road)
+    history = complaint_history.history(ids)
+    if not history:
+        return f"No complaints found for road '{road}'.", None, pd.DataFrame()
+    summary = complaint_history.summary(ids)
     lines = [f"📍 **Complaint History for {road.title()}**\n"]
-    for year in sorted(groups.keys()):
+    lines.append(
+        f"{summary['total']:,} complaints in {summary['months']} months. "
+        f"Last {TREND_MONTHS} months: {summary['recent_total']:,} in {summary['recent_months']} months, "
+        f"trend {summary['trend_per_month']:+.2f} per month"
+        + (" — a repeated-complaint location.\n" if summary['repeated'] else ".\n")
+    )
+    for year, months in itertools.groupby(history, key=lambda h: h[0]):
         lines.append(f"🗓️ **{year}**")
-        # Sort by month and format one month per line
-        for m, c in sorted(groups[year]):
+        for _, m, c in months:
             lines.append(f"• {calendar.month_abbr[m]}: {c}")
         lines.append("")
 
@@ -217,35 +304,111 @@ def handle_repeated_complaints_on_road(road):
     return response, None, pd.DataFrame()
 
 # --- Handler: Bus stops near high-risk pavement ---
+@intent_handler
 def handle_bus_stops_near_high_risk_pavement(pci_threshold=50, radius_m=100):
-    if via_stops_df.empty or pavement_latlon_df.empty:
+    if stop_neighbors is None:
         return "VIA stops and pavement data required.", None, pd.DataFrame()
-    high_risk = pavement_latlon_df[pavement_latlon_df['PCI'] < pci_threshold]
-    if high_risk.empty:
-        return "No high-risk pavement segments found.", None, pd.DataFrame()
-    results = []
-    for _, stop in via_stops_df.iterrows():
-        near = high_risk[((high_risk['Latitude'] - stop['stop_lat'])**2 + (high_risk['Longitude'] - stop['stop_lon'])**2).pow(0.5) < (radius_m/111320)]
-        for _, seg in near.iterrows():
-            results.append({'Stop': stop['stop_name'], 'Latitude': seg['Latitude'], 'Longitude': seg['Longitude']})
-    if not results:
+    pairs = stop_neighbors.below(pci_threshold, min(radius_m, MAX_RADIUS_M))
+    if pairs.empty:
         return "No bus stops found near high-risk pavement.", None, pd.DataFrame()
-    highlight_df = pd.DataFrame(results)
+    highlight_df = pairs[['Stop', 'Latitude', 'Longitude']].copy()
+    highlight_df['color'] = 'purple'
+    highlight_df['marker_radius'] = 10
+    response = (
+        f"Found {pairs['stop'].nunique()} bus stops within {min(radius_m, MAX_RADIUS_M):.0f} m of "
+        f"{pairs['segment'].nunique()} pavement segments with PCI below {pci_threshold:g}."
+    )
+    return response, None, highlight_df
+
+# --- Handler: Bus stops near a street or place ---
+@intent_handler
+def handle_bus_stops_near(place, radius_m=200):
+    if stop_neighbors is None:
+        return "VIA stops and pavement data required.", None, pd.DataFrame()
+    radius_m = min(radius_m, MAX_RADIUS_M)
+    ids = street_index.lookup(place)
+    if ids:
+        pairs = stop_neighbors.near_segments(pavement_street_rows.rows(ids), radius_m)
+        stops = pairs.drop_duplicates('stop').rename(columns={'distance_m': 'distance'})
+        stops = stop_neighbors.stops.iloc[stops['stop']].assign(distance_m=stops['distance'].to_numpy())
+        where = ", ".join(street_index.names_for(ids))
+    else:
+        lat, lon = geocode_address(place)
+        if lat is None:
+            return f"Could not find '{place}'. Try a street name or a full address.", None, pd.DataFrame()
+        stops = stop_neighbors.near_point(lat, lon, radius_m)
+        where = place.title()
+    if stops.empty:
+        return f"No bus stops within {radius_m:.0f} m of {where}.", None, pd.DataFrame()
+    lines = [f"🚌 **{len(stops)} bus stops within {radius_m:.0f} m of {where}**\n"]
+    for stop in stops.head(10).itertuples():
+        lines.append(f"• {stop.stop_name} ({stop.distance_m:.0f} m)")
+    if len(stops) > 10:
+        lines.append(f"…and {len(stops) - 10} more on the map.")
+    highlight_df = stops.rename(columns={'stop_name': 'Stop', 'stop_lat': 'Latitude', 'stop_lon': 'Longitude'})[['Stop', 'Latitude', 'Longitude']]
     highlight_df['color'] = 'purple'
     highlight_df['marker_radius'] = 10
-    return f"Found {len(highlight_df)} bus stops near high-risk pavement.", None, highlight_df
+    return "\n".join(lines), None, highlight_df
+
+# --- Handler: Stops surrounded by the worst pavement ---
+@intent_handler
+def handle_worst_bus_stops(radius_m=200, top_n=10):
+    if stop_neighbors is None:
+        return "VIA stops and pavement data required.", None, pd.DataFrame()
+    radius_m = min(radius_m, MAX_RADIUS_M)
+    worst = stop_neighbors.worst_stops(radius_m, top_n)
+    if worst.empty:
+        return f"No bus stops have pavement data within {radius_m:.0f} m.", None, pd.DataFrame()
+    lines = [f"🚌 **Bus Stops with the Worst Pavement Within {radius_m:.0f} m**\n"]
+    for i, stop in enumerate(worst.itertuples(), 1):
+        lines.append(f"**{i}.** {stop.stop_name}: average PCI **{stop.mean_pci:.1f}** over {stop.segments} segments")
+    highlight_df = worst.rename(columns={'stop_name': 'Stop', 'stop_lat': 'Latitude', 'stop_lon': 'Longitude'})[['Stop', 'Latitude', 'Longitude']]
+    highlight_df['color'] = 'red'
+    highlight_df['marker_radius'] = 12
+    return "\n".join(lines), None, highlight_df
+
+# --- Handler: Transfer hubs most affected by potholes ---
+@intent_handler
+def handle_transfer_hubs_pothole_exposure(top_n=10):
+    if transit_hubs_df.empty:
+        return "VIA stops, transfers and located complaints are required.", None, pd.DataFrame()
+    hubs = transit_hubs_df.head(top_n)
+    lines = ["🚏 **VIA Transfer Hubs Most Affected by Potholes**\n"]
+    for i, hub in enumerate(hubs.itertuples(), 1):
+        lines.append(
+            f"**{i}.** {hub.name}: **{hub.nearby_complaints:,}** complaints within {transit_graph.EXPOSURE_RADIUS_M} m "
+            f"of its {hub.stops} stops ({hub.transfers} transfers, {hub.pagerank:.2%} of network importance)"
+        )
+    lines.append(
+        f"\nHubs are ranked by nearby complaints weighted by PageRank over the {len(transit_stops_df):,}-stop transfer network."
+    )
+    members = transit_stops_df[transit_stops_df['hub'].isin(hubs['hub'])]
+    highlight_df = members.rename(columns={'stop_name': 'Stop', 'stop_lat': 'Latitude', 'stop_lon': 'Longitude'})[['Stop', 'Latitude', 'Longitude']].copy()
+    highlight_df['color'] = 'purple'
+    highlight_df['marker_radius'] = 12
+    return "\n".join(lines), None, highlight_df
 
 # --- Handler: Will I face potholes on the way to [area]? ---
+@intent_handler
 def handle_potholes_on_route(destination, origin="San Antonio, TX", buffer_m=50):
     lat1, lon1 = geocode_address(origin)
     lat2, lon2 = geocode_address(destination)
     if None in (lat1, lon1, lat2, lon2):
         return f"Could not geocode the route from '{origin}' to '{destination}'.", None, pd.DataFrame()
-    osrm_url = f"http://router.project-osrm.org/route/v1/driving/{lon1},{lat1};{lon2},{lat2}?overview=full&geometries=geojson"
+    osrm_url = f"{OSRM_URL}/route/v1/driving/{lon1},{lat1};{lon2},{lat2}?overview=full&geometries=geojson"
+    straight_line = False
     try:
-        resp = requests.get(osrm_url, timeout=5)
+        resp = requests.get(osrm_url, timeout=timeout_for(OSRM_TIMEOUT))
         resp.raise_for_status()
         route = resp.json()["routes"][0]["geometry"]["coordinates"]
+    except (DeadlineExceeded, requests.exceptions.Timeout):
+        # No time left for routing: count along the straight line instead, without points to draw
+        route = [(lon1, lat1), (lon2, lat2)]
+        straight_line = True
+        degrade("Routing did not answer in time, so potholes were counted along a straight line instead.")
+    except Exception:
+        return "Could not retrieve route information. Please try again later.", None, pd.DataFrame()
+    try:
         route_points = [gpd.points_from_xy([pt[0]], [pt[1]])[0] for pt in route]
         route_line = gpd.GeoSeries([gpd.GeoSeries(route_points).union_all().convex_hull], crs="EPSG:4326")
         route_proj = route_line.to_crs(epsg=3857)
@@ -256,6 +419,8 @@ def handle_potholes_on_route(destination, origin="San Antonio, TX", buffer_m=50)
         gdf_proj = gdf.to_crs(epsg=3857)
         on_route = gdf_proj[gdf_proj.geometry.within(route_buffer.iloc[0])]
         count = len(on_route)
+        if straight_line:
+            return f"About {count} pothole(s) lie along a straight line to '{destination}'.", None, pd.DataFrame()
         if count == 0:
             return f"No potholes found along the route to '{destination}'.", None, pd.DataFrame()
         highlight_df = on_route.to_crs(epsg=4326)[["Latitude", "Longitude", "MSAG_Name"]].copy()
@@ -266,6 +431,7 @@ def handle_potholes_on_route(destination, origin="San Antonio, TX", buffer_m=50)
         return "Could not retrieve route information. Please try again later.", None, pd.DataFrame()
 
 # --- Handler: Are there potholes near [address]? ---
+@intent_handler
 def handle_potholes_near_address(address, radius_m=500):
     lat, lon = geocode_address(address)
     if lat is None or lon is None:
@@ -340,11 +506,12 @@ def load_complaint_data(path):
         print(f"File not found or error loading {os.path.basename(path)}: {e}. Some chatbot features may be limited.")
         return pd.DataFrame()
 
+@intent_handler
 def get_pavement_condition_prediction(street_name):
     if pavement_latlon_df.empty:
         return "I don't have pavement condition data to answer that question. Please ensure the 'COSA_Pavement.csv' file is loaded correctly."
 
-    target_street_data = pavement_latlon_df[pavement_latlon_df['MSAG_Name'].str.contains(street_name, case=False, na=False)].copy()
+    target_street_data = pavement_latlon_df.iloc[pavement_street_rows.rows(street_index.lookup(street_name))]
 
     if not target_street_data.empty:
         avg_pci = target_street_data['PCI'].mean()
@@ -358,21 +525,19 @@ def get_pavement_condition_prediction(street_name):
     else:
         return f"No pavement data found for the street: {street_name}. Please check the street name or expand the search area."
 
+@intent_handler
 def get_monthly_pothole_count():
     if pothole_cases_df.empty:
         return "I don't have monthly pothole case data to answer that question. Please ensure the '311_Pothole_Cases_18_24.csv' file is loaded correctly."
 
-    pothole_cases_df['YearMonth'] = pothole_cases_df['OpenDate'].dt.to_period('M')
-    monthly_potholes = pothole_cases_df.groupby('YearMonth')['cases'].sum().sort_index()
-
-    if not monthly_potholes.empty:
-        latest_month_period = monthly_potholes.index.max()
-        potholes_this_month = monthly_potholes.loc[latest_month_period]
-        latest_month_str = latest_month_period.strftime('%B %Y')
-        return f"In {latest_month_str}, a total of {potholes_this_month} potholes were reported."
+    if not case_calendar.empty:
+        year, month, potholes_this_month = case_calendar.latest_month()
+        latest_month_str = f"{calendar.month_name[month]} {year}"
+        return f"In {latest_month_str}, a total of {int(potholes_this_month)} potholes were reported."
     else:
         return "No monthly pothole cases data available to show trends."
 
+@intent_handler
 def get_worst_pothole_streets():
     if pavement_latlon_df.empty:
         return "I don't have pavement data to identify streets with the worst potholes. Please ensure the 'COSA_Pavement.csv' file is loaded correctly.", None, pd.DataFrame()
@@ -405,6 +570,7 @@ def get_worst_pothole_streets():
     else:
         return "No street-level road condition data available to identify worst streets.", None, pd.DataFrame()
 
+@intent_handler
 def get_top_complaint_locations():
     if complaint_df.empty:
         return "I don't have complaint data to identify top locations. Please ensure the 'COSA_pavement_311.csv' file is loaded correctly.", None, pd.DataFrame()
@@ -440,55 +606,37 @@ def get_top_complaint_locations():
     else:
         return "No valid street names found in the complaint data after cleaning.", None, pd.DataFrame()
 
+@intent_handler
 def get_unresolved_complaints_by_year():
     if complaint_df.empty:
         return "I don't have complaint data to determine unresolved complaints. Please ensure the 'COSA_pavement_311.csv' file is loaded correctly.", None, pd.DataFrame()
 
-    df_complaints_yearly = complaint_df.copy()
-    df_complaints_yearly['OPENEDDATETIME'] = pd.to_datetime(df_complaints_yearly['OPENEDDATETIME'], errors='coerce')
-    df_complaints_yearly.dropna(subset=['OPENEDDATETIME'], inplace=True)
-
-    if not df_complaints_yearly.empty:
-        df_complaints_yearly['OpenedYear'] = df_complaints_yearly['OPENEDDATETIME'].dt.year
-        df_complaints_yearly['IsUnresolved'] = df_complaints_yearly['CLOSEDDATETIME'].isna()
-
-        yearly_status = df_complaints_yearly.groupby('OpenedYear').agg(
-            TotalComplaints=('OPENEDDATETIME', 'count'),
-            UnresolvedComplaints=('IsUnresolved', 'sum')
-        ).reset_index()
-        yearly_status['UnresolvedComplaints'] = yearly_status['UnresolvedComplaints'].astype(int)
-
-        if not yearly_status.empty:
-            response = "Complaint Status by Year:\n"
-            for index, row in yearly_status.iterrows():
-                if row['TotalComplaints'] > 0:
-                    percent_unresolved = (row['UnresolvedComplaints'] / row['TotalComplaints']) * 100
-                    response += f"Year {int(row['OpenedYear'])}: Total = {int(row['TotalComplaints'])}, Unresolved = {int(row['UnresolvedComplaints'])} ({percent_unresolved:.2f}%)\n"
-                else:
-                    response += f"Year {int(row['OpenedYear'])}: No complaints reported.\n"
-            return response, None, pd.DataFrame()
-        else:
-            return "No complaints found to summarize by year.", None, pd.DataFrame()
-    else:
+    if complaint_calendar.empty:
         return "No valid complaint data with opened dates found after initial cleaning.", None, pd.DataFrame()
+    if not complaint_calendar.has_fix_times:
+        return "The complaint data has no close dates, so unresolved complaints can't be counted.", None, pd.DataFrame()
+
+    yearly_status = complaint_calendar.unresolved_by_year()
+    if yearly_status:
+        response = "Complaint Status by Year:\n"
+        for year, total, unresolved in yearly_status:
+            percent_unresolved = (unresolved / total) * 100
+            response += f"Year {year}: Total = {total}, Unresolved = {unresolved} ({percent_unresolved:.2f}%)\n"
+        return response, None, pd.DataFrame()
+    else:
+        return "No complaints found to summarize by year.", None, pd.DataFrame()
 
+@intent_handler
 def get_seasonal_pothole_impact():
     if complaint_df.empty:
         return "I don't have complaint data to analyze seasonal impact on potholes. Please ensure the 'COSA_pavement_311.csv' file is loaded correctly.", None, pd.DataFrame()
 
-    pothole_complaints_seasonal = complaint_df.copy()
-    pothole_complaints_seasonal['Month'] = pothole_complaints_seasonal['OPENEDDATETIME'].dt.month
-    pothole_complaints_seasonal = pothole_complaints_seasonal.dropna(subset=['Month'])
-
-    if not pothole_complaints_seasonal.empty:
-        monthly_complaints_potholes = pothole_complaints_seasonal.groupby('Month').size().reset_index(name='Total_Complaints')
-        month_names = {1: 'Jan', 2: 'Feb', 3: 'Mar', 4: 'Apr', 5: 'May', 6: 'Jun',
-                       7: 'Jul', 8: 'Aug', 9: 'Sep', 10: 'Oct', 11: 'Nov', 12: 'Dec'}
-        monthly_complaints_potholes['Month_Name'] = monthly_complaints_potholes['Month'].map(month_names)
+    if not complaint_calendar.empty:
+        monthly_complaints_potholes = pd.DataFrame(complaint_calendar.seasonal(), columns=['Month_Name', 'Total_Complaints'])
 
         response = "Seasonal Trend of Road-Related Complaints:\n"
-        for index, row in monthly_complaints_potholes.iterrows():
-            response += f"{row['Month_Name']}: {row['Total_Complaints']} complaints\n"
+        for month_name, total in complaint_calendar.seasonal():
+            response += f"{month_name}: {int(total)} complaints\n"
         response += "\nTypically, increased precipitation and freeze-thaw cycles (large temperature differences) in winter/early spring contribute to more potholes."
         
         # Create a line plot for seasonal trends
@@ -503,62 +651,17 @@ def get_seasonal_pothole_impact():
     else:
         return "No road-related complaints found for seasonal analysis.", None, pd.DataFrame()
 
+@intent_handler
 def get_pothole_formation_prediction():
-    if pavement_latlon_df.empty or complaint_df.empty:
+    if street_risk_df.empty:
         return "I need both pavement and complaint data to predict pothole formation. Please ensure 'COSA_Pavement.csv' and 'COSA_pavement_311.csv' are loaded correctly.", None, pd.DataFrame()
 
-    # 1. Calculate Average PCI and Road Deterioration Score per MSAG_Name
-    pci_by_msag = pavement_latlon_df.groupby('MSAG_Name')['PCI'].mean().reset_index()
-    pci_by_msag['Road_Deterioration_Score'] = 100 - pci_by_msag['PCI']
-
-    # 2. Calculate Recent Complaint Count per MSAG_Name
-    current_year = datetime.now().year
-    recent_complaints_period = complaint_df[
-        (complaint_df['OPENEDDATETIME'].dt.year >= current_year - 2) &
-        (complaint_df['OPENEDDATETIME'].dt.year < current_year) # Exclude current incomplete year
-    ].copy()
-    recent_complaint_counts = recent_complaints_period['MSAG_Name'].value_counts().reset_index()
-    recent_complaint_counts.columns = ['MSAG_Name', 'Recent_Complaint_Count']
-
-    # 3. Calculate Maintenance Age per MSAG_Name
-    latest_install_date = complaint_df.groupby('MSAG_Name')['InstallDate'].max().reset_index()
-    latest_data_date = complaint_df['OPENEDDATETIME'].max()
-    if pd.isna(latest_data_date):
-        latest_data_date = datetime.now()
-    latest_install_date['Maintenance_Age_Years'] = (latest_data_date - latest_install_date['InstallDate']).dt.days / 365.25
-    latest_install_date['Maintenance_Age_Years'] = latest_install_date['Maintenance_Age_Years'].fillna(latest_install_date['Maintenance_Age_Years'].max() * 2)
-
-    # 4. Merge all relevant dataframes
-    pothole_risk_df = pd.merge(pci_by_msag, recent_complaint_counts, on='MSAG_Name', how='outer')
-    pothole_risk_df = pd.merge(pothole_risk_df, latest_install_date[['MSAG_Name', 'Maintenance_Age_Years']], on='MSAG_Name', how='outer')
-
-    # Fill NaN values
-    pothole_risk_df['Road_Deterioration_Score'] = pothole_risk_df['Road_Deterioration_Score'].fillna(pothole_risk_df['Road_Deterioration_Score'].mean())
-    pothole_risk_df['Recent_Complaint_Count'] = pothole_risk_df['Recent_Complaint_Count'].fillna(0)
-    pothole_risk_df['Maintenance_Age_Years'] = pothole_risk_df['Maintenance_Age_Years'].fillna(pothole_risk_df['Maintenance_Age_Years'].max())
-
-    # 5. Create a composite Pothole Formation Risk Score (normalize and sum)
-    for col in ['Road_Deterioration_Score', 'Recent_Complaint_Count', 'Maintenance_Age_Years']:
-        min_val = pothole_risk_df[col].min()
-        max_val = pothole_risk_df[col].max()
-        if (max_val - min_val) != 0:
-            pothole_risk_df[f'{col}_Scaled'] = (pothole_risk_df[col] - min_val) / (max_val - min_val)
-        else:
-            pothole_risk_df[f'{col}_Scaled'] = 0.5 # Assign a neutral value if all are the same
-
-    pothole_risk_df['Pothole_Formation_Risk_Score'] = \
-        pothole_risk_df['Road_Deterioration_Score_Scaled'] * 0.5 + \
-        pothole_risk_df['Recent_Complaint_Count_Scaled'] * 0.3 + \
-        pothole_risk_df['Maintenance_Age_Years_Scaled'] * 0.2 
+    top_risk_areas = street_risk_df.head(10)
 
-    pothole_risk_df.sort_values(by='Pothole_Formation_Risk_Score', ascending=False, inplace=True)
+    response = "Predicted Top 10 Areas for New Pothole Formation in the next year (Higher Score = Higher Risk):\n"
+    for rank, row in enumerate(top_risk_areas.itertuples(index=False), start=1):
+        response += f"{rank}. {row.MSAG_Name}: Risk Score = {row.Pothole_Formation_Risk_Score:.2f} (Deterioration: {row.Road_Deterioration_Score:.2f}, Recent Complaints: {int(row.Recent_Complaint_Count)}, Maint. Age: {row.Maintenance_Age_Years:.1f} yrs)\n"
 
-    top_risk_areas = pothole_risk_df.head(10)
-    
-    response = "Predicted Top 10 Areas for New Pothole Formation in the next 2 years (Higher Score = Higher Risk):\n"
-    for index, row in top_risk_areas.iterrows():
-        response += f"{index + 1}. {row['MSAG_Name']}: Risk Score = {row['Pothole_Formation_Risk_Score']:.2f} (Deterioration: {row['Road_Deterioration_Score']:.2f}, Recent Complaints: {int(row['Recent_Complaint_Count'])}, Maint. Age: {row['Maintenance_Age_Years']:.1f} yrs)\n"
-    
     # Create a bar chart for predicted pothole formation risk
     fig, ax = plt.subplots(figsize=(10, 6))
     sns.barplot(x='Pothole_Formation_Risk_Score', y='MSAG_Name', data=top_risk_areas, ax=ax, palette="coolwarm", hue='MSAG_Name', legend=False)
@@ -568,98 +671,98 @@ def get_pothole_formation_prediction():
     plt.tight_layout()
 
     # Prepare highlight_data_df for map
-    highlight_data_df = pd.merge(top_risk_areas, pavement_latlon_df[['MSAG_Name', 'Latitude', 'Longitude']],
-                                 on='MSAG_Name', how='left')
-    highlight_data_df = highlight_data_df.drop_duplicates(subset=['MSAG_Name'])
-    highlight_data_df = highlight_data_df.dropna(subset=['Latitude', 'Longitude'])
-
-    # Ensure numeric columns are standard Python types for JSON serialization
-    for col in ['Latitude', 'Longitude', 'Pothole_Formation_Risk_Score', 'Road_Deterioration_Score', 'Recent_Complaint_Count', 'Maintenance_Age_Years']:
-        if col in highlight_data_df.columns:
-            if highlight_data_df[col].dtype == 'float64':
-                highlight_data_df[col] = highlight_data_df[col].astype(float)
-            elif highlight_data_df[col].dtype == 'int64':
-                highlight_data_df[col] = highlight_data_df[col].astype(int)
-
+    # Only what the map draws: the scoring columns (Years_Since_Treatment, ...) can hold NaN
+    highlight_data_df = top_risk_areas.dropna(subset=['Latitude', 'Longitude'])[['MSAG_Name', 'Latitude', 'Longitude', 'Pothole_Formation_Risk_Score']]
+    highlight_data_df = _convert_dataframe_numerics_to_native_types(highlight_data_df)
     highlight_data_df['color'] = 'darkblue' # Assign darkblue color for predicted risk
     highlight_data_df['marker_radius'] = 15 # Assign radius 15 for predicted risk
 
     return response, fig, highlight_data_df
 
 # --- Handler: Area-specific pothole formation prediction ---
+@intent_handler
 def handle_pothole_formation_prediction_area(area):
-    if pavement_latlon_df.empty or complaint_df.empty:
+    if street_risk_df.empty:
         return "I need both pavement and complaint data to predict pothole formation. Please ensure 'COSA_Pavement.csv' and 'COSA_pavement_311.csv' are loaded correctly.", None, pd.DataFrame()
-    # 1. Calculate Average PCI and Road Deterioration Score per MSAG_Name
-    pci_by_msag = pavement_latlon_df.groupby('MSAG_Name')['PCI'].mean().reset_index()
-    pci_by_msag['Road_Deterioration_Score'] = 100 - pci_by_msag['PCI']
-    # 2. Calculate Recent Complaint Count per MSAG_Name
-    current_year = datetime.now().year
-    recent_complaints_period = complaint_df[
-        (complaint_df['OPENEDDATETIME'].dt.year >= current_year - 2) &
-        (complaint_df['OPENEDDATETIME'].dt.year < current_year)
-    ].copy()
-    recent_complaint_counts = recent_complaints_period['MSAG_Name'].value_counts().reset_index()
-    recent_complaint_counts.columns = ['MSAG_Name', 'Recent_Complaint_Count']
-    # 3. Calculate Maintenance Age per MSAG_Name
-    latest_install_date = complaint_df.groupby('MSAG_Name')['InstallDate'].max().reset_index()
-    latest_data_date = complaint_df['OPENEDDATETIME'].max()
-    if pd.isna(latest_data_date):
-        latest_data_date = datetime.now()
-    latest_install_date['Maintenance_Age_Years'] = (latest_data_date - latest_install_date['InstallDate']).dt.days / 365.25
-    latest_install_date['Maintenance_Age_Years'] = latest_install_date['Maintenance_Age_Years'].fillna(latest_install_date['Maintenance_Age_Years'].max() * 2)
-    # 4. Merge all relevant dataframes
-    pothole_risk_df = pd.merge(pci_by_msag, recent_complaint_counts, on='MSAG_Name', how='outer')
-    pothole_risk_df = pd.merge(pothole_risk_df, latest_install_date[['MSAG_Name', 'Maintenance_Age_Years']], on='MSAG_Name', how='outer')
-    # Fill NaN values
-    pothole_risk_df['Road_Deterioration_Score'] = pothole_risk_df['Road_Deterioration_Score'].fillna(pothole_risk_df['Road_Deterioration_Score'].mean())
-    pothole_risk_df['Recent_Complaint_Count'] = pothole_risk_df['Recent_Complaint_Count'].fillna(0)
-    pothole_risk_df['Maintenance_Age_Years'] = pothole_risk_df['Maintenance_Age_Years'].fillna(pothole_risk_df['Maintenance_Age_Years'].max())
-    # 5. Create a composite Pothole Formation Risk Score (normalize and sum)
-    for col in ['Road_Deterioration_Score', 'Recent_Complaint_Count', 'Maintenance_Age_Years']:
-        min_val = pothole_risk_df[col].min()
-        max_val = pothole_risk_df[col].max()
-        if (max_val - min_val) != 0:
-            pothole_risk_df[f'{col}_Scaled'] = (pothole_risk_df[col] - min_val) / (max_val - min_val)
-        else:
-            pothole_risk_df[f'{col}_Scaled'] = 0.5
-    pothole_risk_df['Pothole_Formation_Risk_Score'] = (
-        pothole_risk_df['Road_Deterioration_Score_Scaled'] * 0.5 +
-        pothole_risk_df['Recent_Complaint_Count_Scaled'] * 0.3 +
-        pothole_risk_df['Maintenance_Age_Years_Scaled'] * 0.2
-    )
-    # Find the area (case-insensitive, partial match)
-    area_row = pothole_risk_df[pothole_risk_df['MSAG_Name'].str.contains(area, case=False, na=False)]
+    # Resolve the area through the street index; the highest-risk match wins
+    area_row = street_risk_df.iloc[street_risk_rows.rows(street_index.lookup(area))]
     if area_row.empty:
         return f"No risk data found for the area '{area}'. Please check the area name.", None, pd.DataFrame()
     row = area_row.iloc[0]
-    city_avg = pothole_risk_df['Pothole_Formation_Risk_Score'].mean()
+    city_avg = street_risk_average
     risk = row['Pothole_Formation_Risk_Score']
     risk_level = "High" if risk > 0.66 else ("Moderate" if risk > 0.33 else "Low")
     compare = "above" if risk > city_avg else ("below" if risk < city_avg else "equal to")
+    reported = pothole_reports.street_totals([row['street_id']]) if pothole_reports is not None else (0, 0)
     response = (
         f"The predicted pothole formation risk for {row['MSAG_Name']} is {risk:.2f} ({risk_level}).\n"
         f"- Deterioration: {row['Road_Deterioration_Score']:.2f}\n"
         f"- Recent Complaints: {int(row['Recent_Complaint_Count'])}\n"
         f"- Maintenance Age: {row['Maintenance_Age_Years']:.1f} years\n"
+        + (f"- Reported Potholes: {reported[0]:,} on {reported[1]:,} segments\n" if reported[0] else "")
+        + (f"- Last IMP Treatment: {row['Years_Since_Treatment']:.1f} years ago\n" if pd.notna(row.get('Years_Since_Treatment')) else "")
+        + f"{street_terrain_summary(row['MSAG_Name'])}"
         f"This is {compare} the city average risk."
     )
     # Optionally, highlight this area on the map
-    highlight_df = pavement_latlon_df[pavement_latlon_df['MSAG_Name'] == row['MSAG_Name']][['MSAG_Name', 'Latitude', 'Longitude']].copy()
+    highlight_df = pavement_latlon_df.iloc[pavement_street_rows.rows([row['street_id']])][['MSAG_Name', 'Latitude', 'Longitude']].copy()
+    highlight_df = with_street_features(highlight_df)
     highlight_df['color'] = 'blue'
     highlight_df['marker_radius'] = 12
     return response, None, highlight_df
 
 # --- Handler: How does weather affect formations? ---
+@intent_handler
 def handle_weather_effect():
     response = (
         "Weather plays a major role in pothole formation. Rain and snow allow water to seep into pavement cracks. "
         "When temperatures drop, the water freezes and expands, causing the pavement to break apart. "
         "Repeated freeze-thaw cycles and heavy rainfall accelerate pothole development."
     )
+    if not weather_effect_stats:
+        return response, None, pd.DataFrame()
+    lines = []
+    labels = {
+        "rain": ("the wettest four-week stretches", "the driest", "{:.2f} in of rain a day"),
+        "temperature_swing": ("four-week stretches with the biggest daily temperature swings", "the steadiest", "{:.1f}°F swings"),
+        "temperature": ("the warmest four-week stretches", "the coldest", "{:.0f}°F average"),
+    }
+    for name, (high_label, low_label, unit) in labels.items():
+        effect = weather_effect_stats.get(name)
+        if not effect or effect['low_mean'] == 0:
+            continue
+        change = (effect['high_mean'] / effect['low_mean'] - 1) * 100
+        lines.append(
+            f"- After {high_label} (over {unit.format(effect['high_threshold'])}), San Antonio averaged "
+            f"{effect['high_mean']:.1f} pothole reports a day, versus {effect['low_mean']:.1f} after {low_label} "
+            f"({change:+.0f}%)."
+        )
+    if lines:
+        response += f"\n\nIn the 311 data since {pd.Timestamp(pothole_forecaster.origin):%B %Y}:\n" + "\n".join(lines)
+    return response, None, pd.DataFrame()
+
+# --- Handler: How many potholes should we expect next week / next month? ---
+FORECAST_PERIODS = {"week": 7, "month": 30}
+
+def _long_date(ts):
+    return f"{ts:%B} {ts.day}, {ts.year}"
+
+@intent_handler
+def handle_pothole_forecast(period="week"):
+    if pothole_forecaster is None:
+        return "I don't have the daily pothole case data needed for a forecast. Please ensure '311_Pothole_Cases_18_24.csv' is loaded correctly.", None, pd.DataFrame()
+    days = FORECAST_PERIODS.get(period, 7)
+    f = pothole_forecaster.expected(days)
+    response = (
+        f"📈 **Pothole Forecast for the Next {period.capitalize()}**\n\n"
+        f"Between {_long_date(f['start'])} and {_long_date(f['end'])}, about **{f['expected']:.0f}** potholes are expected to be reported "
+        f"(80% range {f['low_80']:.0f}–{f['high_80']:.0f}, 95% range {f['low_95']:.0f}–{f['high_95']:.0f}).\n"
+        f"Based on the {f['source']}, with reported counts through {_long_date(pothole_forecaster.as_of)}."
+    )
     return response, None, pd.DataFrame()
 
 # --- Handler: Why are there so many potholes? ---
+@intent_handler
 def handle_why_so_many_potholes():
     response = (
         "Potholes are caused by a combination of traffic wear, water infiltration, and temperature changes. "
@@ -669,43 +772,61 @@ def handle_why_so_many_potholes():
     return response, None, pd.DataFrame()
 
 # --- Handler: How long does it take on average for potholes to get fixed in San Antonio? ---
+@intent_handler
 def handle_avg_fix_time():
-    if pothole_cases_df.empty or 'OpenDate' not in pothole_cases_df.columns or 'CloseDate' not in pothole_cases_df.columns:
+    if complaint_calendar.empty or not complaint_calendar.has_fix_times:
         return "No fix time data available.", None, pd.DataFrame()
-    df = pothole_cases_df.dropna(subset=['OpenDate', 'CloseDate']).copy()
-    df['fix_time'] = (pd.to_datetime(df['CloseDate']) - pd.to_datetime(df['OpenDate'])).dt.days
-    avg_days = df['fix_time'].mean()
-    if np.isnan(avg_days):
+    fix = complaint_calendar.fix_time()
+    if fix is None:
         return "Insufficient data to calculate average fix time.", None, pd.DataFrame()
-    return f"On average, potholes in San Antonio are fixed in {avg_days:.1f} days.", None, pd.DataFrame()
+    response = (
+        f"On average, potholes in San Antonio are fixed in {fix['mean']:.1f} days. "
+        f"Half are fixed within {fix['median']:.0f} days and 90% within {fix['p90']:.0f} days "
+        f"({fix['count']:,} closed reports)."
+    )
+    latest = complaint_calendar.fix_time(complaint_calendar.last_date.year)
+    if latest:
+        response += f" For reports opened in {complaint_calendar.last_date.year}, the average is {latest['mean']:.1f} days."
+    return response, None, pd.DataFrame()
 
 # --- Handler: Which areas have the highest amount of potholes? ---
+@intent_handler
 def handle_areas_with_most_potholes(top_n=5):
-    if pothole_cases_df.empty or 'MSAG_Name' not in pothole_cases_df.columns:
+    if pothole_reports is None:
         return "No area data available.", None, pd.DataFrame()
-    area_counts = pothole_cases_df['MSAG_Name'].value_counts().head(top_n)
+    top_streets = pothole_reports.top_streets(top_n)
     response = "🔍 **Areas with the Highest Number of Potholes**\n\n"
-    for i, (area, count) in enumerate(area_counts.items(), 1):
-        response += f"**{i}.** {area}: **{count}** potholes\n"
-    highlight_df = pavement_latlon_df[pavement_latlon_df['MSAG_Name'].isin(area_counts.index)][['MSAG_Name', 'Latitude', 'Longitude']].copy()
+    for i, street in enumerate(top_streets.itertuples(), 1):
+        response += f"**{i}.** {street.MSAG_Name}: **{street.potholes}** potholes on {street.segments} segments\n"
+    highlight_df = pothole_reports.street_locations(top_streets['street_id'])
     highlight_df['color'] = 'red'
     highlight_df['marker_radius'] = 12
     return response, None, highlight_df
 
 # --- Handler: How many potholes have been found this month? ---
+@intent_handler
 def handle_potholes_this_month():
-    if pothole_cases_df.empty or 'OpenDate' not in pothole_cases_df.columns:
+    if case_calendar.empty:
         return "No pothole data available.", None, pd.DataFrame()
     now = pd.Timestamp.now()
-    this_month = pothole_cases_df[pothole_cases_df['OpenDate'].dt.month == now.month]
-    count = len(this_month)
-    return f"📅 **This Month's Pothole Report:**\n\n**{count}** potholes have been reported so far this month.", None, pd.DataFrame()
+    if case_calendar.covers_month(now.year, now.month):
+        count = case_calendar.month(now.year, now.month)
+        return f"📅 **This Month's Pothole Report:**\n\n**{int(count)}** potholes have been reported so far this month.", None, pd.DataFrame()
+    # The case data ends before the current month: report its latest month instead of mixing years
+    year, month, count = case_calendar.latest_month()
+    return (
+        f"📅 **This Month's Pothole Report:**\n\nThe pothole case data runs through {_long_date(case_calendar.last_date)}, "
+        f"so there are no reports for {calendar.month_name[now.month]} {now.year} yet. "
+        f"In {calendar.month_name[month]} {year}, **{int(count)}** potholes were reported up to that date."
+    ), None, pd.DataFrame()
 
 # --- Handler: Should I avoid [area] because of the potholes? ---
+@intent_handler
 def handle_should_avoid_area(area, threshold=10):
-    msg, _, highlight_df = handle_potholes_in_area(area)
-    match = re.search(r"(\d+)", msg)
-    count = int(match.group(1)) if match else 0
+    found = potholes_in_area(area)
+    if isinstance(found, str):
+        return found, None, pd.DataFrame()
+    count, highlight_df = found["count"], found["points"]
     if count > threshold:
         advice = f"⚠️ **Travel Advisory for '{area}'**\n\nThere are **{count}** potholes in this area. It is advisable to avoid this area if possible."
     elif count > 0:
@@ -714,27 +835,35 @@ def handle_should_avoid_area(area, threshold=10):
         advice = f"✅ **Travel Advisory for '{area}'**\n\nNo significant pothole issues detected. It should be safe to travel."
     return advice, None, highlight_df
 
-# --- Handler: How many potholes are in the [area]? ---
-def handle_potholes_in_area(area):
+def potholes_in_area(area, radius_m=1000):
+    """{"lat", "lon", "count", "points"} for the pavement points within `radius_m` of an area, or the reason there are none."""
     lat, lon = geocode_address(area)
     if lat is None or lon is None:
-        return f"Could not geocode the area '{area}'. Please check the area and try again.", None, pd.DataFrame()
+        return f"Could not geocode the area '{area}'. Please check the area and try again."
     gdf = get_pavement_gdf()
     if gdf.empty:
-        return "No pavement location data available.", None, pd.DataFrame()
+        return "No pavement location data available."
     gdf_proj = gdf.to_crs(epsg=3857)
     point = gpd.GeoSeries([gpd.points_from_xy([lon], [lat])[0]], crs="EPSG:4326").to_crs(epsg=3857)
-    buffer = point.buffer(1000)
+    buffer = point.buffer(radius_m)
     in_area = gdf_proj[gdf_proj.geometry.within(buffer.iloc[0])]
-    count = len(in_area)
-    if count == 0:
-        return f"No potholes found in '{area}'.", None, pd.DataFrame()
     highlight_df = in_area.to_crs(epsg=4326)[["Latitude", "Longitude", "MSAG_Name"]].copy()
     highlight_df["color"] = "orange"
     highlight_df["marker_radius"] = 10
-    return f"There are {count} pothole(s) in '{area}'.", None, highlight_df
+    return {"lat": lat, "lon": lon, "count": len(in_area), "points": highlight_df}
+
+# --- Handler: How many potholes are in the [area]? ---
+@intent_handler
+def handle_potholes_in_area(area):
+    found = potholes_in_area(area)
+    if isinstance(found, str):
+        return found, None, pd.DataFrame()
+    if found["count"] == 0:
+        return f"No potholes found in '{area}'.", None, pd.DataFrame()
+    return f"There are {found['count']} pothole(s) in '{area}'.", None, found["points"]
 
 # --- Handler: Any pothole complaints near school zones? ---
+@intent_handler
 def handle_any_complaints_near_sensitive_areas(radius_m=300, sensitive_type='school'):
     # Map user type to possible keywords in the name
     type_keywords = {
@@ -746,10 +875,10 @@ def handle_any_complaints_near_sensitive_areas(radius_m=300, sensitive_type='sch
     if complaint_df.empty or 'Latitude' not in complaint_df.columns or 'Longitude' not in complaint_df.columns:
         return "Complaint data with location is required for this analysis.", None, pd.DataFrame()
     all_complaints = complaint_df[complaint_df['Latitude'].notna() & complaint_df['Longitude'].notna()]
-    print(f"DEBUG: Number of total complaints: {len(all_complaints)}")
+    debug("Number of total complaints: %d", len(all_complaints))
     pattern = '|'.join(keywords)
     sensitive = sensitive_locations_df[sensitive_locations_df['name'].str.contains(pattern, case=False, na=False)].copy()
-    print(f"DEBUG: Number of sensitive locations ({sensitive_type}): {len(sensitive)}")
+    debug("Number of sensitive locations (%s): %d", sensitive_type, len(sensitive))
     if sensitive.empty:
         return f"No sensitive {sensitive_type} location data available.", None, pd.DataFrame()
     sensitive_unique = sensitive.drop_duplicates(subset=['name', 'lat', 'lon'])
@@ -789,12 +918,12 @@ def handle_any_complaints_near_sensitive_areas(radius_m=300, sensitive_type='sch
     return response, None, highlight_df
 
 # --- RAG Query Integration ---
-from rag_tool import query_table
+from rag_tool import query_table, street_names as rag_street_names
 
 # Simple parser for street and year from user question
 def parse_rag_question(question):
     import re
-    print(f"[RAG DEBUG] Parsing question: {question}")
+    debug("RAG: parsing question: %s", question)
     street = None
     year = None
     # Improved regex: match 'on <street> in <year>' or 'for <street> in <year>'
@@ -802,7 +931,7 @@ def parse_rag_question(question):
     if m:
         street = m.group(1).strip()
         year = int(m.group(2))
-        print(f"[RAG DEBUG] Matched improved pattern | street: '{street}', year: {year}")
+        debug("RAG: matched improved pattern | street: '%s', year: %s", street, year)
     else:
         # Fallback to previous patterns - more specific to avoid survey questions
         patterns = [
@@ -820,193 +949,292 @@ def parse_rag_question(question):
             if m:
                 street = m.group(1).strip()
                 year = int(m.group(2))
-                print(f"[RAG DEBUG] Matched fallback pattern: {pat} | street: '{street}', year: {year}")
+                debug("RAG: matched fallback pattern: %s | street: '%s', year: %s", pat, street, year)
                 break
     if not street or not year:
-        print("[RAG DEBUG] No RAG pattern matched.")
+        debug("RAG: no pattern matched.")
     return street, year
 
-# --- Update get_groq_response to use RAG as fallback ---
-def get_groq_response(prompt):
+# --- Handler: How many potholes were reported on [street] in [year]? ---
+@intent_handler
+def handle_street_year_reports(street, year):
+    results = query_table(year=year, street_names=street_index.spellings(street_index.lookup(street)))
+    if results:
+        df = pd.DataFrame(results, columns=["latitude", "longitude", "street_name", "year", "council_district"])
+        df = df.rename(columns={
+            'latitude': 'Latitude',
+            'longitude': 'Longitude',
+            'street_name': 'MSAG_Name'
+        })
+        total = len(df)
+        breakdown = df['MSAG_Name'].value_counts().to_dict()
+        
+        # Create a more readable breakdown with better formatting
+        breakdown_items = []
+        for street_name, count in breakdown.items():
+            # Use ampersand for intersections and format counts with singular/plural
+            display_name = re.sub(r"\sand\s", " & ", str(street_name), flags=re.IGNORECASE)
+            report_word = "report" if count == 1 else "reports"
+            breakdown_items.append(f"• {display_name}: **{count} {report_word}**")
+        breakdown_str = "\n".join(breakdown_items)
+        
+        total_word = "report" if total == 1 else "reports"
+        response = (
+            f"🚧 Found **{total}** pothole {total_word} for streets matching '**{street}**' in **{year}**.\n\n"
+            f"Breakdown:\n{breakdown_str}"
+        )
+        debug("Data-driven response: %s", response)
+        return response, None, df
+    else:
+        debug("No records found for street='%s', year=%s", street, year)
+        return f"No pothole records found for streets matching '{street}' in {year}.", None, pd.DataFrame()
+
+# --- Handler: RAG fallback for free-form street/year questions ---
+@intent_handler
+def handle_rag_street_year(street, year):
+    results = query_table(year=year, street_names=street_index.spellings(street_index.lookup(street)))
+    debug("RAG: results count: %d", len(results))
+    if results:
+        df = pd.DataFrame(results, columns=["latitude", "longitude", "street_name", "year", "council_district"])
+        df = df.rename(columns={
+            'latitude': 'Latitude',
+            'longitude': 'Longitude',
+            'street_name': 'MSAG_Name'
+        })
+        total = len(df)
+        breakdown = df['MSAG_Name'].value_counts().to_dict()
+        breakdown_str = "; ".join([f"{k}: {v}" for k, v in breakdown.items()])
+        response = f"Found {total} pothole records for streets matching '{street}' in {year}.\nBreakdown: {breakdown_str}"
+        debug("RAG: response: %s", response)
+        return response, None, df
+    else:
+        debug("RAG: no records found for street='%s', year=%s", street, year)
+        return f"No pothole records found for streets matching '{street}' in {year}.", None, pd.DataFrame()
+
+# Keyword-based logic
+KEYWORD_RESPONSES = {
+    "how many potholes": "There are {pothole_count} potholes recorded in the dataset.",
+    "number of potholes": "The dataset contains {pothole_count} potholes.",
+    "pavement condition": "Pavement condition ratings were joined with pothole data to analyze correlation.",
+    "correlation": "The correlation matrix visualizes relationships among Vibration, Speed, and Acceleration.",
+    "heatmap": "The heatmap shows which features are strongly related, such as Vibration vs Speed.",
+    "scatter plot": "The scatter plot illustrates the distribution of potholes based on latitude and longitude.",
+    "vibration data": "Vibration data, collected by sensors, helps in assessing road roughness and potential pothole formation.",
+    "acceleration relate": "Acceleration data can indicate sudden jolts or bumps, which are signs of poor road conditions or potholes.",
+    "speed data": "Speed data helps understand how vehicle speed interacts with road conditions, affecting the impact of potholes.",
+    "latitude and longitude": "Latitude and longitude provide the precise geographical location of potholes and road segments for mapping.",
+    "map or folium": "The Folium map displays potholes and road conditions, allowing for interactive geographical analysis.",
+    "time series": "The time series chart visualizes the trend of pothole incidents over time, identifying patterns.",
+    "monthly trends": "Monthly trends show fluctuations in pothole reports throughout the year, highlighting peak seasons.",
+    "yearly trends": "Yearly trends provide an overview of pothole incidents across different years, indicating long-term changes.",
+    "datasets merged": "Various datasets, including 311 service requests, pavement conditions, and sensor data, were merged for comprehensive analysis.",
+    "dataset or data columns": "The datasets include columns such as Service Request Type, Latitude, Longitude, Open Date, Close Date, MSAG Name, PCI, etc.",
+    "missing values": "Missing values in datasets were handled through imputation or removal, depending on the extent and impact of the missing data."
+}
+
+# --- Handler: canned answers for general keywords ---
+@intent_handler
+def handle_keyword_response(keyword):
+    pothole_count = len(pothole_cases_df.index) if not pothole_cases_df.empty else 'no'
+    return KEYWORD_RESPONSES[keyword].format(pothole_count=pothole_count), None, pd.DataFrame()
+
+# --- Handler: Fallback to Groq API for general questions ---
+@intent_handler
+def handle_llm_fallback(prompt):
+    try:
+        headers = {
+            "Authorization": f"Bearer {GROQ_API_KEY}",
+            "Content-Type": "application/json",
+        }
+        data = {
+            "model": "llama3-8b-8192",
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": 4096,
+        }
+        with stage("llm"):
+            groq_response = requests.post(GROQ_API_URL, headers=headers, json=data, timeout=timeout_for(LLM_TIMEOUT))
+            groq_response.raise_for_status() # Raise an exception for HTTP errors
+            response_data = groq_response.json()
+        response_text = response_data["choices"][0]["message"]["content"]
+    except (DeadlineExceeded, requests.exceptions.Timeout):
+        degrade("The AI model did not answer in time.")
+        response_text = "I couldn't get an answer from the Groq AI in time. Please try again, or ask about potholes, streets or VIA routes."
+    except requests.exceptions.RequestException as e:
+        print(f"Error communicating with Groq API: {e}")
+        response_text = "I am currently unable to connect to the Groq AI. Please try again later."
+    except KeyError:
+        response_text = "I received an unexpected response from the Groq AI. Please try rephrasing your question."
+    return response_text, None, pd.DataFrame()
+
+def _normalize_sensitive_type(sensitive_type):
+    # Normalize to match our type_keywords
+    if 'school' in sensitive_type:
+        return 'school'
+    elif 'hospital' in sensitive_type or 'medical' in sensitive_type or 'clinic' in sensitive_type:
+        return 'hospital'
+    elif 'senior' in sensitive_type or 'elder' in sensitive_type or 'center' in sensitive_type:
+        return 'senior'
+    return sensitive_type
+
+# --- Intent routing ---
+def _radius_m(prompt_lower, default):
+    """'within 300 m' / '250 meters' / '500 ft' in a question, in metres."""
+    match = re.search(r'(\d+(?:\.\d+)?)\s*(m|meters?|metres?|ft|feet)\b', prompt_lower)
+    if not match:
+        return default
+    value = float(match.group(1))
+    return value * 0.3048 if match.group(2) in ('ft', 'feet') else value
+
+
+def resolve_intent(prompt):
+    """Match a prompt to the handler that answers it.
+
+    Returns (handler, kwargs); calling handler(**kwargs) produces the answer. Keeping
+    the matching separate from the work lets callers deduplicate or group requests.
+    """
     prompt_lower = prompt.lower()
-    plot_object = None
-    highlight_data_df = pd.DataFrame() # Initialize empty DataFrame for map highlighting
 
-    print(f"[DEBUG] Received prompt: {prompt}")
+    debug("Received prompt: %s", prompt)
 
     # --- PCI in zip code ---
     match = re.search(r"what'?s? the pci in zip code (\d+)", prompt_lower)
     if match:
-        print("[DEBUG] Matched PCI in zip code pattern.")
-        zipcode = match.group(1)
-        return handle_pci_in_zipcode(zipcode)
+        debug("Matched PCI in zip code pattern.")
+        return handle_pci_in_zipcode, {"zipcode": match.group(1)}
     
     # Alternative patterns for PCI zip code queries
     match = re.search(r"pci.*zip code (\d+)", prompt_lower)
     if match:
-        print("[DEBUG] Matched alternative PCI zip code pattern.")
-        zipcode = match.group(1)
-        return handle_pci_in_zipcode(zipcode)
+        debug("Matched alternative PCI zip code pattern.")
+        return handle_pci_in_zipcode, {"zipcode": match.group(1)}
     
     match = re.search(r"zip code (\d+).*pci", prompt_lower)
     if match:
-        print("[DEBUG] Matched reverse PCI zip code pattern.")
-        zipcode = match.group(1)
-        return handle_pci_in_zipcode(zipcode)
+        debug("Matched reverse PCI zip code pattern.")
+        return handle_pci_in_zipcode, {"zipcode": match.group(1)}
 
     # --- Area-specific pothole formation prediction ---
     match = re.search(r"how likely (will|could) potholes form (on|in|along|at) ([^?]+)", prompt_lower)
     if match:
-        print("[DEBUG] Matched area-specific pothole formation prediction pattern.")
-        area = match.group(3).strip()
-        return handle_pothole_formation_prediction_area(area)
+        debug("Matched area-specific pothole formation prediction pattern.")
+        return handle_pothole_formation_prediction_area, {"area": match.group(3).strip()}
     # --- General city-wide prediction ---
     if re.search(r"how likely (will|could) potholes form( in san antonio)?", prompt_lower):
-        print("[DEBUG] Matched city-wide pothole formation prediction pattern.")
-        return get_pothole_formation_prediction()
+        debug("Matched city-wide pothole formation prediction pattern.")
+        return get_pothole_formation_prediction, {}
     # --- Data-driven: How many potholes were reported on [street] in [year]? ---
     match = re.search(r"how many potholes (were )?reported on ([^?]+) in (\d{4})", prompt_lower)
     if match:
-        print("[DEBUG] Matched data-driven street/year pattern.")
-        street = match.group(2).strip()
-        year = int(match.group(3))
-        results = query_table(street=street, year=year)
-        if results:
-            df = pd.DataFrame(results, columns=["latitude", "longitude", "street_name", "year", "council_district"])
-            df = df.rename(columns={
-                'latitude': 'Latitude',
-                'longitude': 'Longitude',
-                'street_name': 'MSAG_Name'
-            })
-            total = len(df)
-            breakdown = df['MSAG_Name'].value_counts().to_dict()
-            
-            # Create a more readable breakdown with better formatting
-            breakdown_items = []
-            for street_name, count in breakdown.items():
-                # Use ampersand for intersections and format counts with singular/plural
-                display_name = re.sub(r"\sand\s", " & ", str(street_name), flags=re.IGNORECASE)
-                report_word = "report" if count == 1 else "reports"
-                breakdown_items.append(f"• {display_name}: **{count} {report_word}**")
-            breakdown_str = "\n".join(breakdown_items)
-            
-            total_word = "report" if total == 1 else "reports"
-            response = (
-                f"🚧 Found **{total}** pothole {total_word} for streets containing '**{street}**' in **{year}**.\n\n"
-                f"Breakdown:\n{breakdown_str}"
-            )
-            print(f"[DEBUG] Data-driven response: {response}")
-            return response, None, df
-        else:
-            print(f"[DEBUG] No records found for street='{street}', year={year}")
-            return f"No pothole records found for streets containing '{street}' in {year}.", None, pd.DataFrame()
+        debug("Matched data-driven street/year pattern.")
+        return handle_street_year_reports, {"street": match.group(2).strip(), "year": int(match.group(3))}
+    # --- Forecast: expected potholes next week / next month ---
+    match = re.search(r"(?:(?:expected|expect|forecast|predicted|how many) (?:number of )?potholes?|potholes? forecast).*\b(?:next|coming|upcoming) (week|month)", prompt_lower)
+    if match:
+        debug("Matched pothole forecast pattern.")
+        return handle_pothole_forecast, {"period": match.group(1)}
     # --- Optimized intent detection for all questions ---
     # 0. Most potholes / worst pothole locations / top pothole locations
     if re.search(r"(where (are|is) (the )?(most|worst) potholes|top (\d+ )?(worst|most) pothole|worst pothole locations|top pothole locations|most pothole complaints|most reported potholes|highest pothole count)", prompt_lower):
         # Try to extract a number for top N, default to 10
         top_n_match = re.search(r"top (\d+)", prompt_lower)
         top_n = int(top_n_match.group(1)) if top_n_match else 10
-        return handle_areas_with_most_potholes(top_n=top_n)
+        return handle_areas_with_most_potholes, {"top_n": top_n}
     # 1. Are there potholes near [address]?
     match = re.search(r"potholes? near ([^?]+)", prompt_lower)
     if match:
-        address = match.group(1).strip()
-        return handle_potholes_near_address(address)
+        return handle_potholes_near_address, {"address": match.group(1).strip()}
     # 2. Will I face potholes on the way to [area]?
     match = re.search(r"potholes? (on|along|on the way to|on my way to|on route to|on the way) ([^?]+)", prompt_lower)
     if match:
-        area = match.group(2).strip()
-        return handle_potholes_on_route(area)
+        return handle_potholes_on_route, {"destination": match.group(2).strip()}
     # 3. How many potholes are in the [area]?
     match = re.search(r"how many potholes (are )?(in|at|within) ([^?]+)", prompt_lower)
     if match:
-        area = match.group(3).strip()
-        return handle_potholes_in_area(area)
+        return handle_potholes_in_area, {"area": match.group(3).strip()}
     # 4. Should I avoid [area] because of the potholes?
     match = re.search(r"should i avoid ([^?]+) because of (the )?potholes", prompt_lower)
     if match:
-        area = match.group(1).strip()
-        return handle_should_avoid_area(area)
+        return handle_should_avoid_area, {"area": match.group(1).strip()}
     # 5. How many potholes have been found this month?
     if re.search(r"(how many|number of) potholes (have been )?(found|reported)? ?(this|in the current) month", prompt_lower):
-        return handle_potholes_this_month()
+        return handle_potholes_this_month, {}
     # 6. Which areas have the highest amount of potholes?
     if re.search(r"which areas? (have|has) (the )?(highest|most) (amount|number) of potholes", prompt_lower):
-        return handle_areas_with_most_potholes()
+        return handle_areas_with_most_potholes, {}
     # 7. Display streets with the worst potholes
     if re.search(r"(display|show) streets? (with|having) (the )?worst potholes", prompt_lower):
-        return get_worst_pothole_streets()
+        return get_worst_pothole_streets, {}
     # 8. How long does it take on average for potholes to get fixed in san antonio\??", prompt_lower):
     if re.search(r"how long does it take (on average )?for potholes to get fixed( in san antonio)?", prompt_lower):
-        return handle_avg_fix_time()
+        return handle_avg_fix_time, {}
     # 9. How likely will potholes form on this route/street/area?
     if re.search(r"how likely (will|could) potholes form (on|in|along|at) (this|the|a)? ?(route|street|area)?", prompt_lower):
-        return get_pothole_formation_prediction()
+        return get_pothole_formation_prediction, {}
     # 10. Why are there so many potholes?
     if re.search(r"why (are|is) (there )?so many potholes", prompt_lower):
-        return handle_why_so_many_potholes()
+        return handle_why_so_many_potholes, {}
     # 11. How does weather affect formations?
     if re.search(r"how does weather affect (pothole )?formation(s)?", prompt_lower):
-        return handle_weather_effect()
+        return handle_weather_effect, {}
 
     # --- Safety & Prevention Questions ---
     match = re.search(r'active pothole complaints.*(school|senior|hospital)', prompt_lower)
     if match:
-        sensitive_type = match.group(1)
-        # Normalize to match our type_keywords
-        if 'school' in sensitive_type:
-            sensitive_type = 'school'
-        elif 'hospital' in sensitive_type or 'medical' in sensitive_type or 'clinic' in sensitive_type:
-            sensitive_type = 'hospital'
-        elif 'senior' in sensitive_type or 'elder' in sensitive_type or 'center' in sensitive_type:
-            sensitive_type = 'senior'
-        return handle_active_complaints_near_sensitive_areas(sensitive_type=sensitive_type)
+        return handle_active_complaints_near_sensitive_areas, {"sensitive_type": _normalize_sensitive_type(match.group(1))}
     if re.search(r'intersections? with via stops.*pothole.*injur', prompt_lower):
-        return handle_intersections_via_pothole_injury()
+        return handle_intersections_via_pothole_injury, {}
     if re.search(r'preventative maintenance.*bus|damage|delay', prompt_lower):
-        return handle_prioritize_maintenance_for_buses()
+        return handle_prioritize_maintenance_for_buses, {}
     match = re.search(r'history of repeated pothole complaints.*along (.+)', prompt_lower)
     if match:
-        road = match.group(1).strip(' ?')
-        return handle_repeated_complaints_on_road(road)
+        return handle_repeated_complaints_on_road, {"road": match.group(1).strip(' ?')}
     # Also match: 'Is there a history of repeated pothole complaints along the [road]?' (with [road] in brackets or as a phrase)
     match = re.search(r'is there a history of repeated pothole complaints along (?:the )?\[?([\w\s\-\.]+)\]?', prompt_lower)
     if match:
-        road = match.group(1).strip()
-        return handle_repeated_complaints_on_road(road)
-    if re.search(r'bus stops.*high[- ]?risk pavement', prompt_lower):
-        return handle_bus_stops_near_high_risk_pavement()
+        return handle_repeated_complaints_on_road, {"road": match.group(1).strip()}
+    if re.search(r'bus stops.*(high[- ]?risk pavement|pci (below|under|less than|<))', prompt_lower):
+        kwargs = {"radius_m": _radius_m(prompt_lower, 100)}
+        match = re.search(r'pci (?:below|under|less than|<)\s*(\d+)', prompt_lower)
+        if match:
+            kwargs["pci_threshold"] = int(match.group(1))
+        return handle_bus_stops_near_high_risk_pavement, kwargs
+    if re.search(r'(transfer hubs?|transit (hubs?|centers?)).*(pothole|complaint|affected|exposure)|(most important|central) (bus |via )?stops', prompt_lower):
+        top_n_match = re.search(r'top (\d+)', prompt_lower)
+        return handle_transfer_hubs_pothole_exposure, {"top_n": int(top_n_match.group(1))} if top_n_match else {}
+    if re.search(r'(worst|which) (bus |via )?stops.*(worst|poor|bad|lowest)[a-z ]*(pavement|pci|roads?)|worst (bus |via )?stops', prompt_lower):
+        top_n_match = re.search(r'top (\d+)', prompt_lower)
+        return handle_worst_bus_stops, {"radius_m": _radius_m(prompt_lower, 200), **({"top_n": int(top_n_match.group(1))} if top_n_match else {})}
+    match = re.search(r'(?:bus|via) stops? (?:(?:are|that are|located) )?(?:near|around|close to|on|along) (.+?)(?: within \d+.*)?\??$', prompt_lower)
+    if match:
+        return handle_bus_stops_near, {"place": match.group(1).strip(' ?'), "radius_m": _radius_m(prompt_lower, 200)}
     match = re.search(r'any pothole complaints.*(school|senior|hospital)', prompt_lower)
     if match:
-        sensitive_type = match.group(1)
-        if 'school' in sensitive_type:
-            sensitive_type = 'school'
-        elif 'hospital' in sensitive_type or 'medical' in sensitive_type or 'clinic' in sensitive_type:
-            sensitive_type = 'hospital'
-        elif 'senior' in sensitive_type or 'elder' in sensitive_type or 'center' in sensitive_type:
-            sensitive_type = 'senior'
-        return handle_any_complaints_near_sensitive_areas(sensitive_type=sensitive_type)
+        return handle_any_complaints_near_sensitive_areas, {"sensitive_type": _normalize_sensitive_type(match.group(1))}
 
     # --- New: VIA route analytics ---
     if re.search(r'(via|transit|bus) route( analytics| risk| affected| pothole)', prompt_lower):
-        return handle_via_route_analytics()
+        return handle_via_route_analytics, {}
     
     # --- New: VIA buses on pothole-prone streets ---
     if re.search(r'which via buses? travel most often on pothole[- ]?prone streets?', prompt_lower):
-        return handle_via_buses_on_pothole_prone_streets()
+        return handle_via_buses_on_pothole_prone_streets, {}
     
     # Alternative patterns for VIA bus analysis
     if re.search(r'via buses?.*pothole[- ]?prone', prompt_lower):
-        return handle_via_buses_on_pothole_prone_streets()
+        return handle_via_buses_on_pothole_prone_streets, {}
     
     if re.search(r'bus routes?.*poor pavement', prompt_lower):
-        return handle_via_buses_on_pothole_prone_streets()
+        return handle_via_buses_on_pothole_prone_streets, {}
     # --- New: ETA/delay prediction ---
     if re.search(r'(eta|delay|arrival time|transit delay|bus delay)', prompt_lower):
-        return handle_eta_delay_prediction()
+        return handle_eta_delay_prediction, {}
+    # --- Treatment effectiveness (IMP projects vs later complaints) ---
+    if re.search(r'(treatments?|resurfac\w*|repav\w*|overlays?|seal\w*|imp projects?|street maintenance)\b.*\b(effective|work|reduc\w*|help|impact|lower)', prompt_lower) \
+            or re.search(r'\b(effective|effectiveness|effect of)\b.*\b(treatments?|resurfac\w*|repav\w*|overlays?|seal\w*|imp projects?|street maintenance)\b', prompt_lower):
+        return handle_treatment_effectiveness, {}
     # --- New: Budget/cost estimation ---
-    if re.search(r'(cost|budget|estimate).*pothole', prompt_lower):
-        return handle_budget_cost_estimation()
+    if re.search(r'(cost|budget|estimate).*pothole', prompt_lower) or re.search(r'\b(repair|maintenance|road|street|paving) budget|\bbudget\b.*\b(district|scenarios?)\b', prompt_lower):
+        return handle_budget_cost_estimation, _budget_params(prompt_lower)
     # --- New: Dashboard/documentation/cleaning Q&A ---
     if re.search(r'(dashboard|documentation|data cleaning|cleaning process)', prompt_lower):
         topic = None
@@ -1016,185 +1244,158 @@ def get_groq_response(prompt):
             topic = 'documentation'
         elif 'cleaning' in prompt_lower:
             topic = 'cleaning'
-        return handle_dashboard_documentation(topic)
+        return handle_dashboard_documentation, {"topic": topic}
     # --- New: Research/idea generation ---
     if re.search(r'(research ideas|research questions|project ideas|analysis ideas)', prompt_lower):
-        return handle_research_ideas()
+        return handle_research_ideas, {}
     # --- New: Security/compliance Q&A ---
     if re.search(r'(security|compliance|pii|privacy|data protection)', prompt_lower):
-        return handle_security_compliance()
+        return handle_security_compliance, {}
 
     # --- Survey-based questions ---
     # Public transportation questions
     match = re.search(r'do people in (?:zip code )?(\d+) like public transportation', prompt_lower)
     if match:
-        zipcode = match.group(1)
-        return handle_public_transportation_sentiment_zipcode(zipcode)
+        return handle_public_transportation_sentiment_zipcode, {"zipcode": match.group(1)}
     
     match = re.search(r'are people in (?:zip code )?(\d+) satisfied with their public transit', prompt_lower)
     if match:
-        zipcode = match.group(1)
-        return handle_public_transit_satisfaction_zipcode(zipcode)
+        return handle_public_transit_satisfaction_zipcode, {"zipcode": match.group(1)}
     
     # Investment opportunities
     if re.search(r'are there opportunities for investment in san antonio', prompt_lower):
-        return handle_investment_opportunities()
+        return handle_investment_opportunities, {}
     
     # Transportation mode questions
     match = re.search(r'what do most citizens in (?:zip code )?(\d+) use for their mode of transportation', prompt_lower)
     if match:
-        zipcode = match.group(1)
-        return handle_transportation_mode_zipcode(zipcode)
+        return handle_transportation_mode_zipcode, {"zipcode": match.group(1)}
     
     # Transportation improvements
     if re.search(r'what do most people in san antonio want to see improved for transportation', prompt_lower):
-        return handle_transportation_improvements()
+        return handle_transportation_improvements, {}
     
     # Public services/resources questions
     match = re.search(r'what public services or resources do people in (?:zip code )?(\d+) lack', prompt_lower)
     if match:
-        zipcode = match.group(1)
-        return handle_missing_services_zipcode(zipcode)
+        return handle_missing_services_zipcode, {"zipcode": match.group(1)}
     
     # City satisfaction questions
     if re.search(r'do san antonians like the city', prompt_lower):
-        return handle_city_satisfaction()
+        return handle_city_satisfaction, {}
     
     if re.search(r'is san antonio cool', prompt_lower):
-        return handle_city_attitude()
+        return handle_city_attitude, {}
     
     # Community spaces accessibility
     match = re.search(r'how accessible are public community spaces in (?:zip code )?(\d+)', prompt_lower)
     if match:
-        zipcode = match.group(1)
-        return handle_community_spaces_accessibility_zipcode(zipcode)
+        return handle_community_spaces_accessibility_zipcode, {"zipcode": match.group(1)}
     
     if re.search(r'how accessible are public community spaces in san antonio', prompt_lower):
-        return handle_community_spaces_accessibility_city()
+        return handle_community_spaces_accessibility_city, {}
     
     # Housing affordability
     match = re.search(r'how affordable is housing in (?:zip code )?(\d+)', prompt_lower)
     if match:
-        zipcode = match.group(1)
-        return handle_housing_affordability_zipcode(zipcode)
+        return handle_housing_affordability_zipcode, {"zipcode": match.group(1)}
     
     if re.search(r'how affordable is housing in san antonio', prompt_lower):
-        return handle_housing_affordability_city()
+        return handle_housing_affordability_city, {}
     
     # Housing type questions
     if re.search(r'what type of housing do san antonio', prompt_lower):
-        return handle_housing_types()
+        return handle_housing_types, {}
     
     # Living arrangements
     if re.search(r'do most people live by themselves or with others', prompt_lower):
-        return handle_living_arrangements()
+        return handle_living_arrangements, {}
 
     # --- RAG fallback: try to parse and answer with query_table ---
     street, year = parse_rag_question(prompt)
     if street and year:
-        print(f"[RAG DEBUG] Parsed street: '{street}', year: {year}")
-        results = query_table(street=street, year=year)
-        print(f"[RAG DEBUG] Results count: {len(results)}")
-        if results:
-            df = pd.DataFrame(results, columns=["latitude", "longitude", "street_name", "year", "council_district"])
-            df = df.rename(columns={
-                'latitude': 'Latitude',
-                'longitude': 'Longitude',
-                'street_name': 'MSAG_Name'
-            })
-            total = len(df)
-            breakdown = df['MSAG_Name'].value_counts().to_dict()
-            breakdown_str = "; ".join([f"{k}: {v}" for k, v in breakdown.items()])
-            response = f"Found {total} pothole records for streets containing '{street}' in {year}.\nBreakdown: {breakdown_str}"
-            print(f"[RAG DEBUG] Response: {response}")
-            return response, None, df
-        else:
-            print(f"[RAG DEBUG] No records found for street='{street}', year={year}")
-            return f"No pothole records found for streets containing '{street}' in {year}.", None, pd.DataFrame()
+        debug("RAG: parsed street: '%s', year: %s", street, year)
+        return handle_rag_street_year, {"street": street, "year": year}
     else:
-        print("[RAG DEBUG] Falling back to generic/LLM answer.")
+        debug("RAG: falling back to generic/LLM answer.")
 
     # --- Existing logic for other questions ---
     # Check for new, more specific analytical questions
     if "pavement condition for" in prompt_lower or "potholes on" in prompt_lower:
         match = re.search(r'(pavement condition for|potholes on)\s+(.+)', prompt_lower)
         if match:
-            street_name = match.group(2).strip()
-            response_text = get_pavement_condition_prediction(street_name)
-            return response_text, plot_object, highlight_data_df
+            return get_pavement_condition_prediction, {"street_name": match.group(2).strip()}
     if "how many potholes this month" in prompt_lower or "monthly pothole count" in prompt_lower:
-        response_text = get_monthly_pothole_count()
-        return response_text, plot_object, highlight_data_df
+        return get_monthly_pothole_count, {}
     if "worst potholes" in prompt_lower or "streets with bad roads" in prompt_lower:
-        response_text, plot_object, highlight_data_df = get_worst_pothole_streets()
-        return response_text, plot_object, highlight_data_df
+        return get_worst_pothole_streets, {}
     if "top complaint locations" in prompt_lower or "most reported streets" in prompt_lower:
-        response_text, plot_object, highlight_data_df = get_top_complaint_locations()
-        return response_text, plot_object, highlight_data_df
+        return get_top_complaint_locations, {}
     if "unresolved complaints" in prompt_lower or "open complaints by year" in prompt_lower:
-        response_text, plot_object, highlight_data_df = get_unresolved_complaints_by_year()
-        return response_text, plot_object, highlight_data_df
+        return get_unresolved_complaints_by_year, {}
     if "seasonal impact on potholes" in prompt_lower or "potholes by season" in prompt_lower:
-        response_text, plot_object, highlight_data_df = get_seasonal_pothole_impact()
-        return response_text, plot_object, highlight_data_df
+        return get_seasonal_pothole_impact, {}
     if "predict new potholes" in prompt_lower or "pothole formation prediction" in prompt_lower or "where will new potholes form" in prompt_lower:
-        response_text, plot_object, highlight_data_df = get_pothole_formation_prediction()
-        return response_text, plot_object, highlight_data_df
-
-    # Keyword-based logic
-    keyword_responses = {
-        "how many potholes": f"There are {len(pothole_cases_df.index) if not pothole_cases_df.empty else 'no'} potholes recorded in the dataset.",
-        "number of potholes": f"The dataset contains {len(pothole_cases_df.index) if not pothole_cases_df.empty else 'no'} potholes.",
-        "pavement condition": "Pavement condition ratings were joined with pothole data to analyze correlation.",
-        "correlation": "The correlation matrix visualizes relationships among Vibration, Speed, and Acceleration.",
-        "heatmap": "The heatmap shows which features are strongly related, such as Vibration vs Speed.",
-        "scatter plot": "The scatter plot illustrates the distribution of potholes based on latitude and longitude.",
-        "vibration data": "Vibration data, collected by sensors, helps in assessing road roughness and potential pothole formation.",
-        "acceleration relate": "Acceleration data can indicate sudden jolts or bumps, which are signs of poor road conditions or potholes.",
-        "speed data": "Speed data helps understand how vehicle speed interacts with road conditions, affecting the impact of potholes.",
-        "latitude and longitude": "Latitude and longitude provide the precise geographical location of potholes and road segments for mapping.",
-        "map or folium": "The Folium map displays potholes and road conditions, allowing for interactive geographical analysis.",
-        "time series": "The time series chart visualizes the trend of pothole incidents over time, identifying patterns.",
-        "monthly trends": "Monthly trends show fluctuations in pothole reports throughout the year, highlighting peak seasons.",
-        "yearly trends": "Yearly trends provide an overview of pothole incidents across different years, indicating long-term changes.",
-        "datasets merged": "Various datasets, including 311 service requests, pavement conditions, and sensor data, were merged for comprehensive analysis.",
-        "dataset or data columns": "The datasets include columns such as Service Request Type, Latitude, Longitude, Open Date, Close Date, MSAG Name, PCI, etc.",
-        "missing values": "Missing values in datasets were handled through imputation or removal, depending on the extent and impact of the missing data."
-    }
+        return get_pothole_formation_prediction, {}
 
-    # Fallback to Groq API for general questions
-    response_text = None
-    for keyword, resp in keyword_responses.items():
+    for keyword in KEYWORD_RESPONSES:
         if keyword in prompt_lower:
-            response_text = resp
-            break
+            return handle_keyword_response, {"keyword": keyword}
+
+    return handle_llm_fallback, {"prompt": prompt}
+
+# These draw with pyplot, whose global state is not thread-safe; only one runs at a time
+PYPLOT_HANDLERS = {
+    get_worst_pothole_streets,
+    get_top_complaint_locations,
+    get_seasonal_pothole_impact,
+    get_pothole_formation_prediction,
+}
+_pyplot_lock = threading.Lock()
+# CPU-bound intents that only read data loaded at startup; they run in worker processes when
+# the server has started them (process_pool.py)
+PROCESS_HANDLERS = PYPLOT_HANDLERS | {
+    handle_active_complaints_near_sensitive_areas,
+    handle_any_complaints_near_sensitive_areas,
+}
+
+def run_intent(handler, kwargs, local=False):
+    """Call a resolved handler and normalize its answer to (response, plot_object, highlight_data_df)."""
+    # A profiled request answers in-process: a profile of the worker wait would show nothing
+    if not local and handler in PROCESS_HANDLERS and not profiling():
+        result = process_pool.run(handler, kwargs)
+        if result is not None:
+            return result
+    with _pyplot_lock if handler in PYPLOT_HANDLERS else nullcontext():
+        result = handler(**kwargs)
+    if not isinstance(result, tuple):
+        # Some older analysis helpers return only the response text
+        return result, None, pd.DataFrame()
+    return result
+
+def intent_key(handler, kwargs):
+    """Identity of a resolved question: the handler and its normalized parameters."""
+    return handler.__name__, repr(sorted(kwargs.items()))
+
+# Identical questions asked while one is being answered share that answer (see coalesce.py)
+answer_flights = SingleFlight(on_flight=lambda key, waiters, seconds: record_coalesced(key[0], waiters, seconds))
 
-    if response_text is None:
-        try:
-            headers = {
-                "Authorization": f"Bearer {GROQ_API_KEY}",
-                "Content-Type": "application/json",
-            }
-            data = {
-                "model": "llama3-8b-8192",
-                "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": 4096,
-            }
-            groq_response = requests.post(GROQ_API_URL, headers=headers, json=data)
-            groq_response.raise_for_status() # Raise an exception for HTTP errors
-            response_data = groq_response.json()
-            response_text = response_data["choices"][0]["message"]["content"]
-        except requests.exceptions.RequestException as e:
-            print(f"Error communicating with Groq API: {e}")
-            response_text = "I am currently unable to connect to the Groq AI. Please try again later."
-        except KeyError:
-            response_text = "I received an unexpected response from the Groq AI. Please try rephrasing your question."
+def get_groq_response(prompt):
+    handler, kwargs = resolve_intent(prompt)
+    return answer_intent(handler, kwargs)
 
-    # Convert numeric types in highlight_data_df to native Python types for JSON serialization
-    if not highlight_data_df.empty:
-        highlight_data_df = _convert_dataframe_numerics_to_native_types(highlight_data_df)
-    
-    return response_text, plot_object, highlight_data_df
+def answer_intent(handler, kwargs):
+    """Answer a resolved question, sharing the answer with identical questions already in flight."""
+    record_intent(handler.__name__)
+    try:
+        with stage("data_query"):
+            # A question waiting on an identical one still answers within its own budget
+            result, shared = answer_flights.do(intent_key(handler, kwargs), lambda: collect(run_intent, handler, kwargs), timeout=remaining())
+    except WaitTimeout:
+        reason = "The same question was already being answered and did not finish in time."
+        return Degraded(("That question is taking longer than usual to answer. Please try again in a moment.", None, pd.DataFrame()), [reason])
+    record_cache("coalesce", hit=shared)
+    return result
 
 # Function to plot markers on the map
 def plot_from_df(df, folium_map):
@@ -1214,28 +1415,34 @@ def plot_from_df(df, folium_map):
         ).add_to(folium_map)
     return folium_map
 
-def add_pothole_markers(df, folium_map, feature_group, color_column='color', marker_radius=8):
-    for _, row in df.iterrows():
-        if pd.notna(row['Latitude']) and pd.notna(row['Longitude']):
-            marker_color = row[color_column] if color_column in row else 'blue' # Default to blue if no color column
-            # Use the best available name for tooltip
-            if 'MSAG_Name' in row:
-                tooltip_name = row['MSAG_Name']
-            elif 'Sensitive' in row:
-                tooltip_name = row['Sensitive']
-            elif 'name' in row:
-                tooltip_name = row['name']
-            else:
-                tooltip_name = 'Location'
-            folium.CircleMarker(
-                location=[row.Latitude, row.Longitude],
-                radius=int(marker_radius),  # Ensure radius is a standard Python int
-                color=marker_color,
-                fill=True,
-                fill_color=marker_color,
-                fill_opacity=0.7,
-                tooltip=f"{tooltip_name}: {row.get('ComplaintCount', 'N/A')} Complaints",
-            ).add_to(feature_group)
+def add_pothole_markers(df, folium_map, feature_group, color_column='color', marker_radius=8, max_markers=MAX_CLUSTERS):
+    # Large results are clustered first so the map gets at most max_markers markers
+    clustered = False
+    if len(df) > max_markers:
+        df, info = cluster_points(df, max_clusters=max_markers)
+        clustered = info["clustered"]
+    df = df[df['Latitude'].notna() & df['Longitude'].notna()]
+    # Use the best available name for tooltip
+    name_column = next((col for col in ('MSAG_Name', 'Sensitive', 'name') if col in df.columns), None)
+    names = df[name_column] if name_column else pd.Series('Location', index=df.index)
+    colors = df[color_column] if color_column in df.columns else pd.Series('blue', index=df.index) # Default to blue if no color column
+    if clustered:
+        radii = df['marker_radius'].astype(int)
+        labels = [str(name) for name in names]
+    else:
+        radii = pd.Series(int(marker_radius), index=df.index)  # Ensure radius is a standard Python int
+        complaints = df['ComplaintCount'] if 'ComplaintCount' in df.columns else pd.Series('N/A', index=df.index)
+        labels = [f"{name}: {count} Complaints" for name, count in zip(names, complaints)]
+    for lat, lon, marker_color, radius, label in zip(df['Latitude'], df['Longitude'], colors, radii, labels):
+        folium.CircleMarker(
+            location=[lat, lon],
+            radius=int(radius),
+            color=marker_color,
+            fill=True,
+            fill_color=marker_color,
+            fill_opacity=0.7,
+            tooltip=label,
+        ).add_to(feature_group)
     return feature_group # Return the feature group
 
 # --- Load additional datasets for chatbot analysis ---
@@ -1247,43 +1454,232 @@ pothole_cases_path = os.path.join(data_folder_path, '311_Pothole_Cases_18_24.csv
 pavement_path = os.path.join(data_folder_path, 'COSA_Pavement.csv')
 complaint_full_path = os.path.join(data_folder_path, 'COSA_pavement_311.csv')
 
-try:
-    pothole_cases_df = pd.read_csv(pothole_cases_path)
-    pavement_latlon_df = pd.read_csv(pavement_path)
-    complaint_df = pd.read_csv(complaint_full_path)
-except Exception as e:
-    print(f"Error loading data files: {e}")
-    pothole_cases_df = pd.DataFrame()
-    pavement_latlon_df = pd.DataFrame()
-    complaint_df = pd.DataFrame()
-
-# After loading DataFrames, ensure correct dtypes and column names
-if 'OpenDate' in pothole_cases_df.columns:
-    pothole_cases_df['OpenDate'] = pd.to_datetime(pothole_cases_df['OpenDate'], errors='coerce')
-if 'OPENEDDATETIME' in complaint_df.columns:
-    complaint_df['OPENEDDATETIME'] = pd.to_datetime(complaint_df['OPENEDDATETIME'], errors='coerce')
-if 'InstallDate' in complaint_df.columns:
-    complaint_df['InstallDate'] = pd.to_datetime(complaint_df['InstallDate'], errors='coerce')
-# Ensure Latitude/Longitude columns exist in pavement_latlon_df
-if 'Lat' in pavement_latlon_df.columns and 'Lon' in pavement_latlon_df.columns:
-    pavement_latlon_df = pavement_latlon_df.rename(columns={'Lat': 'Latitude', 'Lon': 'Longitude'})
-# Extract Latitude/Longitude from GoogleMapView if needed
-if 'GoogleMapView' in pavement_latlon_df.columns:
-    def extract_lat_lon(url):
-        if pd.isna(url) or url == 'Not Available':
+# Everything derived from the data files below is registered with the warm-start
+# snapshot (see snapshot.py); a restart on unchanged files reads it back instead
+warm_start = Snapshot([
+    pothole_cases_path, pavement_path, complaint_full_path,
+    os.path.join(data_folder_path, 'Potholes_on_COSA_Streets.csv'),
+    os.path.join(data_folder_path, 'GIS', 'potholes_elev_sidewalks.csv'),
+    os.path.join(data_folder_path, 'VIA', 'via_routes_cleaned.csv'),
+    os.path.join(data_folder_path, 'VIA', 'trip_cleaned.csv'),
+    os.path.join(data_folder_path, 'VIA', 'stops_cleaned.csv'),
+    os.path.join(data_folder_path, 'VIA', 'transfers_data_cleaned.csv'),
+    'potholess.db', risk_model.MODEL_PATH, feature_table_path('segment'), feature_table_path('street'),
+    treatment_links_path(), budget.STREET_PROJECTS_PATH, budget.SIDEWALK_PROJECTS_PATH,
+])
+
+
+def _load_sources():
+    try:
+        pothole_cases_df = pd.read_csv(pothole_cases_path)
+        pavement_latlon_df = pd.read_csv(pavement_path)
+        complaint_df = pd.read_csv(complaint_full_path)
+    except Exception as e:
+        print(f"Error loading data files: {e}")
+        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+
+    # After loading DataFrames, ensure correct dtypes and column names
+    if 'OpenDate' in pothole_cases_df.columns:
+        pothole_cases_df['OpenDate'] = pd.to_datetime(pothole_cases_df['OpenDate'], errors='coerce')
+    if 'OPENEDDATETIME' in complaint_df.columns:
+        complaint_df['OPENEDDATETIME'] = pd.to_datetime(complaint_df['OPENEDDATETIME'], errors='coerce')
+    if 'InstallDate' in complaint_df.columns:
+        complaint_df['InstallDate'] = pd.to_datetime(complaint_df['InstallDate'], errors='coerce')
+    # Ensure Latitude/Longitude columns exist in pavement_latlon_df
+    if 'Lat' in pavement_latlon_df.columns and 'Lon' in pavement_latlon_df.columns:
+        pavement_latlon_df = pavement_latlon_df.rename(columns={'Lat': 'Latitude', 'Lon': 'Longitude'})
+    # Extract Latitude/Longitude from GoogleMapView if needed
+    if 'GoogleMapView' in pavement_latlon_df.columns:
+        def extract_lat_lon(url):
+            if pd.isna(url) or url == 'Not Available':
+                return None, None
+            match = re.search(r'place/([0-9.]+)N ([0-9.]+)W', url)
+            if match:
+                lat = float(match.group(1))
+                lon = -float(match.group(2))  # West is negative
+                return lat, lon
             return None, None
-        match = re.search(r'place/([0-9.]+)N ([0-9.]+)W', url)
-        if match:
-            lat = float(match.group(1))
-            lon = -float(match.group(2))  # West is negative
-            return lat, lon
-        return None, None
-    pavement_latlon_df[['Latitude', 'Longitude']] = pavement_latlon_df['GoogleMapView'].apply(lambda x: pd.Series(extract_lat_lon(x)))
-print("pothole_cases_df columns:", pothole_cases_df.columns)
-print("pavement_latlon_df columns:", pavement_latlon_df.columns)
-print("complaint_df columns:", complaint_df.columns)
+        pavement_latlon_df[['Latitude', 'Longitude']] = pavement_latlon_df['GoogleMapView'].apply(lambda x: pd.Series(extract_lat_lon(x)))
+    return pothole_cases_df, pavement_latlon_df, complaint_df
+
+
+pothole_cases_df, pavement_latlon_df, complaint_df = warm_start.artifacts(('pothole_cases', 'pavement', 'complaints'), _load_sources)
+debug("pothole_cases_df columns: %s", list(pothole_cases_df.columns))
+debug("pavement_latlon_df columns: %s", list(pavement_latlon_df.columns))
+debug("complaint_df columns: %s", list(complaint_df.columns))
+
+# One street vocabulary shared by every table (see streets.py): each frame gets a
+# street_id column, and a street question resolves to ids and reads its rows directly
+street_index = warm_start.artifact('street_index', StreetIndex)
+
+
+def _encode_streets(df, column='MSAG_Name'):
+    if column in df.columns:
+        df['street_id'] = street_index.add(df[column])
+    return StreetRows(df['street_id'] if 'street_id' in df.columns else [])
+
+
+pavement_street_rows = _encode_streets(pavement_latlon_df)
+complaint_street_rows = _encode_streets(complaint_df)
+street_index.add(pd.Series(warm_start.artifact('rag_street_names', rag_street_names), dtype='str'))
+
+# Segment-level pothole reports (one row per case and segment), indexed by CASEID
+# and CartID with per-segment and per-street totals counted once here
+pothole_reports = warm_start.artifact('pothole_reports', lambda: load_reports(
+    os.path.join(data_folder_path, 'Potholes_on_COSA_Streets.csv'),
+    os.path.join(data_folder_path, 'GIS', 'potholes_elev_sidewalks.csv'),
+    pavement_latlon_df, street_index,
+))
+
+# Complaints per street and month (sparse, see street_history.py) for the history answers
+if 'street_id' in complaint_df.columns and 'OPENEDDATETIME' in complaint_df.columns:
+    complaint_history = StreetMonthMatrix(complaint_df['street_id'], complaint_df['OPENEDDATETIME'])
+else:
+    complaint_history = None
+
+
+def ingest_complaints(records):
+    """Count new road complaints ({MSAG_Name, OPENEDDATETIME} rows) in the street history."""
+    if complaint_history is None or records.empty:
+        return 0
+    return complaint_history.add(street_index.add(records['MSAG_Name']), records['OPENEDDATETIME'])
+
+
+# Calendar rollups for the time-based answers; the raw frames are never modified by them
+if 'OpenDate' in pothole_cases_df.columns and 'cases' in pothole_cases_df.columns:
+    case_calendar = warm_start.artifact('case_calendar', lambda: CalendarRollup(pothole_cases_df['OpenDate'], pothole_cases_df['cases']))
+else:
+    case_calendar = CalendarRollup([])
+if 'OPENEDDATETIME' in complaint_df.columns:
+    complaint_calendar = warm_start.artifact('complaint_calendar', lambda: CalendarRollup(complaint_df['OPENEDDATETIME'], closed=complaint_df.get('CLOSEDDATETIME')))
+else:
+    complaint_calendar = CalendarRollup([])
+
+# Daily case forecasts and weather effects, built once from the daily case history
+ts_pred_path = os.path.join(data_folder_path, '311_ts_pred_24_25.csv')
+if 'OpenDate' in pothole_cases_df.columns and 'cases' in pothole_cases_df.columns:
+    pothole_forecaster = Forecaster(pothole_cases_df, load_published(ts_pred_path))
+    weather_effect_stats = weather_effects(pothole_cases_df)
+else:
+    pothole_forecaster = None
+    weather_effect_stats = {}
+
+# Terrain, watershed and soil features per street, prebuilt offline by features.py
+STREET_FEATURE_COLUMNS = ['avg_slope', 'max_slope', 'watershed', 'subwatershed', 'drainage_class', 'hydrologic_group']
+street_features_df = load_feature_table('street')
+if street_features_df.empty:
+    print("Street feature table not found; run `python features.py` to add terrain and drainage to risk answers.")
+    street_features = {}
+else:
+    street_features = street_features_df.set_index('MSAG_Name')[STREET_FEATURE_COLUMNS].to_dict('index')
+
+
+def with_street_features(df):
+    """Add the prebuilt terrain and drainage columns to a frame keyed by MSAG_Name."""
+    if street_features_df.empty or df.empty:
+        return df
+    merged = df.merge(street_features_df[['MSAG_Name'] + STREET_FEATURE_COLUMNS], on='MSAG_Name', how='left')
+    # Streets without pothole points (and the soil columns, when no soil survey was loaded) have
+    # no features; None keeps the frame JSON-serializable for the map
+    features = merged[STREET_FEATURE_COLUMNS].astype(object)
+    merged[STREET_FEATURE_COLUMNS] = features.where(features.notna(), None)
+    return merged
+
+
+def street_terrain_summary(street):
+    """One line on a street's slope, watershed and soil drainage, or "" when no features were built."""
+    features = street_features.get(street)
+    if not features:
+        return ""
+    parts = []
+    if pd.notna(features['avg_slope']):
+        parts.append(f"average slope {features['avg_slope']:.1f}% (max {features['max_slope']:.1f}%)")
+    if pd.notna(features['watershed']):
+        parts.append(f"{features['watershed']} watershed")
+    if pd.notna(features['drainage_class']):
+        parts.append(f"{features['drainage_class'].lower()} soil")
+    return f"- Terrain: {', '.join(parts)}\n" if parts else ""
+
+
+# Formation risk per street. The trained model scores every pavement segment once
+# here, so the prediction handlers only look rows up.
+def _load_street_risk():
+    if pavement_latlon_df.empty or complaint_df.empty or 'CartID' not in pavement_latlon_df.columns:
+        return None, pd.DataFrame()
+    model = risk_model.load_model()
+    if model is None:
+        print("Risk model not found; fitting one now. Run `python risk_model.py` to train and validate it offline.")
+        model = risk_model.fit_latest(pavement_latlon_df, complaint_df, segment_features_df, treatment_index)
+    return model, risk_model.score_streets(model, pavement_latlon_df, complaint_df, segment_features_df, treatments=treatment_index)
+
+
+segment_features_df = load_feature_table('segment')
+# IMP treatments per segment (built by treatments.py), joined to the complaint history
+if 'CartID' in complaint_df.columns and 'OPENEDDATETIME' in complaint_df.columns:
+    treatment_index = warm_start.artifact('treatment_index', lambda: TreatmentIndex(load_treatment_links(), complaint_df))
+else:
+    treatment_index = None
+formation_model, street_risk_df = warm_start.artifacts(('formation_model', 'street_risk'), _load_street_risk)
+street_risk_rows = _encode_streets(street_risk_df)
+street_risk_average = street_risk_df['Pothole_Formation_Risk_Score'].mean() if not street_risk_df.empty else 0.0
+
+
+# Repair-budget projections: unit costs from the IMP project history, applied to
+# every segment with its formation risk (see budget.py)
+def _load_budget_engine():
+    if formation_model is None:
+        return None
+    projects = budget.load_projects()
+    if projects.empty:
+        return None
+    segments = risk_model.segment_frame(pavement_latlon_df, complaint_df, segment_features_df, risk_model.latest_date(complaint_df), treatment_index)
+    return budget.BudgetEngine(budget.CostModel(projects), segments, formation_model)
+
+
+repair_budget = warm_start.artifact('repair_budget', _load_budget_engine)
+
+# Every VIA stop / pavement segment pair within MAX_RADIUS_M, sorted by distance (see stop_neighbors.py)
+if not via_stops_df.empty and not pavement_latlon_df.empty and 'Latitude' in pavement_latlon_df.columns:
+    stop_neighbors = StopNeighbors(via_stops_df, pavement_latlon_df)
+else:
+    stop_neighbors = None
+
+# VIA transfer graph: stop centrality, transfer hubs and their pothole exposure (see transit_graph.py)
+if not via_stops_df.empty and not via_transfers_df.empty and 'Latitude' in complaint_df.columns:
+    transit_stops_df, transit_hubs_df = warm_start.artifacts(
+        ('transit_stops', 'transit_hubs'),
+        lambda: transit_graph.analyze(via_stops_df, via_transfers_df, complaint_df),
+    )
+else:
+    transit_stops_df, transit_hubs_df = pd.DataFrame(), pd.DataFrame()
+
+# Streets named by each VIA route ("Steves / S St Marys 32-34 Lineup" -> STEVES AVE, S ST MARYS ST)
+VIA_SERVICE_WORDS = re.compile(r"\b(primo|skip|express|frequent|lineup|crosstown|courtesy van|tc)\b|\b\d+(-\d+)?\s*(?=lineup|$)", re.IGNORECASE)
+
+
+def _route_street_ids(route_long_name):
+    name = VIA_SERVICE_WORDS.sub(' ', str(route_long_name))
+    ids = set()
+    for part in name.split('/'):
+        if part.strip():
+            ids.update(street_index.lookup(part))
+    return sorted(ids)
+
+
+via_route_streets = warm_start.artifact('via_route_streets', lambda: {
+    route.route_short_name: _route_street_ids(route.route_long_name)
+    for route in via_routes_df.itertuples(index=False)
+} if 'route_long_name' in via_routes_df.columns else {})
+
+# Weekly trips x poor-pavement miles per route (see route_exposure.py), sorted once here
+if via_route_streets and not pavement_latlon_df.empty:
+    via_route_exposure_df = warm_start.artifact('via_route_exposure', lambda: route_exposure(
+        via_routes_df, via_trips_df, via_route_streets, pavement_latlon_df, pavement_street_rows))
+else:
+    via_route_exposure_df = pd.DataFrame()
 
 # --- Handler: VIA route analytics (most affected routes, route risk, etc.) ---
+@intent_handler
 def handle_via_route_analytics():
     return (
         "VIA route analytics are under development. In the future, this will show which VIA routes are most affected by potholes, risk scores, and more. Please specify a route or ask about route risk.",
@@ -1292,199 +1688,60 @@ def handle_via_route_analytics():
     )
 
 # --- Handler: Which VIA buses travel most often on pothole-prone streets? ---
+@intent_handler
 def handle_via_buses_on_pothole_prone_streets():
     """Analyze which VIA bus routes travel most often on streets with poor pavement conditions."""
-    print(f"DEBUG: via_routes_df empty: {via_routes_df.empty}")
-    print(f"DEBUG: pavement_latlon_df empty: {pavement_latlon_df.empty}")
-    print(f"DEBUG: via_routes_df shape: {via_routes_df.shape if not via_routes_df.empty else 'N/A'}")
-    print(f"DEBUG: pavement_latlon_df shape: {pavement_latlon_df.shape if not pavement_latlon_df.empty else 'N/A'}")
+    debug("via_routes_df shape: %s, pavement_latlon_df shape: %s", via_routes_df.shape, pavement_latlon_df.shape)
     
     if via_routes_df.empty or pavement_latlon_df.empty:
         return "VIA route data and pavement condition data are required for this analysis.", None, pd.DataFrame()
     
     try:
-        # Load VIA routes data
-        via_routes = via_routes_df.copy()
-        
-        # Get pavement data with poor conditions (PCI < 50 indicates poor condition)
-        poor_pavement = pavement_latlon_df[pavement_latlon_df['PCI'] < 50].copy()
-        
-        if poor_pavement.empty:
-            return "No streets with poor pavement conditions (PCI < 50) found in the data.", None, pd.DataFrame()
-        
-        # Create a mapping of route names to their characteristics
-        route_analysis = []
-        
-        # Define common street name variations and route name mappings
-        street_variations = {
-            'fredericksburg': ['fredericksburg', 'fredericksburg road'],
-            'military': ['military', 'military drive'],
-            'zarzamora': ['zarzamora', 'zarzamora street'],
-            'perrin': ['perrin', 'perrin beitel'],
-            'blanco': ['blanco', 'blanco road'],
-            'new braunfels': ['new braunfels', 'new braunfels avenue'],
-            'san pedro': ['san pedro', 'san pedro avenue'],
-            'mccullough': ['mccullough', 'mccullough avenue'],
-            'broadway': ['broadway', 'broadway street'],
-            'east houston': ['east houston', 'e houston', 'houston street'],
-            'east commerce': ['east commerce', 'e commerce', 'commerce street'],
-            'martin luther king': ['martin luther king', 'mlk', 'mlk drive'],
-            'porter': ['porter', 'porter road'],
-            'rigsby': ['rigsby', 'rigsby road'],
-            'steves': ['steves', 'steves avenue'],
-            'south st marys': ['south st marys', 's st marys', 'st marys'],
-            'south presa': ['south presa', 's presa', 'presa street'],
-            'roosevelt': ['roosevelt', 'roosevelt avenue'],
-            'south flores': ['south flores', 's flores', 'flores street'],
-            'pleasanton': ['pleasanton', 'pleasanton road'],
-            'commercial': ['commercial', 'commercial avenue'],
-            'nogalitos': ['nogalitos', 'nogalitos street'],
-            'kirk': ['kirk', 'kirk road'],
-            'us 90': ['us 90', 'us-90', 'highway 90'],
-            'us 281': ['us 281', 'us-281', 'highway 281'],
-            'bandera': ['bandera', 'bandera road'],
-            'poplar': ['poplar', 'poplar street'],
-            'woodlawn': ['woodlawn', 'woodlawn avenue'],
-            'vance jackson': ['vance jackson', 'vance jackson road'],
-            'west avenue': ['west avenue', 'west ave']
-        }
-        
-        # Analyze each route based on its name and likely street coverage
-        for _, route in via_routes.iterrows():
-            route_name = route['route_long_name'].lower()
-            route_short = route['route_short_name']
-            
-            # Count how many poor pavement segments might be on this route
-            matching_streets = 0
-            total_pci = 0
-            street_matches = []
-            
-            for _, pavement in poor_pavement.iterrows():
-                street_name = str(pavement.get('MSAG_Name', '')).lower()
-                
-                # Enhanced matching logic
-                matched = False
-                
-                # Direct name matching
-                if (any(word in route_name for word in street_name.split()) or 
-                    any(word in street_name for word in route_name.split())):
-                    matched = True
-                
-                # Check against street variations
-                for key, variations in street_variations.items():
-                    if key in route_name:
-                        for variation in variations:
-                            if variation in street_name:
-                                matched = True
-                                break
-                    if matched:
-                        break
-                
-                # Check for common abbreviations
-                if 'st ' in route_name and 'street' in street_name:
-                    matched = True
-                elif 'ave ' in route_name and 'avenue' in street_name:
-                    matched = True
-                elif 'rd ' in route_name and 'road' in street_name:
-                    matched = True
-                
-                if matched:
-                    matching_streets += 1
-                    total_pci += pavement['PCI']
-                    street_matches.append(pavement['MSAG_Name'])
-            
-            if matching_streets > 0:
-                avg_pci = total_pci / matching_streets
-                route_analysis.append({
-                    'route_id': route_short,
-                    'route_name': route['route_long_name'],
-                    'poor_streets_count': matching_streets,
-                    'avg_pci': avg_pci,
-                    'route_type': route['route_type'],
-                    'matching_streets': ', '.join(street_matches[:5])  # Show first 5 matches
-                })
-        
-        if not route_analysis:
-            return "No VIA routes found that travel on streets with poor pavement conditions.", None, pd.DataFrame()
-        
-        # Sort by number of poor streets (descending)
-        route_analysis.sort(key=lambda x: x['poor_streets_count'], reverse=True)
-        
-        # Create short response with better formatting
+        if via_route_exposure_df.empty:
+            return f"No VIA routes found that travel on streets with poor pavement conditions (PCI < {POOR_PCI}).", None, pd.DataFrame()
+        route_analysis = via_route_exposure_df.head(5).to_dict('records')
+
+        # Ranked by scheduled trips per week times the miles of poor pavement on the route's streets
         response = "🚌 **Top VIA Routes on Pothole-Prone Streets**\n\n"
-        
-        for i, route in enumerate(route_analysis[:5], 1):  # Top 5 routes only
-            response += f"**{i}.** Route {route['route_id']} - {route['poor_streets_count']} poor streets\n"
-        
-        response += f"\n📊 **Summary:** {len(route_analysis)} total routes affected"
-        
+
+        for i, route in enumerate(route_analysis, 1):
+            response += (
+                f"**{i}.** Route {route['route_id']} - {route['weekly_trips']:,} trips/week over "
+                f"{route['poor_miles']:.1f} mi of poor pavement ({route['poor_segments']} segments, "
+                f"{route['exposure_miles']:,.0f} bus-miles/week)\n"
+            )
+
+        response += f"\n📊 **Summary:** {len(via_route_exposure_df)} total routes affected"
+
         # Create highlight data for map visualization
         highlight_data = []
-        for route in route_analysis[:5]:  # Top 5 for visualization
-            # Get coordinates for the matching streets
-            for _, pavement in poor_pavement.iterrows():
-                street_name = str(pavement.get('MSAG_Name', '')).lower()
-                route_name = route['route_name'].lower()
-                
-                # Use the same matching logic as above
-                matched = False
-                if (any(word in route_name for word in street_name.split()) or 
-                    any(word in street_name for word in route_name.split())):
-                    matched = True
-                
-                for key, variations in street_variations.items():
-                    if key in route_name:
-                        for variation in variations:
-                            if variation in street_name:
-                                matched = True
-                                break
-                    if matched:
-                        break
-                
-                if matched:
-                    # Get coordinates and handle NaN values
-                    lat = pavement.get('Latitude')
-                    lon = pavement.get('Longitude')
-                    pci = pavement.get('PCI')
-                    
-                    # Skip if coordinates are NaN or None
-                    if pd.isna(lat) or pd.isna(lon) or lat is None or lon is None:
-                        continue
-                    
-                    highlight_data.append({
-                        'Latitude': float(lat),
-                        'Longitude': float(lon),
-                        'MSAG_Name': pavement.get('MSAG_Name') if not pd.isna(pavement.get('MSAG_Name')) else 'Unknown Street',
-                        'PCI': float(pci) if not pd.isna(pci) else 0.0,
-                        'Route': f"Route {route['route_id']}",
-                        'color': 'red' if (not pd.isna(pci) and pci < 30) else 'orange',
-                        'marker_radius': 8
-                    })
+        for route in route_analysis:
+            segments = pavement_latlon_df.iloc[route['rows']].dropna(subset=['Latitude', 'Longitude'])
+            for pavement in segments.itertuples(index=False):
+                pci = pavement.PCI
+                highlight_data.append({
+                    'Latitude': float(pavement.Latitude),
+                    'Longitude': float(pavement.Longitude),
+                    'MSAG_Name': pavement.MSAG_Name if not pd.isna(pavement.MSAG_Name) else 'Unknown Street',
+                    'PCI': float(pci) if not pd.isna(pci) else 0.0,
+                    'Route': f"Route {route['route_id']}",
+                    'color': 'red' if (not pd.isna(pci) and pci < 30) else 'orange',
+                    'marker_radius': 8
+                })
         
         highlight_df = pd.DataFrame(highlight_data)
         
-        # Debug: Check for NaN values before conversion
         if not highlight_df.empty:
-            print(f"DEBUG: highlight_df shape before conversion: {highlight_df.shape}")
-            print(f"DEBUG: highlight_df columns: {highlight_df.columns.tolist()}")
-            print(f"DEBUG: highlight_df dtypes: {highlight_df.dtypes}")
-            
-            # Check for NaN values in each column
-            for col in highlight_df.columns:
-                nan_count = highlight_df[col].isna().sum()
-                if nan_count > 0:
-                    print(f"DEBUG: Column '{col}' has {nan_count} NaN values")
+            # The per-column NaN scans are only worth their cost when debugging
+            if DEBUG_ENABLED:
+                debug("highlight_df shape before conversion: %s", highlight_df.shape)
+                for col, nan_count in highlight_df.isna().sum().items():
+                    if nan_count > 0:
+                        debug("Column '%s' has %d NaN values", col, nan_count)
             
             # Apply NaN handling to ensure JSON serialization
             highlight_df = _convert_dataframe_numerics_to_native_types(highlight_df)
             
-            # Debug: Check for NaN values after conversion
-            print(f"DEBUG: highlight_df shape after conversion: {highlight_df.shape}")
-            for col in highlight_df.columns:
-                nan_count = highlight_df[col].isna().sum()
-                if nan_count > 0:
-                    print(f"DEBUG: Column '{col}' still has {nan_count} NaN values after conversion")
-            
             # Additional safety check: replace any remaining NaN with None
             highlight_df = highlight_df.where(pd.notna(highlight_df), None)
         
@@ -1494,6 +1751,7 @@ def handle_via_buses_on_pothole_prone_streets():
         return f"Error analyzing VIA routes and pavement conditions: {str(e)}", None, pd.DataFrame()
 
 # --- Handler: ETA/delay prediction (stub) ---
+@intent_handler
 def handle_eta_delay_prediction(route=None):
     return (
         f"ETA and delay prediction for VIA routes is not yet implemented. In the future, this will estimate delays based on pothole and road condition data. Please specify a route for more details.",
@@ -1501,15 +1759,110 @@ def handle_eta_delay_prediction(route=None):
         pd.DataFrame(),
     )
 
-# --- Handler: Budget/cost estimation (stub) ---
-def handle_budget_cost_estimation(years=5):
-    return (
-        f"Estimated cost to repair potholes over {years} years is under development. This will use historical repair costs and predicted pothole formation rates.",
-        None,
-        pd.DataFrame(),
+# --- Handler: Do street treatments reduce complaints? ---
+MIN_TREATED_SEGMENTS = 30  # smaller treatment groups are too noisy to report
+
+
+@intent_handler
+def handle_treatment_effectiveness():
+    if treatment_index is None or treatment_index.effects.empty:
+        return "Treatment effects need the IMP project links (run `python treatments.py`) and the complaint data.", None, pd.DataFrame()
+    effects = treatment_index.effects
+    window = treatment_index.window_days
+    response = (
+        f"🛠️ **Effect of Street Treatments on Pothole Complaints**\n\n"
+        f"{effects['SMPProjectID'].nunique():,} finished IMP projects on {effects['CartID'].nunique():,} segments, "
+        f"comparing complaints in the {window} days before and after each project finished. "
+        f"The city-wide column adjusts for the overall trend over the same windows.\n\n"
+    )
+    for by, title in (('category', 'By category'), ('treatment', 'By treatment')):
+        table = treatment_index.summary(by)
+        table = table[table['treated_segments'] >= MIN_TREATED_SEGMENTS]
+        if table.empty:
+            continue
+        response += f"**{title}:**\n"
+        for name, row in table.iterrows():
+            response += (
+                f"- {name}: {int(row['treated_segments']):,} segments, {row['before_per_segment']:.2f} → {row['after_per_segment']:.2f} "
+                f"complaints per segment ({row['change_pct']:+.0f}%, {row['change_vs_city_pct']:+.0f}% against the city-wide trend)\n"
+            )
+        response += "\n"
+    return response.rstrip(), None, pd.DataFrame()
+
+
+# --- Handler: Budget/cost estimation ---
+MAX_BUDGET_YEARS = 20
+_AMOUNT_SCALE = {'k': 1e3, 'thousand': 1e3, 'm': 1e6, 'million': 1e6, 'b': 1e9, 'billion': 1e9}
+
+
+def _budget_params(prompt_lower):
+    """Years, council district and annual budget named in a budget question."""
+    params = {}
+    years = re.search(r'(\d+)[- ]?(?:years?|yrs?)\b', prompt_lower)
+    if years:
+        params['years'] = min(max(int(years.group(1)), 1), MAX_BUDGET_YEARS)
+    district = re.search(r'(?:council )?district\s*(\d+)', prompt_lower)
+    if district:
+        params['district'] = int(district.group(1))
+    amount = re.search(r'\$\s*([\d,]+(?:\.\d+)?)\s*(k|thousand|m|million|b|billion)?\b', prompt_lower)
+    if amount:
+        params['annual_budget'] = float(amount.group(1).replace(',', '')) * _AMOUNT_SCALE.get(amount.group(2), 1)
+    return params
+
+
+def _money(value):
+    if value >= 1e6:
+        return f"${value / 1e6:,.1f}M"
+    if value >= 1e3:
+        return f"${value / 1e3:,.0f}K"
+    return f"${value:,.0f}"
+
+
+@intent_handler
+def handle_budget_cost_estimation(years=5, district=None, annual_budget=None):
+    if repair_budget is None:
+        return "Budget estimates need the Street IMP project history and the pavement and complaint data.", None, pd.DataFrame()
+    if district is not None and district not in repair_budget.districts:
+        known = ", ".join(str(d) for d in sorted(repair_budget.districts))
+        return f"I don't have pavement segments for district {district}. Known districts: {known}.", None, pd.DataFrame()
+
+    costs = repair_budget.costs
+    scenarios = repair_budget.scenarios(district, years, annual_budget)
+    first_year = costs.latest_fiscal_year + 1
+    area = f"District {district}" if district is not None else "San Antonio"
+    reactive = scenarios["Resurface as potholes appear"]
+    response = (
+        f"💰 **Repair Budget — {area}, FY{first_year}–FY{first_year + years - 1}**\n\n"
+        f"{reactive['segments']:,} pavement segments, length-weighted PCI {reactive['start_mean_pci']:.0f} today.\n\n"
+        f"**Unit costs** (median per foot, FY{costs.window[0]}–FY{costs.window[1]} IMP projects):\n"
     )
+    for i, band in reversed(list(enumerate(budget.BANDS))):
+        treatment = costs.band_treatment.get(band)
+        if treatment is None:
+            continue
+        row = costs.unit_cost(treatment, band)
+        duration = ""
+        if row and pd.notna(row['duration_median_days']):
+            days = row['duration_median_days']
+            duration = ", usually done within a day" if days < 1 else f", typically {days:.0f} days on site"
+        response += f"- PCI {budget.BAND_LABELS[band]}: {_money(costs.band_cost_per_foot[i])}/ft blended; mostly {treatment}{duration}\n"
+
+    response += f"\n**Scenarios over {years} years:**\n"
+    for name, result in scenarios.items():
+        budget_note = f" ({_money(result['annual_budget'])}/yr)" if result['annual_budget'] else ""
+        response += (
+            f"- {name}{budget_note}: {_money(result['total_spend'])} total, "
+            f"{sum(result['yearly']['miles_treated']):,.1f} miles treated, PCI {result['yearly']['mean_pci'][-1]:.0f} in the final year, "
+            f"~{result['total_expected_complaint_segments']:,.0f} segment-years with pothole complaints\n"
+        )
+    response += (
+        f"\nResurfacing segments as potholes appear costs about {_money(reactive['yearly']['spend'][0])} in the first year. "
+        f"Untreated pavement is assumed to lose {repair_budget.pci_loss:.1f} PCI points a year, and treated segments return to PCI 100."
+    )
+    return response, None, pd.DataFrame()
 
 # --- Handler: Dashboard/documentation/cleaning Q&A (static info) ---
+@intent_handler
 def handle_dashboard_documentation(topic=None):
     doc_map = {
         "dashboard": "The dashboard visualizes pothole locations, risk scores, and VIA route intersections using Streamlit or Power BI.",
@@ -1521,6 +1874,7 @@ def handle_dashboard_documentation(topic=None):
     return ("Supported topics: dashboard, documentation, cleaning. Please specify one.", None, pd.DataFrame())
 
 # --- Handler: Research/idea generation (static list) ---
+@intent_handler
 def handle_research_ideas():
     ideas = [
         "1. Predict pothole formation hotspots using weather and traffic data.",
@@ -1532,6 +1886,7 @@ def handle_research_ideas():
     return ("Here are 5 research ideas:\n" + "\n".join(ideas), None, pd.DataFrame())
 
 # --- Handler: Security/compliance Q&A (static info) ---
+@intent_handler
 def handle_security_compliance():
     return (
         "Security features include encrypted storage, SSH key authentication, and custom firewalls. PII is minimized and not stored in analytics outputs. See the security policy documentation for more.",
@@ -1540,13 +1895,13 @@ def handle_security_compliance():
     )
 
 # --- Survey-based handlers ---
+@intent_handler
 def handle_public_transportation_sentiment_zipcode(zipcode):
     """Handle questions about public transportation sentiment in a specific zip code."""
     if survey_df.empty:
         return "I don't have survey data available to answer that question.", None, pd.DataFrame()
     
-    zipcode_str = str(zipcode)
-    zipcode_data = survey_df[survey_df['What ZIP code do you live in?'].astype(str) == zipcode_str]
+    zipcode_data = survey_rows_for_zipcode(zipcode)
     
     if zipcode_data.empty:
         return f"No survey responses found for zip code {zipcode}.", None, pd.DataFrame()
@@ -1586,10 +1941,12 @@ def handle_public_transportation_sentiment_zipcode(zipcode):
     
     return f"Public transportation satisfaction data not available for zip code {zipcode}.", None, pd.DataFrame()
 
+@intent_handler
 def handle_public_transit_satisfaction_zipcode(zipcode):
     """Handle questions about public transit satisfaction in a specific zip code."""
     return handle_public_transportation_sentiment_zipcode(zipcode)
 
+@intent_handler
 def handle_investment_opportunities():
     """Handle questions about investment opportunities in San Antonio."""
     if survey_df.empty:
@@ -1623,13 +1980,13 @@ def handle_investment_opportunities():
     
     return "Investment opportunity data not available.", None, pd.DataFrame()
 
+@intent_handler
 def handle_transportation_mode_zipcode(zipcode):
     """Handle questions about transportation modes in a specific zip code."""
     if survey_df.empty:
         return "I don't have survey data available to answer that question.", None, pd.DataFrame()
     
-    zipcode_str = str(zipcode)
-    zipcode_data = survey_df[survey_df['What ZIP code do you live in?'].astype(str) == zipcode_str]
+    zipcode_data = survey_rows_for_zipcode(zipcode)
     
     if zipcode_data.empty:
         return f"No survey responses found for zip code {zipcode}.", None, pd.DataFrame()
@@ -1653,6 +2010,42 @@ def handle_transportation_mode_zipcode(zipcode):
     
     return f"Transportation mode data not available for zip code {zipcode}.", None, pd.DataFrame()
 
+@intent_handler
+def handle_transportation_mode_zipcodes(zipcodes):
+    """Answer the transportation-mode question for several zip codes with one grouped count.
+
+    Returns one (response, plot_object, highlight_data_df) tuple per zip code, in order,
+    worded exactly like handle_transportation_mode_zipcode.
+    """
+    if survey_df.empty or SURVEY_MODE_COL not in survey_df.columns:
+        return [handle_transportation_mode_zipcode(zipcode) for zipcode in zipcodes]
+
+    zips = survey_df[SURVEY_ZIP_COL].astype(str)
+    in_batch = zips.isin({str(zipcode) for zipcode in zipcodes})
+    subset_zips = zips[in_batch]
+    totals = subset_zips.value_counts()
+    # sort=False keeps first-seen order, so the stable sort below breaks ties like value_counts()
+    mode_counts = survey_df.loc[in_batch, SURVEY_MODE_COL].groupby(subset_zips, sort=False).value_counts(sort=False)
+
+    results = []
+    for zipcode in zipcodes:
+        zipcode_str = str(zipcode)
+        if zipcode_str not in totals.index:
+            results.append((f"No survey responses found for zip code {zipcode}.", None, pd.DataFrame()))
+            continue
+        total_responses = totals[zipcode_str]
+        counts = mode_counts.loc[zipcode_str].sort_values(ascending=False, kind="stable") if zipcode_str in mode_counts.index.get_level_values(0) else pd.Series(dtype=int)
+
+        response = f"Primary transportation modes in zip code {zipcode}:\n\n"
+        for mode, count in counts.items():
+            percentage = (count / total_responses) * 100
+            response += f"• {mode}: {percentage:.1f}%\n"
+        most_common_mode = counts.index[0] if not counts.empty else "No data"
+        response += f"\nMost common mode: {most_common_mode}"
+        results.append((response, None, pd.DataFrame()))
+    return results
+
+@intent_handler
 def handle_transportation_improvements():
     """Handle questions about transportation improvements desired in San Antonio."""
     if survey_df.empty:
@@ -1680,13 +2073,13 @@ def handle_transportation_improvements():
     
     return "Transportation improvement data not available.", None, pd.DataFrame()
 
+@intent_handler
 def handle_missing_services_zipcode(zipcode):
     """Handle questions about missing public services in a specific zip code."""
     if survey_df.empty:
         return "I don't have survey data available to answer that question.", None, pd.DataFrame()
     
-    zipcode_str = str(zipcode)
-    zipcode_data = survey_df[survey_df['What ZIP code do you live in?'].astype(str) == zipcode_str]
+    zipcode_data = survey_rows_for_zipcode(zipcode)
     
     if zipcode_data.empty:
         return f"No survey responses found for zip code {zipcode}.", None, pd.DataFrame()
@@ -1713,6 +2106,7 @@ def handle_missing_services_zipcode(zipcode):
     
     return f"Missing services data not available for zip code {zipcode}.", None, pd.DataFrame()
 
+@intent_handler
 def handle_city_satisfaction():
     """Handle questions about overall city satisfaction."""
     if survey_df.empty:
@@ -1755,6 +2149,7 @@ def handle_city_satisfaction():
     
     return response, None, pd.DataFrame()
 
+@intent_handler
 def handle_city_attitude():
     """Handle questions about whether San Antonio is 'cool'."""
     if survey_df.empty:
@@ -1801,13 +2196,13 @@ def handle_city_attitude():
     
     return "Sentiment data not available for this question.", None, pd.DataFrame()
 
+@intent_handler
 def handle_community_spaces_accessibility_zipcode(zipcode):
     """Handle questions about community spaces accessibility in a specific zip code."""
     if survey_df.empty:
         return "I don't have survey data available to answer that question.", None, pd.DataFrame()
     
-    zipcode_str = str(zipcode)
-    zipcode_data = survey_df[survey_df['What ZIP code do you live in?'].astype(str) == zipcode_str]
+    zipcode_data = survey_rows_for_zipcode(zipcode)
     
     if zipcode_data.empty:
         return f"No survey responses found for zip code {zipcode}.", None, pd.DataFrame()
@@ -1840,6 +2235,7 @@ def handle_community_spaces_accessibility_zipcode(zipcode):
     
     return f"Community spaces accessibility data not available for zip code {zipcode}.", None, pd.DataFrame()
 
+@intent_handler
 def handle_community_spaces_accessibility_city():
     """Handle questions about community spaces accessibility city-wide."""
     if survey_df.empty:
@@ -1873,13 +2269,13 @@ def handle_community_spaces_accessibility_city():
     
     return "Community spaces accessibility data not available.", None, pd.DataFrame()
 
+@intent_handler
 def handle_housing_affordability_zipcode(zipcode):
     """Handle questions about housing affordability in a specific zip code."""
     if survey_df.empty:
         return "I don't have survey data available to answer that question.", None, pd.DataFrame()
     
-    zipcode_str = str(zipcode)
-    zipcode_data = survey_df[survey_df['What ZIP code do you live in?'].astype(str) == zipcode_str]
+    zipcode_data = survey_rows_for_zipcode(zipcode)
     
     if zipcode_data.empty:
         return f"No survey responses found for zip code {zipcode}.", None, pd.DataFrame()
@@ -1912,6 +2308,7 @@ def handle_housing_affordability_zipcode(zipcode):
     
     return f"Housing affordability data not available for zip code {zipcode}.", None, pd.DataFrame()
 
+@intent_handler
 def handle_housing_affordability_city():
     """Handle questions about housing affordability city-wide."""
     if survey_df.empty:
@@ -1945,6 +2342,7 @@ def handle_housing_affordability_city():
     
     return "Housing affordability data not available.", None, pd.DataFrame()
 
+@intent_handler
 def handle_housing_types():
     """Handle questions about housing types in San Antonio."""
     if survey_df.empty:
@@ -1972,6 +2370,7 @@ def handle_housing_types():
     
     return "Housing type data not available.", None, pd.DataFrame()
 
+@intent_handler
 def handle_living_arrangements():
     """Handle questions about living arrangements (alone vs with others)."""
     if survey_df.empty:
@@ -2029,6 +2428,7 @@ def handle_living_arrangements():
     print("complaint_df empty:", complaint_df.empty)
 
 # --- Handler: PCI in zip code ---
+@intent_handler
 def handle_pci_in_zipcode(zipcode):
     """Handle queries about PCI (Pavement Condition Index) in a specific zip code."""
     if pavement_latlon_df.empty:
@@ -2119,4 +2519,50 @@ def load_survey_data(path):
         return pd.DataFrame()
 
 # Load survey data
-survey_df = load_survey_data("Data/Survey Data.csv")
+survey_df = load_survey_data(os.path.join(data_folder_path, 'Survey Data.csv'))
+
+SURVEY_ZIP_COL = 'What ZIP code do you live in?'
+SURVEY_MODE_COL = 'What is your primary mode of transportation?'
+
+# Index survey responses by ZIP once so per-ZIP questions skip the full-table scan
+if not survey_df.empty and SURVEY_ZIP_COL in survey_df.columns:
+    survey_by_zip = {str(zipcode): rows for zipcode, rows in survey_df.groupby(survey_df[SURVEY_ZIP_COL].astype(str))}
+else:
+    survey_by_zip = {}
+
+def survey_rows_for_zipcode(zipcode):
+    """Survey responses for one ZIP code (empty DataFrame when nobody answered from it)."""
+    return survey_by_zip.get(str(zipcode), survey_df.iloc[0:0])
+
+
+# Cost classes for admission control (admission.py); every other intent is "standard"
+EXPENSIVE_INTENTS = {  # wait on geocoding, OSRM or the LLM
+    handle_llm_fallback,
+    handle_potholes_on_route,
+    handle_potholes_near_address,
+    handle_potholes_in_area,
+    handle_should_avoid_area,
+    handle_bus_stops_near,
+    handle_pci_in_zipcode,
+}
+CHEAP_INTENTS = {  # static text or precomputed lookups
+    handle_weather_effect, handle_why_so_many_potholes, handle_keyword_response, handle_dashboard_documentation,
+    handle_research_ideas, handle_security_compliance, handle_eta_delay_prediction,
+    handle_intersections_via_pothole_injury, handle_prioritize_maintenance_for_buses,
+    get_monthly_pothole_count, get_unresolved_complaints_by_year, handle_potholes_this_month, handle_avg_fix_time,
+    handle_pothole_forecast, handle_areas_with_most_potholes, handle_transfer_hubs_pothole_exposure,
+    handle_treatment_effectiveness, handle_public_transportation_sentiment_zipcode,
+    handle_public_transit_satisfaction_zipcode, handle_investment_opportunities, handle_transportation_mode_zipcode,
+    handle_transportation_improvements, handle_missing_services_zipcode, handle_city_satisfaction, handle_city_attitude,
+    handle_community_spaces_accessibility_zipcode, handle_community_spaces_accessibility_city,
+    handle_housing_affordability_zipcode, handle_housing_affordability_city, handle_housing_types,
+    handle_living_arrangements,
+}
+
+def intent_cost(handler):
+    if handler in EXPENSIVE_INTENTS:
+        return "expensive"
+    return "cheap" if handler in CHEAP_INTENTS else "standard"
+
+# Startup is done changing the derived artifacts; keep them for the next start
+warm_start.save()
@@ -1,35 +1,295 @@
-from fastapi import FastAPI, Request
+import os
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import matplotlib.pyplot as plt
+import pandas as pd
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from integrated import get_groq_response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response
+from starlette.concurrency import run_in_threadpool
+from admission import LANE_ORDER, AdmissionController, Rejected, client_id
+from area_api import CACHE_CONTROL, GEO_DEFAULT_ZOOM, INDICATORS as AREA_INDICATORS, area_data, boundary_payload
+from batch import answer_batch
+from boundaries import LAYERS as BOUNDARY_LAYERS
+from deadline import Degraded, budget
+import integrated
+from integrated import answer_intent, intent_cost, resolve_intent
+from instrumentation import drop_trace, finish_trace, record_intent, render_metrics, stage, start_trace
+import process_pool
+from profiling import admin_enabled, get_profile_path, is_admin, list_profiles, profile_request, should_profile
+from spatial_agg import MAX_CLUSTERS, cluster_points, highlight_store, parse_bbox
+from tiles import LAYERS as TILE_LAYERS, get_tile, valid_tile
+
+@asynccontextmanager
+async def lifespan(app):
+    # Fork the CPU workers before the first request starts any threads
+    workers = process_pool.start()
+    if workers:
+        print(f"Started {workers} worker processes for CPU-bound questions.")
+    yield
+    process_pool.stop()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # For development, allow all. Restrict in production.
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Compresses large /chat and tile responses; already-encoded responses pass through untouched
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+# Upper bound on prompts per /chat/batch call
+MAX_BATCH_SIZE = int(os.environ.get("POTHOLE_MAX_BATCH_SIZE", "25"))
+
+# Per-client rate limits and per-cost-class queues in front of the handlers
+admission = AdmissionController()
+
+def _to_payload(response_tuple, zoom=None, bbox=None):
+    """Turn a handler answer into the JSON-ready {"response", "highlight_data"} dict."""
+    # answer_intent returns (response, plot_object, highlight_data_df)
+    if not isinstance(response_tuple, tuple):
+        return {"response": response_tuple, "highlight_data": None}
+    payload = {"response": response_tuple[0], "highlight_data": None}
+    if isinstance(response_tuple, Degraded):
+        # The handler ran short of time and fell back to a cheaper answer; the frontend shows why
+        payload["degraded"] = response_tuple.reasons
+    if len(response_tuple) > 1 and response_tuple[1] is not None:
+        # Plots are not sent to the client; release the figure so it does not pile up
+        plt.close(response_tuple[1])
+    if len(response_tuple) > 2 and response_tuple[2] is not None:
+        highlight_df = response_tuple[2]
+        try:
+            if len(highlight_df) > MAX_CLUSTERS:
+                # Too many points to draw one by one; send clusters and keep the
+                # full result so the map can ask for finer clusters as it zooms in
+                payload["highlight_id"] = highlight_store.put(highlight_df)
+                highlight_df, info = cluster_points(highlight_df, zoom=zoom, bbox=bbox)
+                payload["highlight_clustered"] = info["clustered"]
+            # Convert DataFrame to list of dicts for JSON serialization
+            payload["highlight_data"] = highlight_df.to_dict('records')
+        except Exception:
+            payload["highlight_data"] = None
+    return payload
+
+def _answer(handler, kwargs, trace, zoom=None, bbox=None):
+    response_tuple = answer_intent(handler, kwargs)
+    with stage("serialization"):
+        payload = _to_payload(response_tuple, zoom, bbox)
+        result = JSONResponse(payload)
+    trace.payload_bytes = len(result.body)
+    trace.highlight_rows = len(payload["highlight_data"]) if payload["highlight_data"] else 0
+    return result
+
+def _chat(user_message, handler, kwargs, trace, zoom, bbox, profile):
+    if not profile:
+        with budget():
+            return _answer(handler, kwargs, trace, zoom, bbox)
+    with profile_request(user_message) as capture, budget():
+        result = _answer(handler, kwargs, trace, zoom, bbox)
+        capture.intent = trace.intent
+    if capture.profile_id:
+        result.headers["X-Profile-Id"] = capture.profile_id
+    return result
 
 @app.post("/chat")
 async def chat(request: Request):
     data = await request.json()
-    user_message = data.get("message", "")
-    response_tuple = get_groq_response(user_message)
-    # get_groq_response returns (response, plot_object, highlight_data_df)
-    if isinstance(response_tuple, tuple):
-        response = response_tuple[0]
-        highlight_data = None
-        if len(response_tuple) > 2 and response_tuple[2] is not None:
-            try:
-                # Convert DataFrame to list of dicts for JSON serialization
-                highlight_data = response_tuple[2].to_dict('records')
-            except Exception:
-                highlight_data = None
-    else:
-        response = response_tuple
-        highlight_data = None
-    return {"response": response, "highlight_data": highlight_data}
+    try:
+        admission.check_rate(client_id(request))
+    except Rejected as e:
+        return e.response()
+    trace = start_trace()
+    try:
+        user_message = data.get("message", "")
+        # Optional map view; large highlight results are clustered for it
+        zoom = data.get("zoom")
+        bbox = parse_bbox(data.get("bbox"))
+        # Routing is a few regexes; it decides which lane the question waits in
+        handler, kwargs = resolve_intent(user_message)
+        record_intent(handler.__name__)
+        # Handlers block, so they run on the worker threads; that also lets identical
+        # concurrent questions share one answer (integrated.answer_flights)
+        async with admission.admit(intent_cost(handler)):
+            return await run_in_threadpool(_chat, user_message, handler, kwargs, trace, zoom, bbox, should_profile(request))
+    except Rejected as e:
+        trace = None
+        drop_trace()
+        return e.response()
+    finally:
+        if trace is not None:
+            finish_trace(trace)
+
+def _batch(messages, resolved):
+    with budget():
+        return answer_batch(messages, resolved)
+
+@app.post("/chat/batch")
+async def chat_batch(request: Request):
+    data = await request.json()
+    messages = data.get("messages")
+    if not isinstance(messages, list) or not all(isinstance(m, str) for m in messages):
+        raise HTTPException(status_code=400, detail="'messages' must be a list of strings.")
+    if len(messages) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_SIZE} messages per batch.")
+    try:
+        admission.check_rate(client_id(request))
+    except Rejected as e:
+        return e.response()
+    trace = start_trace()
+    record_intent("chat_batch")
+    try:
+        resolved = [resolve_intent(message) for message in messages]
+        # The whole batch waits in the lane of its most expensive question
+        lane = max((intent_cost(handler) for handler, _ in resolved), key=LANE_ORDER.index, default=LANE_ORDER[0])
+        async with admission.admit(lane):
+            answers = await run_in_threadpool(_batch, messages, resolved)
+        with stage("serialization"):
+            payloads = [_to_payload(answer) for answer in answers]
+            result = JSONResponse({"responses": payloads})
+        trace.payload_bytes = len(result.body)
+        trace.highlight_rows = sum(len(p["highlight_data"]) for p in payloads if p["highlight_data"])
+        return result
+    except Rejected as e:
+        trace = None
+        drop_trace()
+        return e.response()
+    finally:
+        if trace is not None:
+            finish_trace(trace)
+
+@app.get("/highlights/{highlight_id}")
+def get_highlights(highlight_id: str, zoom: Optional[float] = None, bbox: Optional[str] = None):
+    """Re-cluster a stored highlight result for the current map view."""
+    highlight_df = highlight_store.get(highlight_id)
+    if highlight_df is None:
+        raise HTTPException(status_code=404, detail="Highlight result expired or unknown.")
+    clustered_df, info = cluster_points(highlight_df, zoom=zoom, bbox=parse_bbox(bbox))
+    return JSONResponse({
+        "highlight_data": clustered_df.to_dict('records'),
+        "highlight_clustered": info["clustered"],
+        "zoom": info["zoom"],
+        "total": info["total"],
+    })
+
+@app.get("/tiles/{layer}/{z}/{x}/{y}.mvt")
+def get_vector_tile(layer: str, z: int, x: int, y: int, request: Request):
+    if layer not in TILE_LAYERS:
+        raise HTTPException(status_code=404, detail=f"Unknown layer. Available: {', '.join(TILE_LAYERS)}.")
+    if not valid_tile(z, x, y):
+        raise HTTPException(status_code=400, detail="Tile coordinates out of range.")
+    data, etag = get_tile(layer, z, x, y)
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=86400"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type="application/vnd.mapbox-vector-tile", headers=headers)
+
+# --- Dashboard API: precomputed per-ZIP indicators, profiles and boundaries ---
+def _cached_response(request: Request, payload):
+    headers = {"Cache-Control": CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    if_none_match = request.headers.get("if-none-match", "")
+    body, etag, encoding = payload.select(request.headers.get("accept-encoding"))
+    headers["ETag"] = etag
+    if any(tag.strip() in payload.etags() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.get("/api/indicators")
+def api_indicators(request: Request, indicator: str = "pothole_complaints"):
+    if indicator not in AREA_INDICATORS:
+        raise HTTPException(status_code=404, detail=f"Unknown indicator. Available: {', '.join(AREA_INDICATORS)}.")
+    return _cached_response(request, area_data().indicators[indicator])
+
+@app.get("/api/profiles/{area_id}")
+def api_profile(area_id: str, request: Request):
+    payload = area_data().profiles.get(area_id)
+    if payload is None:
+        raise HTTPException(status_code=404, detail="Area not found.")
+    return _cached_response(request, payload)
+
+@app.get("/api/geo")
+def api_geo(request: Request, zoom: float = GEO_DEFAULT_ZOOM):
+    return _cached_response(request, area_data().geo(zoom))
+
+@app.get("/api/boundaries/{layer}")
+def api_boundaries(layer: str, request: Request, zoom: float = GEO_DEFAULT_ZOOM, format: str = "topojson"):
+    if layer not in BOUNDARY_LAYERS:
+        raise HTTPException(status_code=404, detail=f"Unknown layer. Available: {', '.join(BOUNDARY_LAYERS)}.")
+    if format not in ("topojson", "geojson"):
+        raise HTTPException(status_code=400, detail="format must be 'topojson' or 'geojson'.")
+    payload = boundary_payload(layer, zoom, format)
+    if payload is None:
+        raise HTTPException(status_code=404, detail="Boundary levels not built yet; run `python boundaries.py`.")
+    return _cached_response(request, payload)
+
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+# --- Admin endpoints: need X-Admin-Token to match POTHOLE_ADMIN_TOKEN ---
+def _require_admin(request: Request):
+    if not admin_enabled():
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled; set POTHOLE_ADMIN_TOKEN to enable them.")
+    if not is_admin(request):
+        raise HTTPException(status_code=403, detail="Admin access required.")
+
+# --- Admin: captured request profiles ---
+@app.get("/admin/profiles")
+def admin_list_profiles(request: Request):
+    _require_admin(request)
+    return {"profiles": list_profiles()}
+
+@app.get("/admin/profiles/{profile_id}")
+def admin_get_profile(profile_id: str, request: Request):
+    _require_admin(request)
+    path = get_profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    return FileResponse(path, filename=os.path.basename(path))
+
+# --- Admin: new daily case counts for the forecasts ---
+@app.post("/admin/forecast/observations")
+async def admin_forecast_observations(request: Request):
+    _require_admin(request)
+    if integrated.pothole_forecaster is None:
+        raise HTTPException(status_code=503, detail="Daily case history is not loaded.")
+    data = await request.json()
+    observations = data.get("observations")
+    if not isinstance(observations, list):
+        raise HTTPException(status_code=400, detail="'observations' must be a list of {date, cases}.")
+    added = 0
+    # Oldest first, so every day extends the series
+    try:
+        rows = sorted((pd.Timestamp(o["date"]), float(o["cases"])) for o in observations)
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Each observation needs a 'date' and numeric 'cases'.")
+    for date, cases in rows:
+        added += integrated.pothole_forecaster.observe(date, cases)
+    return {"added": added, "as_of": integrated.pothole_forecaster.as_of.strftime("%Y-%m-%d")}
+
+# --- Admin: new road complaints for the street histories ---
+@app.post("/admin/complaints")
+async def admin_complaints(request: Request):
+    _require_admin(request)
+    if integrated.complaint_history is None:
+        raise HTTPException(status_code=503, detail="Complaint history is not loaded.")
+    data = await request.json()
+    complaints = data.get("complaints")
+    if not isinstance(complaints, list):
+        raise HTTPException(status_code=400, detail="'complaints' must be a list of {street, opened}.")
+    try:
+        records = pd.DataFrame({
+            "MSAG_Name": [str(c["street"]) for c in complaints],
+            "OPENEDDATETIME": [pd.Timestamp(c["opened"]) for c in complaints],
+        })
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Each complaint needs a 'street' and an 'opened' date.")
+    return {"added": integrated.ingest_complaints(records)}
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=5005) 
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=5005)
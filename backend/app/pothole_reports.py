@@ -0,0 +1,165 @@
+"""
+Segment-level pothole reports (Potholes_on_COSA_Streets.csv).
+
+Each row ties one 311 pothole case (CASEID) to the pavement segment it was
+reported on (CartID); a case that spans two segments has a row for each. The
+table is loaded once into columns with two hash indexes:
+  * CASEID -> rows, for looking a case up with its terrain
+    (potholes_elev_sidewalks.csv)
+  * CartID -> rows, joined to the pavement segments (street, district, PCI,
+    location)
+Report totals per segment and per street id (streets.py) are counted at load,
+so "how many potholes on X" and "which streets have the most potholes" are
+array reads instead of a group-by per question.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+TERRAIN_COLUMNS = ["avg_elevation", "avg_slope", "avg_roughness", "sidewalk_ratio"]
+SEGMENT_COLUMNS = ["MSAG_Name", "District", "PCI", "Latitude", "Longitude"]
+
+
+def _cart_ids(values):
+    """CartIDs as nullable integers; the CSV quotes them and some exports add a ".0"."""
+    return pd.to_numeric(pd.Series(values, dtype="str").str.replace(r"\.0$", "", regex=True), errors="coerce").astype("Int64")
+
+
+class KeyIndex:
+    """Hash index from a key column to its row positions.
+
+    Keys are factorized once (a hash table), and rows are grouped by key code
+    so each key's rows are one contiguous slice.
+    """
+
+    def __init__(self, keys):
+        codes, uniques = pd.factorize(pd.Series(keys), use_na_sentinel=True)
+        self.keys = pd.Index(uniques)
+        self.counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        order = np.argsort(codes, kind="stable")
+        self._order = order[codes[order] >= 0]
+        self._offsets = np.concatenate([[0], np.cumsum(self.counts)])
+
+    def __len__(self):
+        return len(self.keys)
+
+    def codes(self, keys):
+        """Key codes for `keys`; -1 for keys not in the index."""
+        return self.keys.get_indexer(pd.Index(np.atleast_1d(keys)))
+
+    def rows(self, key):
+        """Row positions of one key (empty when absent)."""
+        code = self.codes(key)[0]
+        if code < 0:
+            return np.array([], dtype=np.int64)
+        return self._order[self._offsets[code]:self._offsets[code + 1]]
+
+    def count(self, keys):
+        """Rows per key, 0 for keys not in the index."""
+        codes = self.codes(keys)
+        return np.where(codes >= 0, self.counts[np.maximum(codes, 0)], 0)
+
+
+class PotholeReports:
+    def __init__(self, reports, terrain=None, segments=None, street_index=None):
+        """`reports`: CASEID, CartID, MSAG_Name; `terrain`: CASEID + TERRAIN_COLUMNS; `segments`: pavement rows with CartID."""
+        reports = reports.dropna(subset=["CASEID"]).reset_index(drop=True)
+        self.case_id = reports["CASEID"].to_numpy(dtype=np.int64)
+        self.cart_id = _cart_ids(reports["CartID"]).to_numpy(dtype=np.float64, na_value=np.nan)
+        self.street = reports["MSAG_Name"].to_numpy(dtype=object)
+        self.by_case = KeyIndex(self.case_id)
+        self.by_segment = KeyIndex(pd.Series(self.cart_id).astype("Int64"))
+
+        # Terrain is measured per case; cases split over two segments have one row per part, so average them
+        self.terrain = pd.DataFrame(index=self.by_case.keys)
+        if terrain is not None and not terrain.empty:
+            columns = [c for c in TERRAIN_COLUMNS if c in terrain.columns]
+            self.terrain = terrain.groupby("CASEID")[columns].mean().reindex(self.by_case.keys)
+
+        # Per-segment totals joined to the pavement segment attributes
+        table = pd.DataFrame({"potholes": self.by_segment.counts}, index=self.by_segment.keys.rename("CartID"))
+        if segments is not None and not segments.empty and "CartID" in segments.columns:
+            attributes = segments.assign(CartID=_cart_ids(segments["CartID"])).dropna(subset=["CartID"])
+            attributes = attributes.drop_duplicates("CartID").set_index("CartID")
+            table = table.join(attributes[[c for c in SEGMENT_COLUMNS if c in attributes.columns]], how="left")
+        if "MSAG_Name" not in table.columns or table["MSAG_Name"].isna().any():
+            # Segments missing from the pavement file keep the street named on their reports
+            named = pd.Series(self.street).groupby(self.cart_id).first()
+            named.index = named.index.astype(np.int64)
+            fallback = table.index.to_series().map(named)
+            table["MSAG_Name"] = table["MSAG_Name"].fillna(fallback) if "MSAG_Name" in table.columns else fallback
+        self.segments = table
+
+        # Per-street totals over the shared street ids
+        self.street_id = None
+        self.segment_street = None
+        self.street_counts = np.zeros(0, dtype=np.int64)
+        self.street_segments = np.zeros(0, dtype=np.int64)
+        if street_index is not None:
+            self.street_id = street_index.add(self.street)
+            known = self.street_id >= 0
+            self.street_counts = np.bincount(self.street_id[known], minlength=len(street_index))
+            self.segment_street = street_index.add(table["MSAG_Name"])
+            self.street_segments = np.bincount(self.segment_street[self.segment_street >= 0], minlength=len(street_index))
+            self._street_names = street_index.names
+
+    def __len__(self):
+        return len(self.case_id)
+
+    @property
+    def case_count(self):
+        return len(self.by_case)
+
+    def case(self, case_id):
+        """The segment rows of one case, with its terrain; an empty frame when unknown."""
+        rows = self.by_case.rows(case_id)
+        frame = pd.DataFrame({"CASEID": self.case_id[rows], "CartID": pd.array(self.cart_id[rows]).astype("Int64"), "MSAG_Name": self.street[rows]})
+        if rows.size and not self.terrain.empty:
+            frame = frame.join(self.terrain, on="CASEID")
+        return frame
+
+    def segment_counts(self, cart_ids):
+        """Pothole reports on each segment in `cart_ids`."""
+        return self.by_segment.count(_cart_ids(cart_ids))
+
+    def street_totals(self, street_ids):
+        """(reports, segments with reports) summed over the given street ids."""
+        ids = np.asarray([i for i in street_ids if 0 <= i < len(self.street_counts)], dtype=np.int64)
+        return int(self.street_counts[ids].sum()), int(self.street_segments[ids].sum())
+
+    def street_locations(self, street_ids):
+        """MSAG_Name, Latitude, Longitude of the reported segments on the given streets.
+
+        Empty when the segments have no coordinates (no pavement file was loaded).
+        """
+        columns = ["MSAG_Name", "Latitude", "Longitude"]
+        if self.segment_street is None or not {"Latitude", "Longitude"} <= set(self.segments.columns):
+            return pd.DataFrame(columns=columns)
+        located = self.segments[np.isin(self.segment_street, list(street_ids))]
+        return located.dropna(subset=["Latitude", "Longitude"])[columns].reset_index(drop=True)
+
+    def top_streets(self, n=10):
+        """The `n` streets with the most reports: street_id, MSAG_Name (canonical), potholes, segments."""
+        if not len(self.street_counts):
+            return pd.DataFrame(columns=["street_id", "MSAG_Name", "potholes", "segments"])
+        top = np.argsort(-self.street_counts, kind="stable")[:n]
+        top = top[self.street_counts[top] > 0]
+        return pd.DataFrame({
+            "street_id": top,
+            "MSAG_Name": [self._street_names[i] for i in top],
+            "potholes": self.street_counts[top],
+            "segments": self.street_segments[top],
+        })
+
+
+def load_reports(path, terrain_path=None, segments=None, street_index=None):
+    """Pothole reports with their terrain and segments, or None when the file is missing."""
+    if not os.path.exists(path):
+        return None
+    reports = pd.read_csv(path, usecols=["CASEID", "CartID", "MSAG_Name"], dtype={"CartID": str})
+    terrain = None
+    if terrain_path and os.path.exists(terrain_path):
+        terrain = pd.read_csv(terrain_path, usecols=lambda c: c == "CASEID" or c in TERRAIN_COLUMNS)
+    return PotholeReports(reports, terrain, segments, street_index)
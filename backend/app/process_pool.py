@@ -0,0 +1,106 @@
+"""
+Worker processes for CPU-bound intents.
+
+The pyplot analyses spend about 100 ms drawing, and pyplot's global state
+makes threads take turns (integrated._pyplot_lock). The sensitive-area scans
+are pandas loops that hold the GIL. Either way one such question uses one
+core while the others wait. The intents in integrated.PROCESS_HANDLERS run
+instead in a pool of worker processes forked once at startup, after the data
+is loaded:
+  * each worker sees the loaded tables through the parent's copy-on-write
+    pages, so nothing is reloaded or copied up front
+  * only the handler's name and parameters go to the worker; the answer text
+    and highlight points come back pickled (protocol 5)
+  * figures stay in the worker and are closed there, since /chat never sends them
+  * the worker answers within what is left of the request's budget, and the
+    reasons it degraded its answer (deadline.degrade) come back with it
+The workers only see data as it was at startup, so a handler that reads state
+changed later (POST /admin/...) must not be in PROCESS_HANDLERS.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
+
+import pandas as pd
+
+from deadline import Degraded, budget, collect, degrade, remaining
+
+# One core is left for the server's own threads; 0 turns the pool off
+PROCESS_WORKERS = int(os.environ.get("POTHOLE_PROCESS_WORKERS", max(0, min(4, (os.cpu_count() or 1) - 1))))
+TIMED_OUT_ANSWER = "That question is taking longer than usual to answer. Please try again in a moment."
+
+_pool = None
+
+
+def _ready(_):
+    return True
+
+
+def _call(name, kwargs, seconds):
+    import matplotlib.pyplot as plt
+
+    import integrated  # already loaded: the worker is a fork of the server
+
+    with nullcontext() if seconds is None else budget(seconds):
+        answer = collect(integrated.run_intent, getattr(integrated, name), kwargs, local=True)
+    response, fig, highlight_df = answer
+    if fig is not None:
+        plt.close(fig)
+    return (response, None, highlight_df), getattr(answer, "reasons", [])
+
+
+def start(workers=PROCESS_WORKERS):
+    """Fork the workers; call once the data is loaded and before the server starts its threads."""
+    global _pool
+    if _pool is not None or workers <= 0 or "fork" not in multiprocessing.get_all_start_methods():
+        return 0
+    _pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork"))
+    # The fork context starts every worker on the first submit, so this forks them all now
+    list(_pool.map(_ready, range(workers)))
+    return workers
+
+
+def stop():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+def running():
+    return _pool is not None
+
+
+def run(handler, kwargs):
+    """Answer in a worker process.
+
+    None if the pool is not running or a worker died; the caller then answers
+    in-process. When no answer comes back within the request's budget, the
+    answer is a Degraded apology: answering again in-process would only
+    compute it twice, after the budget is gone.
+    """
+    global _pool
+    pool = _pool
+    if pool is None:
+        return None
+    seconds = remaining()
+    future = pool.submit(_call, handler.__name__, kwargs, seconds)
+    try:
+        answer, reasons = future.result(timeout=None if seconds is None else max(0.0, seconds))
+    except FutureTimeout:
+        # Still queued behind other questions (or slow): free the slot if it has not started
+        future.cancel()
+        reason = "The analysis did not finish within the time allowed for this question."
+        degrade(reason)
+        return Degraded((TIMED_OUT_ANSWER, None, pd.DataFrame()), [reason])
+    except BrokenProcessPool:
+        # Forking again from the threaded server is unsafe; answer in-process from now on
+        print("A process pool worker died; CPU-bound intents now run in-process.")
+        _pool = None
+        return None
+    for reason in reasons:
+        degrade(reason)
+    return answer
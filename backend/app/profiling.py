@@ -0,0 +1,176 @@
+import cProfile
+import hmac
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+try:
+    from pyinstrument import Profiler as _PyinstrumentProfiler
+    from pyinstrument.renderers import SpeedscopeRenderer
+except ImportError:  # pyinstrument is optional; cProfile is always available
+    _PyinstrumentProfiler = None
+
+# ---------- Profiling configuration ----------
+# A /chat request is profiled when an admin sends "X-Profile: 1" or adds "?profile=1",
+# or when it is picked by POTHOLE_PROFILE_SAMPLE_RATE (0.0-1.0). Everything else pays
+# one check.
+PROFILE_DIR = os.environ.get("POTHOLE_PROFILE_DIR", "profiles")
+PROFILE_SAMPLE_RATE = float(os.environ.get("POTHOLE_PROFILE_SAMPLE_RATE", "0") or 0)
+PROFILE_KEEP = int(os.environ.get("POTHOLE_PROFILE_KEEP", "50"))
+PROFILER = os.environ.get("POTHOLE_PROFILER", "pyinstrument" if _PyinstrumentProfiler else "cprofile")
+ADMIN_TOKEN = os.environ.get("POTHOLE_ADMIN_TOKEN")  # unset disables the admin endpoints
+
+_PROFILE_ID_RE = re.compile(r"^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$")
+# Only one profiler can be attached to the interpreter at a time
+_profiler_lock = threading.Lock()
+# Set while the current request is being profiled
+_profiling = ContextVar("pothole_profiling", default=False)
+
+
+def should_profile(request):
+    """Decide whether this request gets profiled (admin header or query parameter, or sampling).
+
+    Profiling serializes requests on one lock and writes to disk, so anyone else
+    asking for it is answered unprofiled.
+    """
+    asked = (
+        request.headers.get("x-profile", "").lower() in ("1", "true", "yes")
+        or request.query_params.get("profile", "").lower() in ("1", "true", "yes")
+    )
+    if asked and is_admin(request):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def profiling():
+    """True while the current request is being profiled, so its work stays in this process."""
+    return _profiling.get()
+
+
+def admin_enabled():
+    """Admin endpoints exist only when POTHOLE_ADMIN_TOKEN is set."""
+    return bool(ADMIN_TOKEN)
+
+
+def is_admin(request):
+    """True when the request's X-Admin-Token header matches POTHOLE_ADMIN_TOKEN.
+
+    There is no fallback without a token: behind a reverse proxy every client
+    looks like localhost.
+    """
+    if not ADMIN_TOKEN:
+        return False
+    return hmac.compare_digest(request.headers.get("x-admin-token", "").encode(), ADMIN_TOKEN.encode())
+
+
+class ProfileCapture:
+    """Handle yielded by profile_request(); `profile_id` is set once the profile is saved."""
+
+    def __init__(self):
+        self.profile_id = None
+        self.intent = None
+
+
+@contextmanager
+def profile_request(prompt):
+    """Profile the enclosed block and save it under PROFILE_DIR.
+
+    With pyinstrument installed the profile is a speedscope JSON file (open it at
+    https://www.speedscope.app); otherwise it is a cProfile .prof file that
+    snakeviz, flameprof or `python -m pstats` can read.
+    """
+    capture = ProfileCapture()
+    if not _profiler_lock.acquire(blocking=False):
+        # Another request is being profiled; answer this one unprofiled
+        yield capture
+        return
+    try:
+        use_pyinstrument = PROFILER == "pyinstrument" and _PyinstrumentProfiler is not None
+        profiler = _PyinstrumentProfiler(interval=0.001) if use_pyinstrument else cProfile.Profile()
+        started = time.time()
+        if use_pyinstrument:
+            profiler.start()
+        else:
+            profiler.enable()
+        token = _profiling.set(True)
+        try:
+            yield capture
+        finally:
+            _profiling.reset(token)
+            if use_pyinstrument:
+                profiler.stop()
+            else:
+                profiler.disable()
+            duration = time.time() - started
+            capture.profile_id = _save_profile(profiler, use_pyinstrument, prompt, capture.intent, started, duration)
+    finally:
+        _profiler_lock.release()
+
+
+def _save_profile(profiler, use_pyinstrument, prompt, intent, started, duration):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profile_id = time.strftime("%Y%m%dT%H%M%S", time.gmtime(started)) + "-" + uuid.uuid4().hex[:8]
+    if use_pyinstrument:
+        filename = f"{profile_id}.speedscope.json"
+        with open(os.path.join(PROFILE_DIR, filename), "w") as f:
+            f.write(profiler.output(renderer=SpeedscopeRenderer()))
+    else:
+        filename = f"{profile_id}.prof"
+        profiler.dump_stats(os.path.join(PROFILE_DIR, filename))
+    meta = {
+        "id": profile_id,
+        "file": filename,
+        "format": "speedscope" if use_pyinstrument else "pstats",
+        "prompt": prompt,
+        "intent": intent,
+        "started": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(started)),
+        "duration_ms": round(duration * 1000, 3),
+    }
+    with open(os.path.join(PROFILE_DIR, f"{profile_id}.meta.json"), "w") as f:
+        json.dump(meta, f)
+    _prune_profiles()
+    return profile_id
+
+
+def _prune_profiles():
+    """Keep only the newest PROFILE_KEEP profiles on disk."""
+    profiles = list_profiles()
+    for meta in profiles[PROFILE_KEEP:]:
+        for name in (meta["file"], f"{meta['id']}.meta.json"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, name))
+            except OSError:
+                pass
+
+
+def list_profiles():
+    """Metadata of stored profiles, newest first."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in os.listdir(PROFILE_DIR):
+        if name.endswith(".meta.json"):
+            try:
+                with open(os.path.join(PROFILE_DIR, name)) as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    profiles.sort(key=lambda meta: meta["id"], reverse=True)
+    return profiles
+
+
+def get_profile_path(profile_id):
+    """Path to a stored profile file, or None for unknown or malformed ids."""
+    if not _PROFILE_ID_RE.match(profile_id):
+        return None
+    for suffix in (".speedscope.json", ".prof"):
+        path = os.path.join(PROFILE_DIR, profile_id + suffix)
+        if os.path.exists(path):
+            return path
+    return None
@@ -22,6 +22,7 @@ import duckdb # will serve as our local database
 import re
 from typing import List, Optional, Union
 import os
+from instrumentation import debug
 
 
 # Our RAG solution should receive either street name, district, zipcode, or a combination of such. We may also send in optional parameters such as year, month, day (Monday, Tuesday,...) for which to base the query on, and return the relevant records.
@@ -47,10 +48,26 @@ else:
 import re
 from typing import Optional, Union, List
 
-def query_table(street=None, year=None, zipcode=None, district=None):
-    # Check if the potholes table exists
+def _has_potholes_table():
     tables = conn.execute("SHOW TABLES").fetchall()
-    if not any("potholes" in t for t in tables):
+    return any("potholes" in t for t in tables)
+
+
+def street_names():
+    """Distinct street_name spellings in the potholes table, for the shared street index."""
+    if not _has_potholes_table():
+        return []
+    return [row[0] for row in conn.sql("SELECT DISTINCT street_name FROM potholes WHERE street_name IS NOT NULL").fetchall()]
+
+
+def query_table(street=None, year=None, zipcode=None, district=None, street_names=None):
+    """Pothole records filtered by street, year, zipcode and district.
+
+    `street_names` (exact spellings resolved through the street index) replaces
+    the substring match on `street`; an empty list matches nothing.
+    """
+    # Check if the potholes table exists
+    if not _has_potholes_table():
         print("Warning: potholes table does not exist. Returning empty result.")
         return []
     base_query = """
@@ -59,7 +76,12 @@ def query_table(street=None, year=None, zipcode=None, district=None):
     """
     params = []
 
-    if isinstance(street, str):
+    if street_names is not None:
+        if not street_names:
+            return []
+        base_query += " AND street_name IN (SELECT UNNEST(?::VARCHAR[]))"
+        params.append(list(street_names))
+    elif isinstance(street, str):
         safe_street = street.replace("'", "''")
         base_query += f" AND street_name ILIKE '%{safe_street}%'"
 
@@ -79,9 +101,9 @@ def query_table(street=None, year=None, zipcode=None, district=None):
         base_query += " AND council_district = ?"
         params.append(district)
 
-    # Place the debug prints here, after base_query is fully constructed
-    print("QUERY:", base_query)
-    print("PARAMS:", params)
+    # Place the debug output here, after base_query is fully constructed
+    debug("QUERY: %s", base_query)
+    debug("PARAMS: %s", params)
 
     return conn.sql(base_query, params=params).fetchall()
 # def query_table(street=None, year: Union[int, str, None] = 2024, zipcode = None, district = None) -> List[tuple]:
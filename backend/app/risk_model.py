@@ -0,0 +1,315 @@
+"""
+Pothole formation risk model.
+
+An L2-regularized logistic regression predicts whether a pavement segment gets a
+pothole complaint in the next year. It uses the segment's condition, its recent
+complaint history and the prebuilt terrain and drainage features from
+features.py. Training is offline:
+    python risk_model.py
+fits the model, checks it on the most recent full year of complaints against
+the old fixed-weight formula, and writes the coefficients to JSON. At startup
+integrated.py scores every segment with one matrix product and rolls the
+probabilities up to streets, so the risk answers are lookups.
+"""
+
+import argparse
+import json
+import os
+import warnings
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+MODEL_PATH = os.environ.get("POTHOLE_RISK_MODEL", os.path.join("..", "Data", "models", "risk_model.json"))
+HISTORY_DAYS = 730  # complaint history used as a feature, matching the old two-year window
+HORIZON_DAYS = 365  # what the model predicts: a complaint within the next year
+L2 = 1.0
+FEATURES = [
+    "deterioration",             # 100 - PCI
+    "recent_complaints",         # log1p(complaints on the segment in the history window)
+    "street_recent_complaints",  # log1p(complaints on the whole street in the history window)
+    "maintenance_age",           # years since the segment was installed or last treated in an IMP project
+    "log_length",                # log1p(segment length in feet)
+    "avg_slope",
+    "avg_roughness",
+    "sidewalk_ratio",
+    "drainage_score",
+    "hydrologic_score",
+    "flood_score",
+]
+TERRAIN_FEATURES = FEATURES[5:]
+
+
+def _segment_ids(series):
+    return pd.to_numeric(series, errors="coerce").astype("Int64")
+
+
+def latest_date(complaints):
+    latest = complaints["OPENEDDATETIME"].max()
+    return pd.Timestamp(datetime.now()) if pd.isna(latest) else latest
+
+
+def segment_frame(pavement, complaints, segment_features, cutoff, treatments=None):
+    """One row per pavement segment with the model features as of `cutoff`.
+
+    `treatments` (a treatments.TreatmentIndex) moves the maintenance age to the
+    segment's latest IMP treatment when that is newer than its install date.
+    """
+    segments = pd.DataFrame({
+        "segment": _segment_ids(pavement["CartID"]),
+        "MSAG_Name": pavement["MSAG_Name"],
+        "District": pavement.get("District"),
+        "PCI": pd.to_numeric(pavement["PCI"], errors="coerce"),
+        "InstallDate": pd.to_datetime(pavement.get("InstallDate"), errors="coerce"),
+        "LengthFeet": pd.to_numeric(pavement.get("LengthFeet"), errors="coerce"),
+        "Latitude": pavement.get("Latitude"),
+        "Longitude": pavement.get("Longitude"),
+    })
+    segments = segments.dropna(subset=["segment"]).drop_duplicates("segment").reset_index(drop=True)
+
+    opened = complaints["OPENEDDATETIME"]
+    history = complaints[(opened >= cutoff - pd.Timedelta(days=HISTORY_DAYS)) & (opened < cutoff)]
+    segment_counts = history.groupby(_segment_ids(history["CartID"])).size()
+    street_counts = history.groupby("MSAG_Name").size()
+    segments["Recent_Complaint_Count"] = segments["segment"].map(segment_counts).fillna(0).to_numpy()
+    segments["Street_Complaint_Count"] = segments["MSAG_Name"].map(street_counts).fillna(0).to_numpy()
+    install_age = ((cutoff - segments["InstallDate"]).dt.days / 365.25).clip(lower=0)
+    if treatments is not None:
+        segments["Years_Since_Treatment"] = treatments.years_since_treatment(segments["segment"], cutoff)
+        segments["Maintenance_Age_Years"] = segments["Years_Since_Treatment"].where(
+            segments["Years_Since_Treatment"] < install_age.fillna(np.inf), install_age)
+    else:
+        segments["Years_Since_Treatment"] = np.nan
+        segments["Maintenance_Age_Years"] = install_age
+
+    segments["deterioration"] = 100 - segments["PCI"]
+    segments["recent_complaints"] = np.log1p(segments["Recent_Complaint_Count"])
+    segments["street_recent_complaints"] = np.log1p(segments["Street_Complaint_Count"])
+    segments["maintenance_age"] = segments["Maintenance_Age_Years"]
+    segments["log_length"] = np.log1p(segments["LengthFeet"])
+    if segment_features is not None and not segment_features.empty:
+        terrain = segment_features[["CartID"] + TERRAIN_FEATURES].assign(segment=_segment_ids(segment_features["CartID"]))
+        segments = segments.merge(terrain.drop(columns="CartID"), on="segment", how="left")
+    else:
+        for column in TERRAIN_FEATURES:
+            segments[column] = np.nan
+    return segments
+
+
+def complained_segments(complaints, cutoff, days=HORIZON_DAYS):
+    opened = complaints["OPENEDDATETIME"]
+    window = complaints[(opened >= cutoff) & (opened < cutoff + pd.Timedelta(days=days))]
+    return set(_segment_ids(window["CartID"]).dropna())
+
+
+def fit_logistic(X, y, l2=L2, max_iter=50):
+    """Newton-Raphson for L2-penalized logistic regression; the intercept is not penalized."""
+    Xb = np.hstack([np.ones((len(X), 1)), X])
+    penalty = np.full(Xb.shape[1], float(l2))
+    penalty[0] = 0.0
+    w = np.zeros(Xb.shape[1])
+    for _ in range(max_iter):
+        p = 1.0 / (1.0 + np.exp(-np.clip(Xb @ w, -30, 30)))
+        gradient = Xb.T @ (p - y) + penalty * w
+        hessian = (Xb * (p * (1 - p))[:, None]).T @ Xb + np.diag(penalty)
+        step = np.linalg.solve(hessian + 1e-9 * np.eye(len(w)), gradient)
+        w -= step
+        if np.max(np.abs(step)) < 1e-8:
+            break
+    return w[0], w[1:]
+
+
+class RiskModel:
+    def __init__(self, features, mean, scale, intercept, weights, metadata=None):
+        self.features = list(features)
+        self.mean = np.asarray(mean, dtype=float)
+        self.scale = np.asarray(scale, dtype=float)
+        self.intercept = float(intercept)
+        self.weights = np.asarray(weights, dtype=float)
+        self.metadata = metadata or {}
+
+    def matrix(self, frame):
+        """Standardized feature matrix; missing values sit at the training mean (0)."""
+        X = (frame[self.features].to_numpy(dtype=float) - self.mean) / self.scale
+        return np.nan_to_num(X, nan=0.0)
+
+    def predict(self, frame):
+        z = self.matrix(frame) @ self.weights + self.intercept
+        return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+    def to_dict(self):
+        return {
+            "features": self.features,
+            "mean": self.mean.round(6).tolist(),
+            "scale": self.scale.round(6).tolist(),
+            "intercept": round(self.intercept, 6),
+            "weights": self.weights.round(6).tolist(),
+            **self.metadata,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        known = {"features", "mean", "scale", "intercept", "weights"}
+        metadata = {k: v for k, v in data.items() if k not in known}
+        return cls(data["features"], data["mean"], data["scale"], data["intercept"], data["weights"], metadata)
+
+
+def load_model(path=MODEL_PATH):
+    """The persisted model, or None when it has not been trained."""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return RiskModel.from_dict(json.load(f))
+
+
+def save_model(model, path=MODEL_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(model.to_dict(), f, indent=2)
+
+
+def train(pavement, complaints, segment_features, cutoff, l2=L2, treatments=None):
+    """Fit on features as of `cutoff` and complaints in the following HORIZON_DAYS."""
+    frame = segment_frame(pavement, complaints, segment_features, cutoff, treatments)
+    y = frame["segment"].isin(complained_segments(complaints, cutoff)).to_numpy(dtype=float)
+    raw = frame[FEATURES].to_numpy(dtype=float)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN columns, e.g. soil without polygons
+        mean = np.nan_to_num(np.nanmean(raw, axis=0), nan=0.0)
+        scale = np.nan_to_num(np.nanstd(raw, axis=0), nan=1.0)
+    scale[scale == 0] = 1.0
+    model = RiskModel(FEATURES, mean, scale, 0.0, np.zeros(len(FEATURES)))
+    intercept, weights = fit_logistic(model.matrix(frame), y, l2)
+    model.intercept, model.weights = intercept, weights
+    model.metadata = {
+        "l2": l2,
+        "history_days": HISTORY_DAYS,
+        "horizon_days": HORIZON_DAYS,
+        "trained_cutoff": cutoff.strftime("%Y-%m-%d"),
+        "training_segments": int(len(frame)),
+        "training_positive_rate": round(float(y.mean()), 4) if len(y) else 0.0,
+    }
+    return model
+
+
+def fit_latest(pavement, complaints, segment_features, treatments=None):
+    """Train on the most recent cutoff that still has a full year of outcomes after it."""
+    return train(pavement, complaints, segment_features, latest_date(complaints) - pd.Timedelta(days=HORIZON_DAYS), treatments=treatments)
+
+
+def score_streets(model, pavement, complaints, segment_features, cutoff=None, treatments=None):
+    """Score every segment in one pass and roll up to streets, highest risk first.
+
+    A street's risk is the chance that at least one of its segments gets a
+    complaint, 1 - prod(1 - p), which is what the validation scores against.
+    """
+    cutoff = latest_date(complaints) if cutoff is None else cutoff
+    frame = segment_frame(pavement, complaints, segment_features, cutoff, treatments)
+    frame["log_no_complaint"] = np.log1p(-np.minimum(model.predict(frame), 1 - 1e-12))
+    grouped = frame.groupby("MSAG_Name", sort=False)
+    streets = pd.DataFrame({
+        "Pothole_Formation_Risk_Score": 1 - np.exp(grouped["log_no_complaint"].sum()),
+        "PCI": grouped["PCI"].mean(),
+        "Recent_Complaint_Count": grouped["Street_Complaint_Count"].first().astype(int),
+        "Maintenance_Age_Years": grouped["Maintenance_Age_Years"].min(),
+        "Years_Since_Treatment": grouped["Years_Since_Treatment"].min(),
+        "Latitude": grouped["Latitude"].first(),
+        "Longitude": grouped["Longitude"].first(),
+    })
+    streets.insert(2, "Road_Deterioration_Score", 100 - streets["PCI"])
+    # Like the formula: streets without an install date or treatment get the oldest age seen
+    streets["Maintenance_Age_Years"] = streets["Maintenance_Age_Years"].fillna(streets["Maintenance_Age_Years"].max())
+    streets = streets.sort_values("Pothole_Formation_Risk_Score", ascending=False, kind="stable")
+    return streets.reset_index()
+
+
+# ---------- Validation against the fixed-weight formula ----------
+def formula_street_scores(pavement, complaints, cutoff, treatments=None):
+    """The original 0.5/0.3/0.2 min-max formula, evaluated as of `cutoff`.
+
+    Streets without an install date take their latest IMP treatment from
+    `treatments` when given; the rest get the oldest age seen.
+    """
+    pci_by_msag = pavement.groupby("MSAG_Name")["PCI"].mean().reset_index()
+    pci_by_msag["Road_Deterioration_Score"] = 100 - pci_by_msag["PCI"]
+    opened = complaints["OPENEDDATETIME"]
+    recent = complaints[(opened >= cutoff - pd.Timedelta(days=HISTORY_DAYS)) & (opened < cutoff)]
+    recent_counts = recent["MSAG_Name"].value_counts().rename("Recent_Complaint_Count").reset_index()
+    install = complaints.groupby("MSAG_Name")["InstallDate"].max().reset_index()
+    if treatments is not None:
+        treated = treatments.last_treated(cutoff).rename("TreatedDate").reset_index()
+        treated["CartID"] = treated["CartID"].astype("Int64")
+        street_of = complaints[["CartID", "MSAG_Name"]].assign(CartID=_segment_ids(complaints["CartID"])).drop_duplicates("CartID")
+        treated = treated.merge(street_of, on="CartID").groupby("MSAG_Name")["TreatedDate"].max().reset_index()
+        install = install.merge(treated, on="MSAG_Name", how="outer")
+        install["InstallDate"] = install[["InstallDate", "TreatedDate"]].max(axis=1)
+    install["Maintenance_Age_Years"] = (cutoff - install["InstallDate"]).dt.days / 365.25
+
+    risk = pci_by_msag.merge(recent_counts, on="MSAG_Name", how="outer")
+    risk = risk.merge(install[["MSAG_Name", "Maintenance_Age_Years"]], on="MSAG_Name", how="outer")
+    risk["Road_Deterioration_Score"] = risk["Road_Deterioration_Score"].fillna(risk["Road_Deterioration_Score"].mean())
+    risk["Recent_Complaint_Count"] = risk["Recent_Complaint_Count"].fillna(0)
+    risk["Maintenance_Age_Years"] = risk["Maintenance_Age_Years"].fillna(risk["Maintenance_Age_Years"].max())
+    score = 0
+    for column, weight in (("Road_Deterioration_Score", 0.5), ("Recent_Complaint_Count", 0.3), ("Maintenance_Age_Years", 0.2)):
+        spread = risk[column].max() - risk[column].min()
+        scaled = (risk[column] - risk[column].min()) / spread if spread != 0 else 0.5
+        score = score + scaled * weight
+    return pd.Series(score.to_numpy(), index=risk["MSAG_Name"])
+
+
+def ranking_metrics(scores, positives, ks=(10, 100)):
+    """ROC AUC and precision@k of street scores against the set of streets that got a complaint."""
+    scores = scores.dropna()
+    labels = scores.index.isin(list(positives))
+    n_pos, n_neg = int(labels.sum()), int((~labels).sum())
+    metrics = {"streets": int(len(scores)), "positive_rate": round(n_pos / max(len(scores), 1), 4)}
+    if n_pos and n_neg:
+        ranks = scores.rank().to_numpy()
+        metrics["auc"] = round(float((ranks[labels].sum() - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg)), 4)
+    ordered = labels[np.argsort(-scores.to_numpy(), kind="stable")]
+    for k in ks:
+        metrics[f"precision_at_{k}"] = round(float(ordered[:k].mean()), 4) if len(ordered) else 0.0
+    return metrics
+
+
+def validate(pavement, complaints, segment_features, treatments=None):
+    """Train on the year before the last full year, then rank streets for that last year."""
+    validation_cutoff = latest_date(complaints) - pd.Timedelta(days=HORIZON_DAYS)
+    model = train(pavement, complaints, segment_features, validation_cutoff - pd.Timedelta(days=HORIZON_DAYS), treatments=treatments)
+    opened = complaints["OPENEDDATETIME"]
+    outcome = complaints[(opened >= validation_cutoff) & (opened < validation_cutoff + pd.Timedelta(days=HORIZON_DAYS))]
+    positives = set(outcome["MSAG_Name"].dropna())
+    model_scores = score_streets(model, pavement, complaints, segment_features, validation_cutoff, treatments)
+    return {
+        "validation_cutoff": validation_cutoff.strftime("%Y-%m-%d"),
+        "model": ranking_metrics(model_scores.set_index("MSAG_Name")["Pothole_Formation_Risk_Score"], positives),
+        "formula": ranking_metrics(formula_street_scores(pavement, complaints, validation_cutoff, treatments), positives),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train and validate the pothole formation risk model.")
+    parser.add_argument("--l2", type=float, default=L2, help="ridge penalty on the standardized weights")
+    parser.add_argument("--output", default=MODEL_PATH, help="where to write the model JSON")
+    args = parser.parse_args()
+
+    import integrated
+
+    segment_features, treatments = integrated.segment_features_df, integrated.treatment_index
+    pavement, complaints = integrated.pavement_latlon_df, integrated.complaint_df
+    validation = validate(pavement, complaints, segment_features, treatments)
+    model = train(pavement, complaints, segment_features, latest_date(complaints) - pd.Timedelta(days=HORIZON_DAYS), args.l2, treatments)
+    model.metadata["validation"] = validation
+    save_model(model, args.output)
+
+    print(f"Validation year from {validation['validation_cutoff']}:")
+    print(f"{'':<10}{'streets':>9}{'AUC':>8}{'P@10':>8}{'P@100':>8}")
+    for name in ("model", "formula"):
+        m = validation[name]
+        print(f"{name:<10}{m['streets']:>9}{m.get('auc', float('nan')):>8.3f}{m['precision_at_10']:>8.2f}{m['precision_at_100']:>8.2f}")
+    print("\nWeights (standardized features):")
+    for feature, weight in zip(model.features, model.weights):
+        print(f"  {feature:<26}{weight:+.3f}")
+    print(f"\nWrote {args.output}")
@@ -0,0 +1,70 @@
+"""
+How often VIA buses run over poor pavement.
+
+trip_cleaned.csv lists every scheduled trip with its route, service and
+shape. Trips are counted once per route and per shape for each service day,
+and weighted into trips per week. The GTFS export has no shapes.txt, so a
+route's pavement is the poor segments (PCI below POOR_PCI) of the streets
+named in the route's name (streets.py). The length of those segments times
+the weekly trips gives the route's exposure in bus-miles per week over poor
+pavement. The table is built once at load and kept sorted by exposure, so
+the answer is a slice of it.
+"""
+
+import numpy as np
+import pandas as pd
+
+POOR_PCI = 50
+FEET_PER_MILE = 5280
+# VIA's service ids end in the day type; the weekday service has the most trips
+SERVICE_DAYS = {"321.0.1": "weekday", "321.0.2": "saturday", "321.0.3": "sunday"}
+DAYS_PER_WEEK = {"weekday": 5, "saturday": 1, "sunday": 1}
+
+
+def trip_frequencies(trips, by="route_id"):
+    """Trips per `by` key (route_id or shape_id) for each service day, plus trips per week."""
+    day = trips["service_id"].astype(str).map(SERVICE_DAYS).fillna("other")
+    table = trips.assign(day=day).groupby([by, "day"]).size().unstack("day", fill_value=0)
+    for name in DAYS_PER_WEEK:
+        if name not in table.columns:
+            table[name] = 0
+    table["weekly_trips"] = sum(table[name] * days for name, days in DAYS_PER_WEEK.items())
+    return table
+
+
+def route_exposure(routes, trips, route_streets, pavement, street_rows):
+    """One row per route with poor pavement on its streets, sorted by weekly bus-miles over that pavement.
+
+    `route_streets` maps route_short_name to street ids; `street_rows` is the
+    pavement table's StreetRows.
+    """
+    frequencies = trip_frequencies(trips) if not trips.empty else pd.DataFrame(columns=["weekday", "weekly_trips"])
+    pci = pd.to_numeric(pavement["PCI"], errors="coerce").to_numpy(dtype=float)
+    length = pd.to_numeric(pavement.get("LengthFeet", pd.Series(np.nan, index=pavement.index)), errors="coerce").to_numpy(dtype=float)
+    poor = pci < POOR_PCI
+    shapes = trips.groupby("route_id")["shape_id"].nunique() if not trips.empty else pd.Series(dtype=int)
+    records = []
+    for route in routes.itertuples(index=False):
+        rows = street_rows.rows(route_streets.get(route.route_short_name, []))
+        rows = rows[poor[rows]]
+        if not len(rows):
+            continue
+        weekly = int(frequencies["weekly_trips"].get(route.route_id, 0))
+        miles = float(np.nansum(length[rows])) / FEET_PER_MILE
+        records.append({
+            "route_id": route.route_short_name,
+            "route_name": route.route_long_name,
+            "route_type": route.route_type,
+            "poor_segments": len(rows),
+            "poor_miles": miles,
+            "avg_pci": float(np.nanmean(pci[rows])),
+            "weekday_trips": int(frequencies["weekday"].get(route.route_id, 0)),
+            "weekly_trips": weekly,
+            "shapes": int(shapes.get(route.route_id, 0)),
+            "exposure_miles": weekly * miles,
+            "rows": rows,
+        })
+    if not records:
+        return pd.DataFrame()
+    table = pd.DataFrame.from_records(records)
+    return table.sort_values(["exposure_miles", "poor_segments"], ascending=False, kind="stable").reset_index(drop=True)
@@ -0,0 +1,222 @@
+"""
+Warm-start snapshot of the structures derived at startup.
+
+integrated.py spends most of its start-up time deriving things from the
+source files, not reading them: coordinates parsed out of map URLs, the
+street-name vocabulary, per-segment report counts, the risk and budget
+tables, the streets each VIA route runs on. Each of these is registered as
+an artifact with `Snapshot.artifact(name, build)`. After a cold start,
+`save()` writes them to SNAPSHOT_DIR/<key>/:
+  * DataFrames as Parquet (one file per table, written with duckdb)
+  * everything else in one pickle, so objects that share state (the street
+    index and the tables encoded with it) still share it after loading
+  * manifest.json: the fingerprint of every source file and the file of every artifact
+The key is a digest of the source fingerprints (name, size and content hash
+of each data file and of the app's own modules). Content hashes are cached in
+SNAPSHOT_DIR/hashes.json by size and modification time, so an unchanged file is
+not read again, while a file rewritten within the same second (or with its
+old mtime restored) still changes the key. On the next start with the same
+key, every artifact is read back instead of built. A snapshot is
+used whole or not at all: if any artifact is missing or unreadable,
+everything is rebuilt.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import time
+
+import duckdb
+import pandas as pd
+
+FEATURES_DIR = os.environ.get("POTHOLE_FEATURES_DIR", os.path.join("..", "Data", "features"))
+SNAPSHOT_DIR = os.environ.get("POTHOLE_SNAPSHOT_DIR", os.path.join(FEATURES_DIR, "snapshot"))  # "off" disables
+FORMAT_VERSION = 2
+OBJECTS_FILE = "objects.pkl"
+HASHES_FILE = "hashes.json"
+
+
+def file_digest(path):
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_fingerprint(path, hashes=None):
+    """Size and content hash of a source file, or None when it does not exist.
+
+    `hashes` maps paths to their last known [size, mtime_ns, digest]; a file
+    whose size and modification time still match is not hashed again. New
+    digests are added to it.
+    """
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    known = hashes.get(path) if hashes is not None else None
+    if known and known[:2] == [stat.st_size, stat.st_mtime_ns]:
+        digest = known[2]
+    else:
+        digest = file_digest(path)
+        if hashes is not None:
+            hashes[path] = [stat.st_size, stat.st_mtime_ns, digest]
+    return {"size": stat.st_size, "sha256": digest}
+
+
+def code_paths():
+    """The app's own modules: a snapshot built by different code is not reused."""
+    return sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "*.py")))
+
+
+def _as_table(value):
+    # Parquet keeps only the columns, so a frame qualifies when nothing else would be lost
+    return (
+        type(value) is pd.DataFrame and len(value.columns) > 0
+        and value.index.equals(pd.RangeIndex(len(value)))
+        and all(dtype != object for dtype in value.dtypes)
+    )
+
+
+class Snapshot:
+    def __init__(self, sources, directory=SNAPSHOT_DIR):
+        """`sources`: paths of every file the artifacts are derived from."""
+        self.enabled = directory != "off"
+        known = self._load_hashes(directory) if self.enabled else {}
+        hashes = dict(known)
+        self.sources = {path: source_fingerprint(path, hashes) for path in list(sources) + code_paths()}
+        hashes = {path: hashes[path] for path in self.sources if path in hashes}
+        if self.enabled and hashes != known:
+            self._save_hashes(directory, hashes)
+        self.key = hashlib.md5(json.dumps(self.sources, sort_keys=True).encode()).hexdigest()[:12]
+        self.directory = directory
+        self.path = os.path.join(directory, self.key)
+        self._artifacts = {}  # name -> value, built or restored
+        self._restored = self._load() if self.enabled else {}
+        self.restored = bool(self._restored)
+
+    @staticmethod
+    def _load_hashes(directory):
+        try:
+            with open(os.path.join(directory, HASHES_FILE)) as f:
+                hashes = json.load(f)
+            return hashes if isinstance(hashes, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _save_hashes(directory, hashes):
+        # Only a cache: a write lost to a concurrent worker costs one more hash next start
+        path = os.path.join(directory, HASHES_FILE)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with open(f"{path}.{os.getpid()}.tmp", "w") as f:
+                json.dump(hashes, f, indent=1)
+            os.replace(f"{path}.{os.getpid()}.tmp", path)
+        except OSError as e:
+            print(f"Could not cache source hashes in {path}: {e}")
+
+    def _load(self):
+        manifest_path = os.path.join(self.path, "manifest.json")
+        if not os.path.exists(manifest_path):
+            return {}
+        started = time.perf_counter()
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if manifest.get("format") != FORMAT_VERSION or manifest.get("sources") != self.sources:
+                return {}
+            artifacts = {}
+            con = duckdb.connect()
+            try:
+                for name, entry in manifest["artifacts"].items():
+                    if entry["kind"] == "table":
+                        artifacts[name] = con.execute("SELECT * FROM read_parquet(?)", [os.path.join(self.path, entry["file"])]).df()
+            finally:
+                con.close()
+            if any(entry["kind"] == "object" for entry in manifest["artifacts"].values()):
+                with open(os.path.join(self.path, OBJECTS_FILE), "rb") as f:
+                    artifacts.update(pickle.load(f))
+        except (OSError, ValueError, KeyError, pickle.UnpicklingError, EOFError, duckdb.Error) as e:
+            print(f"Ignoring the warm-start snapshot in {self.path}: {e}")
+            return {}
+        print(f"Loaded {len(artifacts)} derived artifacts from the warm-start snapshot in {time.perf_counter() - started:.2f}s.")
+        return artifacts
+
+    def artifact(self, name, build):
+        """The snapshot's value for `name`, or `build()` when starting cold."""
+        value = self._restored[name] if name in self._restored else build()
+        self._artifacts[name] = value
+        return value
+
+    def artifacts(self, names, build):
+        """Like `artifact` for a `build()` that returns one value per name."""
+        if all(name in self._restored for name in names):
+            values = tuple(self._restored[name] for name in names)
+        else:
+            values = tuple(build())
+        self._artifacts.update(zip(names, values))
+        return values
+
+    def save(self):
+        """Write every artifact as it is now; call once startup has finished changing them."""
+        if not self.enabled or self.restored or not self._artifacts:
+            return None
+        staging = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(staging, exist_ok=True)
+            entries, objects = {}, {}
+            con = duckdb.connect()
+            try:
+                for name, value in self._artifacts.items():
+                    if _as_table(value):
+                        con.register("artifact", value)
+                        con.execute(f"COPY artifact TO '{os.path.join(staging, name)}.parquet' (FORMAT PARQUET, COMPRESSION ZSTD)")
+                        con.unregister("artifact")
+                        entries[name] = {"kind": "table", "file": f"{name}.parquet", "rows": len(value)}
+                    else:
+                        objects[name] = value
+                        entries[name] = {"kind": "object", "file": OBJECTS_FILE}
+            finally:
+                con.close()
+            with open(os.path.join(staging, OBJECTS_FILE), "wb") as f:
+                pickle.dump(objects, f, protocol=pickle.HIGHEST_PROTOCOL)
+            with open(os.path.join(staging, "manifest.json"), "w") as f:
+                json.dump({"format": FORMAT_VERSION, "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                           "sources": self.sources, "artifacts": entries}, f, indent=1)
+            if os.path.exists(self.path):
+                # Another worker starting at the same time got there first
+                shutil.rmtree(staging, ignore_errors=True)
+            else:
+                os.replace(staging, self.path)
+        except (OSError, pickle.PicklingError, TypeError, duckdb.Error) as e:
+            shutil.rmtree(staging, ignore_errors=True)
+            print(f"Could not write the warm-start snapshot: {e}")
+            return None
+        self._prune()
+        return self.path
+
+    def _prune(self):
+        """Remove snapshots written before this one.
+
+        Newer snapshots are kept: they may belong to a worker running newer code
+        or data that shares this directory, and would otherwise be rebuilt on its
+        every start.
+        """
+        try:
+            written = os.path.getmtime(os.path.join(self.path, "manifest.json"))
+        except OSError:
+            return
+        for old in glob.glob(os.path.join(self.directory, "*", "manifest.json")):
+            snapshot = os.path.dirname(old)
+            if snapshot == self.path or snapshot.endswith(".tmp"):
+                continue
+            try:
+                if os.path.getmtime(old) < written:
+                    shutil.rmtree(snapshot, ignore_errors=True)
+            except OSError:
+                continue  # removed by another worker meanwhile
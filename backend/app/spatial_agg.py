@@ -0,0 +1,177 @@
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# ---------- Map highlight aggregation ----------
+# Point-heavy answers (every pothole in an area, every complaint near a school, ...)
+# are binned on a Web Mercator grid before they are sent to the map, so the payload
+# never grows past MAX_CLUSTERS rows however many potholes match. The grid follows
+# the slippy-map tile pyramid, so zooming in by one level halves the cell size.
+MAX_CLUSTERS = int(os.environ.get("POTHOLE_MAX_CLUSTERS", "200"))
+DEFAULT_ZOOM = 11  # roughly the whole city on screen
+MAX_ZOOM = 18
+CELLS_PER_TILE = 4  # grid cells along one 256px tile edge, i.e. ~64px cells on screen
+HIGHLIGHT_CACHE_SIZE = int(os.environ.get("POTHOLE_HIGHLIGHT_CACHE_SIZE", "64"))
+
+CLUSTER_COLUMNS = [
+    "Latitude", "Longitude", "count", "PCI",
+    "min_lat", "min_lon", "max_lat", "max_lon",
+    "name", "color", "marker_radius", "cluster",
+]
+
+
+def _mercator_xy(lat, lon):
+    """Project degrees to the unit Web Mercator square (0..1 on both axes)."""
+    lat = np.clip(lat, -85.05112878, 85.05112878)
+    x = (lon + 180.0) / 360.0
+    lat_rad = np.radians(lat)
+    y = (1.0 - np.log(np.tan(lat_rad) + 1.0 / np.cos(lat_rad)) / np.pi) / 2.0
+    return x, y
+
+
+def _pci_color(pci):
+    # Same thresholds as the PCI answers: >=70 good, >=50 fair, otherwise poor
+    return np.where(np.isnan(pci), "red", np.where(pci >= 70, "green", np.where(pci >= 50, "orange", "red")))
+
+
+def _clean_points(df):
+    """Rows with usable coordinates as float arrays, plus their weights."""
+    lat = pd.to_numeric(df["Latitude"], errors="coerce").to_numpy(dtype=float)
+    lon = pd.to_numeric(df["Longitude"], errors="coerce").to_numpy(dtype=float)
+    valid = ~(np.isnan(lat) | np.isnan(lon))
+    if "count" in df.columns:
+        weights = pd.to_numeric(df["count"], errors="coerce").fillna(1).to_numpy(dtype=float)
+    else:
+        weights = np.ones(len(df))
+    if "PCI" in df.columns:
+        pci = pd.to_numeric(df["PCI"], errors="coerce").to_numpy(dtype=float)
+    else:
+        pci = np.full(len(df), np.nan)
+    return valid, lat, lon, weights, pci
+
+
+def _json_safe(frame):
+    # JSON has no NaN; missing values are sent as null
+    return frame.astype(object).where(frame.notna(), None)
+
+
+def _bin(lat, lon, zoom):
+    cells = (2 ** zoom) * CELLS_PER_TILE
+    x, y = _mercator_xy(lat, lon)
+    col = np.minimum((x * cells).astype(np.int64), cells - 1)
+    row = np.minimum((y * cells).astype(np.int64), cells - 1)
+    return row * cells + col
+
+
+def cluster_points(df, zoom=None, bbox=None, max_clusters=MAX_CLUSTERS):
+    """Aggregate highlight rows for a map view.
+
+    `bbox` is (min_lon, min_lat, max_lon, max_lat); rows outside it are dropped. If
+    what is left fits in `max_clusters` rows it is returned unchanged, so individual
+    points come back once the user has zoomed in far enough. Otherwise points are
+    binned on the grid for `zoom`, coarsening one level at a time until at most
+    `max_clusters` cells remain. Each cluster carries its count, mean PCI, bounding
+    box and count-weighted centre.
+
+    Returns (highlight_df, info) where info has "clustered", "zoom" and "total".
+    """
+    if df is None or df.empty or "Latitude" not in df.columns or "Longitude" not in df.columns:
+        return df, {"clustered": False, "zoom": zoom, "total": 0 if df is None else len(df)}
+
+    valid, lat, lon, weights, pci = _clean_points(df)
+    if bbox is not None:
+        min_lon, min_lat, max_lon, max_lat = bbox
+        valid &= (lon >= min_lon) & (lon <= max_lon) & (lat >= min_lat) & (lat <= max_lat)
+    total = int(valid.sum())
+    if total <= max_clusters:
+        return _json_safe(df if bbox is None else df[valid]), {"clustered": False, "zoom": zoom, "total": total}
+
+    lat, lon, weights, pci = lat[valid], lon[valid], weights[valid], pci[valid]
+    zoom = DEFAULT_ZOOM if zoom is None else int(min(max(zoom, 0), MAX_ZOOM))
+    while True:
+        keys = _bin(lat, lon, zoom)
+        cell_ids, inverse = np.unique(keys, return_inverse=True)
+        if len(cell_ids) <= max_clusters or zoom == 0:
+            break
+        zoom -= 1
+
+    n = len(cell_ids)
+    count = np.bincount(inverse, weights=weights, minlength=n)
+    center_lat = np.bincount(inverse, weights=lat * weights, minlength=n) / count
+    center_lon = np.bincount(inverse, weights=lon * weights, minlength=n) / count
+    has_pci = ~np.isnan(pci)
+    pci_sum = np.bincount(inverse[has_pci], weights=pci[has_pci] * weights[has_pci], minlength=n)
+    pci_weight = np.bincount(inverse[has_pci], weights=weights[has_pci], minlength=n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_pci = np.where(pci_weight > 0, pci_sum / pci_weight, np.nan)
+
+    # Bounding boxes: sort by cell once and reduce each contiguous run
+    order = np.argsort(inverse, kind="stable")
+    starts = np.searchsorted(inverse[order], np.arange(n))
+    min_lat = np.minimum.reduceat(lat[order], starts)
+    max_lat = np.maximum.reduceat(lat[order], starts)
+    min_lon = np.minimum.reduceat(lon[order], starts)
+    max_lon = np.maximum.reduceat(lon[order], starts)
+
+    rounded = np.rint(count).astype(np.int64)
+    clusters = pd.DataFrame({
+        "Latitude": center_lat,
+        "Longitude": center_lon,
+        "count": rounded,
+        "PCI": np.round(mean_pci, 1),
+        "min_lat": min_lat,
+        "min_lon": min_lon,
+        "max_lat": max_lat,
+        "max_lon": max_lon,
+        "name": [f"{c} locations" for c in rounded],
+        "color": _pci_color(mean_pci),
+        "marker_radius": np.minimum(6 + 3 * np.log2(np.maximum(count, 1)), 30).round(1),
+        "cluster": True,
+    }, columns=CLUSTER_COLUMNS)
+    clusters = clusters.sort_values("count", ascending=False, kind="stable").reset_index(drop=True)
+    # Clusters without PCI readings report null
+    clusters["PCI"] = _json_safe(clusters["PCI"])
+    return clusters, {"clustered": True, "zoom": zoom, "total": total}
+
+
+class HighlightStore:
+    """Small LRU of full highlight results, so the map can re-cluster them as it zooms."""
+
+    def __init__(self, capacity=HIGHLIGHT_CACHE_SIZE):
+        self.capacity = capacity
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, df):
+        highlight_id = uuid.uuid4().hex
+        with self._lock:
+            self._items[highlight_id] = df
+            while len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+        return highlight_id
+
+    def get(self, highlight_id):
+        with self._lock:
+            df = self._items.get(highlight_id)
+            if df is not None:
+                self._items.move_to_end(highlight_id)
+            return df
+
+
+highlight_store = HighlightStore()
+
+
+def parse_bbox(value):
+    """Parse "min_lon,min_lat,max_lon,max_lat" (or a 4-item list); None when missing or malformed."""
+    if value is None:
+        return None
+    parts = value.split(",") if isinstance(value, str) else value
+    try:
+        bbox = tuple(float(v) for v in parts)
+    except (TypeError, ValueError):
+        return None
+    return bbox if len(bbox) == 4 else None
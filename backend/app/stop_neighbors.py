@@ -0,0 +1,102 @@
+"""
+VIA stop <-> pavement segment neighbor table.
+
+Every (stop, segment) pair within MAX_RADIUS_M is found once at load with a
+shapely STRtree over the segment points, in local metres (an
+equirectangular projection around the city is accurate to well under a
+metre at these distances). The pairs are kept as arrays sorted by distance,
+so any radius up to MAX_RADIUS_M is a prefix of the table and any PCI
+threshold is a vectorized mask over that prefix:
+  * stops near pavement below a PCI threshold
+  * stops near a street (the street's segment rows, streets.py)
+  * stops ranked by the mean PCI of the pavement around them
+"""
+
+import numpy as np
+import pandas as pd
+import shapely
+
+MAX_RADIUS_M = 500  # largest radius a question can ask for
+MIN_RANKED_SEGMENTS = 3  # segments a stop needs around it to be ranked by their mean PCI
+METRES_PER_DEGREE = 111_320.0
+
+
+class StopNeighbors:
+    def __init__(self, stops, segments, max_radius_m=MAX_RADIUS_M):
+        """`stops`: stop_name, stop_lat, stop_lon; `segments`: Latitude, Longitude, PCI (row positions are kept)."""
+        self.max_radius_m = max_radius_m
+        self.stops = stops.reset_index(drop=True)
+        stop_lat = pd.to_numeric(self.stops["stop_lat"], errors="coerce").to_numpy(dtype=float)
+        stop_lon = pd.to_numeric(self.stops["stop_lon"], errors="coerce").to_numpy(dtype=float)
+        seg_lat = pd.to_numeric(segments["Latitude"], errors="coerce").to_numpy(dtype=float)
+        seg_lon = pd.to_numeric(segments["Longitude"], errors="coerce").to_numpy(dtype=float)
+        self._origin = (np.nanmean(stop_lat), np.nanmean(stop_lon)) if len(stop_lat) else (0.0, 0.0)
+
+        stop_points = self._points(stop_lat, stop_lon)
+        segment_points = self._points(seg_lat, seg_lon)
+        self._stop_tree = shapely.STRtree(stop_points)
+        stop_index, segment_index = shapely.STRtree(segment_points).query(stop_points, predicate="dwithin", distance=max_radius_m)
+        distance = shapely.distance(stop_points[stop_index], segment_points[segment_index])
+
+        order = np.argsort(distance, kind="stable")
+        self.stop = stop_index[order]
+        self.segment = segment_index[order]
+        self.distance = distance[order]
+        self.pci = pd.to_numeric(segments["PCI"], errors="coerce").to_numpy(dtype=float)[self.segment]
+        self._seg_lat, self._seg_lon = seg_lat, seg_lon
+
+    def __len__(self):
+        return len(self.stop)
+
+    def _points(self, lat, lon):
+        lat0, lon0 = self._origin
+        x = (lon - lon0) * METRES_PER_DEGREE * np.cos(np.radians(lat0))
+        y = (lat - lat0) * METRES_PER_DEGREE
+        return shapely.points(np.nan_to_num(x, nan=1e12), np.nan_to_num(y, nan=1e12))
+
+    def _within(self, radius_m):
+        if radius_m > self.max_radius_m:
+            raise ValueError(f"radius_m must be at most {self.max_radius_m}")
+        return int(np.searchsorted(self.distance, radius_m, side="right"))
+
+    def _frame(self, keep):
+        stop, segment = self.stop[keep], self.segment[keep]
+        return pd.DataFrame({
+            "stop": stop,
+            "Stop": self.stops["stop_name"].to_numpy()[stop],
+            "segment": segment,
+            "Latitude": self._seg_lat[segment],
+            "Longitude": self._seg_lon[segment],
+            "distance_m": self.distance[keep],
+            "PCI": self.pci[keep],
+        })
+
+    def below(self, pci_threshold, radius_m):
+        """(stop, segment) pairs within `radius_m` where the segment's PCI is below `pci_threshold`, nearest first."""
+        n = self._within(radius_m)
+        return self._frame(np.flatnonzero(self.pci[:n] < pci_threshold))
+
+    def near_segments(self, segment_rows, radius_m):
+        """Pairs within `radius_m` of any of the given segment rows (e.g. one street's rows), nearest first."""
+        n = self._within(radius_m)
+        return self._frame(np.flatnonzero(np.isin(self.segment[:n], segment_rows)))
+
+    def near_point(self, lat, lon, radius_m):
+        """Stop rows within `radius_m` of a point, nearest first (for places that are not a street)."""
+        point = self._points(np.array([lat], dtype=float), np.array([lon], dtype=float))[0]
+        rows = self._stop_tree.query(point, predicate="dwithin", distance=radius_m)
+        distance = shapely.distance(point, self._stop_tree.geometries[rows])
+        order = np.argsort(distance, kind="stable")
+        return self.stops.iloc[rows[order]].assign(distance_m=distance[order])
+
+    def worst_stops(self, radius_m, n=10, min_segments=MIN_RANKED_SEGMENTS):
+        """Stops ranked by the mean PCI of the segments within `radius_m`, worst first."""
+        k = self._within(radius_m)
+        known = ~np.isnan(self.pci[:k])
+        stops, pci = self.stop[:k][known], self.pci[:k][known]
+        counts = np.bincount(stops, minlength=len(self.stops))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.bincount(stops, weights=pci, minlength=len(self.stops)) / counts
+        ranked = np.flatnonzero(counts >= min_segments)
+        ranked = ranked[np.argsort(mean[ranked], kind="stable")][:n]
+        return self.stops.iloc[ranked].assign(mean_pci=mean[ranked], segments=counts[ranked])
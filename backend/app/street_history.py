@@ -0,0 +1,123 @@
+"""
+Complaint counts per street and month as a sparse matrix.
+
+Rows are street ids from the shared street index (streets.py) and columns
+are months since the first complaint month. The matrix is stored in CSR
+form (row offsets, month columns, counts) as NumPy arrays, built with one
+sort at load, so a street's whole history is one slice of two arrays.
+
+New complaints go through `add`, which buffers them as (street, month)
+counts; reads merge the buffer, and the buffer is folded into the CSR
+arrays once it grows past COMPACT_EVERY entries.
+"""
+
+import threading
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+COMPACT_EVERY = 5000  # buffered (street, month) cells before the CSR arrays are rebuilt
+TREND_MONTHS = 12  # months in the trend fit and the repeat-complaint window
+REPEAT_MONTHS = 3  # months with complaints within the window that make a street a repeat location
+
+
+def _month_numbers(dates):
+    """Months since year 0 (year * 12 + month - 1); -1 for missing dates."""
+    dates = pd.to_datetime(pd.Series(dates), errors="coerce")
+    months = dates.dt.year * 12 + dates.dt.month - 1
+    return months.fillna(-1).to_numpy(dtype=np.int64)
+
+
+class StreetMonthMatrix:
+    def __init__(self, street_ids, opened):
+        """`street_ids`: street index ids per complaint (-1 = unknown); `opened`: complaint dates."""
+        streets = np.asarray(street_ids, dtype=np.int64)
+        months = _month_numbers(opened)
+        valid = (streets >= 0) & (months >= 0)
+        self.first_month = int(months[valid].min()) if valid.any() else 0
+        self.last_month = int(months[valid].max()) if valid.any() else -1
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._build(streets[valid], months[valid] - self.first_month, np.ones(valid.sum(), dtype=np.int64))
+
+    def _build(self, streets, columns, counts):
+        """CSR arrays from (street, column, count) triples; duplicates are summed."""
+        width = int(columns.max()) + 1 if len(columns) else 1
+        cells, inverse = np.unique(streets * width + columns, return_inverse=True)
+        totals = np.bincount(inverse, weights=counts, minlength=len(cells)).astype(np.int64)
+        rows = cells // width
+        self.n_streets = int(rows.max()) + 1 if len(rows) else 0
+        self.indptr = np.searchsorted(rows, np.arange(self.n_streets + 1))
+        self.columns = (cells % width).astype(np.int32)
+        self.counts = totals.astype(np.int32)
+
+    def _compact(self):
+        row_of = np.repeat(np.arange(self.n_streets), np.diff(self.indptr))
+        pending = np.array([(s, c, n) for (s, c), n in self._pending.items()], dtype=np.int64).reshape(-1, 3)
+        self._build(
+            np.concatenate([row_of, pending[:, 0]]),
+            np.concatenate([self.columns.astype(np.int64), pending[:, 1]]),
+            np.concatenate([self.counts.astype(np.int64), pending[:, 2]]),
+        )
+        self._pending.clear()
+
+    def add(self, street_ids, opened):
+        """Count new complaints; returns how many had a street and a date."""
+        streets = np.asarray(street_ids, dtype=np.int64)
+        months = _month_numbers(opened)
+        valid = (streets >= 0) & (months >= self.first_month)
+        with self._lock:
+            for street, month in zip(streets[valid], months[valid]):
+                self._pending[(int(street), int(month - self.first_month))] += 1
+            if valid.any():
+                self.last_month = max(self.last_month, int(months[valid].max()))
+            if len(self._pending) > COMPACT_EVERY:
+                self._compact()
+        return int(valid.sum())
+
+    # ---------- Reads ----------
+    def _row(self, street_id):
+        if 0 <= street_id < self.n_streets:
+            a, b = self.indptr[street_id], self.indptr[street_id + 1]
+            return self.columns[a:b], self.counts[a:b]
+        return self.columns[:0], self.counts[:0]
+
+    def monthly(self, street_ids):
+        """Dense complaints per month, summed over `street_ids`, from the first month to the latest."""
+        dense = np.zeros(self.last_month - self.first_month + 1, dtype=np.int64)
+        ids = set(int(i) for i in street_ids)
+        with self._lock:
+            for street_id in ids:
+                columns, counts = self._row(street_id)
+                np.add.at(dense, columns, counts)
+            for (street, column), n in self._pending.items():
+                if street in ids:
+                    dense[column] += n
+        return dense
+
+    def history(self, street_ids):
+        """[(year, month, complaints)] for the months with complaints, oldest first."""
+        dense = self.monthly(street_ids)
+        months = np.flatnonzero(dense) + self.first_month
+        return [(int(m // 12), int(m % 12) + 1, int(dense[m - self.first_month])) for m in months]
+
+    def summary(self, street_ids, window=TREND_MONTHS):
+        """Total, months with complaints, the trend over the last `window` months and the repeat flag."""
+        dense = self.monthly(street_ids)
+        recent = dense[-window:]
+        slope = float(np.polyfit(np.arange(len(recent)), recent, 1)[0]) if len(recent) > 1 else 0.0
+        recent_months = int(np.count_nonzero(recent))
+        return {
+            "total": int(dense.sum()),
+            "months": int(np.count_nonzero(dense)),
+            "recent_total": int(recent.sum()),
+            "recent_months": recent_months,
+            "trend_per_month": slope,
+            "repeated": recent_months >= REPEAT_MONTHS,
+        }
+
+    def compare(self, streets, window=TREND_MONTHS):
+        """One summary row per named street: `streets` maps a label to its street ids."""
+        rows = {label: self.summary(ids, window) for label, ids in streets.items()}
+        return pd.DataFrame.from_dict(rows, orient="index")
@@ -0,0 +1,213 @@
+"""
+One street vocabulary for every dataset.
+
+The pavement, complaint, pothole, IMP and VIA files spell streets differently:
+"S ST MARYS ST", "St Marys", "South St. Mary's Street". `canonical` reduces a
+name to upper case, USPS abbreviations for directions and street types, and
+no punctuation. `base_key` then drops a leading direction and a trailing
+street type and direction, so the spellings above all share the base key
+"ST MARYS".
+
+`StreetIndex` dictionary-encodes canonical names to integer ids shared by all
+tables (`add` returns the ids for a column). Each id remembers the raw
+spellings it was built from; an intersection ("BLANCO RD and WURZBACH PKWY")
+is also remembered as a spelling of each of its streets, so filtering a table
+by a street's spellings keeps the reports at its intersections. `lookup`
+resolves a user's street to ids in three tiers: every street with the same
+base key (the exact name among them), streets whose base contains every word
+of the query, and finally the closest base keys by trigram similarity, which
+catches typos. `StreetRows` turns an id column into row positions per id,
+so a street question reads its rows without a scan.
+"""
+
+import re
+import threading
+from collections import Counter, defaultdict
+
+import numpy as np
+import pandas as pd
+
+DIRECTIONS = {
+    "NORTH": "N", "SOUTH": "S", "EAST": "E", "WEST": "W",
+    "NORTHEAST": "NE", "NORTHWEST": "NW", "SOUTHEAST": "SE", "SOUTHWEST": "SW",
+}
+DIRECTION_WORDS = {abbreviation: word for word, abbreviation in DIRECTIONS.items()}
+STREET_TYPES = {
+    "STREET": "ST", "AVENUE": "AVE", "AV": "AVE", "ROAD": "RD", "DRIVE": "DR", "BOULEVARD": "BLVD",
+    "LANE": "LN", "COURT": "CT", "CIRCLE": "CIR", "COVE": "CV", "PARKWAY": "PKWY", "PKY": "PKWY",
+    "HIGHWAY": "HWY", "PLACE": "PL", "TRAIL": "TRL", "TERRACE": "TER", "CROSSING": "XING",
+    "SQUARE": "SQ", "FREEWAY": "FWY", "EXPRESSWAY": "EXPY", "ALLEY": "ALY",
+}
+TYPE_ABBREVIATIONS = set(STREET_TYPES.values()) | {"WAY", "LOOP"}
+# Whole-word rewrites applied before the direction and type rules
+WORDS = {"SAINT": "ST", "MLK": "MARTIN LUTHER KING", "INTERSTATE": "IH", "I": "IH", "USHWY": "US"}
+# "BLANCO RD and WURZBACH PKWY": reports at an intersection count for both streets
+INTERSECTION = re.compile(r"\s+AND\s+|\s*&\s*", re.IGNORECASE)
+FUZZY_THRESHOLD = 0.5  # Dice similarity of trigram sets
+MIN_FUZZY_LENGTH = 4  # shorter keys share too many trigrams with unrelated streets
+MISSING = -1
+
+
+def canonical(name):
+    """Upper case, no punctuation, USPS abbreviations: 'South St. Mary's Street' -> 'S ST MARYS ST'."""
+    if not isinstance(name, str):
+        return ""
+    text = re.sub(r"['’]", "", name.upper())
+    text = re.sub(r"[^A-Z0-9]+", " ", text)
+    text = re.sub(r"(?<=[A-Z])(?=\d)", " ", text)  # IH10 -> IH 10
+    tokens = " ".join(WORDS.get(t, t) for t in text.split()).split()
+    if not tokens:
+        return ""
+    # A direction is a prefix ("S FLORES") unless it is the name itself ("WEST AVE"), which is spelled out
+    if len(tokens) == 2 and (tokens[1] in STREET_TYPES or tokens[1] in TYPE_ABBREVIATIONS):
+        tokens[0] = DIRECTION_WORDS.get(tokens[0], tokens[0])
+    elif len(tokens) > 1 and tokens[0] in DIRECTIONS:
+        tokens[0] = DIRECTIONS[tokens[0]]
+    if len(tokens) > 1 and tokens[-1] in STREET_TYPES:
+        tokens[-1] = STREET_TYPES[tokens[-1]]
+    return " ".join(tokens)
+
+
+def base_key(canonical_name):
+    """A canonical name without its leading direction and trailing street type: 'S ST MARYS ST' -> 'ST MARYS'.
+
+    A trailing direction goes too ('MILITARY DR SE' -> 'MILITARY'), unless it
+    names a street of its own ('AVE E').
+    """
+    tokens = canonical_name.split()
+    own_name = len(tokens) == 2 and (tokens[0] in TYPE_ABBREVIATIONS or tokens[0] in STREET_TYPES)
+    if len(tokens) > 1 and tokens[-1] in DIRECTIONS.values() and not own_name:
+        tokens = tokens[:-1]
+    if len(tokens) > 1 and tokens[-1] in TYPE_ABBREVIATIONS:
+        tokens = tokens[:-1]
+    if len(tokens) > 1 and tokens[0] in DIRECTIONS.values():
+        tokens = tokens[1:]
+    return " ".join(tokens)
+
+
+def base_keys(names):
+    """Vectorized base keys for a column of raw names (each distinct name is normalized once)."""
+    names = pd.Series(names)
+    unique = pd.unique(names.dropna())
+    keys = {name: base_key(canonical(name)) for name in unique}
+    return names.map(keys).fillna("")
+
+
+def intersection_parts(name):
+    """The streets of an intersection name ('BLANCO RD and WURZBACH PKWY'); [] for a single street."""
+    if not isinstance(name, str):
+        return []
+    parts = [part.strip() for part in INTERSECTION.split(name) if part.strip()]
+    return parts if len(parts) > 1 else []
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class StreetIndex:
+    def __init__(self):
+        self.names = []  # id -> canonical name
+        self.ids = {}  # canonical name -> id
+        self.spelled = defaultdict(set)  # id -> raw spellings
+        self._raw = {}  # raw spelling -> id
+        self._by_base = defaultdict(set)  # base key -> ids
+        self._by_word = defaultdict(set)  # base-key word -> base keys
+        self._by_trigram = defaultdict(set)  # trigram -> base keys
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getstate__(self):
+        # Pickled for the warm-start snapshot
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _intern(self, raw):
+        name = canonical(raw)
+        if not name:
+            return MISSING
+        street_id = self.ids.get(name)
+        if street_id is None:
+            street_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+            key = base_key(name)
+            if key not in self._by_base:
+                for word in key.split():
+                    self._by_word[word].add(key)
+                for gram in trigrams(key):
+                    self._by_trigram[gram].add(key)
+            self._by_base[key].add(street_id)
+        self.spelled[street_id].add(raw)
+        for part in intersection_parts(raw):
+            part_id = self._intern(part)
+            if part_id != MISSING:
+                self.spelled[part_id].add(raw)
+        return street_id
+
+    def add(self, names):
+        """Street ids for a column of raw names (MISSING for blanks), adding new names to the vocabulary."""
+        names = pd.Series(names)
+        with self._lock:
+            for raw in pd.unique(names.dropna()):
+                if raw not in self._raw:
+                    self._raw[raw] = self._intern(raw)
+            codes = names.map(self._raw)
+        return codes.fillna(MISSING).to_numpy(dtype=np.int32)
+
+    def spellings(self, ids):
+        """Every raw spelling seen for these ids, e.g. to filter a table by exact name."""
+        return sorted({raw for i in ids for raw in self.spelled.get(i, ())})
+
+    def _fuzzy(self, key, limit=3):
+        grams = trigrams(key)
+        overlap = Counter(k for gram in grams for k in self._by_trigram.get(gram, ()))
+        scored = sorted(
+            ((2 * shared / (len(grams) + len(trigrams(k))), k) for k, shared in overlap.items()),
+            reverse=True,
+        )
+        if not scored:
+            return []
+        return [k for score, k in scored[:limit] if score >= FUZZY_THRESHOLD and score >= scored[0][0] - 0.05]
+
+    def lookup(self, query):
+        """Ids of the streets a user means by `query`, best tier first; empty when nothing is close."""
+        name = canonical(query)
+        if not name:
+            return []
+        with self._lock:
+            # The exact name and its variants with another direction or street type
+            # ("BLANCO RD" also finds "N BLANCO RD" and "WEST BLANCO RD")
+            key = base_key(name)
+            if key in self._by_base:
+                return sorted(self._by_base[key])
+            words = key.split()
+            containing = set.intersection(*(self._by_word.get(w, set()) for w in words)) if words else set()
+            # Typo tolerance only for names: numbers (IH 35, US 281) must match exactly
+            if not containing and len(key) >= MIN_FUZZY_LENGTH and not any(w.isdigit() for w in words):
+                containing = self._fuzzy(key)
+            return sorted({i for k in containing for i in self._by_base[k]})
+
+    def names_for(self, ids):
+        return [self.names[i] for i in ids]
+
+
+class StreetRows:
+    """Row positions per street id for one table, from a single argsort of its id column."""
+
+    def __init__(self, codes):
+        codes = np.asarray(codes)
+        self._order = np.argsort(codes, kind="stable")
+        self._sorted = codes[self._order]
+
+    def rows(self, ids):
+        """Row positions (in table order) of every row whose street id is in `ids`."""
+        parts = [self._order[np.searchsorted(self._sorted, i, "left"):np.searchsorted(self._sorted, i, "right")] for i in ids]
+        return np.sort(np.concatenate(parts)) if parts else np.array([], dtype=np.int64)
@@ -0,0 +1,459 @@
+"""
+Mapbox Vector Tiles for the map layers.
+
+Tiles are cut on demand from per-layer spatial indexes (points sorted by x,
+polygons in a shapely STRtree) and cached on disk, so each z/x/y is encoded
+once per data version. Encoding follows the MVT 2.1 spec directly; no
+protobuf or vector-tile package is needed.
+
+Pre-generate the low zoom levels after a data refresh with:
+    python tiles.py --max-zoom 12
+"""
+
+import argparse
+import hashlib
+import math
+import os
+import struct
+import threading
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+import integrated
+
+TILE_CACHE_DIR = os.environ.get("POTHOLE_TILE_CACHE_DIR", "tile_cache")
+EXTENT = 4096  # tile coordinate space, as recommended by the spec
+BUFFER = 64  # extra tile units kept around each tile so lines and fills join cleanly
+MAX_ZOOM = 20
+# Below this zoom, points falling within a couple of screen pixels are merged into one
+# feature carrying a `count`, which keeps city-wide tiles small.
+POINT_DETAIL_ZOOM = 14
+POINT_MERGE_GRID = 128
+
+_HALF_WORLD = 20037508.342789244  # Web Mercator half-extent in metres
+BOUNDARY_DIR = os.path.join(integrated.data_folder_path, "GIS", "GeoBoundaries")
+
+
+# ---------- Protobuf / MVT encoding ----------
+def _varint(value, out):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+
+def _field_bytes(field, payload, out):
+    _varint((field << 3) | 2, out)
+    _varint(len(payload), out)
+    out += payload
+
+
+def _field_varint(field, value, out):
+    _varint(field << 3, out)
+    _varint(value, out)
+
+
+def _packed(values):
+    out = bytearray()
+    for value in values:
+        _varint(value, out)
+    return out
+
+
+def _encode_value(value):
+    out = bytearray()
+    if isinstance(value, (bool, np.bool_)):
+        _field_varint(7, int(value), out)
+    elif isinstance(value, (int, np.integer)):
+        value = int(value)
+        if value >= 0:
+            _field_varint(5, value, out)
+        else:
+            _field_varint(6, _zigzag(value), out)
+    elif isinstance(value, (float, np.floating)):
+        _varint((3 << 3) | 1, out)
+        out += struct.pack("<d", float(value))
+    else:
+        _field_bytes(1, str(value).encode("utf-8"), out)
+    return bytes(out)
+
+
+def _command(command_id, count):
+    return (command_id & 0x7) | (count << 3)
+
+
+def _ring_area(ring):
+    x, y = ring[:, 0], ring[:, 1]
+    return float(np.sum(x[:-1] * y[1:] - x[1:] * y[:-1]) + x[-1] * y[0] - x[0] * y[-1]) / 2
+
+
+class _GeometryWriter:
+    """Builds the command stream of one feature; the cursor carries across parts."""
+
+    def __init__(self):
+        self.commands = []
+        self.cx = 0
+        self.cy = 0
+
+    def _move_and_draw(self, coords, close):
+        self.commands.append(_command(1, 1))
+        x, y = coords[0]
+        self.commands += [_zigzag(x - self.cx), _zigzag(y - self.cy)]
+        self.cx, self.cy = x, y
+        rest = coords[1:]
+        if len(rest):
+            self.commands.append(_command(2, len(rest)))
+            for x, y in rest:
+                self.commands += [_zigzag(x - self.cx), _zigzag(y - self.cy)]
+                self.cx, self.cy = x, y
+        if close:
+            self.commands.append(_command(7, 1))
+
+    def points(self, coords):
+        self.commands.append(_command(1, len(coords)))
+        for x, y in coords:
+            self.commands += [_zigzag(x - self.cx), _zigzag(y - self.cy)]
+            self.cx, self.cy = x, y
+
+    def line(self, coords):
+        self._move_and_draw(coords, close=False)
+
+    def ring(self, coords):
+        # Rings are closed with ClosePath, so the repeated last vertex is dropped
+        self._move_and_draw(coords[:-1], close=True)
+
+
+def _dedupe(coords):
+    """Integer tile coordinates with consecutive duplicates removed."""
+    coords = np.rint(coords).astype(np.int64)
+    if len(coords) < 2:
+        return coords
+    keep = np.ones(len(coords), dtype=bool)
+    keep[1:] = np.any(coords[1:] != coords[:-1], axis=1)
+    return coords[keep]
+
+
+class _LayerEncoder:
+    def __init__(self, name):
+        self.name = name
+        self.keys = {}
+        self.values = {}
+        self.features = []
+
+    def _tags(self, properties):
+        tags = []
+        for key, value in properties.items():
+            if value is None or (isinstance(value, float) and math.isnan(value)):
+                continue
+            key_index = self.keys.setdefault(key, len(self.keys))
+            encoded = _encode_value(value)
+            value_index = self.values.setdefault(encoded, len(self.values))
+            tags += [key_index, value_index]
+        return tags
+
+    def add(self, geom_type, commands, properties, feature_id=None):
+        feature = bytearray()
+        if feature_id is not None:
+            _field_varint(1, int(feature_id), feature)
+        tags = self._tags(properties)
+        if tags:
+            _field_bytes(2, _packed(tags), feature)
+        _field_varint(3, geom_type, feature)
+        _field_bytes(4, _packed(commands), feature)
+        self.features.append(bytes(feature))
+
+    def encode(self):
+        layer = bytearray()
+        _field_varint(15, 2, layer)
+        _field_bytes(1, self.name.encode("utf-8"), layer)
+        for feature in self.features:
+            _field_bytes(2, feature, layer)
+        for key in self.keys:
+            _field_bytes(3, key.encode("utf-8"), layer)
+        for value in self.values:
+            _field_bytes(4, value, layer)
+        _field_varint(5, EXTENT, layer)
+        tile = bytearray()
+        _field_bytes(3, layer, tile)
+        return bytes(tile)
+
+
+# ---------- Tile math ----------
+def tile_bounds(z, x, y):
+    """Web Mercator bounds (minx, miny, maxx, maxy) of a tile, in metres."""
+    size = 2 * _HALF_WORLD / (2 ** z)
+    minx = -_HALF_WORLD + x * size
+    maxy = _HALF_WORLD - y * size
+    return minx, maxy - size, minx + size, maxy
+
+
+def _to_mercator(lat, lon):
+    lat = np.clip(np.asarray(lat, dtype=float), -85.05112878, 85.05112878)
+    mx = np.asarray(lon, dtype=float) * _HALF_WORLD / 180.0
+    my = np.log(np.tan((90.0 + lat) * np.pi / 360.0)) * _HALF_WORLD / np.pi
+    return mx, my
+
+
+# ---------- Layer sources ----------
+class _PointSource:
+    """Point layer indexed by sorted x; a tile is a searchsorted slice plus a y mask."""
+
+    geom_type = 1
+
+    def __init__(self, lat, lon, properties, weight=None):
+        mx, my = _to_mercator(lat, lon)
+        valid = ~(np.isnan(mx) | np.isnan(my))
+        order = np.argsort(mx[valid], kind="stable")
+        self.mx = mx[valid][order]
+        self.my = my[valid][order]
+        self.properties = {name: np.asarray(values)[valid][order] for name, values in properties.items()}
+        weight = np.ones(len(mx)) if weight is None else np.asarray(weight, dtype=float)
+        self.weight = weight[valid][order]
+
+    def render(self, encoder, z, bounds):
+        minx, miny, maxx, maxy = bounds
+        size = maxx - minx
+        pad = size * BUFFER / EXTENT
+        lo, hi = np.searchsorted(self.mx, [minx - pad, maxx + pad])
+        y_slice = self.my[lo:hi]
+        idx = lo + np.flatnonzero((y_slice >= miny - pad) & (y_slice <= maxy + pad))
+        if not len(idx):
+            return
+        px = (self.mx[idx] - minx) / size * EXTENT
+        py = (maxy - self.my[idx]) / size * EXTENT
+
+        if z < POINT_DETAIL_ZOOM:
+            # Merge points that land in the same coarse cell into one counted feature
+            step = EXTENT / POINT_MERGE_GRID
+            cells = np.floor(px / step).astype(np.int64) * (POINT_MERGE_GRID * 4) + np.floor(py / step).astype(np.int64)
+            _, first, inverse = np.unique(cells, return_index=True, return_inverse=True)
+            counts = np.bincount(inverse, weights=self.weight[idx])
+            for i, (j, count) in enumerate(zip(first, counts)):
+                writer = _GeometryWriter()
+                writer.points([(int(round(px[j])), int(round(py[j])))])
+                encoder.add(self.geom_type, writer.commands, {"count": int(round(count))}, feature_id=i + 1)
+            return
+
+        for i, j in enumerate(idx):
+            writer = _GeometryWriter()
+            writer.points([(int(round(px[i])), int(round(py[i])))])
+            properties = {name: _native(values[j]) for name, values in self.properties.items()}
+            properties["count"] = int(round(self.weight[j]))
+            encoder.add(self.geom_type, writer.commands, properties, feature_id=i + 1)
+
+
+class _PolygonSource:
+    """Polygon layer (EPSG:3857) indexed with a shapely STRtree."""
+
+    geom_type = 3
+
+    def __init__(self, gdf, properties):
+        gdf = gdf[gdf.geometry.notna() & ~gdf.geometry.is_empty].to_crs(epsg=3857)
+        self.geometries = gdf.geometry.to_numpy()
+        self.tree = shapely.STRtree(self.geometries)
+        self.properties = {name: gdf[column].to_numpy() for name, column in properties.items()}
+
+    def render(self, encoder, z, bounds):
+        minx, miny, maxx, maxy = bounds
+        size = maxx - minx
+        pad = size * BUFFER / EXTENT
+        clip_box = (minx - pad, miny - pad, maxx + pad, maxy + pad)
+        for i in self.tree.query(shapely.box(*clip_box)):
+            # One tile unit is the finest detail the tile can show
+            clipped = shapely.clip_by_rect(self.geometries[i], *clip_box).simplify(size / EXTENT)
+            writer = _GeometryWriter()
+            for polygon in getattr(clipped, "geoms", [clipped]):
+                if polygon.is_empty or polygon.geom_type != "Polygon":
+                    continue
+                exterior = self._ring(polygon.exterior, minx, maxy, size, exterior=True)
+                if exterior is None:
+                    continue
+                writer.ring(exterior)
+                for interior in polygon.interiors:
+                    hole = self._ring(interior, minx, maxy, size, exterior=False)
+                    if hole is not None:
+                        writer.ring(hole)
+            if writer.commands:
+                properties = {name: _native(values[i]) for name, values in self.properties.items()}
+                encoder.add(self.geom_type, writer.commands, properties, feature_id=int(i) + 1)
+
+    @staticmethod
+    def _ring(ring, minx, maxy, size, exterior):
+        coords = np.asarray(ring.coords)
+        tile = np.column_stack(((coords[:, 0] - minx) / size * EXTENT, (maxy - coords[:, 1]) / size * EXTENT))
+        tile = _dedupe(tile)
+        if len(tile) < 4:
+            return None
+        area = _ring_area(tile[:-1])
+        if area == 0:
+            return None
+        # MVT wants exterior rings with positive area (clockwise on screen) and holes negative
+        if (area > 0) != exterior:
+            tile = tile[::-1]
+        return tile
+
+
+def _native(value):
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return value
+
+
+def _load_potholes():
+    # Pothole reports are keyed by pavement segment; place each segment's count at the segment
+    reports = integrated.pothole_reports
+    if reports is None or "Latitude" not in reports.segments.columns:
+        return None
+    joined = reports.segments.dropna(subset=["Latitude", "Longitude"]).reset_index()
+    return _PointSource(
+        joined["Latitude"], joined["Longitude"],
+        {"CartID": joined["CartID"].astype(np.int64), "MSAG_Name": joined["MSAG_Name"]},
+        weight=joined["potholes"],
+    )
+
+
+def _load_complaints():
+    df = integrated.complaint_df
+    if df.empty or "Latitude" not in df.columns:
+        return None
+    opened = pd.to_datetime(df["OPENEDDATETIME"], errors="coerce") if "OPENEDDATETIME" in df.columns else None
+    properties = {"CASEID": df["CASEID"] if "CASEID" in df.columns else np.arange(len(df))}
+    if opened is not None:
+        properties["opened"] = opened.dt.strftime("%Y-%m-%d").fillna("")
+    if "CLOSEDDATETIME" in df.columns:
+        properties["open"] = df["CLOSEDDATETIME"].isna()
+    if "MSAG_Name" in df.columns:
+        properties["MSAG_Name"] = df["MSAG_Name"]
+    return _PointSource(df["Latitude"], df["Longitude"], properties)
+
+
+def _load_pavement():
+    df = integrated.pavement_latlon_df
+    if df.empty or "Latitude" not in df.columns:
+        return None
+    properties = {column: df[column] for column in ("CartID", "MSAG_Name", "PCI") if column in df.columns}
+    return _PointSource(df["Latitude"], df["Longitude"], properties)
+
+
+def _load_via_stops():
+    df = integrated.via_stops_df
+    if df.empty or "stop_lat" not in df.columns:
+        return None
+    return _PointSource(df["stop_lat"], df["stop_lon"], {"stop_id": df["stop_id"], "stop_name": df["stop_name"]})
+
+
+def _load_boundary(gdb, layer, properties):
+    def load():
+        path = os.path.join(BOUNDARY_DIR, gdb)
+        if not os.path.exists(path):
+            return None
+        return _PolygonSource(gpd.read_file(path, layer=layer), properties)
+    return load
+
+
+LAYERS = {
+    "potholes": _load_potholes,
+    "complaints": _load_complaints,
+    "pavement": _load_pavement,
+    "via_stops": _load_via_stops,
+    "zip_codes": _load_boundary("ZIP_Codes.gdb", "ZIP_Codes", {"zip": "ZCTA5CE20"}),
+    "council_districts": _load_boundary("Council_Districts.gdb", "CoSACouncilDistricts", {"district": "District", "name": "Name"}),
+}
+
+_sources = {}
+_sources_lock = threading.Lock()
+
+
+def _source(layer):
+    with _sources_lock:
+        if layer not in _sources:
+            _sources[layer] = LAYERS[layer]()
+        return _sources[layer]
+
+
+def data_version():
+    """Short fingerprint of the source data; cached tiles from older data are never served."""
+    digest = hashlib.md5()
+    for root, _, files in sorted(os.walk(integrated.data_folder_path)):
+        for name in sorted(files):
+            if name.endswith((".csv", ".gdbtable")):
+                stat = os.stat(os.path.join(root, name))
+                digest.update(f"{name}:{stat.st_size}:{int(stat.st_mtime)}".encode())
+    return digest.hexdigest()[:12]
+
+
+_version = None
+
+
+def _cache_path(layer, z, x, y):
+    global _version
+    if _version is None:
+        _version = data_version()
+    return os.path.join(TILE_CACHE_DIR, _version, layer, str(z), str(x), f"{y}.mvt")
+
+
+def valid_tile(z, x, y):
+    return 0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def render_tile(layer, z, x, y):
+    """Encode one tile; empty tiles are empty bytes."""
+    source = _source(layer)
+    if source is None:
+        return b""
+    encoder = _LayerEncoder(layer)
+    source.render(encoder, z, tile_bounds(z, x, y))
+    return encoder.encode() if encoder.features else b""
+
+
+def get_tile(layer, z, x, y):
+    """Return (tile_bytes, etag), reading the disk cache or rendering and storing the tile."""
+    path = _cache_path(layer, z, x, y)
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        data = render_tile(layer, z, x, y)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    return data, '"' + hashlib.md5(data).hexdigest() + '"'
+
+
+def pregenerate(layers, min_zoom, max_zoom, bounds=(-98.82, 29.18, -98.22, 29.74)):
+    """Render every tile covering `bounds` (lon/lat, San Antonio by default) into the cache."""
+    min_lon, min_lat, max_lon, max_lat = bounds
+    total = 0
+    for z in range(min_zoom, max_zoom + 1):
+        n = 2 ** z
+        x0 = int((min_lon + 180) / 360 * n)
+        x1 = int((max_lon + 180) / 360 * n)
+        y0 = int((1 - math.asinh(math.tan(math.radians(max_lat))) / math.pi) / 2 * n)
+        y1 = int((1 - math.asinh(math.tan(math.radians(min_lat))) / math.pi) / 2 * n)
+        for layer in layers:
+            for x in range(x0, x1 + 1):
+                for y in range(y0, y1 + 1):
+                    get_tile(layer, z, x, y)
+                    total += 1
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-generate vector tiles into the tile cache.")
+    parser.add_argument("--layers", nargs="+", default=list(LAYERS), choices=list(LAYERS))
+    parser.add_argument("--min-zoom", type=int, default=9)
+    parser.add_argument("--max-zoom", type=int, default=12)
+    args = parser.parse_args()
+    count = pregenerate(args.layers, args.min_zoom, args.max_zoom)
+    print(f"Wrote {count} tiles to {TILE_CACHE_DIR}")
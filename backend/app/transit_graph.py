@@ -0,0 +1,136 @@
+"""
+VIA transfer network and its exposure to potholes.
+
+Stops (stops_cleaned.csv) are nodes and the GTFS transfers
+(transfers_data_cleaned.csv, from_stop_id -> to_stop_id) are edges, held as
+a CSR adjacency: `indptr[i]:indptr[i + 1]` slices the neighbours of stop i.
+In one vectorized pass over the edge arrays it computes:
+  * degree and PageRank centrality per stop
+  * transfer hubs: groups of stops joined by transfers (a transit center's
+    bays, a corner's four stops), found by min-label propagation
+  * pothole exposure: road complaints within EXPOSURE_RADIUS_M of each stop,
+    and of each hub without double counting complaints near two of its stops
+
+integrated.py registers the stop and hub tables with the warm-start snapshot
+(snapshot.py), so a restart on the same data reads them back instead of
+rebuilding the graph.
+"""
+
+import numpy as np
+import pandas as pd
+import shapely
+
+EXPOSURE_RADIUS_M = 200  # complaints this close to a stop count towards its exposure
+DAMPING = 0.85  # PageRank damping
+PAGERANK_ITERATIONS = 50
+METRES_PER_DEGREE = 111_320.0
+
+
+class TransferGraph:
+    def __init__(self, stop_ids, from_ids, to_ids):
+        """Undirected CSR adjacency over `stop_ids`; transfers between unknown stops are dropped."""
+        self.stop_ids = pd.Index(stop_ids)
+        source = self.stop_ids.get_indexer(pd.Index(from_ids))
+        target = self.stop_ids.get_indexer(pd.Index(to_ids))
+        keep = (source >= 0) & (target >= 0) & (source != target)
+        n = len(self.stop_ids)
+        # Both directions, each undirected edge once per endpoint
+        pairs = np.unique(np.concatenate([
+            source[keep].astype(np.int64) * n + target[keep],
+            target[keep].astype(np.int64) * n + source[keep],
+        ]))
+        rows, self.indices = pairs // n, (pairs % n).astype(np.int32)
+        self.indptr = np.searchsorted(rows, np.arange(n + 1))
+        self._rows = rows
+
+    def __len__(self):
+        return len(self.stop_ids)
+
+    @property
+    def edge_count(self):
+        return len(self.indices) // 2
+
+    def degree(self):
+        return np.diff(self.indptr)
+
+    def neighbours(self, stop):
+        return self.indices[self.indptr[stop]:self.indptr[stop + 1]]
+
+    def pagerank(self, damping=DAMPING, iterations=PAGERANK_ITERATIONS):
+        """PageRank by power iteration over the edge arrays; stops without transfers keep the teleport share."""
+        n = len(self)
+        degree = self.degree().astype(float)
+        rank = np.full(n, 1.0 / n)
+        for _ in range(iterations):
+            share = np.divide(rank, degree, out=np.zeros(n), where=degree > 0)
+            dangling = rank[degree == 0].sum()
+            rank = (1 - damping) / n + damping * (np.bincount(self.indices, weights=share[self._rows], minlength=n) + dangling / n)
+        return rank
+
+    def components(self):
+        """Component label per stop (the smallest stop index in its group of connected stops)."""
+        labels = np.arange(len(self))
+        while True:
+            updated = labels.copy()
+            np.minimum.at(updated, self._rows, labels[self.indices])
+            updated = updated[updated]  # pointer jumping halves the remaining distance
+            if np.array_equal(updated, labels):
+                return labels
+            labels = updated
+
+
+def _local_points(lat, lon, origin):
+    x = (lon - origin[1]) * METRES_PER_DEGREE * np.cos(np.radians(origin[0]))
+    y = (lat - origin[0]) * METRES_PER_DEGREE
+    return shapely.points(np.nan_to_num(x, nan=1e12), np.nan_to_num(y, nan=1e12))
+
+
+def stop_exposure(stops, complaints, radius_m=EXPOSURE_RADIUS_M):
+    """(stop row, complaint row) pairs within `radius_m`, from an STRtree over the complaint points."""
+    stop_lat = pd.to_numeric(stops["stop_lat"], errors="coerce").to_numpy(dtype=float)
+    stop_lon = pd.to_numeric(stops["stop_lon"], errors="coerce").to_numpy(dtype=float)
+    origin = (np.nanmean(stop_lat), np.nanmean(stop_lon))
+    complaint_points = _local_points(
+        pd.to_numeric(complaints["Latitude"], errors="coerce").to_numpy(dtype=float),
+        pd.to_numeric(complaints["Longitude"], errors="coerce").to_numpy(dtype=float), origin)
+    stop_points = _local_points(stop_lat, stop_lon, origin)
+    return shapely.STRtree(complaint_points).query(stop_points, predicate="dwithin", distance=radius_m)
+
+
+def analyze(stops, transfers, complaints, radius_m=EXPOSURE_RADIUS_M):
+    """(stop table, hub table) with centrality, hub membership and nearby complaint counts."""
+    stops = stops.reset_index(drop=True)
+    graph = TransferGraph(stops["stop_id"], transfers["from_stop_id"], transfers["to_stop_id"])
+    hub = graph.components()
+    stop_index, complaint_index = stop_exposure(stops, complaints, radius_m)
+    n = len(graph)
+    table = pd.DataFrame({
+        "stop_id": stops["stop_id"].to_numpy(),
+        "stop_name": stops["stop_name"].to_numpy(),
+        "stop_lat": stops["stop_lat"].to_numpy(),
+        "stop_lon": stops["stop_lon"].to_numpy(),
+        "transfers": graph.degree(),
+        "pagerank": graph.pagerank(),
+        "hub": hub,
+        "nearby_complaints": np.bincount(stop_index, minlength=n),
+    })
+
+    # A hub's exposure counts each complaint once, even when it is near several of the hub's stops
+    hub_complaints = np.unique(hub[stop_index].astype(np.int64) * len(complaints) + complaint_index) // max(len(complaints), 1)
+    grouped = table.groupby("hub")
+    hubs = pd.DataFrame({
+        "stops": grouped.size(),
+        "transfers": grouped["transfers"].sum() // 2,
+        "pagerank": grouped["pagerank"].sum(),
+        "stop_lat": grouped["stop_lat"].mean(),
+        "stop_lon": grouped["stop_lon"].mean(),
+    })
+    hubs["nearby_complaints"] = np.bincount(hub_complaints, minlength=n)[hubs.index]
+    # Named after its most central stop
+    central = table.sort_values("pagerank", ascending=False, kind="stable").drop_duplicates("hub").set_index("hub")["stop_name"]
+    hubs.insert(0, "name", central.reindex(hubs.index))
+    hubs = hubs[hubs["stops"] > 1]
+    # Importance x exposure: how much of the network's transfer traffic meets pothole complaints
+    hubs["exposure_score"] = hubs["pagerank"] * len(table) * hubs["nearby_complaints"]
+    return table, hubs.sort_values("exposure_score", ascending=False).reset_index()
+
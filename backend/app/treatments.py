@@ -0,0 +1,224 @@
+"""
+Street treatments per pavement segment, and what they did to complaint rates.
+
+The IMP project export (Street_Sidewalk_IMP_Data_FY2014_24.gdb) has the line
+geometry and finish date of every street project, but no segment ids. The
+offline build links projects to segments (CartID) once:
+  * every located point that carries a CartID (311 pothole points, road
+    complaints and pavement segments) is matched to project lines within
+    LINK_DISTANCE_FT, and kept only when both name the same street (streets.py)
+  * each (segment, project) pair becomes one row of treatments.parquet, with
+    the project's finish date, treatment and category
+Run it from backend/app after the IMP or GIS data changes:
+    python treatments.py
+
+At startup `TreatmentIndex` joins those links to the complaint history on
+segment and time with sorted arrays. That gives each segment's time since its
+last treatment, and complaint counts in the year before and after each
+treatment, compared with the city-wide change over the same windows.
+"""
+
+import argparse
+import os
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from streets import base_keys
+
+DATA_DIR = os.path.join("..", "Data")
+GIS_DIR = os.path.join(DATA_DIR, "GIS")
+FEATURES_DIR = os.environ.get("POTHOLE_FEATURES_DIR", os.path.join(DATA_DIR, "features"))
+PROJECTS_PATH = os.path.join(GIS_DIR, "Street_Sidewalk_IMP_Data_FY2014_24.gdb")
+PROJECTS_LAYER = "FY2014_24_Street_Projects"
+PAVEMENT_PATH = os.path.join(DATA_DIR, "COSA_Pavement.csv")
+COMPLAINTS_PATH = os.path.join(DATA_DIR, "COSA_pavement_311.csv")
+
+LINK_DISTANCE_FT = 60  # half a street width plus GPS error; the project layer is in feet (EPSG:2278)
+EFFECT_WINDOW_DAYS = 365  # complaints counted before and after each treatment
+CATEGORIES = ["Rehabilitation", "Preservation", "Sealant"]
+# Application names without their " - City/Contract" suffix, with spelling variants merged
+TREATMENT_NAMES = {
+    "Micro Surface": "Microsurface", "Micros Surface": "Microsurface", "Hot Paver Laid Micro Surface": "Microsurface",
+    "Asphat Overlay": "Asphalt Overlay", "Mill & Overlay-Contract": "Mill & Overlay",
+    "Full Depth Reclamation": "Reclamation", "Reconstruction-L": "Reconstruction",
+    "Reconstruction with Concrete": "Reconstruction", "Reconstruction with Asphalt": "Reconstruction",
+}
+def normalize_treatment(application):
+    base = pd.Series(application, dtype="str").str.strip().str.replace(r"\s*-\s*(City|Contract|Inhouse|Contract Local|\d+)$", "", regex=True)
+    return base.replace(TREATMENT_NAMES)
+
+
+# ---------- Offline build ----------
+def read_projects():
+    import geopandas as gpd
+
+    projects = gpd.read_file(PROJECTS_PATH, layer=PROJECTS_LAYER, columns=[
+        "SMPProjectID", "ProjectStreet", "Application", "Type_", "FiscalYear", "ActualFinish"])
+    projects = projects[projects["ActualFinish"].notna() & projects.geometry.notna()].copy()
+    projects["finish"] = projects["ActualFinish"].dt.tz_localize(None).dt.normalize()
+    projects["treatment"] = normalize_treatment(projects["Application"]).to_numpy()
+    projects["category"] = projects["Type_"]
+    projects["street_key"] = base_keys(projects["ProjectStreet"]).to_numpy()
+    return projects.drop(columns=["ActualFinish", "Application", "Type_"])
+
+
+def _google_map_points(urls):
+    coords = pd.Series(urls, dtype="str").str.extract(r"place/([0-9.]+)N ([0-9.]+)W").astype(float)
+    return coords[0], -coords[1]
+
+
+def read_segment_points():
+    """Located points that carry a segment id: pothole points, road complaints and pavement segments."""
+    from features import read_potholes
+
+    frames = [pd.DataFrame(read_potholes()[["CartID", "MSAG_Name", "Latitude", "Longitude"]])]
+    if os.path.exists(COMPLAINTS_PATH):
+        frames.append(pd.read_csv(COMPLAINTS_PATH, usecols=["CartID", "MSAG_Name", "Latitude", "Longitude"]))
+    if os.path.exists(PAVEMENT_PATH):
+        pavement = pd.read_csv(PAVEMENT_PATH, usecols=["CartID", "MSAG_Name", "GoogleMapView"])
+        pavement["Latitude"], pavement["Longitude"] = _google_map_points(pavement["GoogleMapView"])
+        frames.append(pavement.drop(columns="GoogleMapView"))
+    points = pd.concat(frames, ignore_index=True)
+    points["CartID"] = pd.to_numeric(points["CartID"], errors="coerce").astype("Int64")
+    points = points.dropna(subset=["CartID", "Latitude", "Longitude"])
+    return points.drop_duplicates(["CartID", "Latitude", "Longitude"]).reset_index(drop=True)
+
+
+def link_projects(projects, points, distance=LINK_DISTANCE_FT):
+    """One row per (segment, project) where a point of the segment lies on a project line of the same street."""
+    import geopandas as gpd
+
+    located = gpd.GeoDataFrame(
+        points[["CartID"]].assign(point_key=base_keys(points["MSAG_Name"]).to_numpy()),
+        geometry=gpd.points_from_xy(points["Longitude"], points["Latitude"]), crs="EPSG:4326",
+    ).to_crs(projects.crs)
+    pairs = gpd.sjoin(located, projects, how="inner", predicate="dwithin", distance=distance)
+    pairs = pairs[(pairs["point_key"] == pairs["street_key"]) & (pairs["point_key"] != "")]
+    links = pairs[["CartID", "SMPProjectID", "finish", "FiscalYear", "treatment", "category"]]
+    return pd.DataFrame(links.drop_duplicates(["CartID", "SMPProjectID"])).reset_index(drop=True)
+
+
+def links_path():
+    return os.path.join(FEATURES_DIR, "treatments.parquet")
+
+
+def build(distance=LINK_DISTANCE_FT):
+    projects = read_projects()
+    points = read_segment_points()
+    links = link_projects(projects, points, distance)
+    os.makedirs(FEATURES_DIR, exist_ok=True)
+    con = duckdb.connect()
+    con.register("links", links)
+    con.execute(f"COPY (SELECT * FROM links ORDER BY CartID, finish) TO '{links_path()}' (FORMAT PARQUET, COMPRESSION ZSTD)")
+    con.close()
+    print(f"{len(projects)} finished projects, {len(points)} segment points -> {len(links)} links, "
+          f"{links['CartID'].nunique()} segments, {links['SMPProjectID'].nunique()} projects  {links_path()}")
+
+
+def load_links():
+    """The segment-project links; an empty DataFrame when they have not been built."""
+    path = links_path()
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=["CartID", "SMPProjectID", "finish", "FiscalYear", "treatment", "category"])
+    con = duckdb.connect()
+    try:
+        links = con.execute("SELECT * FROM read_parquet(?)", [path]).df()
+    finally:
+        con.close()
+    links["CartID"] = links["CartID"].astype("Int64")
+    links["finish"] = pd.to_datetime(links["finish"])
+    return links
+
+
+# ---------- Runtime index ----------
+def _days(values):
+    return pd.to_datetime(values).to_numpy(dtype="datetime64[D]").astype(np.int64)
+
+
+class TreatmentIndex:
+    def __init__(self, links, complaints, window_days=EFFECT_WINDOW_DAYS):
+        """`links`: load_links() output; `complaints`: OPENEDDATETIME and CartID per road complaint."""
+        self.links = links.dropna(subset=["CartID", "finish"]).sort_values(["CartID", "finish"], kind="stable").reset_index(drop=True)
+        self.window_days = window_days
+        self._segments = self.links["CartID"].to_numpy(dtype=np.int64)
+        self._finish = _days(self.links["finish"])
+
+        opened = pd.to_datetime(complaints["OPENEDDATETIME"], errors="coerce")
+        segment = pd.to_numeric(complaints["CartID"], errors="coerce")
+        valid = (opened.notna() & segment.notna()).to_numpy()
+        days = _days(opened[valid])
+        self.complaint_range = (int(days.min()), int(days.max())) if len(days) else None
+        # One sorted key per complaint, segment-major, so a (segment, interval) count is two binary searches
+        self._span = int(days.max() - days.min() + 1) if len(days) else 1
+        self._origin = int(days.min()) if len(days) else 0
+        self._keys = np.sort(segment[valid].to_numpy(dtype=np.int64) * self._span + (days - self._origin))
+        self._city_cumulative = np.concatenate([[0], np.cumsum(np.bincount(days - self._origin, minlength=self._span))])
+        self.effects = self._effects()
+
+    def _count(self, segments, start, end):
+        """Complaints on each segment with start <= day < end (days since the epoch)."""
+        lo = np.clip(start - self._origin, 0, self._span)
+        hi = np.clip(end - self._origin, 0, self._span)
+        base = segments * self._span
+        return np.searchsorted(self._keys, base + hi) - np.searchsorted(self._keys, base + lo)
+
+    def _city_count(self, start, end):
+        lo = np.clip(start - self._origin, 0, self._span)
+        hi = np.clip(end - self._origin, 0, self._span)
+        return self._city_cumulative[hi] - self._city_cumulative[lo]
+
+    def _effects(self):
+        """Per-link complaints in the window before and after the finish date, where both windows are observed."""
+        if self.complaint_range is None or self.links.empty:
+            return self.links.iloc[0:0].assign(before=0, after=0, city_before=0, city_after=0)
+        first, last = self.complaint_range
+        w = self.window_days
+        observed = (self._finish - w >= first) & (self._finish + w <= last)
+        segments, finish = self._segments[observed], self._finish[observed]
+        return self.links[observed].assign(
+            before=self._count(segments, finish - w, finish),
+            after=self._count(segments, finish, finish + w),
+            city_before=self._city_count(finish - w, finish),
+            city_after=self._city_count(finish, finish + w),
+        ).reset_index(drop=True)
+
+    def last_treated(self, cutoff):
+        """Finish date of each segment's latest treatment before `cutoff` (Series by CartID)."""
+        before = self._finish < _days([cutoff])[0]
+        if not before.any():
+            return pd.Series(dtype="datetime64[ns]")
+        links = self.links[before]
+        return links.groupby("CartID")["finish"].max()
+
+    def years_since_treatment(self, segments, cutoff):
+        """Years from each segment's latest treatment to `cutoff`; NaN for segments never treated in the IMP history."""
+        last = self.last_treated(cutoff)
+        finish = pd.Series(pd.to_numeric(segments, errors="coerce")).astype("Int64").map(last)
+        return ((pd.Timestamp(cutoff) - pd.to_datetime(finish)).dt.days / 365.25).to_numpy()
+
+    def summary(self, by="category"):
+        """Complaints per treated segment in the year before and after, and the change relative to the city-wide trend."""
+        effects = self.effects
+        if effects.empty:
+            return pd.DataFrame()
+        grouped = effects.groupby(by)
+        table = pd.DataFrame({
+            "treated_segments": grouped.size(),
+            "before_per_segment": grouped["before"].mean(),
+            "after_per_segment": grouped["after"].mean(),
+        })
+        with np.errstate(divide="ignore", invalid="ignore"):
+            raw = grouped["after"].sum() / grouped["before"].sum()
+            city = grouped["city_after"].sum() / grouped["city_before"].sum()
+            table["change_pct"] = (raw - 1) * 100
+            table["change_vs_city_pct"] = (raw / city - 1) * 100
+        return table.sort_values("treated_segments", ascending=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Link IMP street projects to pavement segments.")
+    parser.add_argument("--distance", type=float, default=LINK_DISTANCE_FT, help="link distance in feet")
+    args = parser.parse_args()
+    build(args.distance)
@@ -0,0 +1,69 @@
+"""
+Representative prompt corpus for the chat backend benchmarks.
+
+Each entry is (expected_intent, prompt). The intent is the name recorded by the
+instrumentation layer, so the harness can check that every prompt still routes
+where we think it does.
+"""
+
+PROMPT_CORPUS = [
+    # --- Pavement / pothole data ---
+    ("handle_pci_in_zipcode", "What's the PCI in zip code 78201?"),
+    ("handle_pothole_formation_prediction_area", "How likely will potholes form on Hazel Cv?"),
+    ("get_pothole_formation_prediction", "How likely will potholes form?"),
+    ("handle_street_year_reports", "How many potholes were reported on Main in 2021?"),
+    ("handle_areas_with_most_potholes", "Where are the most potholes?"),
+    ("handle_potholes_near_address", "Are there potholes near 100 Military Dr?"),
+    ("handle_potholes_on_route", "Will I face potholes on the way to Downtown San Antonio?"),
+    ("handle_potholes_in_area", "How many potholes are in Alamo Heights?"),
+    ("handle_should_avoid_area", "Should I avoid Alamo Heights because of the potholes?"),
+    ("handle_potholes_this_month", "How many potholes have been found this month?"),
+    ("get_worst_pothole_streets", "Display streets with the worst potholes"),
+    ("handle_avg_fix_time", "How long does it take on average for potholes to get fixed in San Antonio?"),
+    ("handle_why_so_many_potholes", "Why are there so many potholes?"),
+    ("handle_weather_effect", "How does weather affect pothole formation?"),
+    ("handle_pothole_forecast", "How many potholes are expected next week?"),
+    # --- Safety & prevention ---
+    ("handle_active_complaints_near_sensitive_areas", "Are there active pothole complaints near a school?"),
+    ("handle_intersections_via_pothole_injury", "Which intersections with VIA stops have high pothole and injury rates?"),
+    ("handle_prioritize_maintenance_for_buses", "Where should preventative maintenance be prioritized for bus routes?"),
+    ("handle_repeated_complaints_on_road", "Is there a history of repeated pothole complaints along Hazel Cv?"),
+    ("handle_bus_stops_near_high_risk_pavement", "Which bus stops are near high-risk pavement?"),
+    ("handle_bus_stops_near", "Which bus stops are near Fredericksburg Rd?"),
+    ("handle_worst_bus_stops", "Which bus stops have the worst nearby pavement?"),
+    ("handle_transfer_hubs_pothole_exposure", "Which transfer hubs are most affected by potholes?"),
+    ("handle_any_complaints_near_sensitive_areas", "Are there any pothole complaints near a hospital?"),
+    # --- VIA / planning ---
+    ("handle_via_route_analytics", "Show me VIA route risk"),
+    ("handle_via_buses_on_pothole_prone_streets", "Which VIA buses travel most often on pothole-prone streets?"),
+    ("handle_eta_delay_prediction", "Can you predict the ETA for route 100?"),
+    ("handle_budget_cost_estimation", "Estimate the budget for pothole repairs"),
+    ("handle_treatment_effectiveness", "Do street treatments reduce pothole complaints?"),
+    ("handle_dashboard_documentation", "Where is the dashboard?"),
+    ("handle_research_ideas", "Give me some research ideas"),
+    ("handle_security_compliance", "How do you handle PII?"),
+    # --- Survey ---
+    ("handle_public_transportation_sentiment_zipcode", "Do people in zip code 78201 like public transportation?"),
+    ("handle_public_transit_satisfaction_zipcode", "Are people in zip code 78201 satisfied with their public transit?"),
+    ("handle_investment_opportunities", "Are there opportunities for investment in San Antonio?"),
+    ("handle_transportation_mode_zipcode", "What do most citizens in zip code 78201 use for their mode of transportation?"),
+    ("handle_transportation_improvements", "What do most people in San Antonio want to see improved for transportation?"),
+    ("handle_missing_services_zipcode", "What public services or resources do people in zip code 78201 lack?"),
+    ("handle_city_satisfaction", "Do San Antonians like the city?"),
+    ("handle_city_attitude", "Is San Antonio cool?"),
+    ("handle_community_spaces_accessibility_zipcode", "How accessible are public community spaces in zip code 78201?"),
+    ("handle_community_spaces_accessibility_city", "How accessible are public community spaces in San Antonio?"),
+    ("handle_housing_affordability_zipcode", "How affordable is housing in zip code 78201?"),
+    ("handle_housing_affordability_city", "How affordable is housing in San Antonio?"),
+    ("handle_housing_types", "What type of housing do San Antonio?"),
+    ("handle_living_arrangements", "Do most people live by themselves or with others?"),
+    # --- RAG and legacy keyword paths ---
+    ("handle_rag_street_year", "Show records for Main in 2022"),
+    ("get_pavement_condition_prediction", "What is the pavement condition for Hazel Cv"),
+    ("get_monthly_pothole_count", "Give me the monthly pothole count"),
+    ("get_top_complaint_locations", "What are the top complaint locations?"),
+    ("get_unresolved_complaints_by_year", "How many unresolved complaints are there?"),
+    ("get_seasonal_pothole_impact", "Show potholes by season"),
+    ("handle_keyword_response", "What does the heatmap show?"),
+    ("handle_llm_fallback", "Tell me something interesting about San Antonio."),
+]
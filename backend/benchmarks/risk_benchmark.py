@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Compare the trained formation-risk model with the fixed 0.5/0.3/0.2 formula.
+
+Reports:
+  * scoring time: the formula recomputed per question (what the handlers used to
+    do), the model's one-off scoring pass at startup, and the lookup the
+    handlers do now
+  * ranking quality on the most recent full year of complaints: ROC AUC and
+    precision of the top 10 and top 100 streets
+
+Usage (from anywhere):
+    python backend/benchmarks/risk_benchmark.py
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(os.path.dirname(BENCH_DIR), "app")
+
+
+def time_calls(fn, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    ms = np.asarray(timings) * 1000
+    return {"p50_ms": round(float(np.percentile(ms, 50)), 3), "p95_ms": round(float(np.percentile(ms, 95)), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20, help="timed calls per scoring method")
+    parser.add_argument("--output", help="also write the report to this JSON file")
+    parser.add_argument("--app-dir", default=APP_DIR, help="backend app directory (its ../Data is used)")
+    args = parser.parse_args()
+
+    os.environ.setdefault("POTHOLE_TRACE_LOG", "off")
+    # The app resolves its data as ../Data relative to the working directory
+    os.chdir(args.app_dir)
+    sys.path.insert(0, args.app_dir)
+    import integrated
+    import risk_model
+
+    pavement, complaints = integrated.pavement_latlon_df, integrated.complaint_df
+    if integrated.street_risk_df.empty:
+        print("Pavement and complaint data are required for this benchmark.")
+        return 1
+    segment_features, treatments = integrated.segment_features_df, integrated.treatment_index
+    model = integrated.formation_model
+    cutoff = risk_model.latest_date(complaints)
+    area = integrated.street_risk_df["MSAG_Name"].iloc[len(integrated.street_risk_df) // 2]
+
+    report = {
+        "timing": {
+            "formula_per_question": time_calls(lambda: risk_model.formula_street_scores(pavement, complaints, cutoff, treatments), args.iterations),
+            "model_scoring_pass": time_calls(lambda: risk_model.score_streets(model, pavement, complaints, segment_features, treatments=treatments), args.iterations),
+            "model_lookup_top10": time_calls(lambda: integrated.street_risk_df.head(10), args.iterations),
+            "model_lookup_area": time_calls(lambda: integrated.handle_pothole_formation_prediction_area(area), args.iterations),
+        },
+        "quality": risk_model.validate(pavement, complaints, segment_features, treatments),
+    }
+
+    print(f"{'scoring':<24}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, t in report["timing"].items():
+        print(f"{name:<24}{t['p50_ms']:>10.3f}{t['p95_ms']:>10.3f}")
+    print(f"\nRanking of the year from {report['quality']['validation_cutoff']}:")
+    print(f"{'':<10}{'streets':>9}{'AUC':>8}{'P@10':>8}{'P@100':>8}")
+    for name in ("model", "formula"):
+        m = report["quality"][name]
+        print(f"{name:<10}{m['streets']:>9}{m.get('auc', float('nan')):>8.3f}{m['precision_at_10']:>8.2f}{m['precision_at_100']:>8.2f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for the chat backend.
+
+Runs two suites against local stubs for Groq, Nominatim and OSRM:
+  * micro-benchmarks: every prompt in the corpus through get_groq_response, in-process
+  * load test: concurrent POST /chat requests against a real uvicorn server
+
+Reports p50/p95/p99 latency, throughput and RSS, and compares the p95s with
+the stored baseline.json. The run exits with 1 on any regression beyond the
+tolerance, on any prompt or request that fails, and when there is no baseline
+to compare with (record one with --update-baseline).
+
+Usage (from anywhere):
+    python backend/benchmarks/run_benchmarks.py                    # compare against baseline.json
+    python backend/benchmarks/run_benchmarks.py --update-baseline  # record a new baseline
+"""
+
+import argparse
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(os.path.dirname(BENCH_DIR), "app")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+sys.path.insert(0, BENCH_DIR)
+from corpus import PROMPT_CORPUS  # noqa: E402
+from stubs import start_stub_server  # noqa: E402
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB (falls back to peak RSS off Linux)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def summarize(latencies_s):
+    ms = np.asarray(latencies_s) * 1000
+    return {
+        "count": int(ms.size),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def run_micro(integrated, instrumentation, iterations):
+    """Time every corpus prompt in-process and check it routes to the expected intent.
+
+    A prompt whose handler raises is reported with its error instead of timings.
+    """
+    import matplotlib.pyplot as plt
+
+    results = {}
+    for expected, prompt in PROMPT_CORPUS:
+        # Warm-up call doubles as the routing check
+        trace = instrumentation.start_trace()
+        try:
+            integrated.get_groq_response(prompt)
+        except Exception as e:
+            print(f"  ! '{prompt}' failed: {e!r}")
+            results[expected] = {"prompt": prompt, "routed_to": trace.intent, "error": repr(e)}
+            continue
+        finally:
+            instrumentation.finish_trace(trace)
+            plt.close("all")
+        routed = trace.intent
+
+        latencies = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            integrated.get_groq_response(prompt)
+            latencies.append(time.perf_counter() - start)
+            plt.close("all")
+        results[expected] = dict(summarize(latencies), prompt=prompt, routed_to=routed)
+        if routed != expected:
+            print(f"  ! '{prompt}' routed to {routed}, expected {expected}")
+    return results
+
+
+def start_app_server(port):
+    import uvicorn
+    import main
+
+    config = uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 30
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError("uvicorn did not start within 30s")
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def run_load(base_url, total_requests, concurrency):
+    """Fire `total_requests` /chat calls with `concurrency` workers, cycling through the corpus."""
+    prompts = [prompt for _, prompt in PROMPT_CORPUS]
+    session_local = threading.local()
+
+    def one_request(i):
+        session = getattr(session_local, "session", None)
+        if session is None:
+            session = session_local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            resp = session.post(f"{base_url}/chat", json={"message": prompts[i % len(prompts)]}, timeout=120)
+            ok = resp.status_code == 200
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(one_request, range(total_requests)))
+    wall = time.perf_counter() - wall_start
+
+    latencies = [lat for lat, _ in outcomes]
+    errors = sum(1 for _, ok in outcomes if not ok)
+    return dict(
+        summarize(latencies),
+        concurrency=concurrency,
+        errors=errors,
+        throughput_rps=round(total_requests / wall, 2),
+        rss_mb=round(current_rss_mb(), 1),
+    )
+
+
+def failures(report):
+    """Prompts and load-test requests that failed; their timings say nothing about the app."""
+    failed = [f"micro/{intent}: {stats['error']}" for intent, stats in report["micro"].items() if "error" in stats]
+    if report.get("load", {}).get("errors"):
+        failed.append(f"load: {report['load']['errors']} of {report['load']['count']} requests failed")
+    return failed
+
+
+def compare_with_baseline(report, baseline, tolerance, slack_ms):
+    """Return a list of human-readable regressions (empty when everything is within budget)."""
+    regressions = failures(report)
+
+    def check(label, current, previous):
+        allowed = previous * (1 + tolerance) + slack_ms
+        if current > allowed:
+            regressions.append(f"{label}: p95 {current:.1f} ms > allowed {allowed:.1f} ms (baseline {previous:.1f} ms)")
+
+    for intent, stats in report["micro"].items():
+        previous = baseline.get("micro", {}).get(intent)
+        if previous and "error" not in stats and "p95_ms" in previous:
+            check(f"micro/{intent}", stats["p95_ms"], previous["p95_ms"])
+    if report.get("load") and baseline.get("load"):
+        check("load", report["load"]["p95_ms"], baseline["load"]["p95_ms"])
+        base_rps = baseline["load"]["throughput_rps"]
+        if report["load"]["throughput_rps"] < base_rps / (1 + tolerance):
+            regressions.append(f"load: throughput {report['load']['throughput_rps']} rps < baseline {base_rps} rps")
+    base_rss = baseline.get("startup", {}).get("rss_mb")
+    if base_rss and report["startup"]["rss_mb"] > base_rss * (1 + tolerance):
+        regressions.append(f"startup: RSS {report['startup']['rss_mb']} MB > baseline {base_rss} MB")
+    return regressions
+
+
+def print_report(report):
+    print(f"\nStartup: {report['startup']['import_s']:.2f}s to import, RSS {report['startup']['rss_mb']:.1f} MB")
+    print(f"\n{'intent':<52}{'p50':>10}{'p95':>10}{'p99':>10}  (ms)")
+    for intent, stats in sorted(report["micro"].items(), key=lambda kv: -kv[1].get("p95_ms", float("inf"))):
+        if "error" in stats:
+            print(f"{intent:<52}{'FAILED':>10}  {stats['error']}")
+            continue
+        print(f"{intent:<52}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+    load = report.get("load")
+    if load:
+        print(
+            f"\nLoad: {load['count']} requests @ concurrency {load['concurrency']}: "
+            f"{load['throughput_rps']} req/s, p50 {load['p50_ms']:.1f} ms, p95 {load['p95_ms']:.1f} ms, "
+            f"p99 {load['p99_ms']:.1f} ms, errors {load['errors']}, RSS {load['rss_mb']} MB"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5, help="timed calls per prompt in the micro suite")
+    parser.add_argument("--requests", type=int, default=200, help="total /chat requests in the load test")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent clients in the load test")
+    parser.add_argument("--port", type=int, default=5105, help="port for the app server under test")
+    parser.add_argument("--skip-load", action="store_true", help="only run the in-process micro-benchmarks")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="write this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative p95 slowdown (0.5 = +50%%)")
+    parser.add_argument("--slack-ms", type=float, default=5.0, help="absolute slack added to every p95 budget")
+    parser.add_argument("--output", help="also write the full report to this JSON file")
+    parser.add_argument("--app-dir", default=APP_DIR, help="backend app directory (its ../Data is used)")
+    args = parser.parse_args()
+
+    stub_server, stub_url = start_stub_server()
+    os.environ.update({
+        "GROQ_API_URL": f"{stub_url}/openai/v1/chat/completions",
+        "GROQ_API_KEY": os.environ.get("GROQ_API_KEY", "stub"),
+        "NOMINATIM_URL": f"{stub_url}/search",
+        "OSRM_URL": stub_url,
+        "POTHOLE_TRACE_LOG": "off",
+        # Every load-test request comes from one client; its rate limit would answer most with 429
+        "POTHOLE_CLIENT_RATE": "0",
+    })
+    # The app resolves its data as ../Data relative to the working directory
+    args.baseline = os.path.abspath(args.baseline)
+    os.chdir(args.app_dir)
+    sys.path.insert(0, args.app_dir)
+
+    import_start = time.perf_counter()
+    import integrated
+    import instrumentation
+    report = {"startup": {"import_s": round(time.perf_counter() - import_start, 3), "rss_mb": round(current_rss_mb(), 1)}}
+
+    print(f"Micro-benchmarks: {len(PROMPT_CORPUS)} prompts x {args.iterations} iterations")
+    report["micro"] = run_micro(integrated, instrumentation, args.iterations)
+
+    if not args.skip_load:
+        print(f"Load test: {args.requests} requests, concurrency {args.concurrency}")
+        app_server, app_url = start_app_server(args.port)
+        report["load"] = run_load(app_url, args.requests, args.concurrency)
+        app_server.should_exit = True
+    report["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    stub_server.shutdown()
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.update_baseline:
+        failed = failures(report)
+        if failed:
+            print("\nNot recording a baseline from a run with failures:")
+            for line in failed:
+                print(f"  - {line}")
+            return 1
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to record one.")
+        return 1
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare_with_baseline(report, baseline, args.tolerance, args.slack_ms)
+    if regressions:
+        print("\nREGRESSIONS:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+    print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""
+Local stand-ins for the external services the chat backend calls
+(Groq chat completions, Nominatim search and OSRM routing), so benchmarks
+measure our own code instead of the network.
+"""
+
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Downtown San Antonio; every geocode resolves near here
+STUB_LAT, STUB_LON = 29.4241, -98.4936
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.startswith("/search"):
+            # Nominatim: spread addresses a little so different queries hit different spots
+            offset = (sum(map(ord, self.path)) % 100) / 2000
+            self._send_json([{"lat": str(STUB_LAT + offset), "lon": str(STUB_LON - offset)}])
+        elif self.path.startswith("/route/"):
+            # OSRM: straight line between the two requested coordinates
+            match = re.search(r"driving/([-\d.]+),([-\d.]+);([-\d.]+),([-\d.]+)", self.path)
+            lon1, lat1, lon2, lat2 = (float(v) for v in match.groups())
+            steps = 20
+            coords = [[lon1 + (lon2 - lon1) * i / steps, lat1 + (lat2 - lat1) * i / steps] for i in range(steps + 1)]
+            self._send_json({"routes": [{"geometry": {"type": "LineString", "coordinates": coords}}]})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        if self.path.endswith("/chat/completions"):
+            self._send_json({"choices": [{"message": {"role": "assistant", "content": "Stubbed LLM answer."}}]})
+        else:
+            self.send_error(404)
+
+
+def start_stub_server(host="127.0.0.1", port=0):
+    """Start the stub server in a daemon thread and return (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), _StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
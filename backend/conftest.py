@@ -0,0 +1,26 @@
+"""
+pytest setup for the backend.
+
+The app modules import each other by name and read their data from ../Data,
+so tests run with backend/app on the import path and as the working
+directory, the same way uvicorn serves it.
+"""
+
+import os
+import sys
+
+import pytest
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app")
+
+sys.path.insert(0, APP_DIR)
+os.chdir(APP_DIR)
+os.environ.setdefault("POTHOLE_TRACE_LOG", "off")
+
+
+@pytest.fixture(scope="session")
+def integrated():
+    """The chat module with whatever data is in backend/Data (loaded once per run)."""
+    import integrated
+
+    return integrated
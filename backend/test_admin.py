@@ -0,0 +1,63 @@
+"""
+Tests for the admin token check on /admin endpoints and on-demand profiling
+(profiling.py, main.py).
+"""
+
+import pandas as pd
+import pytest
+
+TOKEN = "s3cret"
+
+
+@pytest.fixture
+def client(integrated, monkeypatch, tmp_path):
+    from starlette.testclient import TestClient
+
+    import main
+    import profiling
+
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(main, "resolve_intent", lambda message: (echo, {"text": message}))
+    with TestClient(main.app) as client:
+        yield client
+
+
+def echo(text):
+    return f"echo {text}", None, pd.DataFrame()
+
+
+@pytest.mark.parametrize("method, path", [
+    ("get", "/admin/profiles"),
+    ("post", "/admin/forecast/observations"),
+    ("post", "/admin/complaints"),
+])
+def test_admin_endpoints_are_disabled_without_a_token(client, monkeypatch, method, path):
+    import profiling
+
+    monkeypatch.setattr(profiling, "ADMIN_TOKEN", None)
+    # The test client connects from a local address: that is no longer enough
+    assert getattr(client, method)(path).status_code == 404
+
+
+def test_admin_endpoints_need_the_token(client, monkeypatch):
+    import profiling
+
+    monkeypatch.setattr(profiling, "ADMIN_TOKEN", TOKEN)
+    assert client.get("/admin/profiles").status_code == 403
+    assert client.get("/admin/profiles", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.get("/admin/profiles", headers={"X-Admin-Token": TOKEN}).json() == {"profiles": []}
+
+
+@pytest.mark.parametrize("token", [None, TOKEN])
+def test_only_admins_can_ask_for_a_profile(client, monkeypatch, token):
+    import profiling
+
+    monkeypatch.setattr(profiling, "ADMIN_TOKEN", token)
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 0)
+    asked = client.post("/chat?profile=1", json={"message": "hi"}, headers={"X-Profile": "1"})
+    assert asked.json()["response"] == "echo hi"
+    assert "X-Profile-Id" not in asked.headers
+    if token:
+        admin = client.post("/chat", json={"message": "hi"}, headers={"X-Profile": "1", "X-Admin-Token": token})
+        assert "X-Profile-Id" in admin.headers
+        assert [meta["id"] for meta in profiling.list_profiles()] == [admin.headers["X-Profile-Id"]]
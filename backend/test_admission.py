@@ -0,0 +1,100 @@
+"""
+Tests for /chat admission control: lanes, queue limits and per-client rate limits (admission.py).
+"""
+
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, Rejected
+
+
+def test_client_bucket_refuses_beyond_the_burst():
+    controller = AdmissionController(lanes={"cheap": (1, 1, 1.0)}, client_rate=0.5, client_burst=2)
+    controller.check_rate("a")
+    controller.check_rate("a")
+    with pytest.raises(Rejected) as rejected:
+        controller.check_rate("a")
+    assert rejected.value.status == 429
+    assert rejected.value.retry_after == 2
+    # Buckets are per client
+    controller.check_rate("b")
+
+
+def test_zero_rate_disables_the_limit():
+    controller = AdmissionController(lanes={"cheap": (1, 1, 1.0)}, client_rate=0, client_burst=1)
+    for _ in range(10):
+        controller.check_rate("a")
+
+
+def test_full_queue_is_rejected_at_once():
+    controller = AdmissionController(lanes={"standard": (1, 1, 5.0)})
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def hold():
+            async with controller.admit("standard"):
+                await release.wait()
+
+        running = asyncio.create_task(hold())
+        queued = asyncio.create_task(hold())
+        await asyncio.sleep(0.01)
+        assert controller.status()["standard"] == {"running": 1, "waiting": 1, "concurrency": 1, "queue": 1}
+        with pytest.raises(Rejected) as rejected:
+            async with controller.admit("standard"):
+                pass
+        release.set()
+        await asyncio.gather(running, queued)
+        return rejected.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.status == 503
+    assert rejected.response().headers["Retry-After"] == str(rejected.retry_after)
+    assert controller.status()["standard"]["running"] == 0
+
+
+def test_queue_timeout_is_rejected():
+    controller = AdmissionController(lanes={"expensive": (1, 4, 0.05)})
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def hold():
+            async with controller.admit("expensive"):
+                await release.wait()
+
+        running = asyncio.create_task(hold())
+        await asyncio.sleep(0.01)
+        try:
+            with pytest.raises(Rejected) as rejected:
+                async with controller.admit("expensive"):
+                    pass
+        finally:
+            release.set()
+            await running
+        return rejected.value
+
+    assert asyncio.run(scenario()).status == 503
+    assert controller.status()["expensive"] == {"running": 0, "waiting": 0, "concurrency": 1, "queue": 4}
+
+
+def test_lanes_are_independent():
+    controller = AdmissionController(lanes={"cheap": (1, 0, 0.05), "expensive": (1, 0, 0.05)})
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def hold():
+            async with controller.admit("expensive"):
+                await release.wait()
+
+        running = asyncio.create_task(hold())
+        await asyncio.sleep(0.01)
+        async with controller.admit("cheap"):
+            admitted = True
+        release.set()
+        await running
+        return admitted
+
+    assert asyncio.run(scenario())
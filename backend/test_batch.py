@@ -0,0 +1,63 @@
+"""
+Tests for /chat/batch answering (batch.py): deduplication, answer order and
+isolation of a failing question.
+"""
+
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def batch(integrated):
+    import batch
+
+    return batch
+
+
+def echo(text):
+    return f"echo {text}", None, pd.DataFrame()
+
+
+def broken(text):
+    raise KeyError("missing column")
+
+
+def test_answers_keep_prompt_order_and_dedupe(batch):
+    calls = []
+
+    def counted(text):
+        calls.append(text)
+        return echo(text)
+
+    resolved = [(counted, {"text": "a"}), (echo, {"text": "b"}), (counted, {"text": "a"})]
+    answers = batch.answer_batch(["a", "b", "a"], resolved)
+    assert [answer[0] for answer in answers] == ["echo a", "echo b", "echo a"]
+    assert calls == ["a"]
+
+
+def test_failing_question_does_not_fail_the_batch(batch):
+    resolved = [(echo, {"text": "a"}), (broken, {"text": "b"}), (echo, {"text": "c"})]
+    answers = batch.answer_batch(["a", "b", "c"], resolved)
+    assert [answer[0] for answer in answers] == ["echo a", batch.FAILED_ANSWER, "echo c"]
+    assert answers[1][2].empty
+
+
+def test_failing_serial_question(batch, monkeypatch):
+    monkeypatch.setattr(batch, "SERIAL_HANDLERS", {broken})
+    answers = batch.answer_batch(["b", "a"], [(broken, {"text": "b"}), (echo, {"text": "a"})])
+    assert [answer[0] for answer in answers] == [batch.FAILED_ANSWER, "echo a"]
+
+
+def test_chat_batch_endpoint_with_a_failing_question(batch, monkeypatch):
+    from starlette.testclient import TestClient
+
+    import main
+
+    def resolve(message):
+        return (broken, {"text": message}) if message == "broken" else (echo, {"text": message})
+
+    monkeypatch.setattr(main, "resolve_intent", resolve)
+    with TestClient(main.app) as client:
+        response = client.post("/chat/batch", json={"messages": ["one", "broken", "two"]})
+    assert response.status_code == 200
+    assert [payload["response"] for payload in response.json()["responses"]] == ["echo one", batch.FAILED_ANSWER, "echo two"]
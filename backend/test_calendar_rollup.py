@@ -0,0 +1,72 @@
+"""
+Tests for the calendar rollups behind the time-based answers (calendar_rollup.py),
+checked against filtering the report frame directly.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from calendar_rollup import MONTH_NAMES, CalendarRollup
+
+
+@pytest.fixture(scope="module")
+def reports():
+    rng = np.random.default_rng(7)
+    opened = pd.Timestamp("2021-11-03") + pd.to_timedelta(rng.integers(0, 900, 2000), unit="D")
+    fix_days = pd.to_timedelta(rng.integers(-2, 60, 2000), unit="D")
+    closed = pd.Series(opened + fix_days).where(rng.random(2000) > 0.1)
+    frame = pd.DataFrame({"opened": opened, "closed": closed})
+    frame.loc[::97, "opened"] = pd.NaT
+    return frame
+
+
+@pytest.fixture(scope="module")
+def rollup(reports):
+    return CalendarRollup(reports["opened"], closed=reports["closed"])
+
+
+def test_months_years_and_ranges_match_the_frame(reports, rollup):
+    opened = reports["opened"].dropna()
+    for year, month in [(2021, 11), (2022, 2), (2023, 12), (2024, 6), (2020, 1)]:
+        expected = ((opened.dt.year == year) & (opened.dt.month == month)).sum()
+        assert rollup.month(year, month) == expected
+    assert rollup.years() == [(year, float(n)) for year, n in opened.dt.year.value_counts().sort_index().items()]
+    start, end = pd.Timestamp("2022-03-15"), pd.Timestamp("2022-07-01")
+    assert rollup.between(start, end) == opened.between(start, end).sum()
+    assert rollup.between("2000-01-01", "2030-01-01") == len(opened)
+    assert rollup.between(end, start) == 0
+
+
+def test_seasonal_and_latest_month(reports, rollup):
+    opened = reports["opened"].dropna()
+    by_month = opened.dt.month.value_counts()
+    assert rollup.seasonal() == [(MONTH_NAMES[m - 1], float(by_month[m])) for m in range(1, 13) if m in by_month]
+    last = opened.max()
+    assert rollup.latest_month()[:2] == (last.year, last.month)
+
+
+def test_fix_times_skip_unresolved_and_negative(reports, rollup):
+    valid = reports.dropna(subset=["opened"])
+    days = (valid["closed"] - valid["opened"]).dt.days.dropna()
+    days = days[days >= 0]
+    summary = rollup.fix_time()
+    assert summary["count"] == len(days)
+    assert summary["mean"] == pytest.approx(days.mean())
+    assert summary["median"] == days.median()
+    year = valid.loc[days.index, "opened"].dt.year
+    assert rollup.fix_time(2022)["median"] == days[year == 2022].median()
+    assert rollup.fix_time(1999) is None
+    unresolved = valid["closed"].isna().groupby(valid["opened"].dt.year).sum()
+    assert [(y, u) for y, _, u in rollup.unresolved_by_year()] == list(unresolved.items())
+
+
+def test_weights_and_empty_input():
+    weighted = CalendarRollup(["2024-01-01", "2024-01-02", "2024-02-01"], counts=[3, 2, 5])
+    assert weighted.month(2024, 1) == 5
+    assert weighted.fix_time() is None
+    empty = CalendarRollup(pd.Series([], dtype="datetime64[ns]"))
+    assert empty.empty
+    assert empty.month(2024, 1) == 0 and empty.between("2024-01-01", "2024-12-31") == 0
+    assert empty.year(2024) == 0
+    assert not empty.covers_month(2024, 1)
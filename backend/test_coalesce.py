@@ -0,0 +1,100 @@
+"""
+Tests for single-flight coalescing of identical concurrent questions (coalesce.py).
+"""
+
+import threading
+import time
+
+import pytest
+
+from coalesce import SingleFlight, WaitTimeout
+
+
+def start_waiters(flights, key, fn, count, **kwargs):
+    """Run `count` callers of `flights.do` in threads; returns their threads and outcomes."""
+    outcomes = []
+
+    def call():
+        try:
+            outcomes.append(flights.do(key, fn, **kwargs))
+        except Exception as e:
+            outcomes.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, outcomes
+
+
+def wait_until(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline, "condition never held"
+        time.sleep(0.001)
+
+
+def waiters(flights, key):
+    with flights._lock:
+        return flights._flights[key].waiters
+
+
+def test_concurrent_callers_share_one_answer():
+    recorded = []
+    flights = SingleFlight(on_flight=lambda key, waiters, seconds: recorded.append((key, waiters)))
+    release, calls = threading.Event(), []
+
+    def answer():
+        calls.append(1)
+        release.wait(5)
+        return "answer"
+
+    leader, outcomes = start_waiters(flights, "q", answer, 1)
+    wait_until(lambda: flights.in_flight() == 1)
+    followers, shared = start_waiters(flights, "q", answer, 3)
+    wait_until(lambda: waiters(flights, "q") == 3)
+    release.set()
+    for thread in leader + followers:
+        thread.join(5)
+    assert calls == [1]
+    assert outcomes == [("answer", False)]
+    assert shared == [("answer", True)] * 3
+    assert recorded == [("q", 3)]
+    assert flights.in_flight() == 0
+
+
+def test_key_is_forgotten_once_answered():
+    flights = SingleFlight()
+    assert flights.do("q", lambda: 1) == (1, False)
+    assert flights.do("q", lambda: 2) == (2, False)
+
+
+def test_error_reaches_every_waiter():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def broken():
+        release.wait(5)
+        raise KeyError("missing column")
+
+    leader, outcomes = start_waiters(flights, "q", broken, 1)
+    wait_until(lambda: flights.in_flight() == 1)
+    followers, shared = start_waiters(flights, "q", broken, 2)
+    wait_until(lambda: waiters(flights, "q") == 2)
+    release.set()
+    for thread in leader + followers:
+        thread.join(5)
+    assert all(isinstance(outcome, KeyError) for outcome in outcomes + shared)
+    assert flights.in_flight() == 0
+
+
+def test_waiter_timeout_leaves_the_flight_running():
+    flights = SingleFlight()
+    release = threading.Event()
+    leader, outcomes = start_waiters(flights, "q", lambda: release.wait(5) and "late", 1)
+    wait_until(lambda: flights.in_flight() == 1)
+    with pytest.raises(WaitTimeout):
+        flights.do("q", lambda: "mine", timeout=0.05)
+    assert waiters(flights, "q") == 0
+    release.set()
+    leader[0].join(5)
+    assert outcomes == [("late", False)]
@@ -0,0 +1,72 @@
+"""
+Tests for the per-request deadline budget and degraded answers (deadline.py).
+"""
+
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from deadline import MIN_STEP_SECONDS, DeadlineExceeded, Degraded, budget, collect, degrade, remaining, timeout_for
+
+
+def test_no_budget_outside_a_request():
+    assert remaining() is None
+    assert timeout_for(5) == 5
+
+
+def test_inner_budget_never_outlasts_the_outer_one():
+    with budget(1):
+        with budget(60):
+            assert remaining() <= 1
+        with budget(0.5):
+            assert remaining() <= 0.5
+        assert 0.5 < remaining() <= 1
+    assert remaining() is None
+
+
+def test_timeout_for_is_capped_by_the_budget():
+    with budget(2):
+        assert timeout_for(10) <= 2
+        assert timeout_for(1) == 1
+    with budget(MIN_STEP_SECONDS / 2):
+        with pytest.raises(DeadlineExceeded):
+            timeout_for(10)
+
+
+def test_collect_returns_degraded_answers_with_their_reasons():
+    def answer():
+        degrade("used the street list")
+        degrade("used the street list")
+        degrade("drew a straight line")
+        return "text", None, pd.DataFrame()
+
+    answer = collect(answer)
+    assert isinstance(answer, Degraded)
+    assert answer[0] == "text"
+    assert answer.reasons == ["used the street list", "drew a straight line"]
+    assert not isinstance(collect(lambda: ("text", None, pd.DataFrame())), Degraded)
+    # Outside of collect there is nobody to tell
+    degrade("ignored")
+
+
+def test_waiting_on_an_identical_question_answers_within_the_budget(integrated):
+    release = threading.Event()
+
+    def slow_answer():
+        release.wait(5)
+        return "slow", None, pd.DataFrame()
+
+    leader = threading.Thread(target=integrated.answer_intent, args=(slow_answer, {}))
+    leader.start()
+    try:
+        while integrated.answer_flights.in_flight() == 0:
+            time.sleep(0.001)
+        with budget(0.1):
+            answer = integrated.answer_intent(slow_answer, {})
+    finally:
+        release.set()
+        leader.join(5)
+    assert isinstance(answer, Degraded)
+    assert answer.reasons == ["The same question was already being answered and did not finish in time."]
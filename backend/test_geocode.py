@@ -0,0 +1,58 @@
+"""
+Tests for geocoding with the Nominatim cache and the local fallback (integrated.py).
+"""
+
+import pytest
+import requests
+
+from deadline import collect
+
+
+def response(status, body=b"[]"):
+    resp = requests.Response()
+    resp.status_code = status
+    resp.url = "http://nominatim.test/search"
+    resp._content = body
+    return resp
+
+
+@pytest.fixture
+def nominatim(integrated, monkeypatch):
+    """Serve Nominatim answers from a list; records every request made."""
+    answers, calls = [], []
+
+    def get(url, params=None, **kwargs):
+        calls.append(params["q"])
+        answer = answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    monkeypatch.setattr(integrated.requests, "get", get)
+    integrated._geocode.cache_clear()
+    yield answers, calls
+    integrated._geocode.cache_clear()
+
+
+def geocode(integrated, address):
+    return collect(lambda: (integrated.geocode_address(address),))
+
+
+@pytest.mark.parametrize("failure", [response(429), response(503), requests.exceptions.ConnectionError(), response(200, b"<html>")])
+def test_failures_fall_back_and_are_not_cached(integrated, nominatim, failure):
+    answers, calls = nominatim
+    answers += [failure, response(200, b'[{"lat": "29.5", "lon": "-98.5"}]')]
+    first = geocode(integrated, "San Antonio")
+    assert first[0] == integrated.CITY_CENTER
+    assert first.reasons == ["The geocoder did not answer, so 'San Antonio' was placed from the street list."]
+    # The failure was not cached: the next question asks Nominatim again
+    assert geocode(integrated, "San Antonio")[0] == (29.5, -98.5)
+    assert calls == ["San Antonio", "San Antonio"]
+
+
+def test_no_match_is_cached(integrated, nominatim):
+    answers, calls = nominatim
+    answers.append(response(200, b"[]"))
+    assert geocode(integrated, "Nowhere St")[0] == (None, None)
+    assert geocode(integrated, "Nowhere St")[0] == (None, None)
+    assert calls == ["Nowhere St"]
@@ -0,0 +1,57 @@
+"""
+Tests for the segment-level pothole reports (pothole_reports.py) and the
+"which areas have the most potholes" answer built on them.
+"""
+
+import pandas as pd
+
+from pothole_reports import PotholeReports
+from streets import StreetIndex
+
+REPORTS = pd.DataFrame({
+    "CASEID": [1, 2, 3, 4, 5, 5],
+    "CartID": ["10", "10", "11", "20", "21.0", "10"],
+    "MSAG_Name": ["BABCOCK RD", "BABCOCK RD", "BABCOCK RD", "PRUE RD", "PRUE RD", "BABCOCK RD"],
+})
+SEGMENTS = pd.DataFrame({
+    "CartID": ["10", "11", "20"],
+    "MSAG_Name": ["BABCOCK RD", "BABCOCK RD", "PRUE RD"],
+    "Latitude": [29.5, 29.51, 29.4],
+    "Longitude": [-98.6, -98.61, -98.5],
+})
+
+
+def test_counts_per_street_and_segment():
+    reports = PotholeReports(REPORTS, segments=SEGMENTS, street_index=StreetIndex())
+    assert len(reports) == 6
+    assert reports.case_count == 5
+    assert list(reports.segment_counts(["10", "11", "99"])) == [3, 1, 0]
+    top = reports.top_streets(5)
+    assert list(top["MSAG_Name"]) == ["BABCOCK RD", "PRUE RD"]
+    assert list(top["potholes"]) == [4, 2]
+    assert list(top["segments"]) == [2, 2]
+
+
+def test_street_locations_use_segment_coordinates():
+    reports = PotholeReports(REPORTS, segments=SEGMENTS, street_index=StreetIndex())
+    top = reports.top_streets(1)
+    located = reports.street_locations(top["street_id"])
+    assert list(located.columns) == ["MSAG_Name", "Latitude", "Longitude"]
+    assert sorted(located["Latitude"]) == [29.5, 29.51]
+
+
+def test_street_locations_without_pavement():
+    reports = PotholeReports(REPORTS, street_index=StreetIndex())
+    located = reports.street_locations(reports.top_streets(2)["street_id"])
+    assert located.empty
+    assert list(located.columns) == ["MSAG_Name", "Latitude", "Longitude"]
+
+
+def test_areas_with_most_potholes_without_pavement(integrated, monkeypatch):
+    # The repo ships Potholes_on_COSA_Streets.csv but not COSA_Pavement.csv
+    monkeypatch.setattr(integrated, "pavement_latlon_df", pd.DataFrame())
+    monkeypatch.setattr(integrated, "pothole_reports", PotholeReports(REPORTS, street_index=integrated.street_index))
+    response, fig, highlight_df = integrated.handle_areas_with_most_potholes()
+    assert "BABCOCK RD: **4** potholes on 2 segments" in response
+    assert fig is None
+    assert highlight_df.empty
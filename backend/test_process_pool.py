@@ -0,0 +1,54 @@
+"""
+Tests for answering CPU-bound intents in worker processes (process_pool.py).
+"""
+
+import multiprocessing
+import time
+
+import pandas as pd
+import pytest
+
+from deadline import Degraded, budget, collect, degrade
+
+pytestmark = pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="the pool forks its workers")
+
+
+def slow_answer(seconds):
+    time.sleep(seconds)
+    return "slow", None, pd.DataFrame()
+
+
+def cheap_answer():
+    degrade("used a cheaper answer")
+    return "cheap", None, pd.DataFrame()
+
+
+@pytest.fixture
+def pool(integrated, monkeypatch):
+    import process_pool
+
+    # Workers look handlers up by name on the integrated module they were forked with
+    monkeypatch.setattr(integrated, "slow_answer", slow_answer, raising=False)
+    monkeypatch.setattr(integrated, "cheap_answer", cheap_answer, raising=False)
+    monkeypatch.setattr(integrated, "PROCESS_HANDLERS", integrated.PROCESS_HANDLERS | {slow_answer, cheap_answer})
+    assert process_pool.start(1) == 1
+    yield process_pool
+    process_pool.stop()
+
+
+def test_degrade_reasons_come_back_from_the_worker(integrated, pool):
+    with budget(10):
+        answer = collect(integrated.run_intent, cheap_answer, {})
+    assert isinstance(answer, Degraded)
+    assert answer[0] == "cheap"
+    assert answer.reasons == ["used a cheaper answer"]
+
+
+def test_timeout_is_not_answered_again_in_process(integrated, pool):
+    started = time.perf_counter()
+    with budget(0.3):
+        answer = collect(integrated.run_intent, slow_answer, {"seconds": 2})
+    # Answering again in-process would have slept another 2 seconds
+    assert time.perf_counter() - started < 1.5
+    assert isinstance(answer, Degraded)
+    assert answer[0] == pool.TIMED_OUT_ANSWER
@@ -0,0 +1,83 @@
+"""
+Tests for the warm-start snapshot of startup-derived artifacts (snapshot.py).
+"""
+
+import os
+import time
+
+import pandas as pd
+import pytest
+
+import snapshot
+from snapshot import Snapshot
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "reports.csv"
+    path.write_text("CASEID,MSAG_Name\n1,BLANCO RD\n")
+    return str(path)
+
+
+def cold_start(source, directory, value="BLANCO RD"):
+    warm_start = Snapshot([source], directory=directory)
+    table = warm_start.artifact("reports", lambda: pd.DataFrame({"CASEID": [1], "street_id": [0]}))
+    names = warm_start.artifact("names", lambda: [value])
+    return warm_start, table, names
+
+
+def test_artifacts_are_read_back_on_unchanged_sources(source, tmp_path):
+    directory = str(tmp_path / "snap")
+    first, _, _ = cold_start(source, directory)
+    assert not first.restored
+    assert first.save() == first.path
+    second, table, names = cold_start(source, directory, value="rebuilt")
+    assert second.restored
+    assert list(table["CASEID"]) == [1]
+    assert names == ["BLANCO RD"]
+
+
+def test_rewrite_with_the_same_size_and_mtime_changes_the_key(source, tmp_path):
+    directory = str(tmp_path / "snap")
+    first = Snapshot([source], directory=directory)
+    stat = os.stat(source)
+    with open(source, "w") as f:
+        f.write("CASEID,MSAG_Name\n2,BLANCO RD\n")
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    # The cached hash is keyed by size and mtime, so only a fresh cache sees the rewrite
+    os.remove(os.path.join(directory, snapshot.HASHES_FILE))
+    assert Snapshot([source], directory=directory).key != first.key
+
+
+def test_unchanged_files_are_not_hashed_again(source, tmp_path, monkeypatch):
+    directory = str(tmp_path / "snap")
+    Snapshot([source], directory=directory)
+    hashed = []
+    digest = snapshot.file_digest
+    monkeypatch.setattr(snapshot, "file_digest", lambda path: hashed.append(path) or digest(path))
+    Snapshot([source], directory=directory)
+    assert hashed == []
+    with open(source, "a") as f:
+        f.write("3,CULEBRA RD\n")
+    Snapshot([source], directory=directory)
+    assert hashed == [source]
+
+
+def test_save_prunes_only_older_snapshots(source, tmp_path):
+    directory = str(tmp_path / "snap")
+    older, _, _ = cold_start(source, directory)
+    older.save()
+    newer = os.path.join(directory, "newer")
+    os.makedirs(newer)
+    with open(os.path.join(newer, "manifest.json"), "w") as f:
+        f.write("{}")
+    now = time.time()
+    os.utime(os.path.join(older.path, "manifest.json"), (now - 60, now - 60))
+    os.utime(os.path.join(newer, "manifest.json"), (now + 60, now + 60))
+    with open(source, "a") as f:
+        f.write("3,CULEBRA RD\n")
+    current, _, _ = cold_start(source, directory)
+    assert current.save() == current.path
+    assert not os.path.exists(older.path)
+    assert os.path.exists(newer)
+    assert os.path.exists(os.path.join(directory, snapshot.HASHES_FILE))
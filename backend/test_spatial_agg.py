@@ -0,0 +1,85 @@
+"""
+Tests for clustering map highlights by zoom and viewport (spatial_agg.py).
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from spatial_agg import HighlightStore, cluster_points, parse_bbox
+
+
+@pytest.fixture(scope="module")
+def potholes():
+    rng = np.random.default_rng(3)
+    n = 5000
+    return pd.DataFrame({
+        "Latitude": 29.42 + rng.normal(0, 0.08, n),
+        "Longitude": -98.49 + rng.normal(0, 0.08, n),
+        "PCI": np.where(rng.random(n) < 0.2, np.nan, rng.uniform(10, 100, n)),
+        "count": rng.integers(1, 4, n),
+    })
+
+
+def test_small_results_come_back_unchanged():
+    df = pd.DataFrame({"Latitude": [29.4, None], "Longitude": [-98.5, -98.6], "PCI": [55.0, np.nan]})
+    out, info = cluster_points(df, zoom=12)
+    assert info == {"clustered": False, "zoom": 12, "total": 1}
+    assert len(out) == 2
+    # JSON has no NaN
+    assert out["PCI"].tolist() == [55.0, None]
+
+
+def test_clusters_keep_every_count(potholes):
+    clusters, info = cluster_points(potholes, zoom=14, max_clusters=100)
+    assert info["clustered"] and info["total"] == len(potholes)
+    assert len(clusters) <= 100
+    assert info["zoom"] <= 14
+    assert clusters["count"].sum() == potholes["count"].sum()
+    assert clusters["count"].is_monotonic_decreasing
+    assert (clusters["min_lat"] <= clusters["Latitude"]).all() and (clusters["Latitude"] <= clusters["max_lat"]).all()
+    assert set(clusters["color"]) <= {"green", "orange", "red"}
+
+
+def test_zooming_in_gives_more_clusters(potholes):
+    coarse, coarse_info = cluster_points(potholes, zoom=9, max_clusters=1000)
+    fine, fine_info = cluster_points(potholes, zoom=11, max_clusters=1000)
+    assert coarse_info["zoom"] == 9 and fine_info["zoom"] == 11
+    assert len(fine) > len(coarse)
+    # Too many cells for the limit: the grid coarsens until they fit
+    _, info = cluster_points(potholes, zoom=16, max_clusters=1000)
+    assert info["zoom"] < 16
+
+
+def test_bbox_drops_points_outside_the_view(potholes):
+    bbox = (-98.50, 29.41, -98.48, 29.43)
+    inside = potholes["Longitude"].between(bbox[0], bbox[2]) & potholes["Latitude"].between(bbox[1], bbox[3])
+    out, info = cluster_points(potholes, zoom=15, bbox=bbox)
+    assert info["total"] == inside.sum()
+    assert out["Latitude"].between(bbox[1], bbox[3]).all()
+
+
+def test_single_cell_pci_is_count_weighted():
+    df = pd.DataFrame({"Latitude": [29.4] * 3, "Longitude": [-98.5] * 3, "PCI": [40.0, 80.0, np.nan], "count": [3, 1, 5]})
+    clusters, info = cluster_points(df, zoom=12, max_clusters=1)
+    assert info["clustered"]
+    assert clusters.loc[0, "count"] == 9
+    assert clusters.loc[0, "PCI"] == 50.0
+    assert clusters.loc[0, "color"] == "orange"
+
+
+def test_parse_bbox():
+    assert parse_bbox("-98.6,29.3,-98.4,29.5") == (-98.6, 29.3, -98.4, 29.5)
+    assert parse_bbox([-98.6, 29.3, -98.4, 29.5]) == (-98.6, 29.3, -98.4, 29.5)
+    assert parse_bbox("1,2,3") is None
+    assert parse_bbox("a,b,c,d") is None
+    assert parse_bbox(None) is None
+
+
+def test_highlight_store_evicts_the_least_recently_used():
+    store = HighlightStore(capacity=2)
+    first, second = store.put("a"), store.put("b")
+    assert store.get(first) == "a"
+    third = store.put("c")
+    assert store.get(second) is None
+    assert store.get(first) == "a" and store.get(third) == "c"
@@ -0,0 +1,83 @@
+"""
+Tests for the shared street vocabulary (streets.py).
+"""
+
+import os
+
+import duckdb
+import numpy as np
+import pytest
+
+from streets import MISSING, StreetIndex, StreetRows, base_key, canonical, intersection_parts
+
+POTHOLES_PARQUET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "potholes.parquet")
+
+
+def test_canonical_and_base_key():
+    assert canonical("South St. Mary's Street") == "S ST MARYS ST"
+    assert canonical("West Ave") == "WEST AVE"
+    assert canonical("IH10") == "IH 10"
+    assert base_key(canonical("S St Marys St")) == "ST MARYS"
+    assert base_key(canonical("Military Dr SE")) == "MILITARY"
+    assert base_key(canonical("Zarzamora N")) == "ZARZAMORA"
+    assert base_key(canonical("Avenue E")) == "AVENUE E"
+    assert base_key(canonical("Ave E")) == "AVE E"
+
+
+def test_intersection_parts():
+    assert intersection_parts("BLANCO RD and WURZBACH PKWY") == ["BLANCO RD", "WURZBACH PKWY"]
+    assert intersection_parts("Culebra & Bandera") == ["Culebra", "Bandera"]
+    assert intersection_parts("BLANCO RD") == []
+    assert intersection_parts(None) == []
+
+
+def test_add_encodes_columns():
+    index = StreetIndex()
+    ids = index.add(["BLANCO RD", "Blanco Road", None, "", "N BLANCO RD"])
+    assert ids[0] == ids[1]
+    assert ids[2] == MISSING and ids[3] == MISSING
+    assert ids[4] != ids[0]
+    assert index.spellings([ids[0]]) == ["BLANCO RD", "Blanco Road"]
+
+
+def test_lookup_tiers():
+    index = StreetIndex()
+    index.add(["BLANCO RD", "N BLANCO RD", "WEST BLANCO RD", "BLANCO KEY", "S ST MARYS ST", "VANCE JACKSON", "IH 35"])
+    # Base key: the exact name and its directional variants, not other streets containing the word
+    assert index.names_for(index.lookup("Blanco Rd")) == ["BLANCO RD", "N BLANCO RD", "W BLANCO RD"]
+    assert index.names_for(index.lookup("St. Mary's")) == ["S ST MARYS ST"]
+    # Every word of the query
+    assert index.names_for(index.lookup("jackson")) == ["VANCE JACKSON"]
+    # Typos, but never for numbered highways
+    assert index.names_for(index.lookup("Vance Jakson")) == ["VANCE JACKSON"]
+    assert index.lookup("IH 53") == []
+    assert index.lookup("") == []
+
+
+def test_intersections_are_spellings_of_both_streets():
+    index = StreetIndex()
+    index.add(["BLANCO RD", "BLANCO RD and WURZBACH PKWY"])
+    assert "BLANCO RD and WURZBACH PKWY" in index.spellings(index.lookup("Blanco Rd"))
+    assert index.spellings(index.lookup("Wurzbach Pkwy")) == ["BLANCO RD and WURZBACH PKWY", "WURZBACH PKWY"]
+
+
+def test_street_rows():
+    rows = StreetRows(np.array([2, 0, 2, MISSING, 1, 2]))
+    assert list(rows.rows([2])) == [0, 2, 5]
+    assert list(rows.rows([0, 1])) == [1, 4]
+    assert list(rows.rows([7])) == []
+    assert list(rows.rows([])) == []
+
+
+@pytest.mark.skipif(not os.path.exists(POTHOLES_PARQUET), reason="backend/potholes.parquet not present")
+@pytest.mark.parametrize("street", ["Fredericksburg Rd", "Culebra Rd", "Blanco Rd", "Huebner Rd", "Military Dr", "Zarzamora"])
+def test_lookup_keeps_every_substring_match(street):
+    """The street index finds every report the old ILIKE '%street%' filter found."""
+    con = duckdb.connect()
+    counts = dict(con.execute("SELECT street_name, count(*) FROM read_parquet(?) GROUP BY 1", [POTHOLES_PARQUET]).fetchall())
+    old = {name: n for name, n in counts.items() if name and street.lower() in name.lower()}
+    index = StreetIndex()
+    index.add([name for name in counts if name])
+    spellings = set(index.spellings(index.lookup(street)))
+    assert set(old) <= spellings
+    assert sum(counts[name] for name in spellings if name in counts) >= sum(old.values())
@@ -0,0 +1,201 @@
+"""
+Tests for the Mapbox Vector Tile encoder (tiles.py), decoded with a small
+independent protobuf reader.
+"""
+
+import math
+import struct
+
+import geopandas as gpd
+import numpy as np
+import pytest
+import shapely
+
+
+@pytest.fixture(scope="module")
+def tiles(integrated):
+    import tiles
+
+    return tiles
+
+
+# ---------- A minimal protobuf / MVT reader ----------
+def read_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, pos
+
+
+def read_fields(data):
+    """[(field number, value)] of one message; length-delimited values are bytes."""
+    fields, pos = [], 0
+    while pos < len(data):
+        key, pos = read_varint(data, pos)
+        field, wire = key >> 3, key & 7
+        if wire == 0:
+            value, pos = read_varint(data, pos)
+        elif wire == 1:
+            value, pos = struct.unpack("<d", data[pos:pos + 8])[0], pos + 8
+        elif wire == 2:
+            length, pos = read_varint(data, pos)
+            value, pos = bytes(data[pos:pos + length]), pos + length
+        else:
+            raise AssertionError(f"unexpected wire type {wire}")
+        fields.append((field, value))
+    return fields
+
+
+def unzigzag(value):
+    return (value >> 1) ^ -(value & 1)
+
+
+def read_packed(data):
+    values, pos = [], 0
+    while pos < len(data):
+        value, pos = read_varint(data, pos)
+        values.append(value)
+    return values
+
+
+def read_value(data):
+    (field, value), = read_fields(data)
+    return {1: lambda v: v.decode(), 3: float, 5: int, 6: unzigzag, 7: bool}[field](value)
+
+
+def read_geometry(commands):
+    """Parts of a feature as lists of absolute (x, y); a closed ring ends with its first vertex."""
+    parts, x, y, i = [], 0, 0, 0
+    while i < len(commands):
+        command, count = commands[i] & 7, commands[i] >> 3
+        i += 1
+        if command == 7:
+            parts[-1].append(parts[-1][0])
+            continue
+        for _ in range(count):
+            x, y = x + unzigzag(commands[i]), y + unzigzag(commands[i + 1])
+            i += 2
+            if command == 1:
+                parts.append([(x, y)])
+            else:
+                parts[-1].append((x, y))
+    return parts
+
+
+def read_tile(data):
+    """The tile's one layer as a dict with its features' ids, types, properties and geometry."""
+    (field, layer_bytes), = read_fields(data)
+    assert field == 3
+    layer = {"features": [], "keys": [], "values": []}
+    raw_features = []
+    for field, value in read_fields(layer_bytes):
+        if field == 15:
+            layer["version"] = value
+        elif field == 1:
+            layer["name"] = value.decode()
+        elif field == 2:
+            raw_features.append(value)
+        elif field == 3:
+            layer["keys"].append(value.decode())
+        elif field == 4:
+            layer["values"].append(read_value(value))
+        elif field == 5:
+            layer["extent"] = value
+    for raw in raw_features:
+        feature = {"id": None, "properties": {}}
+        for field, value in read_fields(raw):
+            if field == 1:
+                feature["id"] = value
+            elif field == 2:
+                tags = read_packed(value)
+                feature["properties"] = {layer["keys"][k]: layer["values"][v] for k, v in zip(tags[::2], tags[1::2])}
+            elif field == 3:
+                feature["type"] = value
+            elif field == 4:
+                feature["geometry"] = read_geometry(read_packed(value))
+        layer["features"].append(feature)
+    return layer
+
+
+def tile_for(lat, lon, z):
+    n = 2 ** z
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return x, y
+
+
+def signed_area(ring):
+    xs, ys = np.array(ring[:-1], dtype=float).T
+    return float(np.sum(xs * np.roll(ys, -1) - np.roll(xs, -1) * ys)) / 2
+
+
+# ---------- Tests ----------
+@pytest.mark.parametrize("value", [7, 0, -3, 2 ** 40, 1.5, -0.25, True, False, "BLANCO RD", "Señal"])
+def test_values_round_trip(tiles, value):
+    decoded = read_value(tiles._encode_value(value))
+    assert decoded == value and type(decoded) is type(value)
+
+
+def test_points_land_where_they_belong(tiles):
+    lat, lon, z = 29.4241, -98.4936, 15
+    x, y = tile_for(lat, lon, z)
+    source = tiles._PointSource(np.array([lat]), np.array([lon]), {"name": np.array(["Alamo"]), "PCI": np.array([61.5])})
+    encoder = tiles._LayerEncoder("potholes")
+    source.render(encoder, z, tiles.tile_bounds(z, x, y))
+    layer = read_tile(encoder.encode())
+    assert (layer["name"], layer["version"], layer["extent"]) == ("potholes", 2, tiles.EXTENT)
+    (feature,) = layer["features"]
+    assert feature["type"] == 1 and feature["id"] == 1
+    assert feature["properties"] == {"name": "Alamo", "PCI": 61.5, "count": 1}
+    ((px, py),), = feature["geometry"]
+    # Back from tile units to degrees, within one tile unit
+    n = 2 ** z * tiles.EXTENT
+    assert (x * tiles.EXTENT + px) / n * 360.0 - 180.0 == pytest.approx(lon, abs=360.0 / n)
+    assert 0 <= px < tiles.EXTENT and 0 <= py < tiles.EXTENT
+
+
+def test_nearby_points_merge_below_the_detail_zoom(tiles):
+    lat = np.array([29.4241, 29.42411, 29.40])
+    lon = np.array([-98.4936, -98.49361, -98.6])
+    source = tiles._PointSource(lat, lon, {"name": np.array(["a", "b", "c"])}, weight=np.array([2, 3, 1]))
+    z = 10
+    x, y = tile_for(29.4241, -98.4936, z)
+    encoder = tiles._LayerEncoder("potholes")
+    source.render(encoder, z, tiles.tile_bounds(z, x, y))
+    layer = read_tile(encoder.encode())
+    counts = sorted(feature["properties"]["count"] for feature in layer["features"])
+    assert counts == [1, 5]
+    # Shared tag values are stored once
+    assert len(layer["values"]) == len(set(layer["values"]))
+
+
+def test_polygon_rings_follow_the_winding_rule(tiles):
+    z = 14
+    x, y = tile_for(29.4241, -98.4936, z)
+    square = shapely.Polygon(
+        [(-98.50, 29.42), (-98.48, 29.42), (-98.48, 29.43), (-98.50, 29.43)],
+        holes=[[(-98.495, 29.424), (-98.495, 29.427), (-98.49, 29.427), (-98.49, 29.424)]],
+    )
+    gdf = gpd.GeoDataFrame({"name": ["Downtown"]}, geometry=[square], crs="EPSG:4326")
+    encoder = tiles._LayerEncoder("districts")
+    tiles._PolygonSource(gdf, {"name": "name"}).render(encoder, z, tiles.tile_bounds(z, x, y))
+    (feature,) = read_tile(encoder.encode())["features"]
+    assert feature["type"] == 3
+    assert feature["properties"] == {"name": "Downtown"}
+    exterior, hole = feature["geometry"]
+    assert exterior[0] == exterior[-1] and hole[0] == hole[-1]
+    # Exterior rings have positive area in tile coordinates, holes negative
+    assert signed_area(exterior) > 0
+    assert signed_area(hole) < 0
+    # Clipped to the tile plus its buffer
+    assert all(-tiles.BUFFER <= v <= tiles.EXTENT + tiles.BUFFER for point in exterior for v in point)
+
+
+def test_empty_tile_is_empty_bytes(tiles, monkeypatch):
+    monkeypatch.setattr(tiles, "_source", lambda layer: tiles._PointSource(np.array([29.4]), np.array([-98.5]), {}))
+    assert tiles.render_tile("potholes", 10, 0, 0) == b""
+    assert tiles.render_tile("potholes", 10, *tile_for(29.4, -98.5, 10)) != b""
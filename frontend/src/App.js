@@ -16,6 +16,7 @@ function App() {
   const [selectedArea, setSelectedArea] = useState(null);
   const [customData, setCustomData] = useState(null);
   const [highlightData, setHighlightData] = useState(null);
+  const [highlightId, setHighlightId] = useState(null); // set when the backend clustered the highlights
   const [viewMode, setViewMode] = useState('district'); // NEW
 
   useEffect(() => {
@@ -74,6 +75,8 @@ function App() {
               params={customData || (profiles.map)}
               onAreaClick={handleAreaClick}
               highlightData={highlightData}
+              highlightId={highlightId}
+              setHighlightData={setHighlightData}
               viewMode={viewMode}
             />
           </div>
@@ -81,7 +84,7 @@ function App() {
         
         {/* Right Side - Chatbot (20%) */}
         <div className="sidebar-section">
-          <FeedbackBubble setHighlightData={setHighlightData} />
+          <FeedbackBubble setHighlightData={setHighlightData} setHighlightId={setHighlightId} />
         </div>
       </div>
       
@@ -5,7 +5,7 @@ import sendIcon from '../assets/images/iconoir_send-solid.svg';
 import botIcon from '../assets/images/BFI_LogoIcon.svg';
 import Markdown from 'markdown-to-jsx';
 
-export default function FeedbackBubble({ setHighlightData }) {
+export default function FeedbackBubble({ setHighlightData, setHighlightId }) {
   const [message, setMessage] = useState('');
   const [chatHistory, setChatHistory] = useState([]);
   const [loading, setLoading] = useState(false);
@@ -24,10 +24,14 @@ export default function FeedbackBubble({ setHighlightData }) {
         body: JSON.stringify({ message }),
       });
       const data = await res.json();
-      setChatHistory((prev) => [...prev, { from: 'bot', text: data.response }]);
+      // Busy-server rejections (429/503) carry a `detail` instead of a response
+      setChatHistory((prev) => [...prev, { from: 'bot', text: data.response ?? data.detail, degraded: data.degraded }]);
       if (setHighlightData) {
         setHighlightData(data.highlight_data || null);
       }
+      if (setHighlightId) {
+        setHighlightId(data.highlight_id || null);
+      }
     } catch (err) {
       setChatHistory((prev) => [...prev, { from: 'bot', text: 'Sorry, there was an error connecting to the chatbot.' }]);
       if (setHighlightData) {
@@ -85,6 +89,9 @@ export default function FeedbackBubble({ setHighlightData }) {
             )}
             <div className={`message-bubble ${msg.from === 'user' ? 'user-message' : 'bot-message'}`}>
               {renderMessageText(msg.text, msg.from)}
+              {msg.degraded && (
+                <div className="degraded-note">Partial answer: {msg.degraded.join(' ')}</div>
+              )}
             </div>
           </div>
         ))}
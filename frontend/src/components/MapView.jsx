@@ -1,6 +1,6 @@
 // ZipMap.jsx
 import React, { useEffect, useState } from "react";
-import { MapContainer, TileLayer, GeoJSON, Circle, Marker, Popup } from "react-leaflet";
+import { MapContainer, TileLayer, GeoJSON, Circle, Marker, Popup, useMapEvents } from "react-leaflet";
 import "leaflet/dist/leaflet.css";
 import * as turf from '@turf/turf';
 import md5 from 'md5'; // for hashing
@@ -23,7 +23,30 @@ const targetZips = [
 
 const mapCenter = [29.4252, -98.4946]; // Downtown San Antonio
 
-export default function ZipMap({ highlightData, viewMode }) {
+// Large answers come back as clusters; ask the backend to re-cluster them for the
+// visible area whenever the map moves, so points expand as the user zooms in.
+function ViewportClusters({ highlightId, setHighlightData }) {
+  const map = useMapEvents({
+    moveend: () => refresh(),
+  });
+
+  const refresh = () => {
+    if (!highlightId || !setHighlightData) return;
+    const b = map.getBounds();
+    const bbox = [b.getWest(), b.getSouth(), b.getEast(), b.getNorth()].join(',');
+    fetch(`http://localhost:5005/highlights/${highlightId}?zoom=${map.getZoom()}&bbox=${bbox}`)
+      .then((res) => (res.ok ? res.json() : null))
+      .then((data) => {
+        if (data) setHighlightData(data.highlight_data || null);
+      })
+      .catch(() => {});
+  };
+
+  useEffect(refresh, [highlightId]); // eslint-disable-line react-hooks/exhaustive-deps
+  return null;
+}
+
+export default function ZipMap({ highlightData, highlightId, setHighlightData, viewMode }) {
   const [zipData, setZipData] = useState(null);
   const [zipCounts, setZipCounts] = useState({}); // NEW
 
@@ -150,6 +173,7 @@ export default function ZipMap({ highlightData, viewMode }) {
         attribution='&copy; OpenStreetMap contributors'
         url="https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png"
       />
+      <ViewportClusters highlightId={highlightId} setHighlightData={setHighlightData} />
       {zipData && viewMode === 'district' && (
         <>
           <GeoJSON key={geoJsonKey} data={zipData} style={style} onEachFeature={onEachFeature} />
@@ -1,35 +1,19 @@
-// using public hardcoded files in public folder
+// Dashboard data from the backend API (precomputed per ZIP, cached with ETags)
 import axios from 'axios';
 
-export async function fetchGeoData() {
-  const res = await axios.get('/geo.json'); // From /public
+const API_BASE = 'http://localhost:5005';
+
+export async function fetchGeoData(zoom = 11) {
+  const res = await axios.get(`${API_BASE}/api/geo`, { params: { zoom } });
   return res.data;
 }
 
-export async function fetchIndicators() {
-  const res = await axios.get('/indicators.json'); // From /public
+export async function fetchIndicators(indicator = 'pothole_complaints') {
+  const res = await axios.get(`${API_BASE}/api/indicators`, { params: { indicator } });
   return res.data;
 }
 
 export async function fetchProfile(areaId) {
-  const res = await axios.get(`/profiles/${areaId}.json`);
+  const res = await axios.get(`${API_BASE}/api/profiles/${areaId}`);
   return res.data;
 }
-
-
-// import axios from 'axios';
-
-// export async function fetchGeoData() {
-//   const res = await axios.get('/path/to/geojson'); 
-//   return res.data;
-// }
-
-// export async function fetchIndicators() {
-//   const res = await axios.get('/api/indicators');
-//   return res.data;
-// }
-
-// export async function fetchProfile(areaId) {
-//   const res = await axios.get(`/api/profiles/${areaId}`);
-//   return res.data;
-// }